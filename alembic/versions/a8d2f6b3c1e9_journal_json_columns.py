@@ -0,0 +1,44 @@
+"""store journal feedback_next_actions / analysis_labels as JSONB
+
+Revision ID: a8d2f6b3c1e9
+Revises: f1c4a9d27b53
+Create Date: 2026-10-17 18:00:00.000000
+
+以前のアプリは json.dumps した文字列を書いていたため、JSON 文字列として二重に
+エンコードされた値（jsonb_typeof = 'string'）はここで配列に戻す。SQLite は TEXT のまま（JSONText）。
+"""
+
+from __future__ import annotations
+
+revision = "a8d2f6b3c1e9"
+down_revision = "f1c4a9d27b53"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+COLUMNS = ("feedback_next_actions", "analysis_labels")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in COLUMNS:
+        op.execute(
+            f"""
+            ALTER TABLE trade_journal ALTER COLUMN {column} TYPE JSONB USING (
+                CASE
+                    WHEN {column} IS NULL THEN NULL
+                    WHEN jsonb_typeof({column}::text::jsonb) = 'string' THEN ({column}::text::jsonb #>> '{{}}')::jsonb
+                    ELSE {column}::text::jsonb
+                END
+            )
+            """
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE trade_journal ALTER COLUMN {column} TYPE TEXT USING {column}::text")
@@ -0,0 +1,44 @@
+"""composite indexes for keyset pagination
+
+Revision ID: b41f7c2d9e10
+Revises: 7e3c9d9b02f0
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+revision = "b41f7c2d9e10"
+down_revision = "7e3c9d9b02f0"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+INDEXES = (
+    ("ix_chat_messages_chat_id_created_at_id", "chat_messages", ["chat_id", "created_at", "id"]),
+    ("ix_trade_journal_closed_at_journal_id", "trade_journal", ["closed_at", "journal_id"]),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # 本番テーブルへの書き込みを止めないよう CONCURRENTLY で作成する（トランザクション外が必要）
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
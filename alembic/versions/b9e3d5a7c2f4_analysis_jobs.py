@@ -0,0 +1,52 @@
+"""analysis_jobs: DB-backed background job queue
+
+Revision ID: b9e3d5a7c2f4
+Revises: a8d2f6b3c1e9
+Create Date: 2026-10-17 19:00:00.000000
+
+ジョブは app.services.jobs のプロセス内ワーカーが処理する（外部ブローカーなし）。
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "b9e3d5a7c2f4"
+down_revision = "a8d2f6b3c1e9"
+branch_labels = None
+depends_on = None
+
+
+JSON_DOCUMENT = sa.Text().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analysis_jobs",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column("lane", sa.String(length=16), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("payload", JSON_DOCUMENT, nullable=False),
+        sa.Column("input_data", sa.LargeBinary(), nullable=True),
+        sa.Column("result", JSON_DOCUMENT, nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("worker_id", sa.String(length=64), nullable=True),
+        sa.Column("run_after", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_analysis_jobs_status_run_after", "analysis_jobs", ["status", "run_after"])
+    op.create_index("ix_analysis_jobs_user_id_status", "analysis_jobs", ["user_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_analysis_jobs_user_id_status", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_status_run_after", table_name="analysis_jobs")
+    op.drop_table("analysis_jobs")
@@ -0,0 +1,66 @@
+"""positions ledger derived from ENTRY/EXIT chat messages
+
+Revision ID: d7a4e2c91f35
+Revises: b41f7c2d9e10
+Create Date: 2026-10-17 12:00:00.000000
+
+既存の ENTRY/EXIT メッセージは scripts/backfill_positions.py で台帳に取り込む。
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "d7a4e2c91f35"
+down_revision = "b41f7c2d9e10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "positions",
+        sa.Column("trade_id", sa.String(), primary_key=True),
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.user_id"), nullable=True),
+        sa.Column("symbol_code", sa.String(), nullable=False),
+        sa.Column("symbol_name", sa.String(), nullable=True),
+        sa.Column("side", sa.String(), nullable=False),
+        sa.Column("qty_open", sa.Integer(), nullable=False),
+        sa.Column("qty_entered", sa.Integer(), nullable=False),
+        sa.Column("qty_exited", sa.Integer(), nullable=False),
+        sa.Column("avg_entry", sa.Float(), nullable=False),
+        sa.Column("realized_pnl", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("opened_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_positions_chat_id_status", "positions", ["chat_id", "status"])
+    op.create_index("ix_positions_user_id_status", "positions", ["user_id", "status"])
+
+    op.create_table(
+        "position_events",
+        sa.Column("message_id", sa.String(), primary_key=True),
+        sa.Column("trade_id", sa.String(), nullable=False),
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("symbol_code", sa.String(), nullable=True),
+        sa.Column("symbol_name", sa.String(), nullable=True),
+        sa.Column("side", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_position_events_trade_id_created_at", "position_events", ["trade_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_position_events_trade_id_created_at", table_name="position_events")
+    op.drop_table("position_events")
+    op.drop_index("ix_positions_user_id_status", table_name="positions")
+    op.drop_index("ix_positions_chat_id_status", table_name="positions")
+    op.drop_table("positions")
@@ -0,0 +1,39 @@
+"""journal rollups for /journal/stats
+
+Revision ID: e5b8c3a0d6f1
+Revises: d7a4e2c91f35
+Create Date: 2026-10-17 15:00:00.000000
+
+既存の trade_journal は scripts/backfill_journal_stats.py で集計する。
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "e5b8c3a0d6f1"
+down_revision = "d7a4e2c91f35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "journal_rollups",
+        sa.Column("scope", sa.String(), primary_key=True),
+        sa.Column("dimension", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.String(), primary_key=True),
+        sa.Column("trades", sa.Integer(), nullable=False),
+        sa.Column("wins", sa.Integer(), nullable=False),
+        sa.Column("pnl_abs_sum", sa.Float(), nullable=False),
+        sa.Column("pnl_pct_sum", sa.Float(), nullable=False),
+        sa.Column("hold_minutes_sum", sa.Integer(), nullable=False),
+        sa.Column("peak_pnl", sa.Float(), nullable=False),
+        sa.Column("max_drawdown", sa.Float(), nullable=False),
+        sa.Column("last_closed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("journal_rollups")
@@ -0,0 +1,67 @@
+"""indexes for journal filtering and symbol search
+
+Revision ID: f1c4a9d27b53
+Revises: e5b8c3a0d6f1
+Create Date: 2026-10-17 17:00:00.000000
+
+symbol の前方一致（4桁コード）は text_pattern_ops の (symbol, closed_at) で、部分一致は
+pg_trgm の GIN インデックスで引く。pg_trgm が使えない環境では GIN だけ作らない。
+オフライン（--sql）では拡張の有無を問い合わせられないので、pg_trgm がある前提で SQL を出す。
+"""
+
+from __future__ import annotations
+
+revision = "f1c4a9d27b53"
+down_revision = "e5b8c3a0d6f1"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+INDEXES = (
+    ("ix_trade_journal_user_id_closed_at", ["user_id", "closed_at"], {}),
+    ("ix_trade_journal_symbol_closed_at", ["symbol", "closed_at"], {"postgresql_ops": {"symbol": "text_pattern_ops"}}),
+)
+TRGM_INDEX = "ix_trade_journal_symbol_trgm"
+
+
+def upgrade() -> None:
+    context = op.get_context()
+    if context.dialect.name != "postgresql":
+        for name, columns, _ in INDEXES:
+            op.create_index(name, "trade_journal", columns, if_not_exists=True)
+        return
+
+    has_trgm = (
+        context.as_sql
+        or op.get_bind().execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar()
+    )
+    if has_trgm:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # 本番テーブルへの書き込みを止めないよう CONCURRENTLY で作成する（トランザクション外が必要）
+    with context.autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(name, "trade_journal", columns, postgresql_concurrently=True, if_not_exists=True, **options)
+        if has_trgm:
+            op.create_index(
+                TRGM_INDEX,
+                "trade_journal",
+                ["symbol"],
+                postgresql_using="gin",
+                postgresql_ops={"symbol": "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="trade_journal", if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(TRGM_INDEX, table_name="trade_journal", postgresql_concurrently=True, if_exists=True)
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="trade_journal", postgresql_concurrently=True, if_exists=True)
@@ -24,6 +24,20 @@ class Settings(BaseSettings):
     database_url_sync: str | None = Field(default=None, alias="DATABASE_URL_SYNC")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
+    openai_base_url: str = Field(default="https://api.openai.com/v1", alias="OPENAI_BASE_URL")
+    llm_timeout: float = Field(default=60.0, alias="LLM_TIMEOUT")
+    llm_connect_timeout: float = Field(default=5.0, alias="LLM_CONNECT_TIMEOUT")
+    llm_max_connections: int = Field(default=20, alias="LLM_MAX_CONNECTIONS")
+    llm_max_keepalive_connections: int = Field(default=10, alias="LLM_MAX_KEEPALIVE_CONNECTIONS")
+    llm_max_concurrency: int = Field(default=8, alias="LLM_MAX_CONCURRENCY")
+    llm_max_retries: int = Field(default=3, alias="LLM_MAX_RETRIES")
+    llm_cache_backend: str = Field(default="memory", alias="LLM_CACHE_BACKEND")
+    llm_cache_ttl: float = Field(default=86400.0, alias="LLM_CACHE_TTL")
+    llm_cache_max_entries: int = Field(default=1000, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_path: str = Field(default="data/llm_cache.sqlite3", alias="LLM_CACHE_PATH")
+    positions_feed_backend: str = Field(default="memory", alias="POSITIONS_FEED_BACKEND")
+    positions_feed_coalesce_ms: float = Field(default=50.0, alias="POSITIONS_FEED_COALESCE_MS")
+    positions_feed_max_pending: int = Field(default=256, alias="POSITIONS_FEED_MAX_PENDING")
     mock_ai: bool = Field(default=False, alias="MOCK_AI")
     jwt_secret_key: str = Field(default="your-secret-key", alias="JWT_SECRET_KEY")
     jwt_algorithm: str = Field(default="HS256", alias="JWT_ALGORITHM")
@@ -31,7 +45,29 @@ class Settings(BaseSettings):
     db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
     db_pool_recycle: int | None = Field(default=1800, alias="DB_POOL_RECYCLE")
     db_pool_timeout: float | None = Field(default=30.0, alias="DB_POOL_TIMEOUT")
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")
+    db_pool_use_lifo: bool = Field(default=True, alias="DB_POOL_USE_LIFO")
     database_echo: bool = Field(default=False, alias="DATABASE_ECHO")
+    rule_scoring_engine: str = Field(default="python", alias="RULE_SCORING_ENGINE")
+    scoring_pool_size: int = Field(default=2, alias="SCORING_POOL_SIZE")
+    scoring_call_timeout: float = Field(default=2.0, alias="SCORING_CALL_TIMEOUT")
+    scoring_health_interval: float = Field(default=30.0, alias="SCORING_HEALTH_INTERVAL")
+    analysis_rule_timeout: float = Field(default=5.0, alias="ANALYSIS_RULE_TIMEOUT")
+    analysis_gpt_timeout: float = Field(default=30.0, alias="ANALYSIS_GPT_TIMEOUT")
+    analysis_batch_concurrency: int = Field(default=8, alias="ANALYSIS_BATCH_CONCURRENCY")
+    job_workers: int = Field(default=4, alias="JOB_WORKERS")
+    job_interactive_workers: int = Field(default=1, alias="JOB_INTERACTIVE_WORKERS")
+    job_per_user_limit: int = Field(default=2, alias="JOB_PER_USER_LIMIT")
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    job_retry_backoff: float = Field(default=5.0, alias="JOB_RETRY_BACKOFF")
+    job_timeout: float = Field(default=300.0, alias="JOB_TIMEOUT")
+    job_poll_interval: float = Field(default=1.0, alias="JOB_POLL_INTERVAL")
+    job_retention: float = Field(default=604800.0, alias="JOB_RETENTION")
+    job_maintenance_interval: float = Field(default=60.0, alias="JOB_MAINTENANCE_INTERVAL")
+    template_cache_dir: str | None = Field(default=None, alias="TEMPLATE_CACHE_DIR")
+    entry_advice_cache_size: int = Field(default=512, alias="ENTRY_ADVICE_CACHE_SIZE")
+    bar_store_path: str = Field(default="data/bars", alias="BAR_STORE_PATH")
 
     @property
     def is_production(self) -> bool:
@@ -1,36 +1,62 @@
 from __future__ import annotations
 
 from collections.abc import AsyncGenerator, Generator
-from typing import Any
+from typing import Any, Dict
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.settings import get_settings
+from app.db.pool import pool_kwargs, pool_metrics
 
 settings = get_settings()
 
 
-def _engine_kwargs() -> dict[str, Any]:
+def _engine_kwargs(url: str, name: str, *, asynchronous: bool) -> dict[str, Any]:
     kwargs: dict[str, Any] = {
         "echo": settings.database_echo,
         "pool_pre_ping": settings.db_pool_pre_ping,
+        **pool_kwargs(
+            url,
+            name,
+            asynchronous=asynchronous,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            use_lifo=settings.db_pool_use_lifo,
+            timeout=settings.db_pool_timeout,
+        ),
     }
     if settings.db_pool_recycle is not None:
         kwargs["pool_recycle"] = settings.db_pool_recycle
-    if settings.db_pool_timeout is not None:
-        kwargs["pool_timeout"] = settings.db_pool_timeout
     return kwargs
 
 
-_async_engine_kwargs = _engine_kwargs()
-_async_engine = create_async_engine(settings.async_database_url, **_async_engine_kwargs)
+_async_engine = create_async_engine(
+    settings.async_database_url, **_engine_kwargs(settings.async_database_url, "async", asynchronous=True)
+)
 async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
 
-_sync_engine_kwargs = _engine_kwargs()
-_sync_engine = create_engine(settings.sync_database_url, **_sync_engine_kwargs)
-session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_sync_engine)
+# 同期エンジンはアプリのリクエスト経路では使わない（スクリプト・テスト用）。
+# 最初に必要になったときに作るので、API プロセスは同期側のプールを持たない。
+_sync_engine: Engine | None = None
+_session_factory: sessionmaker[Session] | None = None
+
+
+def get_sync_engine() -> Engine:
+    global _sync_engine, _session_factory
+    if _sync_engine is None:
+        _sync_engine = create_engine(
+            settings.sync_database_url, **_engine_kwargs(settings.sync_database_url, "sync", asynchronous=False)
+        )
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_sync_engine)
+    return _sync_engine
+
+
+def get_session_factory() -> sessionmaker[Session]:
+    get_sync_engine()
+    assert _session_factory is not None
+    return _session_factory
 
 
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
@@ -39,12 +65,28 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
 
 
 def get_db() -> Generator[Session, None, None]:
-    session = session_factory()
+    session = get_session_factory()()
     try:
         yield session
     finally:
         session.close()
 
 
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """作成済みエンジンのプールのメトリクス（このワーカー分）"""
+    stats = {"async": pool_metrics("async").as_dict(_async_engine.sync_engine.pool)}
+    if _sync_engine is not None:
+        stats["sync"] = pool_metrics("sync").as_dict(_sync_engine.pool)
+    return stats
+
+
 async_engine = _async_engine
-sync_engine = _sync_engine
+
+
+def __getattr__(name: str) -> Any:
+    # `from app.database import sync_engine` / `session_factory` は従来どおり使える（その時点で作成）
+    if name == "sync_engine":
+        return get_sync_engine()
+    if name == "session_factory":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,35 @@
+"""Opaque keyset (cursor) tokens for list endpoints.
+
+A cursor encodes the sort key of the last row on a page, e.g.
+`(created_at, id)`. The next page is fetched with a row-value comparison
+(`(created_at, id) > (:ts, :id)`) against a matching composite index, so deep
+pages cost the same as the first one instead of scanning and discarding
+`OFFSET` rows.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+def encode_cursor(sort_value: datetime, key: Any) -> str:
+    raw = json.dumps([sort_value.isoformat(), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), key
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise InvalidCursorError(f"invalid cursor: {token!r}") from exc
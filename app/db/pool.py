@@ -0,0 +1,109 @@
+"""コネクションプールの設定とメトリクス
+
+QueuePool / AsyncAdaptedQueuePool を計測付きのサブクラスに差し替え、checkout の待ち時間
+（空きがなければその待ち、新規接続なら接続確立と pre-ping を含む）とタイムアウト回数を記録する。
+飽和度は checkout 中の接続数 / (pool_size + max_overflow)。
+
+メトリクスはプールの logging_name ごとに保持する。engine.dispose() でプールが作り直されても
+logging_name は引き継がれるので、値はプロセスの間ずっと累積される。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.checked_out_max = 0
+
+    def record_checkout(self, wait_ms: float, checked_out: int) -> None:
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self.checked_out_max = max(self.checked_out_max, checked_out)
+
+    def as_dict(self, pool: Optional[Pool] = None) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+            "checkout_wait_ms_max": round(self.wait_ms_max, 3),
+            "checked_out_max": self.checked_out_max,
+        }
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            stats.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                saturation=round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+            )
+        return stats
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+
+
+def pool_metrics(name: str) -> PoolMetrics:
+    return _metrics.setdefault(name, PoolMetrics())
+
+
+class _TimedCheckoutMixin:
+    def connect(self):
+        metrics = pool_metrics(self._orig_logging_name or "default")
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        metrics.record_checkout((time.perf_counter() - started) * 1000, self.checkedout())
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_kwargs(
+    url: str,
+    name: str,
+    *,
+    asynchronous: bool,
+    pool_size: int,
+    max_overflow: int,
+    use_lifo: bool,
+    timeout: Optional[float],
+) -> Dict[str, Any]:
+    """create_engine / create_async_engine に渡すプール設定
+
+    SQLite は SQLAlchemy 既定のプール（メモリ DB なら StaticPool など）のままにする。
+    LIFO にすると直近に使った接続から再利用され、余った接続は pool_recycle まで触られず閉じられる。
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    kwargs: Dict[str, Any] = {
+        "poolclass": TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_use_lifo": use_lifo,
+    }
+    if timeout is not None:
+        kwargs["pool_timeout"] = timeout
+    return kwargs
@@ -6,6 +6,7 @@ from enum import Enum
 from typing import Any, Type
 
 from sqlalchemy import String, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.types import TypeDecorator
 
 
@@ -71,4 +72,9 @@ class JSONText(TypeDecorator):
         return json.loads(value)
 
 
-__all__ = ["UUIDStr", "EnumStr", "JSONText"]
+# PostgreSQL では JSONB、それ以外（SQLite のテスト）では JSONText。
+# none_as_null: Python の None を JSON の null ではなく SQL NULL で保存する（COALESCE で既存値を残せるように）
+JSONDocument = JSONText().with_variant(JSONB(none_as_null=True), "postgresql")
+
+
+__all__ = ["UUIDStr", "EnumStr", "JSONText", "JSONDocument"]
@@ -0,0 +1,27 @@
+"""Dialect-native INSERT constructs for upserts (`ON CONFLICT ...`).
+
+PostgreSQL and SQLite share the `on_conflict_do_nothing()` /
+`on_conflict_do_update()` API and the `excluded` namespace, so callers build one
+statement and only the import differs. The SQL-level `GREATEST` is spelled
+`max(a, b)` on SQLite.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import func
+
+
+def dialect_insert(dialect_name: str, table):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(table)
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(table)
+    raise ValueError(f"Unsupported dialect for upsert: {dialect_name}")
+
+
+def greatest(dialect_name: str, *values):
+    return func.greatest(*values) if dialect_name == "postgresql" else func.max(*values)
@@ -11,9 +11,27 @@ from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 
 from app.core.settings import get_settings
-from app.database import async_engine
+from app.database import async_engine, pool_stats
+from app.db.pagination import NEXT_CURSOR_HEADER
 from app.models import Base  # noqa: F401  # Ensure metadata import for Alembic autogenerate
-from app.routers import advice, ai, analyze, chats, exit_feedback, images, integrated_advice, journal, trades
+from app.routers import (
+    advice,
+    ai,
+    analyze,
+    chats,
+    exit_feedback,
+    images,
+    integrated_advice,
+    jobs,
+    journal,
+    positions,
+    trades,
+)
+from app.services.jobs import get_job_pool, shutdown_job_pool
+from app.services.llm_transport import shutdown_llm_transport
+from app.services.positions_feed import get_positions_feed, shutdown_positions_feed
+from app.services.registry import get_service_registry, shutdown_service_registry
+from app.services.scoring_pool import shutdown_scoring_pool
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +50,20 @@ async def lifespan(app: FastAPI):
     except Exception as exc:  # noqa: BLE001 - startup failures should propagate after logging
         logger.exception("Database connectivity check failed during startup: %s", exc)
         raise
+    # テンプレートのコンパイルとサービスの組み立てを最初のリクエストより前に済ませる
+    get_service_registry()
+    feed = get_positions_feed()
+    if feed is not None:
+        await feed.start()
+    job_pool = get_job_pool()
+    if job_pool is not None:
+        await job_pool.start()
     yield
+    await shutdown_job_pool()
+    await shutdown_positions_feed()
+    shutdown_scoring_pool()
+    await shutdown_llm_transport()
+    shutdown_service_registry()
     await async_engine.dispose()
 
 
@@ -44,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(images.router)
@@ -53,6 +85,9 @@ app.include_router(chats.router)
 app.include_router(ai.router)
 app.include_router(journal.router)
 app.include_router(trades.router)
+app.include_router(positions.router)
+app.include_router(positions.live_router)
+app.include_router(jobs.router)
 app.include_router(integrated_advice.router, prefix="/api/v1", tags=["integrated-analysis"])
 app.include_router(exit_feedback.router, prefix="/api/v1", tags=["exit-feedback"])
 
@@ -78,3 +113,9 @@ async def healthz() -> JSONResponse:
 async def legacy_health() -> JSONResponse:
     status_code, payload = await _health_response()
     return JSONResponse(status_code=status_code, content=payload)
+
+
+@app.get("/healthz/db")
+async def database_pool_stats() -> dict:
+    """コネクションプールのメトリクス（このワーカー分、DB には問い合わせない）"""
+    return pool_stats()
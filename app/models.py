@@ -4,11 +4,11 @@ from datetime import datetime
 from typing import Any, Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text, text
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from app.db.types import JSONText
+from app.db.types import JSONDocument, JSONText
 
 
 class Base(DeclarativeBase):
@@ -157,6 +157,10 @@ class Chat(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # キーセットページング (created_at, id) 用
+        Index("ix_chat_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id"), nullable=False)
@@ -176,6 +180,16 @@ class ChatMessage(Base):
 
 class TradeJournal(Base):
     __tablename__ = "trade_journal"
+    __table_args__ = (
+        # キーセットページング (closed_at, journal_id) 用
+        Index("ix_trade_journal_closed_at_journal_id", "closed_at", "journal_id"),
+        # 一覧の絞り込み用（app/services/journal_query.py）。symbol の部分一致用の pg_trgm GIN
+        # インデックス ix_trade_journal_symbol_trgm はマイグレーションでのみ作成する（拡張が必要なため）
+        Index("ix_trade_journal_user_id_closed_at", "user_id", "closed_at"),
+        Index(
+            "ix_trade_journal_symbol_closed_at", "symbol", "closed_at", postgresql_ops={"symbol": "text_pattern_ops"}
+        ),
+    )
 
     journal_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     trade_uuid: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("trades.trade_uuid"), unique=True)
@@ -196,14 +210,113 @@ class TradeJournal(Base):
     # Feedback from chat
     feedback_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     feedback_tone: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    feedback_next_actions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    feedback_next_actions: Mapped[Optional[list[str]]] = mapped_column(JSONDocument, nullable=True)
     feedback_message_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     # Analysis data (optional)
     analysis_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    analysis_labels: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    analysis_labels: Mapped[Optional[list[str]]] = mapped_column(JSONDocument, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
     )
+
+
+class Position(Base):
+    """ENTRY/EXIT メッセージを tradeId 単位で畳み込んだ建玉台帳（position_events から再構築可能）"""
+
+    __tablename__ = "positions"
+    __table_args__ = (
+        Index("ix_positions_chat_id_status", "chat_id", "status"),
+        Index("ix_positions_user_id_status", "user_id", "status"),
+    )
+
+    trade_id: Mapped[str] = mapped_column(String, primary_key=True)
+    chat_id: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True), ForeignKey("users.user_id"), nullable=True)
+    symbol_code: Mapped[str] = mapped_column(String, nullable=False)
+    symbol_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    side: Mapped[str] = mapped_column(String, nullable=False)  # LONG, SHORT
+
+    qty_open: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    qty_entered: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    qty_exited: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    avg_entry: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    realized_pnl: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="OPEN")  # OPEN, CLOSED
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    opened_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    closed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class PositionEvent(Base):
+    """台帳に畳み込んだ ENTRY/EXIT メッセージ（1メッセージ1行）"""
+
+    __tablename__ = "position_events"
+    __table_args__ = (Index("ix_position_events_trade_id_created_at", "trade_id", "created_at"),)
+
+    message_id: Mapped[str] = mapped_column(String, primary_key=True)
+    trade_id: Mapped[str] = mapped_column(String, nullable=False)
+    chat_id: Mapped[str] = mapped_column(String, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # ENTRY, EXIT
+    price: Mapped[float] = mapped_column(Float, nullable=False)
+    qty: Mapped[int] = mapped_column(Integer, nullable=False)
+    symbol_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    symbol_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    side: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # chat_messages.created_at と同じ naive UTC
+
+
+class JournalRollup(Base):
+    """trade_journal の集計バケット（close_trade と同じトランザクションで journal_stats が更新する）"""
+
+    __tablename__ = "journal_rollups"
+
+    scope: Mapped[str] = mapped_column(String, primary_key=True)  # user_id（ユーザーなしは ""）
+    dimension: Mapped[str] = mapped_column(String, primary_key=True)  # total, symbol, side, day, week, month
+    bucket: Mapped[str] = mapped_column(String, primary_key=True)  # 銘柄 / LONG・SHORT / 期間の開始日 (UTC)
+
+    trades: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    wins: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pnl_abs_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    pnl_pct_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    hold_minutes_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # 累積損益（= pnl_abs_sum を closed_at 順に積んだもの）のピークと、そこからの最大下落幅
+    peak_pnl: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    max_drawdown: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    last_closed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class AnalysisJob(Base):
+    """バックグラウンドで実行する画像解析・フィードバック生成（app.services.jobs のワーカーが処理する）"""
+
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # ワーカーの取り出し（queued を run_after 順）と、ユーザーごとの実行中件数
+        Index("ix_analysis_jobs_status_run_after", "status", "run_after"),
+        Index("ix_analysis_jobs_user_id_status", "user_id", "status"),
+    )
+
+    job_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)  # chart_analysis, integrated_analysis, exit_feedback
+    lane: Mapped[str] = mapped_column(String(16), nullable=False, default="interactive")  # interactive, batch
+    user_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True), nullable=True)
+    # queued, running, succeeded, failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONDocument, nullable=False)
+    input_data: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)  # 画像（完了時に消す）
+    result: Mapped[Optional[dict[str, Any]]] = mapped_column(JSONDocument, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)  # 再試行のバックオフ
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,20 +1,19 @@
 import base64
-import json
 import logging
+import uuid
+from datetime import datetime, timedelta, timezone
 
-import markdown2
-import requests
-from fastapi import APIRouter, Body, Depends, File, HTTPException, Request, UploadFile
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, UploadFile
 from fastapi.templating import Jinja2Templates
-from jinja2 import Template
-from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.settings import get_settings
-from app.database import get_async_db
-from app.models import Chat
-from app.schemas.indicator_facts import IndicatorFacts
-from app.services.strategy_estimator import estimate_strategy
+from app.database import async_session_factory, get_async_db
+from app.services.chat_writes import append_messages
+from app.services.entry_advice import entry_advice_template, generate_entry_advice  # noqa: F401  # 従来の import 先
+from app.services.llm_cache import cached_completion
+from app.services.llm_streaming import LLMStreamer, advice_event_stream, cached_stream, get_llm_streamer, sse_response
+from app.services.llm_transport import LLMTransport, LLMTransportError, extract_content, get_llm_transport
 
 logger = logging.getLogger(__name__)
 
@@ -23,130 +22,104 @@ templates = Jinja2Templates(directory="app/templates")
 
 settings = get_settings()
 
-entry_advice_template = Template("""
-## ✅ 現在の状況（{{ time }}時点）
-
-### 🔍 テクニカルチェック
-
-| 項目 | 状況 |
-| --- | --- |
-| 下降トレンド入り | {{ trend_check }} |
-| ボリンジャーバンド収束 | {{ bollinger_contraction }} |
-| RSI過熱感 | {{ rsi_overheat }} |
-
-### 📈 価格動向
-
-| 指標 | 値 |
-| --- | --- |
-| 現在価格 | {{ current_price }} |
-| 移動平均線 | {{ moving_average }} |
-
-## ✅ 今の判断まとめ
-
-| 判断項目 | 結果 |
-| --- | --- |
-| エントリー推奨 | {{ entry_recommendation }} |
-| 利確ポイント | {{ take_profit_point }} |
-| 損切りポイント | {{ stop_loss_point }} |
-
-## 🧠 今できること（戦略タスク）
-
-{% if strategy.tactical_summary %}
-<ul>
-{% for item in strategy.tactical_summary %}
-  <li>{{ item }}</li>
-{% endfor %}
-</ul>
-{% endif %}
-""")
-
-
-def generate_entry_advice(facts: IndicatorFacts) -> str:
-    strategy = estimate_strategy(facts)
-    facts_dict = facts.dict()
-    raw_markdown = entry_advice_template.render(
-        time=facts_dict.get("time", "未指定"),
-        trend_check=facts_dict.get("trend_check", ""),
-        bollinger_contraction=facts_dict.get("bollinger_contraction", ""),
-        rsi_overheat=facts_dict.get("rsi_overheat", ""),
-        current_price=facts_dict.get("current_price", ""),
-        moving_average=facts_dict.get("moving_average", ""),
-        entry_recommendation=strategy.get("entry_recommendation", ""),
-        take_profit_point=strategy.get("take_profit_point", ""),
-        stop_loss_point=strategy.get("stop_loss_point", ""),
-        strategy=strategy,
-    )
-    html = markdown2.markdown(raw_markdown, extras=["tables"])
-    # print("=== Generated HTML ===")
-    # print(repr(html))
-    # print("======================")
-    return html
-
-
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
-
-
-def _openai_headers() -> dict[str, str]:
-    api_key = settings.openai_api_key
-    if not api_key:
+ADVICE_SYSTEM_PROMPT = (
+    "あなたはプロの株式スイングトレーダー兼アナリストです。\n"
+    "まず、画像から銘柄名（企業名、証券コード、Ticker）を特定してください。\n"
+    "銘柄名は以下の優先順位で抽出：\n"
+    "1)証券コード（4桁数字） 2)カタカナ企業名 3)漢字企業名 4)英語企業名\n"
+    "その後、以下のフォーマットに従い、日本語で初心者にも分かりやすく詳細かつ論理的に解析結果を"
+    "Markdown形式で出力してください。\n\n"
+    "STOCK_NAME_EXTRACTED: {抽出した銘柄名}\n"
+    "📊 {銘柄名（証券コード）} チャート分析（{日付・時刻時点}）\n"
+    "⸻\n"
+    "✅ テクニカル分析まとめ\n\n"
+    "🟢 株価動向\n"
+    "・現在値、前日比、高値、安値、終値、トレンド方向を簡潔に解説\n\n"
+    "⸻\n"
+    "📈 移動平均線\n"
+    "・短期・中期・長期線の状況を解説\n\n"
+    "⸻\n"
+    "🔸 出来高\n"
+    "・出来高状況、買い圧力や売り圧力のコメント\n\n"
+    "⸻\n"
+    "🔶 RSI（相対力指数）\n"
+    "・RSI値と解釈を解説\n\n"
+    "🎯 エントリーポイント戦略\n"
+    "パターン / 条件 / エントリー価格目安 / ストップライン / 利確目標 / "
+    "リスクリワードを簡潔に提示\n\n"
+    "🧠 補足\n"
+    "・トレード判断に影響するポイントや注意事項\n\n"
+    "このフォーマットを必ず守り、Markdown形式で出力してください。"
+)
+
+
+USER_AUTHOR_ID = "user"
+BOT_AUTHOR_ID = "bot"
+
+EMPTY_ANSWER_MESSAGE = "⚠️ AIから有効な回答が返りませんでした。質問をより具体的にして再度お試しください。"
+
+
+def _openai_transport() -> LLMTransport:
+    if not settings.openai_api_key:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    return get_llm_transport()
+
+
+def _llm_streamer() -> LLMStreamer:
+    streamer = get_llm_streamer()
+    if isinstance(streamer, LLMTransport) and not streamer.api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    return streamer
+
+
+async def _save_streamed_messages(chat_id: str, user_message: str, bot_response: str):
+    """ストリーミング応答の保存（レスポンス本体の送信中なので専用セッションを使う）"""
+    if not chat_id:
+        return
+    async with async_session_factory() as session:
+        await update_chat_messages(session, chat_id, user_message, bot_response)
 
 
 async def update_chat_messages(db: AsyncSession, chat_id: str, user_message: str, bot_response: str):
-    """チャットのメッセージを更新する"""
+    """チャットに質問と回答を ChatMessage 行として追記する
+
+    履歴全体（messages_json）を読み書きせず、2行の INSERT と chats.updated_at の更新だけを行う。
+    """
     if not chat_id:
         return
 
     try:
-        # チャットを取得
-        stmt = select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None))
-        result = await db.execute(stmt)
-        chat = result.scalar_one_or_none()
-
-        if not chat:
+        now = datetime.now(timezone.utc)
+        created_at = now.replace(tzinfo=None)
+        # チャットの存在確認・2行の INSERT・updated_at の更新をまとめて行う
+        rows = await append_messages(
+            db,
+            chat_id,
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "type": "TEXT",
+                    "author_id": USER_AUTHOR_ID,
+                    "text": user_message,
+                    "created_at": created_at,
+                },
+                {
+                    "id": str(uuid.uuid4()),
+                    "type": "TEXT",
+                    "author_id": BOT_AUTHOR_ID,
+                    "text": bot_response,
+                    # 同一時刻でも質問→回答の順に並ぶようにする
+                    "created_at": created_at + timedelta(microseconds=1),
+                },
+            ],
+            touched_at=now,
+        )
+        if not rows:
             logger.warning(f"Chat {chat_id} not found")
             return
-
-        # 既存のメッセージを取得
-        existing_messages = []
-        if chat.messages_json:
-            try:
-                existing_messages = json.loads(chat.messages_json)
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON in chat {chat_id} messages")
-
-        # 新しいメッセージを追加
-        import uuid
-        from datetime import datetime
-
-        user_msg = {
-            "id": str(uuid.uuid4()),
-            "type": "user",
-            "content": user_message,
-            "timestamp": datetime.now().strftime("%H:%M"),
-        }
-
-        bot_msg = {
-            "id": str(uuid.uuid4()),
-            "type": "bot",
-            "content": bot_response,
-            "timestamp": datetime.now().strftime("%H:%M"),
-        }
-
-        existing_messages.extend([user_msg, bot_msg])
-
-        # チャットを更新
-        stmt = (
-            update(Chat)
-            .where(Chat.id == chat_id)
-            .values(messages_json=json.dumps(existing_messages, ensure_ascii=False), updated_at=datetime.utcnow())
-        )
-
-        await db.execute(stmt)
         await db.commit()
 
-        logger.info(f"Updated chat {chat_id} with new messages")
+        logger.info(f"Appended advice messages to chat {chat_id}")
 
     except Exception as e:
         logger.error(f"Error updating chat messages: {str(e)}")
@@ -163,6 +136,7 @@ async def advice(
     exit_price: float = Body(None),
     symbol_context: str = Body(None),
     analysis_context: str = Body(None),
+    stream: bool = Query(False, description="trueならSSEでトークンを逐次返す"),
     db: AsyncSession = Depends(get_async_db),
 ):
     # Attempt to extract message if not provided by FastAPI Body parsing
@@ -197,84 +171,35 @@ async def advice(
         # Case 2: Text question provided
         if message:
             # Handle text question input
-            headers = _openai_headers()
             payload = {
                 "model": "gpt-4o-mini",
                 "messages": [
                     {
                         "role": "system",
-                        "content": (
-                            "あなたはプロの株式スイングトレーダー兼アナリストです。\n"
-                            "まず、画像から銘柄名（企業名、証券コード、Ticker）を特定してください。\n"
-                            "銘柄名は以下の優先順位で抽出：\n"
-                            "1)証券コード（4桁数字） 2)カタカナ企業名 3)漢字企業名 4)英語企業名\n"
-                            "その後、以下のフォーマットに従い、日本語で初心者にも分かりやすく詳細かつ論理的に解析結果を"
-                            "Markdown形式で出力してください。\n\n"
-                            "STOCK_NAME_EXTRACTED: {抽出した銘柄名}\n"
-                            "📊 {銘柄名（証券コード）} チャート分析（{日付・時刻時点}）\n"
-                            "⸻\n"
-                            "✅ テクニカル分析まとめ\n\n"
-                            "🟢 株価動向\n"
-                            "・現在値、前日比、高値、安値、終値、トレンド方向を簡潔に解説\n\n"
-                            "⸻\n"
-                            "📈 移動平均線\n"
-                            "・短期・中期・長期線の状況を解説\n\n"
-                            "⸻\n"
-                            "🔸 出来高\n"
-                            "・出来高状況、買い圧力や売り圧力のコメント\n\n"
-                            "⸻\n"
-                            "🔶 RSI（相対力指数）\n"
-                            "・RSI値と解釈を解説\n\n"
-                            "🎯 エントリーポイント戦略\n"
-                            "パターン / 条件 / エントリー価格目安 / ストップライン / 利確目標 / "
-                            "リスクリワードを簡潔に提示\n\n"
-                            "🧠 補足\n"
-                            "・トレード判断に影響するポイントや注意事項\n\n"
-                            "このフォーマットを必ず守り、Markdown形式で出力してください。"
-                        ),
+                        "content": ADVICE_SYSTEM_PROMPT,
                     },
                     {"role": "user", "content": message},
                 ],
                 "max_tokens": 500,
             }
-            # print("=== Payload Sent to OpenAI (Text Question) ===")
-            # print(payload)
-            # print("Headers:", headers)
-            # print("==============================================")
-            # print("Message content received in endpoint:", message)
-            response = requests.post(OPENAI_API_URL, headers=headers, json=payload)
-            # print("=== OpenAI Response Status Code ===", response.status_code)
-            if response.status_code != 200:
-                return {"error": f"OpenAI API request failed: {response.text}"}
-            result = response.json()
-            # print("=== OpenAI API Raw Result (Text Question) ===")
-            # print(result)
-            # print("=============================================")
-            # print("Keys in OpenAI result:", result.keys())
-            if "choices" in result:
-                # print("Number of choices:", len(result["choices"]))
-                if len(result["choices"]) > 0:
-                    # print("Choice 0 keys:", result["choices"][0].keys())
-                    if "message" in result["choices"][0]:
-                        # print("Message content:", result["choices"][0]["message"].get("content", ""))
-                        pass
-                    if "text" in result["choices"][0]:
-                        # print("Text content:", result["choices"][0]["text"])
-                        pass
-            choices = result.get("choices", [])
-            # print("=== OpenAI choices content ===")
-            # print(choices)
-            # print("==============================")
-            advice_text = ""
-
-            if choices and isinstance(choices[0], dict):
-                if "message" in choices[0] and "content" in choices[0]["message"]:
-                    advice_text = choices[0]["message"]["content"].strip()
-                elif "text" in choices[0]:
-                    advice_text = choices[0]["text"].strip()
+            if stream:
+                return sse_response(
+                    advice_event_stream(
+                        _llm_streamer().stream_chat(payload),
+                        fallback=EMPTY_ANSWER_MESSAGE,
+                        on_complete=lambda text: _save_streamed_messages(chat_id, message, text.strip()),
+                    )
+                )
+
+            transport = _openai_transport()
+            try:
+                result = await transport.chat_completion(payload)
+            except LLMTransportError as exc:
+                return {"error": f"OpenAI API request failed: {exc.body or exc}"}
+            advice_text = extract_content(result).strip()
 
             if not advice_text:
-                advice_text = "⚠️ AIから有効な回答が返りませんでした。質問をより具体的にして再度お試しください。"
+                advice_text = EMPTY_ANSWER_MESSAGE
 
             # チャットメッセージを更新
             await update_chat_messages(db, chat_id, message, advice_text)
@@ -297,42 +222,12 @@ async def advice(
             if not analysis_context:
                 analysis_context = form_data.get("analysis_context")
 
-            headers = _openai_headers()
-
             payload = {
                 "model": "gpt-4o-mini",
                 "messages": [
                     {
                         "role": "system",
-                        "content": (
-                            "あなたはプロの株式スイングトレーダー兼アナリストです。\n"
-                            "まず、画像から銘柄名（企業名、証券コード、Ticker）を特定してください。\n"
-                            "銘柄名は以下の優先順位で抽出：\n"
-                            "1)証券コード（4桁数字） 2)カタカナ企業名 3)漢字企業名 4)英語企業名\n"
-                            "その後、以下のフォーマットに従い、日本語で初心者にも分かりやすく詳細かつ論理的に解析結果を"
-                            "Markdown形式で出力してください。\n\n"
-                            "STOCK_NAME_EXTRACTED: {抽出した銘柄名}\n"
-                            "📊 {銘柄名（証券コード）} チャート分析（{日付・時刻時点}）\n"
-                            "⸻\n"
-                            "✅ テクニカル分析まとめ\n\n"
-                            "🟢 株価動向\n"
-                            "・現在値、前日比、高値、安値、終値、トレンド方向を簡潔に解説\n\n"
-                            "⸻\n"
-                            "📈 移動平均線\n"
-                            "・短期・中期・長期線の状況を解説\n\n"
-                            "⸻\n"
-                            "🔸 出来高\n"
-                            "・出来高状況、買い圧力や売り圧力のコメント\n\n"
-                            "⸻\n"
-                            "🔶 RSI（相対力指数）\n"
-                            "・RSI値と解釈を解説\n\n"
-                            "🎯 エントリーポイント戦略\n"
-                            "パターン / 条件 / エントリー価格目安 / ストップライン / 利確目標 / "
-                            "リスクリワードを簡潔に提示\n\n"
-                            "🧠 補足\n"
-                            "・トレード判断に影響するポイントや注意事項\n\n"
-                            "このフォーマットを必ず守り、Markdown形式で出力してください。"
-                        ),
+                        "content": ADVICE_SYSTEM_PROMPT,
                     },
                     {
                         "role": "user",
@@ -352,11 +247,34 @@ async def advice(
                 "max_tokens": 500,
             }
 
-            response = requests.post(OPENAI_API_URL, headers=headers, json=payload)
-            if response.status_code != 200:
-                return {"error": f"OpenAI API request failed: {response.text}"}
+            cache_fields = {
+                "model": payload["model"],
+                "template": ADVICE_SYSTEM_PROMPT,
+                "image": content,
+                "symbol_context": symbol_context,
+                "analysis_context": analysis_context,
+                "max_tokens": payload["max_tokens"],
+            }
+            user_message_content = f"画像をアップロードしました: {file.filename}"
+
+            if stream:
+                streamer = _llm_streamer()
+                header = f"📄 **{symbol_context}** {analysis_context or 'チャート分析'}\n\n" if symbol_context else ""
+                return sse_response(
+                    advice_event_stream(
+                        cached_stream(lambda: streamer.stream_chat(payload), **cache_fields),
+                        prefix=header,
+                        stock_name=symbol_context,
+                        on_complete=lambda text: _save_streamed_messages(chat_id, user_message_content, text),
+                    )
+                )
 
-            result = response.json()
+            transport = _openai_transport()
+            try:
+                # 同じ画像・プロンプト・文脈の解析はキャッシュから返す
+                result = await cached_completion(lambda: transport.chat_completion(payload), **cache_fields)
+            except LLMTransportError as exc:
+                return {"error": f"OpenAI API request failed: {exc.body or exc}"}
             advice_text = result["choices"][0]["message"]["content"]
 
             # Extract stock name from AI response or use provided symbol context
@@ -376,7 +294,6 @@ async def advice(
                 advice_text = f"📄 **{extracted_stock_name}** {analysis_context or 'チャート分析'}\n\n{advice_text}"
 
             # チャットメッセージを更新（画像アップロードの場合）
-            user_message_content = f"画像をアップロードしました: {file.filename}"
             await update_chat_messages(db, chat_id, user_message_content, advice_text)
 
             return {"filename": file.filename, "message": advice_text, "extracted_stock_name": extracted_stock_name}
@@ -1,69 +1,106 @@
 from __future__ import annotations
 
 import base64
+from typing import Any, Dict, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from openai import OpenAI
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.settings import get_settings
+from app.database import get_async_db
+from app.routers.jobs import BACKGROUND_DESCRIPTION, LANE_PATTERN, job_accepted
+from app.services.jobs import job_handler, submit_job
+from app.services.llm_cache import cached_completion, get_llm_cache
+from app.services.llm_transport import LLMTransport, extract_content, get_llm_transport
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
 
 settings = get_settings()
-_client: OpenAI | None = None
 
+SYSTEM_PROMPT = "あなたは株式チャートのテクニカル分析アシスタントです。"
+CHART_PROMPT = (
+    "このチャート画像を見て、上昇トレンドか下降トレンドか、"
+    "およびエントリー判断として『押し目』『戻り売り』『ブレイク直後』『トレンド無し』のいずれかを判定してください。"
+    "赤＝陽線、青＝陰線です。次の形式でJSONを出力してください：\n"
+    "{\n"
+    '  "trend": "上昇トレンド または 下降トレンド または トレンドなし",\n'
+    '  "entry_pattern": "押し目・戻り売り・ブレイク直後・トレンド無しのいずれか",\n'
+    '  "confidence": 数値（0.0〜1.0）, \n'
+    '  "reason": "診断の理由"\n'
+    "}"
+)
 
-def _get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        api_key = settings.openai_api_key
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-        _client = OpenAI(api_key=api_key)
-    return _client
+
+def _get_transport() -> LLMTransport:
+    if not settings.openai_api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    return get_llm_transport()
+
+
+async def _analyze_chart(transport: LLMTransport, image_bytes: bytes, content_type: str) -> Dict[str, Any]:
+    encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+    payload = {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": CHART_PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:{content_type};base64,{encoded_image}"}},
+                ],
+            },
+        ],
+        "max_tokens": 500,
+        "temperature": 0.3,
+    }
+
+    result = await cached_completion(
+        lambda: transport.chat_completion(payload),
+        model=payload["model"],
+        template=SYSTEM_PROMPT + CHART_PROMPT,
+        image=image_bytes,
+        content_type=content_type,
+    )
+    return {"analysis": extract_content(result)}
+
+
+@job_handler("chart_analysis")
+async def _chart_analysis_job(payload: Dict[str, Any], input_data: Optional[bytes]) -> Dict[str, Any]:
+    return await _analyze_chart(_get_transport(), input_data or b"", payload["content_type"])
 
 
 @router.post("/chart")
-async def analyze_chart_image(file: UploadFile = File(...)):
+async def analyze_chart_image(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    lane: str = Query("interactive", pattern=LANE_PATTERN),
+    user_id: Optional[UUID] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="画像ファイルをアップロードしてください")
 
     image_bytes = await file.read()
-    encoded_image = base64.b64encode(image_bytes).decode("utf-8")
 
-    client = _get_client()
+    transport = _get_transport()
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "あなたは株式チャートのテクニカル分析アシスタントです。"},
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "このチャート画像を見て、上昇トレンドか下降トレンドか、"
-                                "およびエントリー判断として『押し目』『戻り売り』『ブレイク直後』『トレンド無し』のいずれかを判定してください。"
-                                "赤＝陽線、青＝陰線です。次の形式でJSONを出力してください：\n"
-                                "{\n"
-                                '  "trend": "上昇トレンド または 下降トレンド または トレンドなし",\n'
-                                '  "entry_pattern": "押し目・戻り売り・ブレイク直後・トレンド無しのいずれか",\n'
-                                '  "confidence": 数値（0.0〜1.0）, \n'
-                                '  "reason": "診断の理由"\n'
-                                "}"
-                            ),
-                        },
-                        {"type": "image_url", "image_url": {"url": f"data:{file.content_type};base64,{encoded_image}"}},
-                    ],
-                },
-            ],
-            max_tokens=500,
-            temperature=0.3,
+    if background:
+        job = await submit_job(
+            db, "chart_analysis", {"content_type": file.content_type}, image_bytes, lane=lane, user_id=user_id
         )
+        return job_accepted(job)
 
-        return {"analysis": response.choices[0].message.content}
+    try:
+        return await _analyze_chart(transport, image_bytes, file.content_type)
 
     except Exception as exc:  # noqa: BLE001 - propagate as 500 for client visibility
         raise HTTPException(status_code=500, detail=f"診断エラー: {exc}")
+
+
+@router.get("/cache/stats")
+async def llm_cache_stats():
+    """画像解析レスポンスキャッシュのヒット率と節約できたレイテンシ・トークン数"""
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"backend": "off"}
@@ -1,29 +1,75 @@
 import logging
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import delete, insert, select, update
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_async_db
+from app.db.pagination import NEXT_CURSOR_HEADER, InvalidCursorError, decode_cursor, encode_cursor
 from app.models import Chat, ChatMessage
 from app.schemas.chat_message import (
+    ChatMessageBulkItem,
+    ChatMessageBulkRequest,
+    ChatMessageBulkResponse,
+    ChatMessageBulkResult,
     ChatMessageCreate,
     ChatMessageUpdate,
 )
+from app.services.chat_writes import (
+    append_messages,
+    edit_message,
+    insert_messages,
+    live_chat_condition,
+    remove_message,
+    touch_chats,
+)
+from app.services.positions_feed import get_positions_feed
+from app.services.positions_ledger import (
+    LEDGER_TYPES,
+    LedgerChanges,
+    discard_message,
+    is_settled_entry,
+    record_messages,
+    replace_message,
+    settled_entry_condition,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
+UNDO_WINDOW_MINUTES = 30
+
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def _message_content(message: ChatMessageCreate) -> tuple[Optional[str], Optional[dict]]:
+    if message.type == "TEXT":
+        return message.text, None
+    return None, message.payload.model_dump()
+
+
+async def _publish_ledger_changes(db: AsyncSession, changes: LedgerChanges) -> None:
+    """コミット後に建玉の変更をライブ配信へ流す（失敗してもリクエストは成功扱い）"""
+    feed = get_positions_feed()
+    if feed is None or not changes:
+        return
+    try:
+        await feed.publish_changes(db, changes)
+    except Exception:
+        logger.exception("Failed to publish position changes")
+
+
+def _validation_summary(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+
 class CreateChatRequest(BaseModel):
     name: str
     user_id: Optional[str] = None
@@ -218,46 +264,40 @@ async def restore_chat(chat_id: str, db: AsyncSession = Depends(get_async_db)):
 async def create_message(chat_id: str, message: ChatMessageCreate, db: AsyncSession = Depends(get_async_db)):
     """
     新しいメッセージを作成する
+
+    チャットの存在確認・INSERT・chats.updated_at の更新を1ステートメントで行う。
     """
     try:
-        # チャットの存在確認
-        chat_stmt = select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None))
-        chat_result = await db.execute(chat_stmt)
-        chat = chat_result.scalar_one_or_none()
-
-        if not chat:
-            raise HTTPException(status_code=404, detail=f"Chat with ID {chat_id} not found")
-
         # メッセージIDを生成
         message_id = str(uuid.uuid4())
 
         # メッセージの内容を準備
-        text = None
-        payload = None
-
-        if message.type == "TEXT":
-            text = message.text
-        elif message.type in ["ENTRY", "EXIT"]:
-            payload = message.payload.dict()
+        text, payload = _message_content(message)
 
         now = _utc_now()
         message_timestamp = now.replace(tzinfo=None)
 
-        await db.execute(
-            insert(ChatMessage).values(
-                id=message_id,
-                chat_id=chat_id,
-                type=message.type,
-                author_id=message.author_id,
-                text=text,
-                payload=payload,
-                created_at=message_timestamp,
-            )
+        rows = await append_messages(
+            db,
+            chat_id,
+            [
+                {
+                    "id": message_id,
+                    "type": message.type,
+                    "author_id": message.author_id,
+                    "text": text,
+                    "payload": payload,
+                    "created_at": message_timestamp,
+                }
+            ],
+            touched_at=now,
         )
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Chat with ID {chat_id} not found")
 
-        await db.execute(update(Chat).where(Chat.id == chat_id).values(updated_at=now))
-
+        changes = await record_messages(db, [row._mapping for row in rows])
         await db.commit()
+        await _publish_ledger_changes(db, changes)
 
         return {
             "id": message_id,
@@ -278,22 +318,73 @@ async def create_message(chat_id: str, message: ChatMessageCreate, db: AsyncSess
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-def _is_entry_settled(message_content: str) -> bool:
+@router.post("/messages/bulk", response_model=ChatMessageBulkResponse)
+async def bulk_create_messages(request: ChatMessageBulkRequest, db: AsyncSession = Depends(get_async_db)):
     """
-    Check if an ENTRY message represents a settled/closed position.
-    This is a simplified check that looks for specific patterns.
-    In a real implementation, this would check against a positions store.
+    複数チャットへのメッセージを一括作成する（インポート・再生成用）
+
+    要素ごとに ChatMessageCreate で検証し、不正な要素や存在しないチャット宛ての要素は
+    results にエラーとして返す（バッチ全体は中断しない）。有効な要素は1回の executemany で
+    INSERT し、対象チャットの updated_at は1チャットにつき1回だけ更新する。
     """
-    if not message_content or "建値入力しました" not in message_content:
-        return False
+    results: list[ChatMessageBulkResult] = []
+    valid: list[tuple[int, ChatMessageBulkItem]] = []
+    for index, raw in enumerate(request.items):
+        try:
+            valid.append((index, ChatMessageBulkItem.model_validate(raw)))
+        except ValidationError as exc:
+            chat_id = raw.get("chat_id") if isinstance(raw.get("chat_id"), str) else None
+            results.append(
+                ChatMessageBulkResult(index=index, status="error", chat_id=chat_id, error=_validation_summary(exc))
+            )
+
+    try:
+        now = _utc_now()
+        # 存在確認と updated_at の更新を1ステートメントで行う
+        live_chats = await touch_chats(db, (item.chat_id for _, item in valid), now)
+
+        rows = []
+        base_timestamp = now.replace(tzinfo=None)
+        for index, item in valid:
+            if item.chat_id not in live_chats:
+                results.append(
+                    ChatMessageBulkResult(
+                        index=index,
+                        status="error",
+                        chat_id=item.chat_id,
+                        error=f"Chat with ID {item.chat_id} not found",
+                    )
+                )
+                continue
+            text, payload = _message_content(item.message)
+            message_id = str(uuid.uuid4())
+            rows.append(
+                {
+                    "id": message_id,
+                    "chat_id": item.chat_id,
+                    "type": item.message.type,
+                    "author_id": item.message.author_id,
+                    "text": text,
+                    "payload": payload,
+                    # 同一リクエスト内の順序を created_at でも保つ
+                    "created_at": base_timestamp + timedelta(microseconds=index),
+                }
+            )
+            results.append(ChatMessageBulkResult(index=index, status="created", chat_id=item.chat_id, id=message_id))
 
-    # For now, return False to allow editing
-    # TODO: Implement actual position checking logic
-    # This would involve:
-    # 1. Extract symbol and side from message content
-    # 2. Check if position exists in positions store
-    # 3. Return True if position is closed/settled
-    return False
+        await insert_messages(db, rows)
+        changes = await record_messages(db, rows)
+        await db.commit()
+        await _publish_ledger_changes(db, changes)
+
+        results.sort(key=lambda result: result.index)
+        logger.info(f"Bulk-created {len(rows)} messages across {len(live_chats)} chats")
+        return ChatMessageBulkResponse(created=len(rows), failed=len(results) - len(rows), results=results)
+
+    except Exception as e:
+        logger.error(f"Error bulk-creating messages: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.patch("/messages/{message_id}")
@@ -307,31 +398,8 @@ async def update_message(
     メッセージを更新する（編集機能）
     """
     try:
-        # メッセージの存在確認と権限チェック
-        stmt = select(ChatMessage).where(ChatMessage.id == message_id)
-        result = await db.execute(stmt)
-        message = result.scalar_one_or_none()
-
-        if not message:
-            raise HTTPException(status_code=404, detail=f"Message with ID {message_id} not found")
-
         # 権限チェック（著者のみ編集可能）
-        # TODO: current_user_idが実装されるまでスキップ
-        # if current_user_id and message.author_id != current_user_id:
-        #     raise HTTPException(
-        #         status_code=403,
-        #         detail="You can only edit your own messages"
-        #     )
-
-        # Check if trying to edit a settled ENTRY message
-        # Check both existing message and new content
-        current_content = message.text or ""
-        new_content = message_update.text or message_update.content or ""
-
-        if _is_entry_settled(current_content) or _is_entry_settled(new_content):
-            raise HTTPException(
-                status_code=409, detail="Cannot edit settled ENTRY message. Position is already closed."
-            )
+        # TODO: current_user_idが実装されるまでスキップ（実装時は UPDATE の WHERE に author_id を加える）
 
         # 更新データを準備
         update_data = {}
@@ -346,27 +414,29 @@ async def update_message(
 
         # Handle payload updates for ENTRY/EXIT
         if hasattr(message_update, "payload") and message_update.payload is not None:
-            update_data["payload"] = message_update.payload.dict()
+            update_data["payload"] = message_update.payload.model_dump()
             if hasattr(message_update, "type") and message_update.type in ["ENTRY", "EXIT"]:
                 update_data["type"] = message_update.type
 
         now = _utc_now()
         update_data["updated_at"] = now.replace(tzinfo=None)
 
-        # メッセージを更新
-        update_stmt = update(ChatMessage).where(ChatMessage.id == message_id).values(**update_data)
-
-        await db.execute(update_stmt)
+        # UPDATE ... RETURNING とチャットの更新日時の更新を1往復で行う
+        # 決済済み建玉の ENTRY は台帳の参照を WHERE に含めて更新対象から外す
+        updated_message = await edit_message(db, message_id, update_data, now, ~settled_entry_condition())
+        if updated_message is None:
+            if await is_settled_entry(db, message_id):
+                raise HTTPException(
+                    status_code=409, detail="Cannot edit settled ENTRY message. Position is already closed."
+                )
+            raise HTTPException(status_code=404, detail=f"Message with ID {message_id} not found")
 
-        # チャットの更新日時も更新
-        await db.execute(update(Chat).where(Chat.id == message.chat_id).values(updated_at=now))
+        changes = LedgerChanges()
+        if updated_message.type in LEDGER_TYPES:
+            changes = await replace_message(db, updated_message._mapping)
 
         await db.commit()
-
-        # 更新されたメッセージを取得
-        updated_stmt = select(ChatMessage).where(ChatMessage.id == message_id)
-        updated_result = await db.execute(updated_stmt)
-        updated_message = updated_result.scalar_one()
+        await _publish_ledger_changes(db, changes)
 
         return {
             "id": updated_message.id,
@@ -391,29 +461,23 @@ async def update_message(
 async def delete_message(chat_id: str, message_id: str, db: AsyncSession = Depends(get_async_db)):
     """指定したチャットからメッセージを安全に削除する"""
     try:
-        # Ensure the parent chat exists and isn't soft-deleted
-        chat_stmt = select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None))
-        chat_result = await db.execute(chat_stmt)
-        chat = chat_result.scalar_one_or_none()
-
-        if not chat:
-            raise HTTPException(status_code=404, detail=f"Chat with ID {chat_id} not found")
-
-        # Locate the target message within the chat
-        message_stmt = select(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.chat_id == chat_id)
-        message_result = await db.execute(message_stmt)
-        message = message_result.scalar_one_or_none()
+        # チャットが有効な場合のみ削除し、同じ往復でチャットの更新日時も更新する
+        now = _utc_now()
+        deleted = await remove_message(db, message_id, now, live_chat_condition(chat_id))
 
-        if not message:
+        if deleted is None:
+            # エラー時のみ追加で読み、どちらが存在しないのかを返す
+            chat_stmt = select(Chat.id).where(Chat.id == chat_id, Chat.deleted_at.is_(None))
+            if (await db.execute(chat_stmt)).scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail=f"Chat with ID {chat_id} not found")
             raise HTTPException(status_code=404, detail=f"Message with ID {message_id} not found in chat {chat_id}")
 
-        # Remove the message
-        await db.execute(delete(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.chat_id == chat_id))
-
-        now = _utc_now()
-        await db.execute(update(Chat).where(Chat.id == chat_id).values(updated_at=now))
+        changes = LedgerChanges()
+        if deleted.type in LEDGER_TYPES:
+            changes = await discard_message(db, message_id)
 
         await db.commit()
+        await _publish_ledger_changes(db, changes)
 
         logger.info(f"Deleted message {message_id} from chat {chat_id}")
 
@@ -434,12 +498,27 @@ async def delete_message(chat_id: str, message_id: str, db: AsyncSession = Depen
 
 @router.get("/{chat_id}/messages")
 async def get_messages(
-    chat_id: str, limit: Optional[int] = 100, offset: Optional[int] = 0, db: AsyncSession = Depends(get_async_db)
+    chat_id: str,
+    response: Response,
+    limit: Optional[int] = 100,
+    offset: Optional[int] = 0,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     チャットのメッセージ一覧を取得する
+
+    (created_at, id) の昇順。`cursor` を指定するとそのメッセージの次から返す（offset は無視）。
+    続きがある場合は次ページのカーソルを `X-Next-Cursor` ヘッダーで返す。
     """
     try:
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
         # チャットの存在確認
         chat_stmt = select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None))
         chat_result = await db.execute(chat_stmt)
@@ -448,17 +527,26 @@ async def get_messages(
         if not chat:
             raise HTTPException(status_code=404, detail=f"Chat with ID {chat_id} not found")
 
-        # メッセージを取得
-        stmt = select(ChatMessage).where(ChatMessage.chat_id == chat_id).order_by(ChatMessage.created_at.asc())
+        # メッセージを取得（chat_id, created_at, id の複合インデックスを辿る）
+        stmt = (
+            select(ChatMessage)
+            .where(ChatMessage.chat_id == chat_id)
+            .order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc())
+        )
 
+        if after is not None:
+            stmt = stmt.where(tuple_(ChatMessage.created_at, ChatMessage.id) > tuple_(*after))
+        elif offset:
+            stmt = stmt.offset(offset)
         if limit:
             stmt = stmt.limit(limit)
-        if offset:
-            stmt = stmt.offset(offset)
 
         result = await db.execute(stmt)
         messages = result.scalars().all()
 
+        if limit and len(messages) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(messages[-1].created_at, messages[-1].id)
+
         return [
             {
                 "id": msg.id,
@@ -490,44 +578,28 @@ async def undo_message(
     決済メッセージの取り消し（Undo）機能
     """
     try:
-        # メッセージの存在確認
-        stmt = select(ChatMessage).where(ChatMessage.id == message_id)
-        result = await db.execute(stmt)
-        message = result.scalar_one_or_none()
-
-        if not message:
-            raise HTTPException(status_code=404, detail=f"Message with ID {message_id} not found")
-
-        # EXITメッセージのみUndo可能
-        if message.type != "EXIT":
-            raise HTTPException(status_code=400, detail="Only EXIT messages can be undone")
-
         # 権限チェック（著者のみUndo可能）
-        # TODO: current_user_idが実装されるまでスキップ
-        # if current_user_id and message.author_id != current_user_id:
-        #     raise HTTPException(
-        #         status_code=403,
-        #         detail="You can only undo your own messages"
-        #     )
-
-        # 時間制限チェック（30分以内のみ）
-        from datetime import timedelta
-
-        time_limit = _utc_now() - timedelta(minutes=30)
-        if message.created_at < time_limit:
-            raise HTTPException(status_code=400, detail="Message is too old to undo (30 minutes limit)")
-
-        # メッセージを削除（実際は論理削除でも良い）
-        from sqlalchemy import delete
+        # TODO: current_user_idが実装されるまでスキップ（実装時は DELETE の WHERE に author_id を加える）
 
-        delete_stmt = delete(ChatMessage).where(ChatMessage.id == message_id)
-        await db.execute(delete_stmt)
-
-        # チャットの更新日時を更新
+        # EXITメッセージかつ30分以内のものだけを1往復で削除する
         now = _utc_now()
-        await db.execute(update(Chat).where(Chat.id == message.chat_id).values(updated_at=now))
+        time_limit = (now - timedelta(minutes=UNDO_WINDOW_MINUTES)).replace(tzinfo=None)
+        deleted = await remove_message(
+            db, message_id, now, ChatMessage.type == "EXIT", ChatMessage.created_at >= time_limit
+        )
+
+        if deleted is None:
+            # 失敗理由の判定（エラー時のみ読む）
+            message = (await db.execute(select(ChatMessage).where(ChatMessage.id == message_id))).scalar_one_or_none()
+            if not message:
+                raise HTTPException(status_code=404, detail=f"Message with ID {message_id} not found")
+            if message.type != "EXIT":
+                raise HTTPException(status_code=400, detail="Only EXIT messages can be undone")
+            raise HTTPException(status_code=400, detail="Message is too old to undo (30 minutes limit)")
 
+        changes = await discard_message(db, message_id)
         await db.commit()
+        await _publish_ledger_changes(db, changes)
 
         logger.info(f"Message {message_id} undone successfully")
 
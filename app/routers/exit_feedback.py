@@ -1,12 +1,16 @@
-from typing import Optional
+from typing import Any, Dict, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.settings import get_settings
 from app.database import get_async_db
+from app.routers.jobs import BACKGROUND_DESCRIPTION, LANE_PATTERN, job_accepted
 from app.schemas.exit_feedback import ExitFeedbackRequest, ExitFeedbackResponse
 from app.services.exit_feedback_service import ExitFeedbackService
+from app.services.jobs import job_handler, submit_job
+from app.services.registry import get_exit_feedback_service
 
 router = APIRouter()
 
@@ -19,6 +23,13 @@ def _require_openai_key() -> str:
     return settings.openai_api_key
 
 
+@job_handler("exit_feedback")
+async def _exit_feedback_job(payload: Dict[str, Any], input_data: Optional[bytes]) -> Dict[str, Any]:
+    _require_openai_key()
+    result = await get_exit_feedback_service().generate_exit_feedback(ExitFeedbackRequest(**payload), input_data)
+    return result.model_dump(mode="json")
+
+
 @router.post("/feedback/exit", response_model=ExitFeedbackResponse)
 async def generate_exit_feedback(
     trade_id: Optional[str] = Form(None, description="トレードID"),
@@ -30,7 +41,11 @@ async def generate_exit_feedback(
     file: Optional[UploadFile] = File(None, description="チャート画像ファイル"),
     entry_date: Optional[str] = Form(None, description="エントリー日時"),
     exit_date: Optional[str] = Form(None, description="決済日時"),
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    lane: str = Query("interactive", pattern=LANE_PATTERN),
+    user_id: Optional[UUID] = Query(None),
     db: AsyncSession = Depends(get_async_db),
+    feedback_service: ExitFeedbackService = Depends(get_exit_feedback_service),
 ):
     """
     決済時フィードバック生成エンドポイント
@@ -38,9 +53,10 @@ async def generate_exit_feedback(
     - チャート画像を分析して振り返りポイントを生成
     - GPT-4oによる画像解析でトレードの振り返りを構造化
     - HTML形式で視認性の高いフィードバックを返却
+    - `?background=true` ならジョブとして登録し、結果は `GET /jobs/{jobId}` で取得
     """
 
-    api_key = _require_openai_key()
+    _require_openai_key()
 
     try:
         # リクエストデータ作成
@@ -70,11 +86,14 @@ async def generate_exit_feedback(
 
             image_data = file_content
 
-        # フィードバック生成サービス初期化
-        feedback_service = ExitFeedbackService(api_key)
+        if background:
+            job = await submit_job(
+                db, "exit_feedback", request.model_dump(mode="json"), image_data, lane=lane, user_id=user_id
+            )
+            return job_accepted(job)
 
-        # 決済フィードバック生成
-        result = feedback_service.generate_exit_feedback(request, image_data)
+        # 決済フィードバック生成（サービスはプロセス共通）
+        result = await feedback_service.generate_exit_feedback(request, image_data)
 
         return result
 
@@ -1,19 +1,32 @@
+import asyncio
 import base64
+import json
 import os
-from typing import Literal, Optional
+import time
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.settings import get_settings
 from app.database import get_async_db
-from app.schemas.indicators import AnalysisResponse
-from app.services.integrated_advice_service import IntegratedAdviceService
+from app.routers.jobs import BACKGROUND_DESCRIPTION, LANE_PATTERN, job_accepted
+from app.schemas.indicators import AnalysisResponse, IndicatorSnapshotResponse, OHLCVBar
+from app.services.indicator_engine import IndicatorSnapshot, get_indicator_engine
+from app.services.integrated_advice_service import BatchItem, IntegratedAdviceService, generate_batch_advice
+from app.services.jobs import job_handler, submit_job
+from app.services.llm_streaming import advice_event_stream, cached_stream, get_llm_streamer, sse_response
+from app.services.registry import get_integrated_advice_service
+from app.services.scoring_pool import get_scoring_pool
 
 router = APIRouter()
 settings = get_settings()
 
+BATCH_MAX_ITEMS = 100
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
 
 def _require_openai_key() -> str:
     if not settings.openai_api_key:
@@ -21,6 +34,25 @@ def _require_openai_key() -> str:
     return settings.openai_api_key
 
 
+async def _read_chart(file: UploadFile) -> bytes:
+    image_data = await file.read()
+
+    # ファイルサイズチェック（10MB制限）
+    if len(image_data) > MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="ファイルサイズが大きすぎます（10MB制限）")
+
+    # ファイル形式チェック
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="画像ファイルのみアップロード可能です")
+    return image_data
+
+
+@job_handler("integrated_analysis")
+async def _integrated_analysis_job(payload: Dict[str, Any], input_data: Optional[bytes]) -> Dict[str, Any]:
+    result = await get_integrated_advice_service().generate_integrated_advice(image_data=input_data or b"", **payload)
+    return result.model_dump(mode="json")
+
+
 @router.post("/integrated-analysis", response_model=AnalysisResponse)
 async def integrated_analysis(
     file: UploadFile = File(..., description="チャート画像ファイル"),
@@ -28,7 +60,11 @@ async def integrated_analysis(
     entry_price: Optional[float] = Form(None, description="建値"),
     position_type: Optional[Literal["long", "short"]] = Form(None, description="ポジションタイプ"),
     analysis_context: Optional[str] = Form(None, description="分析コンテキスト"),
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    lane: str = Query("interactive", pattern=LANE_PATTERN),
+    user_id: Optional[UUID] = Query(None),
     db: AsyncSession = Depends(get_async_db),
+    advice_service: IntegratedAdviceService = Depends(get_integrated_advice_service),
 ):
     """
     統合分析エンドポイント
@@ -37,26 +73,27 @@ async def integrated_analysis(
     - pivot1.3 + entry-v04 のルールベース判定
     - GPT-4o による画像解析
     - 両者を統合した総合判定を返却
+    - `?background=true` ならジョブとして登録し、結果は `GET /jobs/{jobId}` で取得
     """
 
-    api_key = _require_openai_key()
+    _require_openai_key()
 
     try:
-        # ファイル読み込み
-        image_data = await file.read()
-
-        # ファイルサイズチェック（10MB制限）
-        if len(image_data) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="ファイルサイズが大きすぎます（10MB制限）")
-
-        # ファイル形式チェック
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="画像ファイルのみアップロード可能です")
-
-        # 統合アドバイスサービス初期化
-        advice_service = IntegratedAdviceService(api_key)
-
-        # 統合分析実行
+        # ファイル読み込み（サイズ・形式チェック込み）
+        image_data = await _read_chart(file)
+
+        if background:
+            payload = {
+                "filename": file.filename,
+                "symbol_context": symbol,
+                "analysis_context": analysis_context,
+                "entry_price": entry_price,
+                "position_type": position_type,
+            }
+            job = await submit_job(db, "integrated_analysis", payload, image_data, lane=lane, user_id=user_id)
+            return job_accepted(job)
+
+        # 統合分析実行（サービスはプロセス共通）
         result = await advice_service.generate_integrated_advice(
             image_data=image_data,
             filename=file.filename,
@@ -74,16 +111,118 @@ async def integrated_analysis(
         raise HTTPException(status_code=500, detail=f"分析中にエラーが発生しました: {str(e)}")
 
 
+@router.post("/integrated-analysis/batch")
+async def integrated_analysis_batch(
+    files: Optional[List[UploadFile]] = File(None, description="チャート画像（複数可）"),
+    symbols: Optional[str] = Form(
+        None, description="カンマ区切りの銘柄。画像と同数なら画像ごとの銘柄、画像なしなら銘柄の足だけで判定"
+    ),
+    position_type: Optional[Literal["long", "short"]] = Form(None, description="ポジションタイプ（全件共通）"),
+    analysis_context: Optional[str] = Form(None, description="分析コンテキスト（全件共通）"),
+    concurrency: Optional[int] = Query(None, ge=1, le=64, description="並行数（既定は ANALYSIS_BATCH_CONCURRENCY）"),
+    advice_service: IntegratedAdviceService = Depends(get_integrated_advice_service),
+):
+    """
+    バッチ統合分析エンドポイント（ウォッチリストのスクリーニング用）
+
+    - 共有の統合分析サービスで最大 concurrency 件を並行に分析
+    - 結果は終わった順に NDJSON で返す（1行1件、`index` は入力順）
+    - 最後の行は `{"done": true, "count": ..., "elapsed_ms": ...}`
+    """
+    _require_openai_key()
+
+    symbol_list = [symbol.strip() for symbol in (symbols or "").split(",") if symbol.strip()]
+    files = files or []
+    if files and symbol_list and len(symbol_list) != len(files):
+        raise HTTPException(status_code=400, detail="symbols は画像と同じ件数で指定してください")
+    count = len(files) or len(symbol_list)
+    if count == 0:
+        raise HTTPException(status_code=400, detail="files か symbols のどちらかを指定してください")
+    if count > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"一度に分析できるのは {BATCH_MAX_ITEMS} 件までです")
+
+    if files:
+        items = [
+            BatchItem(
+                symbol_context=symbol_list[index] if symbol_list else None,
+                image_data=await _read_chart(file),
+                filename=file.filename,
+            )
+            for index, file in enumerate(files)
+        ]
+    else:
+        items = [BatchItem(symbol_context=symbol) for symbol in symbol_list]
+
+    async def ndjson():
+        started = time.perf_counter()
+        results = generate_batch_advice(
+            advice_service,
+            items,
+            concurrency or settings.analysis_batch_concurrency,
+            analysis_context=analysis_context,
+            position_type=position_type,
+        )
+        async for index, result in results:
+            line = {
+                "index": index,
+                "symbol": items[index].symbol_context,
+                "filename": items[index].filename,
+                **result.model_dump(mode="json"),
+            }
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        yield json.dumps({"done": True, "count": len(items), "elapsed_ms": elapsed_ms}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _snapshot_response(snapshot: IndicatorSnapshot) -> IndicatorSnapshotResponse:
+    return IndicatorSnapshotResponse(
+        symbol=snapshot.symbol,
+        bar_count=snapshot.bar_count,
+        pivot_input=snapshot.pivot_input,
+        indicators=snapshot.indicators,
+        context=snapshot.context(),
+    )
+
+
+@router.post("/bars/{symbol}", response_model=IndicatorSnapshotResponse)
+async def ingest_bars(symbol: str, bars: List[OHLCVBar]):
+    """
+    日足をインジケーターエンジンに追加（古い順）
+
+    最新足と同じ date の足は当日足の更新として扱う。以降の統合分析は
+    この銘柄のサンプルバーの代わりにエンジンの値を使う。
+    """
+    if not bars:
+        raise HTTPException(status_code=400, detail="bars must not be empty")
+
+    snapshot = get_indicator_engine().extend(symbol, [bar.model_dump() for bar in bars])
+    return _snapshot_response(snapshot)
+
+
+@router.get("/bars/{symbol}", response_model=IndicatorSnapshotResponse)
+async def get_bar_snapshot(symbol: str):
+    """インジケーターエンジン上の最新足スナップショット"""
+    snapshot = get_indicator_engine().snapshot(symbol)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No bars for symbol")
+    return _snapshot_response(snapshot)
+
+
 @router.post("/quick-analysis")
 async def quick_analysis(
     file: UploadFile = File(..., description="チャート画像ファイル"),
     symbol: Optional[str] = Form(None, description="銘柄名・証券コード"),
     analysis_context: Optional[str] = Form(None, description="分析コンテキスト"),
+    stream: bool = Query(False, description="trueならSSEでトークンを逐次返す"),
 ):
     """
     クイック分析エンドポイント（GPTのみ、軽量版）
 
-    統合分析よりも高速だが、ルールベース判定は含まない
+    統合分析よりも高速だが、ルールベース判定は含まない。
+    `?stream=true` の場合は GPT の応答を Server-Sent Events で逐次返す
+    （`token` イベントの後に `done` イベントで全文）。
     """
 
     _require_openai_key()
@@ -92,6 +231,21 @@ async def quick_analysis(
         image_data = await file.read()
         image_base64 = base64.b64encode(image_data).decode("utf-8")
 
+        if stream:
+            from app.services.integrated_advice_service import simple_advice_payload
+
+            payload = simple_advice_payload(image_base64, symbol_context=symbol, analysis_context=analysis_context)
+            streamer = get_llm_streamer()
+            chunks = cached_stream(
+                lambda: streamer.stream_chat(payload),
+                model=payload["model"],
+                template=payload["messages"][0]["content"],
+                image=image_data,
+                symbol_context=symbol,
+                analysis_context=analysis_context,
+            )
+            return sse_response(advice_event_stream(chunks, stock_name=symbol))
+
         # シンプルなGPT分析のみ実行
         from app.services.integrated_advice_service import generate_simple_advice
 
@@ -112,6 +266,14 @@ async def analysis_status():
     """
     分析システムの稼働状況確認
     """
+    scoring_pool_status = None
+    if settings.rule_scoring_engine == "pool":
+        try:
+            # health_check は worker へ同期で ping するのでイベントループを塞がない
+            scoring_pool_status = await asyncio.to_thread(get_scoring_pool().health_check)
+        except Exception as e:
+            scoring_pool_status = {"error": str(e)}
+
     status = {
         "integrated_analysis": "available",
         "quick_analysis": "available",
@@ -119,6 +281,8 @@ async def analysis_status():
             "pivot_v13": "available" if os.path.exists("pivot/dist/pivotScore.js") else "unavailable",
             "entry_v04": "available" if os.path.exists("entry-v04/dist/entryScore.js") else "unavailable",
         },
+        "rule_scoring_engine": settings.rule_scoring_engine,
+        "scoring_pool": scoring_pool_status,
         "gpt_analysis": "available" if settings.openai_api_key else "unavailable",
         "template_system": "available",
     }
@@ -139,15 +303,13 @@ async def analysis_status():
 
 
 @router.post("/test-integration")
-async def test_integration():
+async def test_integration(advice_service: IntegratedAdviceService = Depends(get_integrated_advice_service)):
     """
     統合システムのテスト用エンドポイント
     """
 
     try:
         # テスト用のサンプルデータで統合分析をテスト
-        advice_service = IntegratedAdviceService(settings.openai_api_key or "test_key")
-
         # ダミー画像データ（1x1ピクセル透明PNG）
         dummy_image = base64.b64decode(
             "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
@@ -0,0 +1,59 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+
+from app.core.settings import get_settings
+from app.database import async_session_factory
+from app.models import AnalysisJob
+from app.schemas.jobs import JobResponse, JobSubmitted
+from app.services.jobs import get_job_pool, wait_for_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+settings = get_settings()
+
+BACKGROUND_DESCRIPTION = "true ならジョブとして登録して 202 と jobId を返す（結果は GET /jobs/{jobId}）"
+LANE_PATTERN = r"^(interactive|batch)$"
+
+
+def job_accepted(job: AnalysisJob) -> JSONResponse:
+    body = JobSubmitted(
+        job_id=job.job_id,
+        kind=job.kind,
+        lane=job.lane,
+        status=job.status,
+        status_url=f"/jobs/{job.job_id}",
+    )
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=body.model_dump(mode="json", by_alias=True))
+
+
+@router.get("/stats")
+async def get_job_stats():
+    """ワーカープールのメトリクス（このワーカー分）と lane・状態ごとのジョブ数"""
+    pool = get_job_pool()
+    if pool is None:
+        return {"workers": 0}
+    return await pool.stats()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: UUID,
+    wait: Optional[float] = Query(None, ge=0, le=60, description="終わるまで最大この秒数待つ（ロングポーリング）"),
+):
+    """ジョブの状態と結果
+
+    待っている間は DB 接続を持たないよう、リクエストのセッションではなく読み直しごとにセッションを開く。
+    """
+    job = await wait_for_job(
+        async_session_factory,
+        job_id,
+        wait or 0,
+        pool=get_job_pool(),
+        poll_interval=settings.job_poll_interval,
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse.model_validate(job)
@@ -1,115 +1,78 @@
-import json
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_async_db
+from app.database import async_session_factory, get_async_db
+from app.db.pagination import NEXT_CURSOR_HEADER, InvalidCursorError, decode_cursor, encode_cursor
 from app.models import TradeJournal
-from app.schemas.journal import FeedbackResponse, JournalClosePayload, JournalEntryResponse
+from app.schemas.journal import (
+    FeedbackResponse,
+    JournalCloseBulkRequest,
+    JournalClosePayload,
+    JournalEntryResponse,
+    JournalStatsBucket,
+    JournalStatsResponse,
+)
+from app.services import journal_export, journal_stats
+from app.services.journal_query import ENTRY_COLUMNS, journal_filters
+from app.services.journal_writes import upsert_closes
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/journal", tags=["journal"])
 
+_ENTRIES = TypeAdapter(List[JournalEntryResponse])
+
+
+def _journal_row(payload: JournalClosePayload) -> dict:
+    """Journal row values for a close; feedback / analysis are None when not provided (kept on upsert)"""
+    # Parse closed_at string to datetime (normalize to UTC but keep tz info)
+    closed_at = datetime.fromisoformat(payload.closed_at.replace("Z", "+00:00"))
+    if closed_at.tzinfo is None:
+        closed_at = closed_at.replace(tzinfo=timezone.utc)
+    else:
+        closed_at = closed_at.astimezone(timezone.utc)
+
+    feedback = payload.feedback
+    analysis = payload.analysis
+    return {
+        "trade_uuid": payload.trade_id,
+        "user_id": payload.user_id,
+        "chat_id": payload.chat_id,
+        "symbol": payload.symbol,
+        "side": payload.side,
+        "avg_entry": payload.avg_entry,
+        "avg_exit": payload.avg_exit,
+        "qty": payload.qty,
+        "pnl_abs": payload.pnl_abs,
+        "pnl_pct": payload.pnl_pct,
+        "hold_minutes": payload.hold_minutes,
+        "closed_at": closed_at,
+        "feedback_text": feedback.text if feedback else None,
+        "feedback_tone": feedback.tone if feedback else None,
+        "feedback_next_actions": feedback.next_actions if feedback else None,
+        "feedback_message_id": feedback.message_id if feedback else None,
+        "analysis_score": analysis.score if analysis else None,
+        "analysis_labels": analysis.labels if analysis else None,
+    }
+
 
 @router.post("/close")
 async def close_trade(payload: JournalClosePayload, db: AsyncSession = Depends(get_async_db)):
-    """Idempotent upsert for trade close - creates or updates journal entry"""
+    """Idempotent upsert for trade close - creates or updates journal entry.
+
+    Uses INSERT ... ON CONFLICT (trade_uuid) DO UPDATE; stored feedback / analysis are kept
+    when the payload omits them.
+    """
     try:
-        # Parse closed_at string to datetime (normalize to UTC but keep tz info)
-        closed_at = datetime.fromisoformat(payload.closed_at.replace("Z", "+00:00"))
-        if closed_at.tzinfo is None:
-            closed_at = closed_at.replace(tzinfo=timezone.utc)
-        else:
-            closed_at = closed_at.astimezone(timezone.utc)
-
-        # Prepare data for upsert
-        trade_data = {
-            "trade_uuid": payload.trade_id,
-            "user_id": payload.user_id,
-            "chat_id": payload.chat_id,
-            "symbol": payload.symbol,
-            "side": payload.side,
-            "avg_entry": payload.avg_entry,
-            "avg_exit": payload.avg_exit,
-            "qty": payload.qty,
-            "pnl_abs": payload.pnl_abs,
-            "pnl_pct": payload.pnl_pct,
-            "hold_minutes": payload.hold_minutes,
-            "closed_at": closed_at,
-        }
-
-        # Add feedback if provided
-        if payload.feedback:
-            trade_data.update(
-                {
-                    "feedback_text": payload.feedback.text,
-                    "feedback_tone": payload.feedback.tone,
-                    "feedback_next_actions": json.dumps(payload.feedback.next_actions),
-                    "feedback_message_id": payload.feedback.message_id,
-                }
-            )
-
-        # Add analysis if provided
-        if payload.analysis:
-            trade_data.update(
-                {
-                    "analysis_score": payload.analysis.score,
-                    "analysis_labels": json.dumps(payload.analysis.labels),
-                }
-            )
-
-        # Use SQLite-style UPSERT (INSERT OR REPLACE)
-        # First check if entry exists
-        existing_query = select(TradeJournal).where(TradeJournal.trade_uuid == payload.trade_id)
-        existing_result = await db.execute(existing_query)
-        existing_entry = existing_result.scalar_one_or_none()
-
-        if existing_entry:
-            # Update existing entry, preserving non-null feedback/analysis
-            update_data = {
-                "avg_entry": payload.avg_entry,
-                "avg_exit": payload.avg_exit,
-                "qty": payload.qty,
-                "pnl_abs": payload.pnl_abs,
-                "pnl_pct": payload.pnl_pct,
-                "hold_minutes": payload.hold_minutes,
-                "closed_at": closed_at,
-            }
-
-            # Update feedback only if provided
-            if payload.feedback:
-                update_data.update(
-                    {
-                        "feedback_text": payload.feedback.text,
-                        "feedback_tone": payload.feedback.tone,
-                        "feedback_next_actions": json.dumps(payload.feedback.next_actions),
-                        "feedback_message_id": payload.feedback.message_id,
-                    }
-                )
-
-            # Update analysis only if provided
-            if payload.analysis:
-                update_data.update(
-                    {
-                        "analysis_score": payload.analysis.score,
-                        "analysis_labels": json.dumps(payload.analysis.labels),
-                    }
-                )
-
-            for key, value in update_data.items():
-                setattr(existing_entry, key, value)
-        else:
-            # Create new entry
-            new_entry = TradeJournal(**trade_data)
-            db.add(new_entry)
-
-        # Commit is done below
+        await upsert_closes(db, [_journal_row(payload)])
         await db.commit()
 
         logger.info(f"Trade journal entry upserted: {payload.trade_id}")
@@ -122,85 +85,152 @@ async def close_trade(payload: JournalClosePayload, db: AsyncSession = Depends(g
         raise HTTPException(status_code=500, detail=f"Failed to save journal entry: {str(e)}")
 
 
+@router.post("/close/bulk")
+async def bulk_close_trades(payload: JournalCloseBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    """Upsert many closes in one statement (backfills). All-or-nothing, same semantics as /journal/close."""
+    try:
+        result = await upsert_closes(db, [_journal_row(item) for item in payload.items])
+        await db.commit()
+
+        logger.info(f"Trade journal bulk upsert: created={result.created} updated={result.updated}")
+
+        return {"status": "success", "created": result.created, "updated": result.updated}
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error bulk upserting {len(payload.items)} journal entries: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to save journal entries: {str(e)}")
+
+
 @router.get("/", response_model=List[JournalEntryResponse])
 async def get_journal_entries(
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
-    symbol: Optional[str] = Query(None),
+    symbol: Optional[str] = Query(None, description="4桁の銘柄コードは前方一致、それ以外は部分一致"),
     pnl: Optional[str] = Query(None, pattern=r"^(win|lose)$"),
+    user_id: Optional[UUID] = Query(None),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor（指定時は offset を無視）"),
     db: AsyncSession = Depends(get_async_db),
 ):
-    """Get journal entries with optional filters"""
+    """Get journal entries with optional filters.
+
+    Ordered by (closed_at, journal_id) descending. When a full page is returned,
+    the `X-Next-Cursor` header holds the cursor for the next page.
+    """
     try:
-        query = select(TradeJournal)
+        before = None
+        if cursor:
+            try:
+                before = decode_cursor(cursor)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        query = select(TradeJournal.journal_id, *ENTRY_COLUMNS)
+
+        # Build filters (see journal_query for the index each one uses)
+        filters = journal_filters(
+            from_date=datetime.fromisoformat(from_date) if from_date else None,
+            to_date=datetime.fromisoformat(to_date) if to_date else None,
+            symbol=symbol,
+            pnl=pnl,
+            user_id=user_id,
+        )
+        if filters:
+            query = query.where(and_(*filters))
 
-        # Build filters
-        filters = []
+        # Order by closed_at DESC (newest first), journal_id breaks ties
+        query = query.order_by(TradeJournal.closed_at.desc(), TradeJournal.journal_id.desc())
 
-        if from_date:
-            from_dt = datetime.fromisoformat(from_date)
-            filters.append(TradeJournal.closed_at >= from_dt)
+        # Apply pagination: keyset when a cursor is given, OFFSET otherwise
+        if before is not None:
+            query = query.where(tuple_(TradeJournal.closed_at, TradeJournal.journal_id) < before)
+        elif offset:
+            query = query.offset(offset)
+        query = query.limit(limit)
 
-        if to_date:
-            to_dt = datetime.fromisoformat(to_date)
-            filters.append(TradeJournal.closed_at <= to_dt)
+        rows = (await db.execute(query)).all()
 
-        if symbol:
-            filters.append(TradeJournal.symbol.ilike(f"%{symbol}%"))
+        headers = {}
+        if len(rows) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].closed_at, rows[-1].journal_id)
 
-        if pnl == "win":
-            filters.append(TradeJournal.pnl_abs > 0)
-        elif pnl == "lose":
-            filters.append(TradeJournal.pnl_abs <= 0)
+        # Validate the row tuples in one pass and write JSON bytes directly (no ORM objects / per-row models)
+        body = _ENTRIES.dump_json(_ENTRIES.validate_python(rows, from_attributes=True), by_alias=True)
+        return Response(content=body, media_type="application/json", headers=headers)
 
-        if filters:
-            query = query.where(and_(*filters))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching journal entries: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch journal entries: {str(e)}")
 
-        # Order by closed_at DESC (newest first)
-        query = query.order_by(TradeJournal.closed_at.desc())
 
-        # Apply pagination
-        query = query.offset(offset).limit(limit)
+@router.get("/export")
+async def export_journal_entries(
+    format: str = Query("csv", pattern=r"^(csv|parquet)$"),
+    from_date: Optional[str] = Query(None),
+    to_date: Optional[str] = Query(None),
+    symbol: Optional[str] = Query(None, description="4桁の銘柄コードは前方一致、それ以外は部分一致"),
+    pnl: Optional[str] = Query(None, pattern=r"^(win|lose)$"),
+    user_id: Optional[UUID] = Query(None),
+):
+    """Stream every matching journal entry as CSV (UTF-8 with BOM) or Parquet.
 
-        result = await db.execute(query)
-        entries = result.scalars().all()
-
-        # Convert to response format
-        response_entries = []
-        for entry in entries:
-            response_entries.append(
-                JournalEntryResponse(
-                    trade_id=entry.trade_uuid,
-                    chat_id=entry.chat_id,
-                    symbol=entry.symbol,
-                    side=entry.side,
-                    avg_entry=entry.avg_entry,
-                    avg_exit=entry.avg_exit,
-                    qty=entry.qty,
-                    pnl_abs=entry.pnl_abs,
-                    pnl_pct=entry.pnl_pct,
-                    hold_minutes=entry.hold_minutes,
-                    closed_at=entry.closed_at,
-                    feedback_text=entry.feedback_text,
-                    feedback_tone=entry.feedback_tone,
-                    feedback_next_actions=json.loads(entry.feedback_next_actions)
-                    if entry.feedback_next_actions
-                    else None,
-                    feedback_message_id=entry.feedback_message_id,
-                    analysis_score=entry.analysis_score,
-                    analysis_labels=json.loads(entry.analysis_labels) if entry.analysis_labels else None,
-                    created_at=entry.created_at,
-                    updated_at=entry.updated_at,
-                )
-            )
-
-        return response_entries
+    Takes the same filters as `GET /journal/`, without pagination. Rows are read through a
+    server-side cursor and ordered by (closed_at, journal_id) ascending.
+    """
+    try:
+        filters = journal_filters(
+            from_date=datetime.fromisoformat(from_date) if from_date else None,
+            to_date=datetime.fromisoformat(to_date) if to_date else None,
+            symbol=symbol,
+            pnl=pnl,
+            user_id=user_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date filter: {str(e)}")
+
+    query = select(*ENTRY_COLUMNS).where(*filters).order_by(TradeJournal.closed_at.asc(), TradeJournal.journal_id.asc())
+    if format == "parquet":
+        if not journal_export.parquet_available():
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow (pip install .[export])")
+        body = journal_export.stream_parquet(async_session_factory, query)
+        media_type = "application/vnd.apache.parquet"
+    else:
+        body = journal_export.stream_csv(async_session_factory, query)
+        media_type = "text/csv; charset=utf-8"
+
+    filename = f"journal-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    logger.info(f"Exporting journal entries as {format}")
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/stats", response_model=JournalStatsResponse)
+async def get_journal_stats(
+    group_by: str = Query("total", pattern=r"^(total|symbol|side|day|week|month)$"),
+    user_id: Optional[UUID] = Query(None, description="省略時は全ユーザーを合算（maxDrawdown は null）"),
+    from_date: Optional[date] = Query(None, description="day / week / month のときの開始日（UTC）"),
+    to_date: Optional[date] = Query(None, description="day / week / month のときの終了日（UTC）"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Aggregated journal stats per bucket, read from the incrementally maintained rollups.
 
+    Buckets are ordered by key; day / week / month keys are the period start date (UTC, weeks start on Monday).
+    """
+    try:
+        buckets = await journal_stats.load_stats(db, group_by, user_id=user_id, since=from_date, until=to_date)
+        return JournalStatsResponse(
+            group_by=group_by,
+            user_id=user_id,
+            buckets=[JournalStatsBucket(**bucket) for bucket in buckets],
+        )
     except Exception as e:
-        logger.error(f"Error fetching journal entries: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch journal entries: {str(e)}")
+        logger.error(f"Error fetching journal stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch journal stats: {str(e)}")
 
 
 @router.get("/{trade_id}/feedback", response_model=FeedbackResponse)
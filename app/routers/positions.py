@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.models import Position
+from app.schemas.position import PositionResponse, PositionsSnapshot
+from app.services.positions_feed import Subscriber, get_positions_feed, position_payload
+from app.services.positions_ledger import select_positions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/positions", tags=["positions"])
+live_router = APIRouter(tags=["positions"])
+
+LIVE_SNAPSHOT_LIMIT = 1000
+
+
+@router.get("/snapshot", response_model=PositionsSnapshot)
+async def get_positions_snapshot(
+    chat_id: Optional[str] = Query(None),
+    user_id: Optional[UUID] = Query(None),
+    status: str = Query("open", pattern=r"^(open|closed|all)$"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """台帳から建玉のスナップショットを返す（updatedAt の降順）"""
+    try:
+        emitted_at = datetime.now(timezone.utc)
+        positions = (await db.execute(select_positions(chat_id, user_id, status, limit))).scalars().all()
+        return PositionsSnapshot(
+            emitted_at=emitted_at, positions=[PositionResponse.model_validate(p) for p in positions]
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting positions snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/live/stats")
+async def get_positions_live_stats():
+    """ライブ配信のメトリクス（このワーカー分）"""
+    feed = get_positions_feed()
+    if feed is None:
+        return {"backend": "off"}
+    return feed.stats()
+
+
+@router.get("/{trade_id}", response_model=PositionResponse)
+async def get_position(trade_id: str, db: AsyncSession = Depends(get_async_db)):
+    """tradeId の建玉を返す（台帳にない場合は 404）"""
+    try:
+        position = await db.get(Position, trade_id)
+        if position is None:
+            raise HTTPException(status_code=404, detail=f"Position {trade_id} not found")
+        return PositionResponse.model_validate(position)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting position {trade_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+async def _receive_commands(websocket: WebSocket, subscriber: Subscriber, send) -> None:
+    while True:
+        try:
+            message = json.loads(await websocket.receive_text())
+        except ValueError:
+            continue
+        if not isinstance(message, dict):
+            continue
+        if message.get("type") == "ping":
+            await send({"type": "pong"})
+        elif message.get("type") == "positions.snapshot.request":
+            subscriber.request_snapshot()
+
+
+@live_router.websocket("/ws/positions")
+async def positions_live(
+    websocket: WebSocket,
+    chat_id: Optional[str] = Query(None),
+    user_id: Optional[UUID] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    建玉のライブ配信
+
+    接続直後に positions.snapshot（OPEN の建玉一覧）を送り、以降は positions.upsert /
+    positions.removed を positionId 単位で集約して送る。クライアントの受信が追いつかず
+    保留が上限を超えた場合は差分を捨ててスナップショットを送り直す。
+    """
+    feed = get_positions_feed()
+    if feed is None:
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    subscriber = feed.hub.subscribe(chat_id, str(user_id) if user_id else None)
+    send_lock = asyncio.Lock()
+
+    async def send(event: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_json(event)
+
+    async def load_snapshot():
+        try:
+            stmt = select_positions(chat_id, user_id, "open", LIVE_SNAPSHOT_LIMIT)
+            return [position_payload(p) for p in (await db.execute(stmt)).scalars().all()]
+        finally:
+            # 接続中に読み取りトランザクションを持ち続けない
+            await db.rollback()
+
+    tasks = {
+        asyncio.create_task(feed.hub.serve(subscriber, send, load_snapshot)),
+        asyncio.create_task(_receive_commands(websocket, subscriber, send)),
+    }
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"Positions live connection closed with error: {error!r}")
+    finally:
+        feed.hub.unsubscribe(subscriber)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -3,9 +3,7 @@ from typing import List
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
 
-from app.database import get_db
 from app.deps import get_session
 from app.models import Trade
 from app.schemas.trade import TradeCreate, TradeIn, TradeOut
@@ -48,7 +46,7 @@ async def get_trades(session: AsyncSession = Depends(get_session)):
 
 
 @router.post("/save", response_model=TradeOut, status_code=status.HTTP_201_CREATED)
-def save_trade(trade: TradeCreate, db: Session = Depends(get_db)):
+async def save_trade(trade: TradeCreate, session: AsyncSession = Depends(get_session)):
     db_trade = Trade(
         user_id=trade.user_id,
         stock_code=trade.stock_code,
@@ -61,7 +59,7 @@ def save_trade(trade: TradeCreate, db: Session = Depends(get_db)):
         size=trade.size,
         description=trade.description or "",
     )
-    db.add(db_trade)
-    db.commit()
-    db.refresh(db_trade)
+    session.add(db_trade)
+    await session.commit()
+    await session.refresh(db_trade)
     return TradeOut.model_validate(db_trade)
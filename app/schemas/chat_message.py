@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Any, Dict, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class EntryPayload(BaseModel):
@@ -65,3 +65,30 @@ class ChatMessageResponse(BaseModel):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+BULK_MESSAGE_LIMIT = 1000
+
+
+class ChatMessageBulkItem(BaseModel):
+    chat_id: str
+    message: ChatMessageCreate
+
+
+class ChatMessageBulkRequest(BaseModel):
+    # 1件ずつ ChatMessageBulkItem で検証し、不正な要素があってもバッチ全体は拒否しない
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_MESSAGE_LIMIT)
+
+
+class ChatMessageBulkResult(BaseModel):
+    index: int
+    status: Literal["created", "error"]
+    chat_id: Optional[str] = None
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ChatMessageBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[ChatMessageBulkResult]
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Literal, Optional, Union
+from typing import Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -43,6 +43,12 @@ class TradingAnalysis(BaseModel):
     risk_points: List[str] = Field(default_factory=list, description="注意点・リスク")
     opportunity_points: List[str] = Field(default_factory=list, description="チャンスポイント")
 
+    # 実行情報（pivot / entry / gpt は並行実行。total は統合全体）
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="ステージごとの所要時間（ms）")
+    fallback_stages: List[str] = Field(
+        default_factory=list, description="タイムアウト・エラーでフォールバック結果を使ったステージ"
+    )
+
 
 class AnalysisRequest(BaseModel):
     """分析リクエストの入力データ"""
@@ -60,3 +66,24 @@ class AnalysisResponse(BaseModel):
     analysis: Optional[TradingAnalysis] = Field(None, description="分析結果")
     natural_feedback: str = Field(..., description="自然言語フィードバック")
     error_message: Optional[str] = Field(None, description="エラーメッセージ")
+
+
+class OHLCVBar(BaseModel):
+    """インジケーターエンジンに投入する日足（同じdateを再送すると当日足を更新）"""
+
+    date: str = Field(..., description="日付（YYYY-MM-DD）")
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = Field(..., ge=0)
+
+
+class IndicatorSnapshotResponse(BaseModel):
+    """最新足のスコアラー入力（PivotInput / Indicators / context）"""
+
+    symbol: str
+    bar_count: int
+    pivot_input: dict
+    indicators: dict
+    context: dict
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class JobSubmitted(BaseModel):
+    job_id: UUID = Field(serialization_alias="jobId")
+    kind: str
+    lane: Literal["interactive", "batch"]
+    status: str
+    status_url: str = Field(serialization_alias="statusUrl")
+
+
+class JobResponse(BaseModel):
+    job_id: UUID = Field(serialization_alias="jobId")
+    kind: str
+    lane: Literal["interactive", "batch"]
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    max_attempts: int = Field(serialization_alias="maxAttempts")
+    result: Optional[Dict[str, Any]] = None  # 元のエンドポイントが同期実行で返す JSON と同じ
+    error: Optional[str] = None
+    created_at: datetime = Field(serialization_alias="createdAt")
+    started_at: Optional[datetime] = Field(default=None, serialization_alias="startedAt")
+    finished_at: Optional[datetime] = Field(default=None, serialization_alias="finishedAt")
+
+    model_config = ConfigDict(from_attributes=True)
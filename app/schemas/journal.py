@@ -2,7 +2,9 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+JOURNAL_BULK_LIMIT = 1000
 
 
 class FeedbackData(BaseModel):
@@ -36,6 +38,21 @@ class JournalClosePayload(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class JournalCloseBulkRequest(BaseModel):
+    items: List[JournalClosePayload] = Field(..., min_length=1, max_length=JOURNAL_BULK_LIMIT)
+
+    @field_validator("items")
+    @classmethod
+    def unique_trade_ids(cls, items: List[JournalClosePayload]) -> List[JournalClosePayload]:
+        # 1文の ON CONFLICT で同じ行を2回更新できないため、同一 tradeId は1件にまとめて送る
+        seen = set()
+        for item in items:
+            if item.trade_id in seen:
+                raise ValueError(f"duplicate tradeId: {item.trade_id}")
+            seen.add(item.trade_id)
+        return items
+
+
 class JournalEntryResponse(BaseModel):
     trade_id: UUID = Field(serialization_alias="tradeId")
     chat_id: str = Field(serialization_alias="chatId")
@@ -73,3 +90,22 @@ class FeedbackResponse(BaseModel):
     feedback_text: str
     chat_id: str
     message_id: Optional[str] = None
+
+
+class JournalStatsBucket(BaseModel):
+    key: str  # 銘柄 / LONG・SHORT / 期間の開始日（total は ""）
+    trades: int
+    wins: int
+    win_rate: float = Field(serialization_alias="winRate")
+    pnl_abs_sum: float = Field(serialization_alias="pnlAbsSum")
+    pnl_abs_avg: float = Field(serialization_alias="pnlAbsAvg")
+    pnl_pct_sum: float = Field(serialization_alias="pnlPctSum")
+    pnl_pct_avg: float = Field(serialization_alias="pnlPctAvg")
+    hold_minutes_avg: float = Field(serialization_alias="holdMinutesAvg")
+    max_drawdown: Optional[float] = Field(default=None, serialization_alias="maxDrawdown")
+
+
+class JournalStatsResponse(BaseModel):
+    group_by: str = Field(serialization_alias="groupBy")
+    user_id: Optional[UUID] = Field(default=None, serialization_alias="userId")
+    buckets: List[JournalStatsBucket]
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PositionResponse(BaseModel):
+    # フロントエンドの Position（store/positions.ts）と同じキー名で返す
+    trade_id: str = Field(serialization_alias="positionId")
+    chat_id: str = Field(serialization_alias="chatId")
+    user_id: Optional[UUID] = Field(default=None, serialization_alias="ownerId")
+    symbol_code: str = Field(serialization_alias="symbol")
+    symbol_name: Optional[str] = Field(default=None, serialization_alias="name")
+    side: Literal["LONG", "SHORT"]
+    qty_open: int = Field(serialization_alias="qtyTotal")
+    qty_entered: int = Field(serialization_alias="qtyEntered")
+    qty_exited: int = Field(serialization_alias="qtyExited")
+    avg_entry: float = Field(serialization_alias="avgPrice")
+    realized_pnl: float = Field(serialization_alias="realizedPnl")
+    status: Literal["OPEN", "CLOSED"]
+    version: int
+    opened_at: datetime = Field(serialization_alias="openedAt")
+    closed_at: Optional[datetime] = Field(default=None, serialization_alias="closedAt")
+    updated_at: datetime = Field(serialization_alias="updatedAt")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+
+class PositionsSnapshot(BaseModel):
+    emitted_at: datetime = Field(serialization_alias="emittedAt")
+    positions: List[PositionResponse]
@@ -2,10 +2,10 @@ from __future__ import annotations
 
 from typing import Optional
 
-import markdown2
 from openai import OpenAI
 
 from app.core.settings import get_settings
+from app.services.registry import get_service_registry
 
 settings = get_settings()
 
@@ -121,7 +121,7 @@ chart_facts:
     markdown_text = response.choices[0].message.content
     print("=== Markdown Text ===")
     print(markdown_text)
-    html_output = markdown2.markdown(markdown_text)
+    html_output = get_service_registry().markdown.convert(markdown_text)
     return html_output
 
 
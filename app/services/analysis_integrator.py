@@ -1,59 +1,128 @@
+import asyncio
+import inspect
+import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
+from app.core.settings import get_settings
 from app.schemas.indicators import IndicatorItem, TradingAnalysis
 from app.services.gpt_analyzer import GPTAnalyzer
 from app.services.rule_based_analyzer import RuleBasedAnalyzer
 
+logger = logging.getLogger(__name__)
+
+STAGES = ("pivot", "entry", "gpt")
+
 
 class AnalysisIntegrator:
-    """ルールベース分析とGPT分析を統合するクラス"""
+    """ルールベース分析とGPT分析を統合するクラス
+
+    pivot / entry のスコアリングと GPT の画像解析は互いに独立しているので並行に実行する
+    （同期処理はスレッドに逃がしてイベントループを塞がない）。所要時間は合計ではなく最も遅い
+    ステージで決まる。ステージごとにタイムアウトがあり、超過・失敗したステージは
+    フォールバック結果（中立スコア / GPT 指標なし）で統合を続ける。
+    """
 
-    def __init__(self, openai_api_key: str):
+    def __init__(
+        self,
+        openai_api_key: Optional[str],
+        rule_timeout: Optional[float] = None,
+        gpt_timeout: Optional[float] = None,
+    ):
+        settings = get_settings()
         self.rule_analyzer = RuleBasedAnalyzer()
         self.gpt_analyzer = GPTAnalyzer(openai_api_key)
+        self.rule_timeout = rule_timeout if rule_timeout is not None else settings.analysis_rule_timeout
+        self.gpt_timeout = gpt_timeout if gpt_timeout is not None else settings.analysis_gpt_timeout
 
-    def integrate_analysis(
+    async def _run_stage(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...],
+        timeout: float,
+        fallback: Callable[[], Dict[str, Any]],
+    ) -> Tuple[Dict[str, Any], float, bool]:
+        """1ステージを実行し (結果, 所要時間ms, フォールバックしたか) を返す"""
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(func):
+                result = await asyncio.wait_for(func(*args), timeout)
+            else:
+                # タイムアウトしてもスレッド側は止まらないが、結果は待たずに先へ進む
+                result = await asyncio.wait_for(asyncio.to_thread(func, *args), timeout)
+            return result, (time.perf_counter() - started) * 1000, False
+        except asyncio.TimeoutError:
+            logger.warning(f"Analysis stage {name} timed out after {timeout}s, using fallback result")
+        except Exception as e:
+            logger.error(f"Analysis stage {name} failed: {e}")
+        return fallback(), (time.perf_counter() - started) * 1000, True
+
+    async def integrate_analysis(
         self,
         bar_data: Dict[str, Any],
         indicators_data: Dict[str, Any],
         context: Dict[str, Any],
         image_base64: str,
-        symbol_context: str = None,
-        analysis_context: str = None,
-        entry_price: float = None,
-        position_type: Literal["long", "short"] = None,
+        symbol_context: Optional[str] = None,
+        analysis_context: Optional[str] = None,
+        entry_price: Optional[float] = None,
+        position_type: Optional[Literal["long", "short"]] = None,
     ) -> TradingAnalysis:
         """分析を統合して最終結果を生成"""
+        started = time.perf_counter()
+
+        # 1. ルールベース分析と GPT 分析を並行実行
+        stages = await asyncio.gather(
+            self._run_stage(
+                "pivot",
+                self.rule_analyzer.analyze_pivot_v13,
+                (bar_data,),
+                self.rule_timeout,
+                self.rule_analyzer._get_fallback_pivot_result,
+            ),
+            self._run_stage(
+                "entry",
+                self.rule_analyzer.analyze_entry_v04,
+                (bar_data, indicators_data, context),
+                self.rule_timeout,
+                self.rule_analyzer._get_fallback_entry_result,
+            ),
+            self._run_stage(
+                "gpt",
+                self.gpt_analyzer.analyze_chart_image,
+                (image_base64, symbol_context, analysis_context),
+                self.gpt_timeout,
+                dict,
+            ),
+        )
+        pivot_result, entry_result, gpt_result = (result for result, _, _ in stages)
+        stage_timings = {name: round(elapsed_ms, 3) for name, (_, elapsed_ms, _) in zip(STAGES, stages)}
+        fallback_stages = [name for name, (_, _, fell_back) in zip(STAGES, stages) if fell_back]
 
-        # 1. ルールベース分析実行
-        pivot_result = self.rule_analyzer.analyze_pivot_v13(bar_data)
-        entry_result = self.rule_analyzer.analyze_entry_v04(bar_data, indicators_data, context)
-
-        # 2. GPT分析実行
-        gpt_result = self.gpt_analyzer.analyze_chart_image(image_base64, symbol_context, analysis_context)
-
-        # 3. インジケーター配列を作成
+        # 2. インジケーター配列を作成
         rule_indicators = []
         rule_indicators.extend(self.rule_analyzer.pivot_result_to_indicators(pivot_result))
         rule_indicators.extend(self.rule_analyzer.entry_result_to_indicators(entry_result))
 
         gpt_indicators = self.gpt_analyzer.gpt_result_to_indicators(gpt_result)
 
-        # 4. 重複するインジケーターをマージ
+        # 3. 重複するインジケーターをマージ
         merged_indicators = self._merge_indicators(rule_indicators, gpt_indicators)
 
-        # 5. 総合評価を算出
+        # 4. 総合評価を算出
         overall_evaluation, confidence_score = self._calculate_overall_evaluation(
             pivot_result, entry_result, gpt_indicators, position_type
         )
 
-        # 6. 戦略情報を生成
+        # 5. 戦略情報を生成
         strategy_info = self._generate_strategy_info(
             pivot_result, entry_result, gpt_result, overall_evaluation, position_type
         )
+        stage_timings["total"] = round((time.perf_counter() - started) * 1000, 3)
 
-        # 7. 統合結果を返す
+        # 6. 統合結果を返す
         return TradingAnalysis(
             timestamp=datetime.now(),
             symbol=symbol_context,
@@ -69,6 +138,8 @@ class AnalysisIntegrator:
             strategy_summary=strategy_info["summary"],
             risk_points=strategy_info["risks"],
             opportunity_points=strategy_info["opportunities"],
+            stage_timings=stage_timings,
+            fallback_stages=fallback_stages,
         )
 
     def _merge_indicators(
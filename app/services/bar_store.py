@@ -0,0 +1,255 @@
+"""Columnar on-disk OHLCV store with memory-mapped reads.
+
+Layout (one raw little-endian file per column, append-only)::
+
+    <root>/daily/<symbol>/{ts.i8, open.f8, high.f8, low.f8, close.f8, volume.f8}
+    <root>/intraday/<symbol>/<YYYY-MM-DD>/{ts.i8, open.f8, ...}
+
+`ts` holds epoch seconds (naive timestamps are stored as given). Reads map the
+column files with `np.memmap` and slice them, so a window of N bars is a view
+into the page cache: nothing is copied or parsed. The `ts` column is written
+last on append and defines how many rows are committed; a torn append is
+truncated back to that length before the next write.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+from app.core.settings import get_settings
+
+TIMEFRAMES = ("daily", "intraday")
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+TS_FILE = "ts.i8"
+
+# 先頭は英数字（"." / ".." でパーティションの外を指せないようにする）
+_SYMBOL_RE = re.compile(r"[0-9A-Za-z][0-9A-Za-z._-]*")
+
+TimeLike = Union[str, int, np.datetime64, Any]
+
+
+class BarStoreError(ValueError):
+    """Raised for invalid symbols, partitions or out-of-order appends."""
+
+
+def to_epoch_seconds(values: Union[TimeLike, Iterable[TimeLike]]) -> np.ndarray:
+    """Convert dates / datetimes / ISO strings / epoch ints to int64 epoch seconds."""
+    array = np.asarray(values)
+    if array.dtype.kind in "iu":
+        return array.astype(np.int64)
+    return array.astype("datetime64[s]").astype(np.int64)
+
+
+@dataclass(frozen=True)
+class BarSlice:
+    """Zero-copy window over one partition (every column is a memmap view)."""
+
+    symbol: str
+    timeframe: str
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """`ts` viewed as datetime64[s] (still no copy)."""
+        return self.ts.view("datetime64[s]")
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """OHLCV dict in the shape `score_series` / the scorers expect."""
+        return {name: getattr(self, name) for name in PRICE_COLUMNS}
+
+    def bars(self) -> List[Dict[str, Any]]:
+        """Materialize per-bar dicts (copies; for small windows such as IndicatorEngine feeds)."""
+        dates = np.datetime_as_string(self.dates, unit="D" if self.timeframe == "daily" else "s")
+        return [
+            {
+                "date": str(dates[i]),
+                "open": float(self.open[i]),
+                "high": float(self.high[i]),
+                "low": float(self.low[i]),
+                "close": float(self.close[i]),
+                "volume": float(self.volume[i]),
+            }
+            for i in range(len(self))
+        ]
+
+
+class BarStore:
+    """Append-only columnar bar store keyed by symbol code."""
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # paths
+    # ------------------------------------------------------------------ #
+    def partition_path(self, symbol: str, timeframe: str = "daily", session: Optional[str] = None) -> Path:
+        if not _SYMBOL_RE.fullmatch(symbol or ""):
+            raise BarStoreError(f"invalid symbol: {symbol!r}")
+        if timeframe not in TIMEFRAMES:
+            raise BarStoreError(f"timeframe must be one of {TIMEFRAMES}, got {timeframe!r}")
+        path = self.root / timeframe / symbol
+        if timeframe == "intraday":
+            if not session:
+                raise BarStoreError("intraday partitions need a session date (YYYY-MM-DD)")
+            path = path / str(np.datetime64(session, "D"))
+        return path
+
+    def symbols(self, timeframe: str = "daily") -> List[str]:
+        base = self.root / timeframe
+        return sorted(p.name for p in base.iterdir() if p.is_dir()) if base.exists() else []
+
+    def sessions(self, symbol: str) -> List[str]:
+        base = self.root / "intraday" / symbol
+        return sorted(p.name for p in base.iterdir() if p.is_dir()) if base.exists() else []
+
+    # ------------------------------------------------------------------ #
+    # write
+    # ------------------------------------------------------------------ #
+    def append(
+        self,
+        symbol: str,
+        bars: Mapping[str, Any],
+        timeframe: str = "daily",
+        skip_existing: bool = False,
+    ) -> int:
+        """Append columnar bars (`ts`/`date` + OHLCV). Returns the number of rows written.
+
+        Timestamps must be strictly increasing and newer than what is stored.
+        With `skip_existing`, rows at or before the stored tail are dropped
+        instead (idempotent re-imports). Intraday bars are split into one
+        partition per session date.
+        """
+        ts_values = bars.get("ts") if "ts" in bars else bars.get("date")
+        if ts_values is None:
+            raise BarStoreError("bars need a 'ts' or 'date' column")
+        ts = to_epoch_seconds(ts_values)
+        columns = {name: np.asarray(bars[name], dtype="<f8") for name in PRICE_COLUMNS}
+        for name, values in columns.items():
+            if values.shape != ts.shape:
+                raise BarStoreError(f"column {name!r} has {values.shape[0]} rows, expected {ts.shape[0]}")
+        if len(ts) > 1 and not np.all(np.diff(ts) > 0):
+            raise BarStoreError("timestamps must be strictly increasing")
+
+        if timeframe != "intraday":
+            return self._append_partition(self.partition_path(symbol, timeframe), ts, columns, skip_existing)
+
+        sessions = ts.astype("datetime64[s]").astype("datetime64[D]")
+        written = 0
+        for session in np.unique(sessions):
+            mask = sessions == session
+            path = self.partition_path(symbol, "intraday", str(session))
+            written += self._append_partition(
+                path, ts[mask], {name: values[mask] for name, values in columns.items()}, skip_existing
+            )
+        return written
+
+    def _append_partition(self, path: Path, ts: np.ndarray, columns: Dict[str, np.ndarray], skip_existing: bool) -> int:
+        with self._lock:
+            path.mkdir(parents=True, exist_ok=True)
+            committed = self._repair(path)
+            if committed:
+                last_ts = int(np.memmap(path / TS_FILE, dtype="<i8", mode="r", shape=(committed,))[-1])
+                if len(ts) and ts[0] <= last_ts:
+                    if not skip_existing:
+                        raise BarStoreError(f"{path}: append is not newer than stored tail ({ts[0]} <= {last_ts})")
+                    keep = ts > last_ts
+                    ts = ts[keep]
+                    columns = {name: values[keep] for name, values in columns.items()}
+            if not len(ts):
+                return 0
+
+            for name in PRICE_COLUMNS:
+                with open(path / f"{name}.f8", "ab") as fh:
+                    fh.write(columns[name].astype("<f8", copy=False).tobytes())
+            # ts を最後に書くことで、ts の行数＝確定済み行数になる
+            with open(path / TS_FILE, "ab") as fh:
+                fh.write(ts.astype("<i8", copy=False).tobytes())
+            return len(ts)
+
+    @staticmethod
+    def _repair(path: Path) -> int:
+        """Truncate columns past the committed `ts` length (torn appends). Returns row count."""
+        ts_file = path / TS_FILE
+        committed = ts_file.stat().st_size // 8 if ts_file.exists() else 0
+        # ts 自体の書きかけ（8 バイトに満たない末尾）も落とす。残すと次の append がずれる
+        if ts_file.exists() and ts_file.stat().st_size != committed * 8:
+            with open(ts_file, "r+b") as fh:
+                fh.truncate(committed * 8)
+        for name in PRICE_COLUMNS:
+            column = path / f"{name}.f8"
+            if column.exists() and column.stat().st_size != committed * 8:
+                if column.stat().st_size < committed * 8:
+                    raise BarStoreError(f"{column} is shorter than {TS_FILE}; partition is corrupt")
+                with open(column, "r+b") as fh:
+                    fh.truncate(committed * 8)
+        return committed
+
+    # ------------------------------------------------------------------ #
+    # read
+    # ------------------------------------------------------------------ #
+    def read(
+        self,
+        symbol: str,
+        timeframe: str = "daily",
+        start: Optional[TimeLike] = None,
+        end: Optional[TimeLike] = None,
+        last: Optional[int] = None,
+        session: Optional[str] = None,
+    ) -> BarSlice:
+        """Memory-mapped window `[start, end]` (inclusive), optionally only the last N bars."""
+        path = self.partition_path(symbol, timeframe, session)
+        rows = (path / TS_FILE).stat().st_size // 8 if (path / TS_FILE).exists() else 0
+        if rows == 0:
+            empty = np.empty(0, dtype="<f8")
+            return BarSlice(symbol, timeframe, np.empty(0, dtype="<i8"), *([empty] * len(PRICE_COLUMNS)))
+
+        ts = np.memmap(path / TS_FILE, dtype="<i8", mode="r", shape=(rows,))
+        lo = 0 if start is None else int(np.searchsorted(ts, to_epoch_seconds(start), "left"))
+        hi = rows if end is None else int(np.searchsorted(ts, to_epoch_seconds(_day_end(end)), "right"))
+        if last is not None:
+            lo = max(lo, hi - last)
+
+        columns = [
+            np.memmap(path / f"{name}.f8", dtype="<f8", mode="r", shape=(rows,))[lo:hi] for name in PRICE_COLUMNS
+        ]
+        return BarSlice(symbol, timeframe, ts[lo:hi], *columns)
+
+    def count(self, symbol: str, timeframe: str = "daily", session: Optional[str] = None) -> int:
+        ts_file = self.partition_path(symbol, timeframe, session) / TS_FILE
+        return ts_file.stat().st_size // 8 if ts_file.exists() else 0
+
+
+def _day_end(value: TimeLike) -> TimeLike:
+    # 日付だけの end はその日の終わりまでを含める
+    if isinstance(value, str) and len(value) == 10:
+        return np.datetime64(value, "D") + np.timedelta64(1, "D") - np.timedelta64(1, "s")
+    return value
+
+
+_store: Optional[BarStore] = None
+_store_lock = threading.Lock()
+
+
+def get_bar_store() -> BarStore:
+    """Return the process-wide bar store rooted at `BAR_STORE_PATH`."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BarStore(get_settings().bar_store_path)
+        return _store
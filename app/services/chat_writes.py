@@ -0,0 +1,164 @@
+"""Single-round-trip writes for chat messages.
+
+Every message write also touches the parent `chats.updated_at`. On PostgreSQL
+both happen in one statement through a data-modifying CTE, for example::
+
+    WITH touched AS (UPDATE chats SET updated_at = :now
+                     WHERE id = :chat_id AND deleted_at IS NULL RETURNING id)
+    INSERT INTO chat_messages (...) SELECT ... FROM touched RETURNING ...
+
+The existence check is folded into the same statement: no parent row means
+nothing is written and nothing is returned. Other dialects (SQLite) have no DML
+in CTEs, so they run the guarded write plus the touch as two statements in the
+same transaction. Callers only fall back to extra reads on the error path,
+where they need to tell "chat missing" from "message missing".
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import DateTime, Row, String, Text, delete, exists, insert, literal, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import TypeEngine
+
+from app.db.types import JSONText
+from app.models import Chat, ChatMessage
+
+MESSAGE_COLUMNS = tuple(ChatMessage.__table__.c)
+_INSERT_COLUMNS = ("id", "chat_id", "type", "author_id", "text", "payload", "created_at")
+_LITERAL_TYPES: Dict[str, TypeEngine[Any]] = {
+    "id": String(),
+    "type": String(),
+    "author_id": String(),
+    "text": Text(),
+    "created_at": DateTime(),
+}
+
+
+def _uses_dml_cte(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+def _touch_chat(chat_id: Any, touched_at: datetime):
+    return (
+        update(Chat)
+        .where(Chat.id == chat_id, Chat.deleted_at.is_(None))
+        .values(updated_at=touched_at)
+        .returning(Chat.id)
+    )
+
+
+def _live_chat(chat_id: Any):
+    return exists().where(Chat.id == chat_id, Chat.deleted_at.is_(None))
+
+
+async def append_messages(
+    db: AsyncSession, chat_id: str, rows: Sequence[Dict[str, Any]], touched_at: datetime
+) -> List[Row]:
+    """Insert message rows into a live chat and touch it. Returns [] when the chat is missing or deleted.
+
+    Each row needs id / type / author_id / text / payload / created_at.
+    """
+    if not rows:
+        return []
+
+    if _uses_dml_cte(db):
+        touched = _touch_chat(chat_id, touched_at).cte("touched")
+        selects = [
+            select(
+                *(
+                    touched.c.id
+                    if name == "chat_id"
+                    else literal(row.get(name), JSONText() if name == "payload" else _LITERAL_TYPES[name])
+                    for name in _INSERT_COLUMNS
+                )
+            )
+            for row in rows
+        ]
+        source = selects[0] if len(selects) == 1 else union_all(*selects)
+        stmt = insert(ChatMessage).from_select(list(_INSERT_COLUMNS), source).returning(*MESSAGE_COLUMNS)
+        return list((await db.execute(stmt)).all())
+
+    if (await db.execute(_touch_chat(chat_id, touched_at))).first() is None:
+        return []
+    params = [{**{name: row.get(name) for name in _INSERT_COLUMNS}, "chat_id": chat_id} for row in rows]
+    stmt = insert(ChatMessage).returning(*MESSAGE_COLUMNS, sort_by_parameter_order=True)
+    result = await db.execute(stmt.execution_options(render_nulls=True), params)
+    return list(result.all())
+
+
+async def touch_chats(db: AsyncSession, chat_ids: Iterable[str], touched_at: datetime) -> Set[str]:
+    """Touch every live chat in `chat_ids` once; returns the ids that exist (the rest are missing or deleted)."""
+    ids = sorted(set(chat_ids))
+    if not ids:
+        return set()
+    stmt = (
+        update(Chat)
+        .where(Chat.id.in_(ids), Chat.deleted_at.is_(None))
+        .values(updated_at=touched_at)
+        .returning(Chat.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set((await db.execute(stmt)).scalars().all())
+
+
+async def insert_messages(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> None:
+    """Insert many message rows (chat_id included) with a single executemany. Chats must already be checked."""
+    if rows:
+        # render_nulls keeps TEXT and ENTRY/EXIT rows (different NULL columns) in one executemany
+        stmt = insert(ChatMessage).execution_options(render_nulls=True)
+        await db.execute(stmt, [{name: row.get(name) for name in _INSERT_COLUMNS} for row in rows])
+
+
+async def edit_message(
+    db: AsyncSession, message_id: str, values: Dict[str, Any], touched_at: datetime, *conditions: Any
+) -> Optional[Row]:
+    """UPDATE ... RETURNING the message (only if `conditions` hold) and touch its chat.
+
+    Returns None when nothing matched.
+    """
+    updated_stmt = (
+        update(ChatMessage)
+        .where(ChatMessage.id == message_id, *conditions)
+        .values(**values)
+        .returning(*MESSAGE_COLUMNS)
+    )
+
+    if _uses_dml_cte(db):
+        updated = updated_stmt.cte("updated")
+        touched = (
+            update(Chat).where(Chat.id == updated.c.chat_id).values(updated_at=touched_at).returning(Chat.id)
+        ).cte("touched")
+        return (await db.execute(select(updated).add_cte(touched))).first()
+
+    row = (await db.execute(updated_stmt)).first()
+    if row is not None:
+        await db.execute(update(Chat).where(Chat.id == row.chat_id).values(updated_at=touched_at))
+    return row
+
+
+async def remove_message(db: AsyncSession, message_id: str, touched_at: datetime, *conditions: Any) -> Optional[Row]:
+    """DELETE ... RETURNING the message (only if `conditions` hold) and touch its chat.
+
+    Returns None when nothing matched; the caller decides which error that is.
+    """
+    deleted_stmt = delete(ChatMessage).where(ChatMessage.id == message_id, *conditions).returning(*MESSAGE_COLUMNS)
+
+    if _uses_dml_cte(db):
+        deleted = deleted_stmt.cte("deleted")
+        touched = (
+            update(Chat).where(Chat.id == deleted.c.chat_id).values(updated_at=touched_at).returning(Chat.id)
+        ).cte("touched")
+        return (await db.execute(select(deleted).add_cte(touched))).first()
+
+    row = (await db.execute(deleted_stmt)).first()
+    if row is not None:
+        await db.execute(update(Chat).where(Chat.id == row.chat_id).values(updated_at=touched_at))
+    return row
+
+
+def live_chat_condition(chat_id: str):
+    """WHERE clause: the message belongs to `chat_id` and that chat is not soft-deleted."""
+    return (ChatMessage.chat_id == chat_id) & _live_chat(chat_id)
@@ -0,0 +1,153 @@
+"""エントリーアドバイス（IndicatorFacts → HTML）の生成とメモ化
+
+HTML は facts のフィールドだけで決まる（estimate_strategy も facts だけを見る）ので、
+facts を正規化した JSON（宣言順のフィールド、0.0 と -0.0 のような表記の違いも区別される）を
+キーに、プロセス内の LRU にメモ化する。ENTRY_ADVICE_CACHE_SIZE=0 でメモ化しない。
+
+HTML は entry_advice.html.j2 から直接組み立て、Markdown を経由しない。従来の
+Markdown テンプレート → markdown2（tables）の経路は render_entry_advice_markdown に残してあり、
+通常の facts では同じ HTML になる。値に Markdown や HTML の記法（`|`、`*`、`<` など）が
+含まれる場合、Markdown 経路はそれを解釈してしまうが、直接経路はエスケープして表示する。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from jinja2 import Template
+
+from app.core.settings import get_settings
+from app.schemas.indicator_facts import IndicatorFacts
+from app.services.llm_cache import MemoryCacheBackend
+from app.services.registry import get_service_registry
+from app.services.strategy_estimator import estimate_strategy
+
+ENTRY_ADVICE_HTML_TEMPLATE = "entry_advice.html.j2"
+
+entry_advice_template = Template("""
+## ✅ 現在の状況（{{ time }}時点）
+
+### 🔍 テクニカルチェック
+
+| 項目 | 状況 |
+| --- | --- |
+| 下降トレンド入り | {{ trend_check }} |
+| ボリンジャーバンド収束 | {{ bollinger_contraction }} |
+| RSI過熱感 | {{ rsi_overheat }} |
+
+### 📈 価格動向
+
+| 指標 | 値 |
+| --- | --- |
+| 現在価格 | {{ current_price }} |
+| 移動平均線 | {{ moving_average }} |
+
+## ✅ 今の判断まとめ
+
+| 判断項目 | 結果 |
+| --- | --- |
+| エントリー推奨 | {{ entry_recommendation }} |
+| 利確ポイント | {{ take_profit_point }} |
+| 損切りポイント | {{ stop_loss_point }} |
+
+## 🧠 今できること（戦略タスク）
+
+{% if strategy.tactical_summary %}
+<ul>
+{% for item in strategy.tactical_summary %}
+  <li>{{ item }}</li>
+{% endfor %}
+</ul>
+{% endif %}
+""")
+
+
+def _template_context(facts: IndicatorFacts) -> Dict[str, Any]:
+    strategy = estimate_strategy(facts)
+    facts_dict = facts.model_dump()
+    return {
+        "time": facts_dict.get("time", "未指定"),
+        "trend_check": facts_dict.get("trend_check", ""),
+        "bollinger_contraction": facts_dict.get("bollinger_contraction", ""),
+        "rsi_overheat": facts_dict.get("rsi_overheat", ""),
+        "current_price": facts_dict.get("current_price", ""),
+        "moving_average": facts_dict.get("moving_average", ""),
+        "entry_recommendation": strategy.get("entry_recommendation", ""),
+        "take_profit_point": strategy.get("take_profit_point", ""),
+        "stop_loss_point": strategy.get("stop_loss_point", ""),
+        "strategy": strategy,
+    }
+
+
+def render_entry_advice_markdown(facts: IndicatorFacts) -> str:
+    """従来の経路: Markdown を描画して markdown2 で HTML にする（イベントループのスレッドから呼ぶ）"""
+    raw_markdown = entry_advice_template.render(**_template_context(facts))
+    return get_service_registry().table_markdown.convert(raw_markdown)
+
+
+def render_entry_advice_html(facts: IndicatorFacts) -> str:
+    """HTML テンプレートから直接描画する（スレッドセーフ）"""
+    template = get_service_registry().templates.get_template(ENTRY_ADVICE_HTML_TEMPLATE)
+    return template.render(**_template_context(facts))
+
+
+def facts_cache_key(facts: IndicatorFacts) -> str:
+    return facts.model_dump_json()
+
+
+class EntryAdviceCache:
+    """正規化した facts → HTML の LRU（ワーカーごと）"""
+
+    def __init__(self, max_entries: int = 512):
+        self.backend = MemoryCacheBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, facts: IndicatorFacts, render: Callable[[IndicatorFacts], str]) -> str:
+        key = facts_cache_key(facts)
+        entry = self.backend.get(key, 0.0)
+        with self._lock:
+            if entry is not None:
+                self.hits += 1
+                return entry["html"]
+            self.misses += 1
+        html = render(facts)
+        self.backend.set(key, {"html": html}, math.inf, 0.0)
+        return html
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.backend),
+            "max_entries": self.backend.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[EntryAdviceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_entry_advice_cache() -> Optional[EntryAdviceCache]:
+    """プロセス共通のキャッシュ（`ENTRY_ADVICE_CACHE_SIZE=0` なら None）"""
+    global _cache
+    size = get_settings().entry_advice_cache_size
+    if size <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EntryAdviceCache(size)
+        return _cache
+
+
+def generate_entry_advice(facts: IndicatorFacts) -> str:
+    """facts からエントリーアドバイスの HTML を作る（同じ facts は LRU から返す）"""
+    cache = get_entry_advice_cache()
+    if cache is None:
+        return render_entry_advice_html(facts)
+    return cache.get_or_render(facts, render_entry_advice_html)
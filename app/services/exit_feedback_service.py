@@ -3,7 +3,6 @@ import base64
 import os
 from typing import List, Optional
 
-import openai
 from jinja2 import Environment, FileSystemLoader
 
 from app.config import MOCK_AI
@@ -12,22 +11,29 @@ from app.schemas.exit_feedback import (
     ExitFeedbackResponse,
     TradeReflectionItem,
 )
+from app.services.llm_transport import LLMTransport, get_llm_transport
 
 
 class ExitFeedbackService:
     """決済フィードバック生成サービス"""
 
-    def __init__(self, openai_api_key: str):
+    def __init__(
+        self,
+        openai_api_key: Optional[str],
+        transport: Optional[LLMTransport] = None,
+        jinja_env: Optional[Environment] = None,
+    ):
         self.openai_api_key = openai_api_key
-        # APIキー設定はMOCK時は不要
-        if not MOCK_AI and openai_api_key:
-            openai.api_key = openai_api_key
+        # 共有の非同期トランスポート（MOCK時は使わない）
+        self.transport = transport or get_llm_transport()
 
-        # Jinja2 環境
-        template_dir = os.path.join(os.path.dirname(__file__), "..", "templates")
-        self.jinja_env = Environment(loader=FileSystemLoader(template_dir))
+        # Jinja2 環境（レジストリからは共有のコンパイル済み環境を受け取る）
+        if jinja_env is None:
+            template_dir = os.path.join(os.path.dirname(__file__), "..", "templates")
+            jinja_env = Environment(loader=FileSystemLoader(template_dir))
+        self.jinja_env = jinja_env
 
-    def generate_exit_feedback(
+    async def generate_exit_feedback(
         self, request: ExitFeedbackRequest, image_data: Optional[bytes] = None
     ) -> ExitFeedbackResponse:
         """決済フィードバックを生成"""
@@ -52,7 +58,7 @@ class ExitFeedbackService:
             memo_comment = ""
 
             if image_data and (self.openai_api_key or MOCK_AI):
-                gpt_analysis = self._analyze_chart_with_gpt(request, image_data)
+                gpt_analysis = await self._analyze_chart_with_gpt(request, image_data)
                 reflection_items = self._parse_gpt_analysis(gpt_analysis, request)
                 memo_comment = self._generate_memo_comment(gpt_analysis, request)
             else:
@@ -88,7 +94,7 @@ class ExitFeedbackService:
                 error_message=str(e),
             )
 
-    def _analyze_chart_with_gpt(self, request: ExitFeedbackRequest, image_data: bytes) -> str:
+    async def _analyze_chart_with_gpt(self, request: ExitFeedbackRequest, image_data: bytes) -> str:
         """GPT を使用してチャート分析"""
         if MOCK_AI:
             position_text = "ロング（買い）" if request.position_type == "long" else "ショート（売り）"
@@ -143,7 +149,7 @@ class ExitFeedbackService:
 最後に、このトレードから学べるメモ・補足を記述してください。
 """.strip()
 
-            response = openai.chat.completions.create(
+            return await self.transport.chat_text(
                 model="gpt-4o",
                 messages=[
                     {
@@ -161,8 +167,6 @@ class ExitFeedbackService:
                 temperature=0.7,
             )
 
-            return response.choices[0].message.content
-
         except Exception as e:
             return f"GPT分析エラー: {str(e)}"
 
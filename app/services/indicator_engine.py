@@ -0,0 +1,243 @@
+"""Streaming indicator engine for the pivot v1.3 / entry v0.4 scorers.
+
+Each symbol keeps constant-size rolling state (running sums for the SMAs and
+volume MA, short histories for the 5-bars-ago lookbacks and previous-bar
+extremes), so appending a bar — or revising today's bar intraday — is O(1)
+and never touches history. Snapshots are the exact `PivotInput` / `Bar` /
+`Indicators` / context dicts the scorers consume.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+from app.services.scoring import score_pivot
+from app.services.scoring.pivot_v13 import get_price_band
+
+SMA_WINDOWS = (5, 20, 60)
+VOLUME_WINDOW = 5
+LOOKBACK_BARS = 5
+
+
+class _RollingMean:
+    """Fixed-window mean with a running sum; `replace_last` revises the newest value."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: Deque[float] = deque(maxlen=window)
+        self.total = 0.0
+        self._pushes = 0
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._pushes += 1
+        # 浮動小数の誤差が溜まらないよう、窓が一巡するたびに合計を取り直す（償却O(1)）
+        if self._pushes % self.window == 0:
+            self.total = math.fsum(self.values)
+
+    def replace_last(self, value: float) -> None:
+        self.total += value - self.values[-1]
+        self.values[-1] = value
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+
+@dataclass
+class IndicatorSnapshot:
+    """Scorer inputs for the latest bar of one symbol."""
+
+    symbol: str
+    bar: Dict[str, Any]
+    indicators: Dict[str, Any]
+    pivot_input: Dict[str, Any]
+    recent_pivot_bars_ago: Optional[int]
+    bar_count: int
+
+    def context(self, **extra: Any) -> Dict[str, Any]:
+        """entry v0.4 の `context`（recentPivotBarsAgo 付き）"""
+        return {
+            "recentPivotBarsAgo": self.recent_pivot_bars_ago,
+            "priceBand": get_price_band(self.bar["close"]),
+            **extra,
+        }
+
+
+@dataclass
+class _SymbolState:
+    closes: Dict[int, _RollingMean] = field(default_factory=lambda: {w: _RollingMean(w) for w in SMA_WINDOWS})
+    volumes: _RollingMean = field(default_factory=lambda: _RollingMean(VOLUME_WINDOW))
+    # 直近 LOOKBACK_BARS+1 本分のSMA値（先頭が5本前）
+    sma_history: Dict[int, Deque[Optional[float]]] = field(
+        default_factory=lambda: {w: deque(maxlen=LOOKBACK_BARS + 1) for w in SMA_WINDOWS}
+    )
+    # 直近3本の (high, low, close)（末尾が当日）
+    recent: Deque[Tuple[float, float, float]] = field(default_factory=lambda: deque(maxlen=3))
+    last_bar: Optional[Dict[str, Any]] = None
+    bar_count: int = 0
+    # 当日より前で最後にPivot認定された足の通し番号と、当日足のPivot判定
+    last_pivot_before: Optional[int] = None
+    current_is_pivot: bool = False
+    snapshot: Optional[IndicatorSnapshot] = None
+
+
+class IndicatorEngine:
+    """Per-symbol O(1) rolling indicators emitting scorer-ready dicts.
+
+    `update(symbol, bar)` appends a bar, or revises the latest one when `date`
+    matches it (intraday updates). When `track_pivots` is on, each bar is also
+    scored with pivot v1.3 so snapshots carry `recentPivotBarsAgo`.
+    """
+
+    def __init__(self, track_pivots: bool = True):
+        self.track_pivots = track_pivots
+        self._states: Dict[str, _SymbolState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol: str, bar: Mapping[str, Any]) -> IndicatorSnapshot:
+        normalized = _normalize_bar(bar)
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = _SymbolState()
+
+            last = state.last_bar
+            if last is not None and normalized["date"] and normalized["date"] == last["date"]:
+                self._revise(state, normalized)
+            else:
+                self._append(state, normalized)
+
+            state.snapshot = self._build_snapshot(symbol, state, normalized)
+            return state.snapshot
+
+    def extend(self, symbol: str, bars: List[Mapping[str, Any]]) -> Optional[IndicatorSnapshot]:
+        """Feed several bars in order; returns the snapshot after the last one."""
+        snapshot = None
+        for bar in bars:
+            snapshot = self.update(symbol, bar)
+        return snapshot
+
+    def snapshot(self, symbol: str) -> Optional[IndicatorSnapshot]:
+        state = self._states.get(symbol)
+        return state.snapshot if state else None
+
+    def symbols(self) -> List[str]:
+        return list(self._states)
+
+    def reset(self, symbol: Optional[str] = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop(symbol, None)
+
+    # ------------------------------------------------------------------ #
+    def _append(self, state: _SymbolState, bar: Dict[str, Any]) -> None:
+        if state.current_is_pivot:
+            state.last_pivot_before = state.bar_count - 1
+
+        for window, rolling in state.closes.items():
+            rolling.push(bar["close"])
+            state.sma_history[window].append(rolling.value)
+        state.volumes.push(bar["volume"])
+        state.recent.append((bar["high"], bar["low"], bar["close"]))
+        state.last_bar = bar
+        state.bar_count += 1
+
+    def _revise(self, state: _SymbolState, bar: Dict[str, Any]) -> None:
+        for window, rolling in state.closes.items():
+            rolling.replace_last(bar["close"])
+            state.sma_history[window][-1] = rolling.value
+        state.volumes.replace_last(bar["volume"])
+        state.recent[-1] = (bar["high"], bar["low"], bar["close"])
+        state.last_bar = bar
+
+    def _build_snapshot(self, symbol: str, state: _SymbolState, last_bar: Dict[str, Any]) -> IndicatorSnapshot:
+        bar = dict(last_bar)
+        sma = {window: state.closes[window].value for window in SMA_WINDOWS}
+        sma_5ago = {
+            window: history[0] if len(history) == LOOKBACK_BARS + 1 else None
+            for window, history in state.sma_history.items()
+        }
+        prev = state.recent[-2] if len(state.recent) >= 2 else (None, None, None)
+        prev2 = state.recent[-3] if len(state.recent) >= 3 else (None, None, None)
+        vol_ma5 = state.volumes.value
+
+        indicators = {
+            "sma5": sma[5],
+            "sma20": sma[20],
+            "sma60": sma[60],
+            "sma5_5ago": sma_5ago[5],
+            "sma20_5ago": sma_5ago[20],
+            "sma60_5ago": sma_5ago[60],
+            "volMA5": vol_ma5,
+            "prevHigh": prev[0],
+            "prevLow": prev[1],
+            "prevClose": prev[2],
+            "prev2High": prev2[0],
+            "prev2Low": prev2[1],
+        }
+        pivot_input = {
+            **bar,
+            "volMA5": vol_ma5,
+            "sma20": sma[20],
+            "sma60": sma[60],
+            "sma20_5ago": sma_5ago[20],
+            "sma60_5ago": sma_5ago[60],
+        }
+
+        if self.track_pivots:
+            state.current_is_pivot = score_pivot(pivot_input)["isPivot"]
+        current_index = state.bar_count - 1
+        if state.current_is_pivot:
+            bars_ago: Optional[int] = 0
+        elif state.last_pivot_before is not None:
+            bars_ago = current_index - state.last_pivot_before
+        else:
+            bars_ago = None
+
+        return IndicatorSnapshot(
+            symbol=symbol,
+            bar=bar,
+            indicators=indicators,
+            pivot_input=pivot_input,
+            recent_pivot_bars_ago=bars_ago,
+            bar_count=state.bar_count,
+        )
+
+
+def _normalize_bar(bar: Mapping[str, Any]) -> Dict[str, Any]:
+    try:
+        return {
+            "date": str(bar.get("date") or ""),
+            "open": float(bar["open"]),
+            "high": float(bar["high"]),
+            "low": float(bar["low"]),
+            "close": float(bar["close"]),
+            "volume": float(bar["volume"]),
+        }
+    except KeyError as exc:
+        raise ValueError(f"bar is missing {exc.args[0]!r}") from exc
+
+
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """Return the process-wide indicator engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine()
+        return _engine
@@ -1,12 +1,15 @@
+import asyncio
 import base64
 import logging
 import os
-from typing import Any, Dict, Literal, Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
 from jinja2 import Template
 
 from app.schemas.indicators import AnalysisResponse, IndicatorItem, TradingAnalysis
 from app.services.analysis_integrator import AnalysisIntegrator
+from app.services.indicator_engine import IndicatorEngine, IndicatorSnapshot, get_indicator_engine
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +17,16 @@ logger = logging.getLogger(__name__)
 class IntegratedAdviceService:
     """統合分析サービス"""
 
-    def __init__(self, openai_api_key: str):
+    def __init__(
+        self,
+        openai_api_key: Optional[str],
+        indicator_engine: Optional[IndicatorEngine] = None,
+        template: Optional[Template] = None,
+    ):
         self.integrator = AnalysisIntegrator(openai_api_key)
-        self.template = self._load_template()
+        # レジストリからはコンパイル済みのテンプレートを受け取る
+        self.template = template or self._load_template()
+        self.indicator_engine = indicator_engine or get_indicator_engine()
 
     def _load_template(self) -> Template:
         """テンプレートを読み込み"""
@@ -52,13 +62,18 @@ class IntegratedAdviceService:
             # 1. 画像をBase64エンコード
             image_base64 = base64.b64encode(image_data).decode("utf-8")
 
-            # 2. サンプルバーデータを作成（実際の実装では画像から抽出するか外部から取得）
-            bar_data = self._create_sample_bar_data()
-            indicators_data = self._create_sample_indicators_data()
-            context = self._create_analysis_context(entry_price, position_type)
+            # 2. インジケーターエンジンに銘柄の足があればそれを使い、無ければサンプルバーで代用
+            snapshot = self._find_snapshot(symbol_context)
+            if snapshot is not None:
+                bar_data = snapshot.pivot_input
+                indicators_data = snapshot.indicators
+            else:
+                bar_data = self._create_sample_bar_data()
+                indicators_data = self._create_sample_indicators_data()
+            context = self._create_analysis_context(entry_price, position_type, snapshot)
 
-            # 3. 統合分析実行
-            analysis = self.integrator.integrate_analysis(
+            # 3. 統合分析実行（pivot / entry / GPT は並行）
+            analysis = await self.integrator.integrate_analysis(
                 bar_data=bar_data,
                 indicators_data=indicators_data,
                 context=context,
@@ -115,14 +130,30 @@ class IntegratedAdviceService:
             "prevClose": 1020,
         }
 
+    def _find_snapshot(self, symbol_context: Optional[str]) -> Optional[IndicatorSnapshot]:
+        """symbol_context（"7203" / "7203 トヨタ" など）に対応するエンジンのスナップショット"""
+        if not symbol_context:
+            return None
+        key = symbol_context.strip()
+        snapshot = self.indicator_engine.snapshot(key)
+        if snapshot is None and key:
+            snapshot = self.indicator_engine.snapshot(key.split()[0])
+        return snapshot
+
     def _create_analysis_context(
-        self, entry_price: Optional[float], position_type: Optional[Literal["long", "short"]]
+        self,
+        entry_price: Optional[float],
+        position_type: Optional[Literal["long", "short"]],
+        snapshot: Optional[IndicatorSnapshot] = None,
     ) -> Dict[str, Any]:
         """分析コンテキスト作成"""
-        context = {
-            "recentPivotBarsAgo": 2,  # サンプル値
-            "priceBand": "mid",
-        }
+        if snapshot is not None:
+            context = snapshot.context()
+        else:
+            context = {
+                "recentPivotBarsAgo": 2,  # サンプル値
+                "priceBand": "mid",
+            }
 
         if entry_price:
             context["entry_price"] = entry_price
@@ -166,19 +197,93 @@ class IntegratedAdviceService:
         )
 
 
-# 従来のシンプルなアドバイス生成（後方互換性のため）
-def generate_simple_advice(image_base64: str, symbol_context: str = None, analysis_context: str = None) -> str:
-    """シンプルなGPT分析（統合分析を使わない場合）"""
+@dataclass
+class BatchItem:
+    """バッチ統合分析の1件（画像なしの場合は銘柄の足だけで判定する）"""
+
+    symbol_context: Optional[str] = None
+    image_data: bytes = b""
+    filename: Optional[str] = None
+
+
+async def generate_batch_advice(
+    service: IntegratedAdviceService,
+    items: List[BatchItem],
+    concurrency: int,
+    analysis_context: Optional[str] = None,
+    position_type: Optional[Literal["long", "short"]] = None,
+) -> AsyncIterator[Tuple[int, AnalysisResponse]]:
+    """items を最大 concurrency 件ずつ並行に分析し、終わった順に (index, 結果) を返す
+
+    途中で打ち切られた（クライアント切断など）場合は残りのタスクをキャンセルする。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: BatchItem) -> Tuple[int, AnalysisResponse]:
+        async with semaphore:
+            result = await service.generate_integrated_advice(
+                image_data=item.image_data,
+                filename=item.filename or "",
+                symbol_context=item.symbol_context,
+                analysis_context=analysis_context,
+                position_type=position_type,
+            )
+        return index, result
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    _system_prompt = (
+
+# 従来のシンプルなアドバイス生成（後方互換性のため）
+def _simple_advice_prompts(
+    symbol_context: Optional[str] = None, analysis_context: Optional[str] = None
+) -> tuple[str, str]:
+    system_prompt = (
         "あなたはプロの株式スイングトレーダー兼アナリストです。"
         "チャート画像を解析し、トレーディングアドバイスを日本語で提供してください。"
     )
-
-    _user_prompt = (
+    user_prompt = (
         f"この{symbol_context or '株価'}のチャート画像を解析し、"
         f"{analysis_context or 'トレーディング'}のアドバイスを教えてください。"
     )
+    return system_prompt, user_prompt
+
+
+def generate_simple_advice(
+    image_base64: str, symbol_context: Optional[str] = None, analysis_context: Optional[str] = None
+) -> str:
+    """シンプルなGPT分析（統合分析を使わない場合）"""
+
+    _system_prompt, _user_prompt = _simple_advice_prompts(symbol_context, analysis_context)
 
     # 簡易版のGPT呼び出し（実装は省略）
     return f"📊 **{symbol_context or 'チャート'}分析**\n\n簡易分析モードで実行されました。"
+
+
+def simple_advice_payload(
+    image_base64: str,
+    symbol_context: Optional[str] = None,
+    analysis_context: Optional[str] = None,
+    model: str = "gpt-4o-mini",
+) -> Dict[str, Any]:
+    """クイック分析をストリーミングで実行する際の Chat Completions リクエスト"""
+    system_prompt, user_prompt = _simple_advice_prompts(symbol_context, analysis_context)
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": user_prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
+                ],
+            },
+        ],
+        "max_tokens": 500,
+    }
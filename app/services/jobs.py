@@ -0,0 +1,439 @@
+"""DB に載せるバックグラウンドジョブ（画像解析・決済フィードバック）
+
+外部ブローカーは使わず、既存の DB（analysis_jobs）をキューにする。
+
+- submit_job(): queued で INSERT して job_id を返す
+- JobWorkerPool: プロセス内の asyncio ワーカー。queued のジョブを lane（interactive → batch）、
+  run_after の順に取り出して登録済みのハンドラで実行し、結果を保存する
+  - JOB_INTERACTIVE_WORKERS 本は interactive 専用なので、batch が溜まっても対話的なジョブは待たされない
+  - user_id ごとの実行中ジョブは JOB_PER_USER_LIMIT 件まで（複数プロセスが同時に取り出すと一時的に超えうる）
+  - 一時的な失敗（TransientJobError / タイムアウト / 再試行可能な LLMTransportError）は
+    指数バックオフで max_attempts まで再実行する
+  - 取り出しは SELECT ... FOR UPDATE SKIP LOCKED と条件付き UPDATE なので、
+    複数ワーカープロセスでも同じジョブを二重に実行しない
+  - JOB_MAINTENANCE_INTERVAL ごとに、落ちたプロセスが running のまま残したジョブを回収し
+    （試行回数が残っていれば queued に戻す）、JOB_RETENTION を過ぎた終了済みジョブを削除する
+- wait_for_job(): ロングポーリング。同じプロセスで完了したジョブは即座に返し、
+  他プロセスのジョブは JOB_POLL_INTERVAL ごとに読み直す
+
+ハンドラは `@job_handler("kind")` で登録する（payload, 入力バイト列）→ 結果 dict の async 関数。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from uuid import UUID
+
+import httpx
+from sqlalchemy import case, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.models import AnalysisJob
+from app.services.llm_transport import RETRY_STATUS, LLMTransportError
+
+logger = logging.getLogger(__name__)
+
+LANES = ("interactive", "batch")
+TERMINAL_STATUSES = frozenset({"succeeded", "failed"})
+
+JobHandler = Callable[[Dict[str, Any], Optional[bytes]], Awaitable[Dict[str, Any]]]
+_handlers: Dict[str, JobHandler] = {}
+
+
+class TransientJobError(RuntimeError):
+    """再試行すれば成功しうる失敗（ハンドラが明示的に投げる）"""
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+
+    return register
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (TransientJobError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, LLMTransportError):
+        return error.status_code is None or error.status_code in RETRY_STATUS
+    return False
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def submit_job(
+    db: AsyncSession,
+    kind: str,
+    payload: Dict[str, Any],
+    input_data: Optional[bytes] = None,
+    lane: str = "interactive",
+    user_id: Optional[UUID] = None,
+    max_attempts: Optional[int] = None,
+) -> AnalysisJob:
+    """ジョブを queued で登録してコミットし、このプロセスのワーカーを起こす"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane}")
+    now = _now()
+    job = AnalysisJob(
+        kind=kind,
+        lane=lane,
+        user_id=user_id,
+        status="queued",
+        payload=payload,
+        input_data=input_data,
+        attempts=0,
+        max_attempts=max_attempts or get_settings().job_max_attempts,
+        run_after=now,
+        created_at=now,
+    )
+    db.add(job)
+    await db.commit()
+    pool = get_job_pool()
+    if pool is not None:
+        pool.notify()
+    return job
+
+
+@dataclass
+class ClaimedJob:
+    job_id: UUID
+    kind: str
+    payload: Dict[str, Any]
+    input_data: Optional[bytes]
+    attempts: int
+    max_attempts: int
+
+
+async def claim_job(
+    db: AsyncSession, worker_id: str, lanes: Sequence[str], per_user_limit: int
+) -> Optional[ClaimedJob]:
+    """実行できる queued ジョブを1件 running にして返す（なければ None）"""
+    now = _now()
+    busy_users = (
+        select(AnalysisJob.user_id)
+        .where(AnalysisJob.status == "running", AnalysisJob.user_id.is_not(None))
+        .group_by(AnalysisJob.user_id)
+        .having(func.count() >= per_user_limit)
+    )
+    candidate = (
+        select(AnalysisJob.job_id)
+        .where(
+            AnalysisJob.status == "queued",
+            AnalysisJob.run_after <= now,
+            AnalysisJob.lane.in_(lanes),
+            or_(AnalysisJob.user_id.is_(None), AnalysisJob.user_id.not_in(busy_users)),
+        )
+        .order_by(case((AnalysisJob.lane == "interactive", 0), else_=1), AnalysisJob.run_after, AnalysisJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = (await db.execute(candidate)).scalar_one_or_none()
+    if job_id is None:
+        await db.rollback()
+        return None
+    claimed = (
+        await db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.job_id == job_id, AnalysisJob.status == "queued")
+            .values(status="running", worker_id=worker_id, started_at=now, attempts=AnalysisJob.attempts + 1)
+            .returning(
+                AnalysisJob.job_id,
+                AnalysisJob.kind,
+                AnalysisJob.payload,
+                AnalysisJob.input_data,
+                AnalysisJob.attempts,
+                AnalysisJob.max_attempts,
+            )
+        )
+    ).first()
+    await db.commit()
+    return ClaimedJob(*claimed) if claimed is not None else None
+
+
+class JobWorkerPool:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        workers: int = 4,
+        interactive_workers: int = 1,
+        per_user_limit: int = 2,
+        retry_backoff: float = 5.0,
+        job_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        retention: float = 7 * 86400.0,
+        maintenance_interval: float = 60.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self.workers = workers
+        self.interactive_workers = min(interactive_workers, workers)
+        self.per_user_limit = per_user_limit
+        self.retry_backoff = retry_backoff
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.maintenance_interval = maintenance_interval
+        self.worker_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._waiters: Dict[UUID, List[asyncio.Event]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self.recover_stale()
+        for n in range(self.workers):
+            lanes = ("interactive",) if n < self.interactive_workers else LANES
+            self._tasks.append(asyncio.create_task(self._work(f"{self.worker_prefix}-{n}", lanes)))
+        self._maintenance = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        if self._maintenance is not None:
+            tasks.append(self._maintenance)
+            self._maintenance = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def recover_stale(self) -> int:
+        """タイムアウトを大きく超えて running のまま（落ちたプロセスが持っていた）ジョブを回収する
+
+        試行回数が残っていれば queued に戻し、使い切っていれば failed にする。
+        回収するまでは per_user_limit の枠も埋めたままになるので、起動時だけでなく定期的に呼ぶ。
+        """
+        now = _now()
+        cutoff = now - timedelta(seconds=self.job_timeout * 2)
+        stale = (AnalysisJob.status == "running", AnalysisJob.started_at < cutoff)
+        async with self._session_factory() as session:
+            failed = await session.execute(
+                update(AnalysisJob)
+                .where(*stale, AnalysisJob.attempts >= AnalysisJob.max_attempts)
+                .values(
+                    status="failed",
+                    worker_id=None,
+                    error="Worker stopped while running the job",
+                    input_data=None,
+                    finished_at=now,
+                )
+            )
+            requeued = await session.execute(update(AnalysisJob).where(*stale).values(status="queued", worker_id=None))
+            await session.commit()
+        if failed.rowcount or requeued.rowcount:
+            logger.warning(f"Recovered stale analysis jobs: {requeued.rowcount} requeued, {failed.rowcount} failed")
+            self.notify()
+        return failed.rowcount + requeued.rowcount
+
+    async def purge_finished(self) -> int:
+        """終了から retention 秒を過ぎたジョブを削除する（retention <= 0 なら残す）"""
+        if self.retention <= 0:
+            return 0
+        cutoff = _now() - timedelta(seconds=self.retention)
+        async with self._session_factory() as session:
+            result = await session.execute(
+                delete(AnalysisJob).where(AnalysisJob.status.in_(TERMINAL_STATUSES), AnalysisJob.finished_at < cutoff)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} finished analysis jobs")
+        return result.rowcount
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                await self.recover_stale()
+                await self.purge_finished()
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {e}")
+
+    async def _work(self, worker_id: str, lanes: Sequence[str]) -> None:
+        while True:
+            try:
+                async with self._session_factory() as session:
+                    job = await claim_job(session, worker_id, lanes, self.per_user_limit)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._run(worker_id, job)
+
+    async def _run(self, worker_id: str, job: ClaimedJob) -> None:
+        self.running += 1
+        try:
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                raise ValueError(f"No handler for job kind {job.kind}")
+            result = await asyncio.wait_for(handler(job.payload, job.input_data), self.job_timeout)
+        except asyncio.CancelledError:
+            # シャットダウン: 別のワーカー（再起動後を含む）がやり直せるよう queued に戻す
+            await asyncio.shield(self._finish(worker_id, job.job_id, status="queued", worker_id=None))
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts and is_transient(e):
+                self.retried += 1
+                delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                logger.warning(
+                    f"Job {job.job_id} ({job.kind}) attempt {job.attempts} failed, retry in {delay}s: {error}"
+                )
+                await self._finish(
+                    worker_id,
+                    job.job_id,
+                    status="queued",
+                    worker_id=None,
+                    error=error,
+                    run_after=_now() + timedelta(seconds=delay),
+                )
+            else:
+                self.failed += 1
+                logger.error(f"Job {job.job_id} ({job.kind}) failed: {error}")
+                await self._finish(
+                    worker_id, job.job_id, status="failed", error=error, input_data=None, finished_at=_now()
+                )
+                self._done(job.job_id)
+        else:
+            self.completed += 1
+            await self._finish(
+                worker_id, job.job_id, status="succeeded", result=result, input_data=None, finished_at=_now()
+            )
+            self._done(job.job_id)
+        finally:
+            self.running -= 1
+
+    async def _finish(self, owner: str, job_id: UUID, **values: Any) -> None:
+        # まだ owner が持っている場合だけ書く（stale として回収され、別のワーカーが実行中のこともある）
+        try:
+            async with self._session_factory() as session:
+                await session.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.job_id == job_id, AnalysisJob.worker_id == owner)
+                    .values(**values)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record job {job_id} as {values.get('status')}: {e}")
+
+    def _done(self, job_id: UUID) -> None:
+        for event in self._waiters.pop(job_id, []):
+            event.set()
+
+    def completion_event(self, job_id: UUID) -> asyncio.Event:
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, []).append(event)
+        return event
+
+    def discard_event(self, job_id: UUID, event: asyncio.Event) -> None:
+        waiters = self._waiters.get(job_id)
+        if waiters and event in waiters:
+            waiters.remove(event)
+            if not waiters:
+                del self._waiters[job_id]
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self._session_factory() as session:
+            rows = await session.execute(
+                select(AnalysisJob.lane, AnalysisJob.status, func.count()).group_by(
+                    AnalysisJob.lane, AnalysisJob.status
+                )
+            )
+            queue = {f"{lane}.{status}": count for lane, status, count in rows}
+        return {
+            "workers": len(self._tasks),
+            "interactive_workers": self.interactive_workers,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "queue": queue,
+        }
+
+
+async def wait_for_job(
+    session_factory: Callable[[], AsyncSession],
+    job_id: UUID,
+    timeout: float,
+    pool: Optional[JobWorkerPool] = None,
+    poll_interval: float = 1.0,
+) -> Optional[AnalysisJob]:
+    """ジョブが終わるか timeout 秒経つまで待って、その時点の行を返す（ないジョブは None）
+
+    このプロセスのワーカーが完了させたジョブは完了通知ですぐに返し、
+    他プロセスで実行中のジョブは poll_interval ごとに読み直す。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        async with session_factory() as session:
+            job = await session.get(AnalysisJob, job_id)
+        remaining = deadline - loop.time()
+        if job is None or job.status in TERMINAL_STATUSES or remaining <= 0:
+            return job
+        if pool is None:
+            await asyncio.sleep(min(remaining, poll_interval))
+            continue
+        event = pool.completion_event(job_id)
+        try:
+            await asyncio.wait_for(event.wait(), min(remaining, poll_interval))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            pool.discard_event(job_id, event)
+
+
+_pool: Optional[JobWorkerPool] = None
+
+
+def get_job_pool() -> Optional[JobWorkerPool]:
+    """プロセス共通のワーカープール（`JOB_WORKERS=0` なら None: このプロセスは登録だけ行う）"""
+    global _pool
+    settings = get_settings()
+    if settings.job_workers <= 0:
+        return None
+    if _pool is None:
+        from app.database import async_session_factory
+
+        _pool = JobWorkerPool(
+            async_session_factory,
+            workers=settings.job_workers,
+            interactive_workers=settings.job_interactive_workers,
+            per_user_limit=settings.job_per_user_limit,
+            retry_backoff=settings.job_retry_backoff,
+            job_timeout=settings.job_timeout,
+            poll_interval=settings.job_poll_interval,
+            retention=settings.job_retention,
+            maintenance_interval=settings.job_maintenance_interval,
+        )
+    return _pool
+
+
+async def shutdown_job_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.stop()
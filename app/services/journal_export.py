@@ -0,0 +1,138 @@
+"""/journal/export: trade_journal を CSV / Parquet でストリーミング出力する
+
+サーバーサイドカーソル（AsyncSession.stream + yield_per）で EXPORT_BATCH_SIZE 行ずつ読み、
+バッチごとにエンコードして送る。履歴が何万行あってもメモリに載るのは1バッチ分だけ。
+
+- CSV: UTF-8（BOM 付きなので Excel でもそのまま開ける）。配列列は JSON 文字列
+- Parquet: pyarrow（任意依存、`pip install .[export]`）が必要。1バッチ = 1 row group で、
+  フッターは最後に書かれる
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.journal_query import ENTRY_COLUMNS
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = [column.key for column in ENTRY_COLUMNS]
+
+_LIST_FIELDS = {"feedback_next_actions", "analysis_labels"}
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+async def _partitions(
+    session_factory: Callable[[], AsyncSession], query: Select, batch_size: Optional[int]
+) -> AsyncIterator[Sequence[Any]]:
+    # レスポンス本体の送信中に読むので、リクエストのセッションではなく専用セッションを使う
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size or EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+
+def _csv_value(name: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if name in _LIST_FIELDS:
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_csv(
+    session_factory: Callable[[], AsyncSession], query: Select, batch_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for rows in _partitions(session_factory, query, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(name, value) for name, value in zip(EXPORT_FIELDS, row)] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """ParquetWriter の出力先。書かれたバイト列を溜め、drain() で取り出して送る"""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(pa):
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "trade_id": pa.string(),
+        "avg_entry": pa.float64(),
+        "avg_exit": pa.float64(),
+        "qty": pa.int64(),
+        "pnl_abs": pa.float64(),
+        "pnl_pct": pa.float64(),
+        "hold_minutes": pa.int64(),
+        "analysis_score": pa.int64(),
+        "closed_at": timestamp,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+        "feedback_next_actions": pa.list_(pa.string()),
+        "analysis_labels": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in EXPORT_FIELDS])
+
+
+async def stream_parquet(
+    session_factory: Callable[[], AsyncSession], query: Select, batch_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in _partitions(session_factory, query, batch_size):
+            columns: List[Sequence[Any]] = list(zip(*rows))
+            # 先頭は trade_id（UUID）
+            columns[0] = [str(trade_id) for trade_id in columns[0]]
+            arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,81 @@
+"""trade_journal の絞り込み条件（一覧とエクスポートで共通）
+
+条件ごとに使うインデックス:
+- user_id (+ closed_at 範囲) → ix_trade_journal_user_id_closed_at
+- 銘柄コード（4桁、TSE の英字入りコードを含む）→ 前方一致 LIKE 'code%'
+  → ix_trade_journal_symbol_closed_at（PostgreSQL では text_pattern_ops なのでロケールに依らず使える）
+- それ以外の銘柄検索 → 部分一致 ILIKE '%...%' → ix_trade_journal_symbol_trgm（pg_trgm の GIN）
+- closed_at 範囲のみ → ix_trade_journal_closed_at_journal_id
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import literal
+
+from app.models import TradeJournal
+
+# JournalEntryResponse のフィールド名で選ぶ列（行タプルをそのまま検証・直列化できる）
+ENTRY_COLUMNS = (
+    TradeJournal.trade_uuid.label("trade_id"),
+    TradeJournal.chat_id,
+    TradeJournal.symbol,
+    TradeJournal.side,
+    TradeJournal.avg_entry,
+    TradeJournal.avg_exit,
+    TradeJournal.qty,
+    TradeJournal.pnl_abs,
+    TradeJournal.pnl_pct,
+    TradeJournal.hold_minutes,
+    TradeJournal.closed_at,
+    TradeJournal.feedback_text,
+    TradeJournal.feedback_tone,
+    TradeJournal.feedback_next_actions,
+    TradeJournal.feedback_message_id,
+    TradeJournal.analysis_score,
+    TradeJournal.analysis_labels,
+    TradeJournal.created_at,
+    TradeJournal.updated_at,
+)
+
+SECURITY_CODE = re.compile(r"\d[0-9A-Z]\d[0-9A-Z]")
+_LIKE_SPECIALS = re.compile(r"([\\%_])")
+
+
+def symbol_filter(symbol: str):
+    term = symbol.strip()
+    code = term.upper()
+    if SECURITY_CODE.fullmatch(code):
+        # パターンはバインドせず SQL に埋め込む。プリペアド文のパラメータのままだと、キャッシュ後の
+        # 汎用プランでは前方一致と判定できず text_pattern_ops のインデックスが使われない。
+        # code は SECURITY_CODE に一致する英数字だけなので埋め込んでも安全
+        return TradeJournal.symbol.like(literal(f"{code}%", literal_execute=True))
+    escaped = _LIKE_SPECIALS.sub(r"\\\1", term)
+    return TradeJournal.symbol.ilike(f"%{escaped}%", escape="\\")
+
+
+def journal_filters(
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    symbol: Optional[str] = None,
+    pnl: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+) -> List:
+    filters = []
+    if user_id:
+        filters.append(TradeJournal.user_id == user_id)
+    if from_date:
+        filters.append(TradeJournal.closed_at >= from_date)
+    if to_date:
+        filters.append(TradeJournal.closed_at <= to_date)
+    if symbol and symbol.strip():
+        filters.append(symbol_filter(symbol))
+    if pnl == "win":
+        filters.append(TradeJournal.pnl_abs > 0)
+    elif pnl == "lose":
+        filters.append(TradeJournal.pnl_abs <= 0)
+    return filters
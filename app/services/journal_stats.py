@@ -0,0 +1,297 @@
+"""トレードジャーナルの集計ロールアップ（/journal/stats）
+
+close_trade と同じトランザクションで journal_rollups を差分更新する。1件のクローズは
+ユーザーごとに total / symbol / side / day / week / month の6バケットへの加算で、
+1回の INSERT ... ON CONFLICT DO UPDATE にまとめる。統計の読み出しはトレード件数に
+関係なくバケット数に比例する。
+
+最大ドローダウンは累積損益（closed_at 順に積んだ pnl_abs）のピークからの最大下落幅。
+closed_at 順に追加される限り列の値だけで更新できる。過去日付のクローズや既存トレードの
+修正で順序が崩れたバケットだけ、そのバケットのトレードを読み直して再計算する。
+日付バケットは UTC（週は月曜始まり）で、キーは期間の開始日。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import RowMapping, and_, case, delete, false, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import dialect_insert, greatest
+from app.models import JournalRollup, TradeJournal
+
+DIMENSIONS = ("total", "symbol", "side", "day", "week", "month")
+TIME_DIMENSIONS = ("day", "week", "month")
+
+_SUM_COLUMNS = ("trades", "wins", "pnl_abs_sum", "pnl_pct_sum", "hold_minutes_sum")
+FACT_FIELDS = ("user_id", "symbol", "side", "pnl_abs", "pnl_pct", "hold_minutes", "closed_at")
+
+BucketKey = Tuple[str, str, str]
+Facts = Union[Mapping[str, Any], RowMapping]  # journal_facts() の dict か集計クエリの Row._mapping
+CloseChange = Tuple[Optional[Mapping[str, Any]], Mapping[str, Any]]  # (更新前, 更新後) の journal_facts
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def scope_of(user_id: Optional[UUID]) -> str:
+    return str(user_id) if user_id else ""
+
+
+def period_start(dimension: str, at: datetime | date) -> date:
+    day = _aware(at).date() if isinstance(at, datetime) else at
+    if dimension == "week":
+        return day - timedelta(days=day.weekday())
+    if dimension == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _period_end(dimension: str, start: date) -> date:
+    if dimension == "week":
+        return start + timedelta(days=7)
+    if dimension == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def journal_facts(entry: Any) -> Dict[str, Any]:
+    """集計に使う TradeJournal の値（更新前の値の退避にも使う）"""
+    facts = {name: getattr(entry, name) for name in FACT_FIELDS}
+    facts["closed_at"] = _aware(facts["closed_at"])
+    return facts
+
+
+def bucket_keys(facts: Facts) -> List[BucketKey]:
+    scope = scope_of(facts["user_id"])
+    keys = [(scope, "total", ""), (scope, "symbol", facts["symbol"]), (scope, "side", facts["side"])]
+    keys += [(scope, dim, period_start(dim, facts["closed_at"]).isoformat()) for dim in TIME_DIMENSIONS]
+    return keys
+
+
+@dataclass
+class _Bucket:
+    trades: int = 0
+    wins: int = 0
+    pnl_abs_sum: float = 0.0
+    pnl_pct_sum: float = 0.0
+    hold_minutes_sum: int = 0
+    peak_pnl: float = 0.0
+    max_drawdown: float = 0.0
+    last_closed_at: Optional[datetime] = None
+
+    def add(self, facts: Facts, sign: int = 1) -> None:
+        """closed_at 順に呼べばドローダウンまで正しく畳み込める（sign=-1 は取り消し用の差分）"""
+        self.trades += sign
+        self.wins += sign if facts["pnl_abs"] > 0 else 0
+        self.pnl_abs_sum += sign * facts["pnl_abs"]
+        self.pnl_pct_sum += sign * facts["pnl_pct"]
+        self.hold_minutes_sum += sign * facts["hold_minutes"]
+        if sign > 0:
+            self.peak_pnl = max(self.peak_pnl, self.pnl_abs_sum)
+            self.max_drawdown = max(self.max_drawdown, self.peak_pnl - self.pnl_abs_sum)
+        closed_at = _aware(facts["closed_at"])
+        self.last_closed_at = closed_at if self.last_closed_at is None else max(self.last_closed_at, closed_at)
+
+
+def _bucket_filter(key: BucketKey) -> list:
+    scope, dimension, bucket = key
+    conditions = [TradeJournal.user_id == UUID(scope) if scope else TradeJournal.user_id.is_(None)]
+    if dimension == "symbol":
+        conditions.append(TradeJournal.symbol == bucket)
+    elif dimension == "side":
+        conditions.append(TradeJournal.side == bucket)
+    elif dimension in TIME_DIMENSIONS:
+        start = date.fromisoformat(bucket)
+        conditions.append(TradeJournal.closed_at >= datetime.combine(start, time(), timezone.utc))
+        conditions.append(
+            TradeJournal.closed_at < datetime.combine(_period_end(dimension, start), time(), timezone.utc)
+        )
+    return conditions
+
+
+_FOLD_COLUMNS = (
+    TradeJournal.pnl_abs,
+    TradeJournal.pnl_pct,
+    TradeJournal.hold_minutes,
+    TradeJournal.closed_at,
+)
+
+
+async def _recompute(db: AsyncSession, key: BucketKey) -> None:
+    """バケットのトレードを closed_at 順に畳み直す（空になったバケットは削除）"""
+    stmt = select(*_FOLD_COLUMNS).where(*_bucket_filter(key)).order_by(TradeJournal.closed_at, TradeJournal.journal_id)
+    totals = _Bucket()
+    for row in await db.execute(stmt):
+        totals.add(row._mapping)
+
+    scope, dimension, bucket = key
+    where = (JournalRollup.scope == scope, JournalRollup.dimension == dimension, JournalRollup.bucket == bucket)
+    if totals.trades == 0:
+        await db.execute(delete(JournalRollup).where(*where))
+    else:
+        await db.execute(update(JournalRollup).where(*where).values(**asdict(totals)))
+
+
+async def apply_closes(
+    db: AsyncSession, changes: Sequence[Tuple[Optional[Mapping[str, Any]], Mapping[str, Any]]]
+) -> None:
+    """クローズをロールアップに反映する。changes は (更新前の journal_facts または None, 更新後) の並び。
+
+    ジャーナル行の書き込み（flush）後、同じトランザクション内で呼ぶこと。closed_at 順に
+    反映するので、時系列どおりのバッチならドローダウンも差分だけで進む。
+    """
+    # 読み直したバケットはバッチ内の全行を含むので、以降の差分は足さない
+    settled: Set[BucketKey] = set()
+    for previous, current in sorted(changes, key=lambda change: change[1]["closed_at"]):
+        await _apply(db, previous, current, settled)
+
+
+async def _apply(
+    db: AsyncSession, previous: Optional[Mapping[str, Any]], current: Mapping[str, Any], settled: Set[BucketKey]
+) -> None:
+    if previous is not None and dict(previous) == dict(current):
+        return  # 同じ内容の再送（冪等リトライ）
+
+    deltas: Dict[BucketKey, _Bucket] = {}
+    if previous is not None:
+        for key in bucket_keys(previous):
+            deltas.setdefault(key, _Bucket()).add(previous, sign=-1)
+    for key in bucket_keys(current):
+        deltas.setdefault(key, _Bucket()).add(current)
+    for key in settled.intersection(deltas):
+        del deltas[key]
+    if not deltas:
+        return
+
+    dialect = db.bind.dialect.name
+    stmt = dialect_insert(dialect, JournalRollup).values(
+        [
+            {"scope": scope, "dimension": dim, "bucket": bucket, **asdict(delta)}
+            for (scope, dim, bucket), delta in deltas.items()
+        ]
+    )
+    table = JournalRollup.__table__.c
+    excluded = stmt.excluded
+    cumulative = table.pnl_abs_sum + excluded.pnl_abs_sum
+    peak = greatest(dialect, table.peak_pnl, cumulative)
+    # 1件の追加で、かつバケット内の最新なら列の値だけでピークとドローダウンを進められる
+    in_order = and_(excluded.trades == 1, excluded.last_closed_at >= table.last_closed_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["scope", "dimension", "bucket"],
+        set_={
+            **{name: table[name] + excluded[name] for name in _SUM_COLUMNS},
+            "peak_pnl": case((in_order, peak), else_=table.peak_pnl),
+            "max_drawdown": case(
+                (in_order, greatest(dialect, table.max_drawdown, peak - cumulative)), else_=table.max_drawdown
+            ),
+            "last_closed_at": greatest(dialect, table.last_closed_at, excluded.last_closed_at),
+        },
+    ).returning(table.scope, table.dimension, table.bucket, table.last_closed_at)
+
+    for row in (await db.execute(stmt)).all():
+        key = (row.scope, row.dimension, row.bucket)
+        delta = deltas[key]
+        # 取り消しを含む差分や、既存の最新より古いクローズは順序が崩れるので読み直す
+        if delta.trades != 1 or delta.last_closed_at is None or _aware(row.last_closed_at) > delta.last_closed_at:
+            await _recompute(db, key)
+            settled.add(key)
+
+
+async def rebuild_rollups(db: AsyncSession, user_ids: Optional[Iterable[Optional[UUID]]] = None) -> int:
+    """trade_journal からロールアップを作り直す（user_ids 省略時は全ユーザー）。作成したバケット数を返す。"""
+    delete_stmt = delete(JournalRollup)
+    select_stmt = select(TradeJournal.user_id, TradeJournal.symbol, TradeJournal.side, *_FOLD_COLUMNS)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        delete_stmt = delete_stmt.where(JournalRollup.scope.in_([scope_of(user_id) for user_id in user_ids]))
+        select_stmt = select_stmt.where(
+            or_(
+                TradeJournal.user_id.in_([user_id for user_id in user_ids if user_id]),
+                TradeJournal.user_id.is_(None) if None in user_ids else false(),
+            )
+        )
+    await db.execute(delete_stmt)
+
+    buckets: Dict[BucketKey, _Bucket] = {}
+    result = await db.stream(
+        select_stmt.order_by(TradeJournal.closed_at, TradeJournal.journal_id).execution_options(yield_per=1000)
+    )
+    async for row in result:
+        facts = row._mapping
+        for key in bucket_keys(facts):
+            buckets.setdefault(key, _Bucket()).add(facts)
+
+    if buckets:
+        rows = [{"scope": s, "dimension": d, "bucket": b, **asdict(totals)} for (s, d, b), totals in buckets.items()]
+        await db.execute(dialect_insert(db.bind.dialect.name, JournalRollup), rows)
+    return len(buckets)
+
+
+def _summary(bucket: str, trades: int, wins: int, pnl_abs_sum, pnl_pct_sum, hold_minutes_sum, max_drawdown):
+    return {
+        "key": bucket,
+        "trades": trades,
+        "wins": wins,
+        "win_rate": wins / trades,
+        "pnl_abs_sum": pnl_abs_sum,
+        "pnl_abs_avg": pnl_abs_sum / trades,
+        "pnl_pct_sum": pnl_pct_sum,
+        "pnl_pct_avg": pnl_pct_sum / trades,
+        "hold_minutes_avg": hold_minutes_sum / trades,
+        "max_drawdown": max_drawdown,
+    }
+
+
+async def load_stats(
+    db: AsyncSession,
+    dimension: str,
+    user_id: Optional[UUID] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """バケットごとの集計を bucket 昇順で返す。
+
+    user_id 省略時は全ユーザーのバケットを合算する（ドローダウンはユーザー単位でしか
+    意味を持たないので None）。since / until は day / week / month のときだけ使う。
+    """
+    conditions = [JournalRollup.dimension == dimension, JournalRollup.trades > 0]
+    if dimension in TIME_DIMENSIONS:
+        if since is not None:
+            conditions.append(JournalRollup.bucket >= period_start(dimension, since).isoformat())
+        if until is not None:
+            conditions.append(JournalRollup.bucket <= until.isoformat())
+
+    if user_id is not None:
+        stmt = select(
+            JournalRollup.bucket,
+            *(getattr(JournalRollup, name) for name in _SUM_COLUMNS),
+            JournalRollup.max_drawdown,
+        ).where(JournalRollup.scope == scope_of(user_id), *conditions)
+    else:
+        stmt = (
+            select(
+                JournalRollup.bucket,
+                *(func.sum(getattr(JournalRollup, name)).label(name) for name in _SUM_COLUMNS),
+            )
+            .where(*conditions)
+            .group_by(JournalRollup.bucket)
+        )
+    rows = await db.execute(stmt.order_by(JournalRollup.bucket))
+    return [
+        _summary(
+            row.bucket,
+            row.trades,
+            row.wins,
+            row.pnl_abs_sum,
+            row.pnl_pct_sum,
+            row.hold_minutes_sum,
+            row.max_drawdown if user_id is not None else None,
+        )
+        for row in rows
+    ]
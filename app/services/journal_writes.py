@@ -0,0 +1,105 @@
+"""Native upserts for trade closes (`/journal/close`).
+
+A close, or a whole batch of closes, is written with one
+`INSERT ... ON CONFLICT (trade_uuid) DO UPDATE` statement. On conflict:
+
+- the trade metrics and `closed_at` are overwritten;
+- feedback / analysis columns are COALESCEd, so a close without them keeps
+  the stored values;
+- user / chat / symbol / side stay as first recorded.
+
+The /journal/stats rollups need each trade's previous values. The existing
+rows are therefore read with `FOR UPDATE` first, in one statement for the
+whole batch. That row lock also serializes concurrent re-closes of the same
+trade.
+
+Two first closes of the same trade can race past the lock, because there is no
+row to lock yet. The loser's insert then turns into an update of the winner's
+row. PostgreSQL reports this through `xmax`. Because the overwritten values are
+gone, that user's rollups are rebuilt from the journal.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import dialect_insert
+from app.models import TradeJournal
+from app.services import journal_stats
+
+OVERWRITE_COLUMNS = ("avg_entry", "avg_exit", "qty", "pnl_abs", "pnl_pct", "hold_minutes", "closed_at")
+COALESCE_COLUMNS = (
+    "feedback_text",
+    "feedback_tone",
+    "feedback_next_actions",
+    "feedback_message_id",
+    "analysis_score",
+    "analysis_labels",
+)
+
+
+@dataclass
+class CloseResult:
+    created: int = 0
+    updated: int = 0
+
+
+async def upsert_closes(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> CloseResult:
+    """Upsert journal rows (one per trade_uuid) and roll them into /journal/stats.
+
+    Each row needs trade_uuid / user_id / chat_id / symbol / side, the OVERWRITE_COLUMNS and
+    the COALESCE_COLUMNS (None when not provided). The caller commits.
+    """
+    result = CloseResult()
+    if not rows:
+        return result
+
+    previous_stmt = (
+        select(TradeJournal.trade_uuid, *(getattr(TradeJournal, name) for name in journal_stats.FACT_FIELDS))
+        .where(TradeJournal.trade_uuid.in_([row["trade_uuid"] for row in rows]))
+        .with_for_update()
+    )
+    previous = {row.trade_uuid: journal_stats.journal_facts(row) for row in await db.execute(previous_stmt)}
+
+    dialect = db.bind.dialect.name
+    now = datetime.now(timezone.utc)
+    stmt = dialect_insert(dialect, TradeJournal).values([{**row, "created_at": now, "updated_at": now} for row in rows])
+    table = TradeJournal.__table__.c
+    excluded = stmt.excluded
+    returning = [table.trade_uuid, *(table[name] for name in journal_stats.FACT_FIELDS)]
+    if dialect == "postgresql":
+        returning.append(literal_column("xmax = 0").label("inserted"))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["trade_uuid"],
+        set_={
+            **{name: excluded[name] for name in OVERWRITE_COLUMNS},
+            **{name: func.coalesce(excluded[name], table[name]) for name in COALESCE_COLUMNS},
+            "updated_at": excluded.updated_at,
+        },
+    ).returning(*returning)
+    written = (await db.execute(stmt)).all()
+
+    changes = []
+    rebuild_users: Set[Optional[UUID]] = set()
+    for row in written:
+        before = previous.get(row.trade_uuid)
+        if before is None and not getattr(row, "inserted", True):
+            result.updated += 1
+            rebuild_users.add(row.user_id)
+            continue
+        if before is None:
+            result.created += 1
+        else:
+            result.updated += 1
+        changes.append((before, journal_stats.journal_facts(row)))
+    await journal_stats.apply_closes(db, changes)
+
+    if rebuild_users:
+        await journal_stats.rebuild_rollups(db, rebuild_users)
+    return result
@@ -0,0 +1,235 @@
+"""Content-addressed cache for chart-image LLM responses.
+
+The same screenshot is often uploaded to several endpoints. Responses are
+keyed by a SHA-256 over the image bytes, prompt template, model and context
+fields, kept for a TTL and evicted least-recently-used. Backends are pluggable
+(in-process dict or on-disk SQLite); hit/miss counters also track how much
+upstream latency and how many tokens the hits saved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+from app.core.settings import get_settings
+
+
+def make_cache_key(
+    *,
+    model: str,
+    template: str,
+    image: Optional[bytes] = None,
+    **context: Any,
+) -> str:
+    """Stable key from image bytes + prompt template + model + context fields."""
+    material = {
+        "model": model,
+        "template": hashlib.sha256(template.encode("utf-8")).hexdigest(),
+        "image": hashlib.sha256(image).hexdigest() if image is not None else None,
+        "context": {key: context[key] for key in sorted(context)},
+    }
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str, now: float) -> Optional[Dict[str, Any]]: ...
+
+    def set(self, key: str, entry: Dict[str, Any], expires_at: float, now: float) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU dict (per worker)."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any], expires_at: float, now: float) -> None:
+        with self._lock:
+            self._data[key] = (expires_at, entry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """On-disk cache shared by workers on one host (LRU by last access time)."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " entry TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+
+    def get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT entry, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key: str, entry: Dict[str, Any], expires_at: float, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_cache (key, entry, expires_at, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET entry = excluded.entry, expires_at = excluded.expires_at, "
+                "last_access = excluded.last_access",
+                (key, json.dumps(entry, ensure_ascii=False), expires_at, now),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """TTL cache in front of LLM completions with hit/miss and savings counters."""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 86400.0, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.backend.get(key, self.clock())
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry.get("latency", 0.0)
+            self.saved_tokens += entry.get("tokens", 0)
+        return entry["response"]
+
+    def set(self, key: str, response: Dict[str, Any], latency: float = 0.0) -> None:
+        usage = response.get("usage") or {}
+        entry = {"response": response, "latency": latency, "tokens": int(usage.get("total_tokens") or 0)}
+        now = self.clock()
+        self.backend.set(key, entry, now + self.ttl, now)
+
+    async def get_or_call(self, key: str, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return the cached completion for `key`, or run `call()` and cache its result."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        response = await call()
+        self.set(key, response, latency=time.perf_counter() - started)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache from settings (`LLM_CACHE_BACKEND=off` disables it)."""
+    global _cache
+    settings = get_settings()
+    if settings.llm_cache_backend == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if settings.llm_cache_backend == "sqlite":
+                backend: CacheBackend = SQLiteCacheBackend(settings.llm_cache_path, settings.llm_cache_max_entries)
+            else:
+                backend = MemoryCacheBackend(settings.llm_cache_max_entries)
+            _cache = LLMResponseCache(backend, ttl=settings.llm_cache_ttl)
+        return _cache
+
+
+async def cached_completion(
+    call: Callable[[], Awaitable[Dict[str, Any]]],
+    *,
+    model: str,
+    template: str,
+    image: Optional[bytes] = None,
+    **context: Any,
+) -> Dict[str, Any]:
+    """Run `call()` through the shared cache (or directly when caching is off)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return await call()
+    key = make_cache_key(model=model, template=template, image=image, **context)
+    return await cache.get_or_call(key, call)
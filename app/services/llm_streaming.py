@@ -0,0 +1,209 @@
+"""Server-sent event delivery for LLM answers.
+
+Endpoints that support `?stream=true` forward completion deltas to the client
+as they arrive instead of waiting for the whole answer. The
+`STOCK_NAME_EXTRACTED:` line the advice prompt asks for is removed on the fly
+(and captured), and the assembled text is handed to a completion callback so
+chat history is still persisted. With `MOCK_AI=true` a canned streamer is used
+so the flow works offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Protocol
+
+from fastapi.responses import StreamingResponse
+
+from app.config import MOCK_AI
+from app.services.llm_cache import get_llm_cache, make_cache_key
+from app.services.llm_transport import LLMTransportError, extract_content, get_llm_transport
+
+logger = logging.getLogger(__name__)
+
+STOCK_NAME_MARKER = "STOCK_NAME_EXTRACTED:"
+
+_LINE_RE = re.compile(r"[^\n]*\n|[^\n]+")
+
+
+class LLMStreamer(Protocol):
+    def stream_chat(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[str]: ...
+
+
+class MockLLMStreamer:
+    """Offline streamer that replays a canned answer in small chunks."""
+
+    def __init__(self, text: Optional[str] = None, chunk_size: int = 8, delay: float = 0.0):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    def _answer(self, payload: Dict[str, Any]) -> str:
+        if self.text is not None:
+            return self.text
+        user = _user_text(payload.get("messages") or [])
+        return f"{STOCK_NAME_MARKER} MOCK\n📊 【MOCK】チャート分析\n⸻\n要約: {user[:50]} ...\n結論: シナリオは妥当。"
+
+    async def stream_chat(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[str]:
+        text = self._answer(payload)
+        for start in range(0, len(text), self.chunk_size):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield text[start : start + self.chunk_size]
+
+
+def _user_text(messages: list) -> str:
+    for message in messages:
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        return " ".join(part.get("text", "") for part in content or [] if part.get("type") == "text")
+    return ""
+
+
+def get_llm_streamer() -> LLMStreamer:
+    """MOCK_AI=true ならモック、それ以外は共有トランスポート"""
+    if MOCK_AI:
+        return MockLLMStreamer()
+    return get_llm_transport()
+
+
+class StockNameFilter:
+    """Drop `STOCK_NAME_EXTRACTED:` lines from streamed text, keeping the first name seen.
+
+    Only the start of the current line is held back, and only while it could
+    still turn out to be the marker; everything else passes straight through.
+    """
+
+    def __init__(self, marker: str = STOCK_NAME_MARKER):
+        self.marker = marker
+        self.stock_name: Optional[str] = None
+        self._pending = ""
+        self._passthrough = False
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for part in _LINE_RE.findall(chunk):
+            complete = part.endswith("\n")
+            if self._passthrough:
+                out.append(part)
+            else:
+                self._pending += part
+                head = self._pending.lstrip()
+                if head.startswith(self.marker):
+                    if complete:
+                        self._capture(head)
+                        self._pending = ""
+                elif not complete and self.marker.startswith(head):
+                    pass  # まだマーカーの途中かもしれない
+                else:
+                    out.append(self._pending)
+                    self._pending = ""
+                    self._passthrough = True
+            if complete:
+                self._passthrough = False
+        return "".join(out)
+
+    def flush(self) -> str:
+        pending, self._pending = self._pending, ""
+        if pending.lstrip().startswith(self.marker):
+            self._capture(pending.lstrip())
+            return ""
+        return pending
+
+    def _capture(self, line: str) -> None:
+        if self.stock_name is None:
+            self.stock_name = line[len(self.marker) :].strip() or None
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def cached_stream(
+    call: Callable[[], AsyncIterator[str]],
+    *,
+    model: str,
+    template: str,
+    image: Optional[bytes] = None,
+    **context: Any,
+) -> AsyncIterator[str]:
+    """Stream through the response cache: a hit is replayed as one chunk, a miss is stored once complete."""
+    cache = get_llm_cache()
+    if cache is None:
+        async for chunk in call():
+            yield chunk
+        return
+
+    key = make_cache_key(model=model, template=template, image=image, **context)
+    cached = cache.get(key)
+    if cached is not None:
+        yield extract_content(cached)
+        return
+
+    started = time.perf_counter()
+    parts = []
+    async for chunk in call():
+        parts.append(chunk)
+        yield chunk
+    response = {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}]}
+    cache.set(key, response, latency=time.perf_counter() - started)
+
+
+async def advice_event_stream(
+    chunks: AsyncIterator[str],
+    *,
+    prefix: str = "",
+    stock_name: Optional[str] = None,
+    fallback: str = "",
+    on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> AsyncIterator[str]:
+    """Turn LLM deltas into `token` events followed by one `done` (or `error`) event.
+
+    `done` carries the assembled message and extracted stock name, matching the
+    JSON the non-streaming endpoints return.
+    """
+    name_filter = StockNameFilter()
+    parts = []
+    try:
+        if prefix:
+            parts.append(prefix)
+            yield sse_event("token", {"text": prefix})
+        async for chunk in chunks:
+            text = name_filter.feed(chunk)
+            if text:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        tail = name_filter.flush()
+        if tail:
+            parts.append(tail)
+            yield sse_event("token", {"text": tail})
+    except LLMTransportError as exc:
+        yield sse_event("error", {"error": f"OpenAI API request failed: {exc.body or exc}"})
+        return
+    except Exception as exc:  # noqa: BLE001 - ストリーム途中の失敗はイベントで通知する
+        logger.exception("Streaming advice failed")
+        yield sse_event("error", {"error": f"ファイル解析中にエラーが発生しました: {exc}"})
+        return
+
+    message = "".join(parts)
+    if not message.strip() and fallback:
+        message = fallback
+        yield sse_event("token", {"text": fallback})
+    if on_complete is not None:
+        await on_complete(message)
+    yield sse_event("done", {"message": message, "extracted_stock_name": stock_name or name_filter.stock_name})
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,240 @@
+"""Shared async transport for OpenAI chat completions.
+
+All LLM calls (advice, chart analysis, exit feedback, llm_gateway) go through
+one `httpx.AsyncClient` with a bounded keep-alive pool, so a slow completion
+only occupies a connection slot instead of blocking the event loop. Requests
+are additionally gated by a concurrency semaphore and retried with jittered
+exponential backoff on timeouts, connection errors, 429 and 5xx.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class LLMTransportError(RuntimeError):
+    """Raised when a completion fails after retries (or with a non-retryable status)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class LLMTransport:
+    """Pooled async client for `/chat/completions`."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = "https://api.openai.com/v1",
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits, transport=self._transport
+            )
+        return self._client
+
+    def _headers(self) -> Dict[str, str]:
+        if not self.api_key:
+            raise LLMTransportError("OpenAI API key not configured")
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        # full jitter: [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2**attempt)))
+
+    async def chat_completion(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST `/chat/completions` and return the decoded JSON body."""
+        headers = self._headers()
+        request_timeout = httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else self.timeout
+        last_error: Optional[LLMTransportError] = None
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(
+                        "/chat/completions", json=payload, headers=headers, timeout=request_timeout
+                    )
+            except (httpx.TimeoutException, httpx.TransportError) as exc:
+                last_error = LLMTransportError(f"OpenAI request failed: {exc.__class__.__name__}: {exc}")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                last_error = LLMTransportError(
+                    f"OpenAI API request failed: {response.status_code}",
+                    status_code=response.status_code,
+                    body=response.text,
+                )
+                if response.status_code not in RETRY_STATUS:
+                    raise last_error
+                retry_after = response.headers.get("retry-after")
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning("LLM call failed (%s); retry %d in %.2fs", last_error, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+        raise last_error  # type: ignore[misc]
+
+    async def stream_chat(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """POST `/chat/completions` with `stream: true` and yield content deltas as they arrive.
+
+        Failures before the first delta are retried like `chat_completion`; once
+        text has been yielded a failure is raised as-is (the caller already
+        forwarded part of the answer).
+        """
+        headers = self._headers()
+        request_timeout = httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else self.timeout
+        body = {**payload, "stream": True}
+        last_error: Optional[LLMTransportError] = None
+        started = False
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with self.client.stream(
+                        "POST", "/chat/completions", json=body, headers=headers, timeout=request_timeout
+                    ) as response:
+                        if response.status_code == 200:
+                            async for delta in _iter_stream_deltas(response):
+                                started = True
+                                yield delta
+                            return
+                        await response.aread()
+                        last_error = LLMTransportError(
+                            f"OpenAI API request failed: {response.status_code}",
+                            status_code=response.status_code,
+                            body=response.text,
+                        )
+                        if response.status_code not in RETRY_STATUS:
+                            raise last_error
+                        retry_after = response.headers.get("retry-after")
+            except (httpx.TimeoutException, httpx.TransportError) as exc:
+                last_error = LLMTransportError(f"OpenAI request failed: {exc.__class__.__name__}: {exc}")
+                if started:
+                    raise last_error from exc
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning("LLM stream failed (%s); retry %d in %.2fs", last_error, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+        raise last_error  # type: ignore[misc]
+
+    async def chat_text(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = "gpt-4o-mini",
+        timeout: Optional[float] = None,
+        **params: Any,
+    ) -> str:
+        """Convenience wrapper returning `choices[0].message.content` (or legacy `text`)."""
+        result = await self.chat_completion({"model": model, "messages": messages, **params}, timeout=timeout)
+        return extract_content(result)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def _iter_stream_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """Parse `data: {...}` server-sent events into `choices[0].delta.content` strings."""
+    # [DONE] で抜けずに最後まで読み切る（httpx の行イテレータを途中で放棄しない）
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            continue
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed stream chunk: %r", data[:200])
+            continue
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def extract_content(result: Dict[str, Any]) -> str:
+    choices = result.get("choices") or []
+    if not choices or not isinstance(choices[0], dict):
+        return ""
+    choice = choices[0]
+    message = choice.get("message") or {}
+    if isinstance(message, dict) and message.get("content"):
+        return message["content"]
+    return choice.get("text") or ""
+
+
+_transport: Optional[LLMTransport] = None
+
+
+def get_llm_transport() -> LLMTransport:
+    """Return the process-wide transport built from settings."""
+    global _transport
+    if _transport is None:
+        settings = get_settings()
+        _transport = LLMTransport(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=settings.llm_timeout,
+            connect_timeout=settings.llm_connect_timeout,
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            max_concurrency=settings.llm_max_concurrency,
+            max_retries=settings.llm_max_retries,
+        )
+    return _transport
+
+
+async def shutdown_llm_transport() -> None:
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
@@ -0,0 +1,350 @@
+"""建玉ライブ配信（WebSocket /ws/positions）のファンアウト
+
+接続ごとに Subscriber を持ち、positionId 単位で最新イベントだけを保持する有界の保留キューに
+積む。送信ループは短い集約ウィンドウの後でまとめて送るため、同じ建玉の連続更新は1件に潰れる。
+保留が上限を超えた（遅いクライアント）場合は保留を捨てて resnapshot フラグを立て、
+次の送信でスナップショットを送り直す。
+
+ワーカー間の配信は PositionsBroker で差し替える:
+- InProcessBroker: 同一プロセス内のみ（開発・単一ワーカー）
+- PostgresNotifyBroker: PostgreSQL の LISTEN/NOTIFY で全ワーカーに配る
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.models import Position
+from app.schemas.position import PositionResponse
+from app.services.positions_ledger import LedgerChanges
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = "1"
+UPSERT = "positions.upsert"
+REMOVED = "positions.removed"
+SNAPSHOT = "positions.snapshot"
+NOTIFY_PAYLOAD_LIMIT = 7900  # pg_notify の上限 8000 バイトに余裕を持たせる
+
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+SnapshotLoader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def position_payload(position: Position) -> Dict[str, Any]:
+    return PositionResponse.model_validate(position).model_dump(mode="json", by_alias=True)
+
+
+def make_event(event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": event_type, "schemaVersion": SCHEMA_VERSION, "emittedAt": _now_iso(), "payload": payload}
+
+
+class FeedMetrics:
+    """rollout メモの snapshot_http_ms / event_queue_max などをプロセス単位で集計する"""
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.resnapshots = 0
+        self.snapshots = 0
+        self.snapshot_ms_total = 0.0
+        self.snapshot_ms_max = 0.0
+        self.event_queue_max = 0
+
+    def record_snapshot(self, elapsed_ms: float) -> None:
+        self.snapshots += 1
+        self.snapshot_ms_total += elapsed_ms
+        self.snapshot_ms_max = max(self.snapshot_ms_max, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "resnapshots": self.resnapshots,
+            "snapshots": self.snapshots,
+            "snapshot_http_ms_avg": round(self.snapshot_ms_total / self.snapshots, 3) if self.snapshots else 0.0,
+            "snapshot_http_ms_max": round(self.snapshot_ms_max, 3),
+            "event_queue_max": self.event_queue_max,
+        }
+
+
+class Subscriber:
+    """1接続分の保留キュー（positionId ごとに最新1件、上限付き）"""
+
+    def __init__(
+        self, metrics: FeedMetrics, chat_id: Optional[str] = None, user_id: Optional[str] = None, max_pending: int = 256
+    ) -> None:
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.resnapshot = False
+        self.wakeup = asyncio.Event()
+        self._metrics = metrics
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        if self.resnapshot:
+            # どうせスナップショットで置き換わるので積まない
+            return
+        key = event["payload"]["positionId"]
+        if key in self.pending:
+            del self.pending[key]
+            self._metrics.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.resnapshot = True
+            self._metrics.resnapshots += 1
+            self.wakeup.set()
+            return
+        self.pending[key] = event
+        self._metrics.event_queue_max = max(self._metrics.event_queue_max, len(self.pending))
+        self.wakeup.set()
+
+    def request_snapshot(self) -> None:
+        self.pending.clear()
+        self.resnapshot = True
+        self.wakeup.set()
+
+    def drain(self) -> Tuple[bool, List[Dict[str, Any]]]:
+        resnapshot, events = self.resnapshot, list(self.pending.values())
+        self.resnapshot = False
+        self.pending = {}
+        self.wakeup.clear()
+        return resnapshot, events
+
+
+class PositionsHub:
+    """プロセス内の購読者管理。chat_id / user_id ごとに索引して配信対象だけを走査する。"""
+
+    def __init__(self, coalesce_window: float = 0.05, max_pending: int = 256) -> None:
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self.metrics = FeedMetrics()
+        self._by_chat: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._by_user: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._unfiltered: Set[Subscriber] = set()
+
+    def __len__(self) -> int:
+        return self.metrics.connections
+
+    def subscribe(self, chat_id: Optional[str] = None, user_id: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(self.metrics, chat_id=chat_id, user_id=user_id, max_pending=self.max_pending)
+        self._index(subscriber).add(subscriber)
+        self.metrics.connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        bucket = self._index(subscriber)
+        if subscriber in bucket:
+            bucket.discard(subscriber)
+            self.metrics.connections -= 1
+
+    def _index(self, subscriber: Subscriber) -> Set[Subscriber]:
+        if subscriber.chat_id:
+            return self._by_chat[subscriber.chat_id]
+        if subscriber.user_id:
+            return self._by_user[subscriber.user_id]
+        return self._unfiltered
+
+    def dispatch(self, event: Dict[str, Any], chat_id: Optional[str], user_id: Optional[str]) -> None:
+        self.metrics.published += 1
+        targets = [self._unfiltered]
+        if chat_id and chat_id in self._by_chat:
+            targets.append(self._by_chat[chat_id])
+        if user_id and user_id in self._by_user:
+            targets.append(self._by_user[user_id])
+        for bucket in targets:
+            for subscriber in bucket:
+                # chat と user の両方で絞った購読は chat 側に索引しているので、ここで user も確認する
+                if subscriber.user_id and subscriber.user_id != user_id:
+                    continue
+                subscriber.offer(event)
+
+    async def serve(self, subscriber: Subscriber, send: Send, load_snapshot: SnapshotLoader) -> None:
+        """スナップショット → 集約した差分、を切断（send の例外かキャンセル）まで送り続ける"""
+        await self._send_snapshot(send, load_snapshot)
+        while True:
+            await subscriber.wakeup.wait()
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+            resnapshot, events = subscriber.drain()
+            if resnapshot:
+                await self._send_snapshot(send, load_snapshot)
+                continue
+            for event in events:
+                await send(event)
+            self.metrics.delivered += len(events)
+
+    async def _send_snapshot(self, send: Send, load_snapshot: SnapshotLoader) -> None:
+        started = time.perf_counter()
+        positions = await load_snapshot()
+        self.metrics.record_snapshot((time.perf_counter() - started) * 1000)
+        await send(make_event(SNAPSHOT, {"positions": positions}))
+
+
+class PositionsBroker(Protocol):
+    async def start(self, hub: PositionsHub) -> None: ...
+
+    async def publish(self, event: Dict[str, Any], chat_id: Optional[str], user_id: Optional[str]) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class InProcessBroker:
+    """同一プロセスの hub にそのまま配る"""
+
+    def __init__(self) -> None:
+        self._hub: Optional[PositionsHub] = None
+
+    async def start(self, hub: PositionsHub) -> None:
+        self._hub = hub
+
+    async def publish(self, event: Dict[str, Any], chat_id: Optional[str], user_id: Optional[str]) -> None:
+        if self._hub is not None:
+            self._hub.dispatch(event, chat_id, user_id)
+
+    async def stop(self) -> None:
+        self._hub = None
+
+
+class PostgresNotifyBroker:
+    """LISTEN/NOTIFY で全ワーカーの hub に配る（専用の asyncpg 接続を1本使う）"""
+
+    def __init__(self, dsn: str, channel: str = "positions_feed") -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self._connection: Any = None  # asyncpg.Connection
+        self._hub: Optional[PositionsHub] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_database_url(cls, database_url: str, channel: str = "positions_feed") -> "PostgresNotifyBroker":
+        url = make_url(database_url).set(drivername="postgresql")
+        return cls(url.render_as_string(hide_password=False), channel)
+
+    async def start(self, hub: PositionsHub) -> None:
+        import asyncpg
+
+        self._hub = hub
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, _connection, _pid, _channel, raw: str) -> None:
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed positions notification")
+            return
+        if self._hub is not None:
+            self._hub.dispatch(message["event"], message.get("chat_id"), message.get("user_id"))
+
+    async def publish(self, event: Dict[str, Any], chat_id: Optional[str], user_id: Optional[str]) -> None:
+        raw = json.dumps({"event": event, "chat_id": chat_id, "user_id": user_id}, ensure_ascii=False)
+        if len(raw.encode()) > NOTIFY_PAYLOAD_LIMIT or self._connection is None:
+            logger.warning("Positions event not broadcast (payload too large or broker stopped); delivering locally")
+            if self._hub is not None:
+                self._hub.dispatch(event, chat_id, user_id)
+            return
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, raw)
+
+    async def stop(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.remove_listener(self.channel, self._on_notify)
+            await connection.close()
+        self._hub = None
+
+
+class PositionsFeed:
+    def __init__(self, hub: PositionsHub, broker: PositionsBroker) -> None:
+        self.hub = hub
+        self.broker = broker
+        self._started = False
+
+    async def start(self) -> None:
+        if not self._started:
+            await self.broker.start(self.hub)
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self.broker.stop()
+            self._started = False
+
+    @property
+    def wants_events(self) -> bool:
+        # プロセス内配信で購読者がいなければ、配信用の再読み込み自体を省く
+        return not isinstance(self.broker, InProcessBroker) or len(self.hub) > 0
+
+    async def publish_changes(self, db: AsyncSession, changes: LedgerChanges) -> None:
+        """コミット済みの台帳変更を配信する（upsert は1回の SELECT で読み直す）"""
+        if not changes or not self.wants_events:
+            return
+        if changes.upserted:
+            positions = (
+                (
+                    await db.execute(
+                        select(Position)
+                        .where(Position.trade_id.in_(sorted(changes.upserted)))
+                        .execution_options(populate_existing=True)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            for position in positions:
+                user_id = str(position.user_id) if position.user_id else None
+                await self.broker.publish(make_event(UPSERT, position_payload(position)), position.chat_id, user_id)
+        for removed in changes.removed:
+            await self.broker.publish(make_event(REMOVED, removed), removed.get("chatId"), removed.get("ownerId"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self.broker).__name__, **self.hub.metrics.as_dict()}
+
+
+_feed: Optional[PositionsFeed] = None
+
+
+def get_positions_feed() -> Optional[PositionsFeed]:
+    """プロセス共通の配信（`POSITIONS_FEED_BACKEND=off` で無効）"""
+    global _feed
+    settings = get_settings()
+    if settings.positions_feed_backend == "off":
+        return None
+    if _feed is None:
+        if settings.positions_feed_backend == "postgres":
+            broker: PositionsBroker = PostgresNotifyBroker.from_database_url(settings.async_database_url)
+        else:
+            broker = InProcessBroker()
+        hub = PositionsHub(
+            coalesce_window=settings.positions_feed_coalesce_ms / 1000,
+            max_pending=settings.positions_feed_max_pending,
+        )
+        _feed = PositionsFeed(hub, broker)
+    return _feed
+
+
+async def shutdown_positions_feed() -> None:
+    global _feed
+    feed, _feed = _feed, None
+    if feed is not None:
+        await feed.stop()
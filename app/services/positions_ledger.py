@@ -0,0 +1,282 @@
+"""ENTRY/EXIT メッセージから建玉台帳（positions）を維持する
+
+メッセージ追加時は新しいイベントだけを既存の建玉に畳み込む（履歴は再走査しない）。
+編集・削除・Undo のように過去のイベントが変わる場合や、新しい建玉・順序の前後するイベントのように
+差分では再構築と結果が合わない場合は、その tradeId のイベントだけを created_at 順に畳み直す。
+集計ルールはフロントエンドの positions store と同じで、
+平均建値は ENTRY の加重平均、EXIT では変えず（固定平均建値）、数量が 0 になったら CLOSED。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import and_, delete, exists, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, ChatMessage, Position, PositionEvent
+
+LEDGER_TYPES = ("ENTRY", "EXIT")
+OPEN = "OPEN"
+CLOSED = "CLOSED"
+
+_EVENT_COLUMNS = tuple(column.name for column in PositionEvent.__table__.c)
+
+
+@dataclass
+class LedgerChanges:
+    """台帳の変更結果（ライブ配信用）。removed は削除された建玉の識別情報。"""
+
+    upserted: Set[str] = field(default_factory=set)
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.upserted or self.removed)
+
+
+def select_positions(
+    chat_id: Optional[str] = None, user_id: Optional[UUID] = None, status: str = "open", limit: int = 500
+):
+    """スナップショット用のクエリ（updated_at の降順）。status は open / closed / all。"""
+    stmt = select(Position)
+    if chat_id:
+        stmt = stmt.where(Position.chat_id == chat_id)
+    if user_id:
+        stmt = stmt.where(Position.user_id == user_id)
+    if status != "all":
+        stmt = stmt.where(Position.status == status.upper())
+    return stmt.order_by(Position.updated_at.desc(), Position.trade_id).limit(limit)
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def event_from_message(message: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """chat_messages の行（dict / Row._mapping）を position_events の行に変換する。対象外なら None。"""
+    payload = message.get("payload")
+    if message.get("type") not in LEDGER_TYPES or not isinstance(payload, Mapping) or not payload.get("tradeId"):
+        return None
+    created_at = message.get("created_at") or datetime.now(timezone.utc)
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    event = {
+        "message_id": message["id"],
+        "trade_id": str(payload["tradeId"]),
+        "chat_id": message["chat_id"],
+        "kind": message["type"],
+        "symbol_code": None,
+        "symbol_name": None,
+        "side": None,
+        "created_at": created_at,
+    }
+    try:
+        if message["type"] == "ENTRY":
+            event.update(
+                price=float(payload["price"]),
+                qty=int(payload["qty"]),
+                symbol_code=payload.get("symbolCode"),
+                symbol_name=payload.get("symbolName"),
+                side=payload.get("side"),
+            )
+        else:
+            event.update(price=float(payload["exitPrice"]), qty=int(payload["exitQty"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return event
+
+
+def _new_position(event: Mapping[str, Any]) -> Position:
+    at = _aware(event["created_at"])
+    return Position(
+        trade_id=event["trade_id"],
+        chat_id=event["chat_id"],
+        # チャットの所有者を INSERT 時にサブクエリで埋める（追加の往復なし）
+        user_id=select(Chat.user_id).where(Chat.id == event["chat_id"]).scalar_subquery(),
+        symbol_code=event["symbol_code"] or "",
+        symbol_name=event["symbol_name"],
+        side=event["side"] or "LONG",
+        qty_open=0,
+        qty_entered=0,
+        qty_exited=0,
+        avg_entry=0.0,
+        realized_pnl=0.0,
+        status=OPEN,
+        version=0,
+        opened_at=at,
+        updated_at=at,
+    )
+
+
+def _reset(position: Position, first_entry: Mapping[str, Any]) -> None:
+    at = _aware(first_entry["created_at"])
+    position.qty_open = position.qty_entered = position.qty_exited = 0
+    position.avg_entry = position.realized_pnl = 0.0
+    position.status = OPEN
+    position.opened_at = at
+    position.closed_at = None
+    position.symbol_code = first_entry["symbol_code"] or position.symbol_code
+    position.symbol_name = first_entry["symbol_name"] or position.symbol_name
+    position.side = first_entry["side"] or position.side
+
+
+def fold(position: Position, event: Mapping[str, Any]) -> None:
+    """1イベントを建玉に適用する"""
+    at = _aware(event["created_at"])
+    qty = event["qty"]
+    price = event["price"]
+
+    if event["kind"] == "ENTRY":
+        total = position.qty_open + qty
+        if total > 0:
+            position.avg_entry = (position.avg_entry * position.qty_open + price * qty) / total
+        position.qty_open = total
+        position.qty_entered += qty
+        if position.status == CLOSED:
+            position.status = OPEN
+            position.closed_at = None
+    else:
+        # 保有数量を超える決済は保有分までに丸める
+        qty = min(qty, position.qty_open)
+        if qty <= 0:
+            return
+        per_share = price - position.avg_entry if position.side == "LONG" else position.avg_entry - price
+        position.realized_pnl += per_share * qty
+        position.qty_open -= qty
+        position.qty_exited += qty
+        if position.qty_open == 0:
+            position.status = CLOSED
+            position.closed_at = at
+
+    position.version += 1
+    position.updated_at = at
+
+
+def _ordered(events: Iterable[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+    return sorted(events, key=lambda event: (event["created_at"], event["message_id"]))
+
+
+async def _load_positions(db: AsyncSession, trade_ids: Set[str]) -> Dict[str, Position]:
+    if not trade_ids:
+        return {}
+    stmt = select(Position).where(Position.trade_id.in_(sorted(trade_ids))).with_for_update()
+    return {position.trade_id: position for position in (await db.execute(stmt)).scalars()}
+
+
+async def record_messages(db: AsyncSession, messages: Sequence[Mapping[str, Any]]) -> LedgerChanges:
+    """新規メッセージのうち ENTRY/EXIT を台帳に記録する"""
+    events = [event for event in map(event_from_message, messages) if event is not None]
+    if not events:
+        return LedgerChanges()
+
+    await db.execute(insert(PositionEvent), [{name: event[name] for name in _EVENT_COLUMNS} for event in events])
+
+    positions = await _load_positions(db, {event["trade_id"] for event in events})
+    # 次の tradeId は差分の畳み込みでは再構築と結果が変わるので、イベント全体から畳み直す
+    # - 建玉がまだない: 先に届いて保留になっている EXIT があるかもしれない
+    # - 畳み込み済みの最新イベント（updated_at）より古いイベントがある: 適用順が変わる
+    rebuild = {
+        event["trade_id"]
+        for event in events
+        if event["trade_id"] not in positions
+        or _aware(event["created_at"]) < _aware(positions[event["trade_id"]].updated_at)
+    }
+    for event in _ordered(events):
+        if event["trade_id"] not in rebuild:
+            fold(positions[event["trade_id"]], event)
+    await db.flush()
+    changes = await rebuild_trades(db, rebuild)
+    changes.upserted |= set(positions) - rebuild
+    return changes
+
+
+async def rebuild_trades(db: AsyncSession, trade_ids: Iterable[Optional[str]]) -> LedgerChanges:
+    """指定 tradeId の建玉をイベントから畳み直す（イベントがなくなった建玉は削除）"""
+    wanted: Set[str] = {trade_id for trade_id in trade_ids if trade_id}
+    changes = LedgerChanges()
+    if not wanted:
+        return changes
+
+    rows = (await db.execute(select(PositionEvent).where(PositionEvent.trade_id.in_(sorted(wanted))))).scalars()
+    events_by_trade: Dict[str, List[Mapping[str, Any]]] = {}
+    for row in rows:
+        events_by_trade.setdefault(row.trade_id, []).append({name: getattr(row, name) for name in _EVENT_COLUMNS})
+
+    positions = await _load_positions(db, wanted)
+    for trade_id in wanted:
+        events = _ordered(events_by_trade.get(trade_id, []))
+        entries = [event for event in events if event["kind"] == "ENTRY"]
+        position = positions.get(trade_id)
+        if not entries:
+            if position is not None:
+                changes.removed.append(
+                    {
+                        "positionId": position.trade_id,
+                        "symbol": position.symbol_code,
+                        "side": position.side,
+                        "chatId": position.chat_id,
+                        "ownerId": str(position.user_id) if position.user_id else None,
+                    }
+                )
+                await db.delete(position)
+            continue
+        if position is None:
+            position = _new_position(entries[0])
+            db.add(position)
+        version = position.version
+        _reset(position, entries[0])
+        for event in events:
+            fold(position, event)
+        # 再構築でも version は単調増加させる（クライアントの LWW 用）
+        position.version = version + 1
+        changes.upserted.add(trade_id)
+    await db.flush()
+    return changes
+
+
+async def replace_message(db: AsyncSession, message: Mapping[str, Any]) -> LedgerChanges:
+    """編集後のメッセージで台帳イベントを差し替える"""
+    previous = (
+        await db.execute(
+            delete(PositionEvent).where(PositionEvent.message_id == message["id"]).returning(PositionEvent.trade_id)
+        )
+    ).scalar_one_or_none()
+    event = event_from_message(message)
+    if event is not None:
+        await db.execute(insert(PositionEvent).values(**{name: event[name] for name in _EVENT_COLUMNS}))
+    return await rebuild_trades(db, {previous, event["trade_id"] if event else None})
+
+
+async def discard_message(db: AsyncSession, message_id: str) -> LedgerChanges:
+    """削除・Undo されたメッセージを台帳から外す"""
+    trade_id = (
+        await db.execute(
+            delete(PositionEvent).where(PositionEvent.message_id == message_id).returning(PositionEvent.trade_id)
+        )
+    ).scalar_one_or_none()
+    return await rebuild_trades(db, {trade_id})
+
+
+def settled_entry_condition():
+    """WHERE 句: ChatMessage が CLOSED 建玉の ENTRY である（PK/インデックスの1回の参照で判定できる）"""
+    return exists().where(
+        PositionEvent.message_id == ChatMessage.id,
+        PositionEvent.kind == "ENTRY",
+        and_(Position.trade_id == PositionEvent.trade_id, Position.status == CLOSED),
+    )
+
+
+async def is_settled_entry(db: AsyncSession, message_id: str) -> bool:
+    stmt = select(
+        exists().where(
+            PositionEvent.message_id == message_id,
+            PositionEvent.kind == "ENTRY",
+            Position.trade_id == PositionEvent.trade_id,
+            Position.status == CLOSED,
+        )
+    )
+    return bool((await db.execute(stmt)).scalar())
@@ -0,0 +1,84 @@
+"""アプリケーション共通のサービスレジストリ
+
+リクエストごとに作っていたもの（統合分析・決済フィードバックのサービスとそのアナライザー、
+Jinja のテンプレート、markdown 変換器）をプロセスで1つずつ持つ。lifespan の起動時に作って
+テンプレートをすべてコンパイルしておき、ルーターには FastAPI の Depends で渡す。
+
+テンプレートはバイトコードキャッシュ（TEMPLATE_CACHE_DIR、未指定なら一時ディレクトリ）付きの
+Environment で読み、auto_reload を切っているので get_template はファイルを stat しない。
+markdown2.Markdown は convert のたびに状態をリセットするので使い回せるが、スレッドセーフではない。
+イベントループのスレッド（await を挟まない同期処理）からだけ使う。
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+import markdown2
+from jinja2 import BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.core.settings import get_settings
+from app.services.exit_feedback_service import ExitFeedbackService
+from app.services.integrated_advice_service import IntegratedAdviceService
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+def _bytecode_cache(directory: Optional[str]) -> Optional[BytecodeCache]:
+    try:
+        return FileSystemBytecodeCache(directory or None)
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Jinja bytecode cache disabled: {e}")
+        return None
+
+
+class ServiceRegistry:
+    def __init__(self, openai_api_key: Optional[str], template_cache_dir: Optional[str] = None) -> None:
+        self.templates = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            bytecode_cache=_bytecode_cache(template_cache_dir),
+            auto_reload=False,
+        )
+        self.markdown = markdown2.Markdown()
+        self.table_markdown = markdown2.Markdown(extras=["tables"])
+        self.integrated_advice = IntegratedAdviceService(
+            openai_api_key, template=self.templates.get_template("integrated_analysis.j2")
+        )
+        self.exit_feedback = ExitFeedbackService(openai_api_key, jinja_env=self.templates)
+
+    def warm(self) -> int:
+        """テンプレートをすべてコンパイルしておく（コンパイルした数を返す）"""
+        names = self.templates.list_templates(extensions=["j2"])
+        for name in names:
+            self.templates.get_template(name)
+        return len(names)
+
+
+_registry: Optional[ServiceRegistry] = None
+
+
+def get_service_registry() -> ServiceRegistry:
+    global _registry
+    if _registry is None:
+        settings = get_settings()
+        _registry = ServiceRegistry(settings.openai_api_key, settings.template_cache_dir)
+        _registry.warm()
+    return _registry
+
+
+def shutdown_service_registry() -> None:
+    global _registry
+    _registry = None
+
+
+# FastAPI の依存関数（テストでは app.dependency_overrides で差し替える）
+def get_integrated_advice_service() -> IntegratedAdviceService:
+    return get_service_registry().integrated_advice
+
+
+def get_exit_feedback_service() -> ExitFeedbackService:
+    return get_service_registry().exit_feedback
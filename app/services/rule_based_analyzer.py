@@ -1,21 +1,36 @@
 import json
 import os
 import subprocess
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Mapping, Optional
 
+from app.core.settings import get_settings
 from app.schemas.indicators import IndicatorItem
+from app.services.scoring import score_entry_v04, score_pivot, score_series
+from app.services.scoring_pool import get_scoring_pool
 
 
 class RuleBasedAnalyzer:
-    """ルールベース分析（pivot1.3 / entry-v04）の処理クラス"""
+    """ルールベース分析（pivot1.3 / entry-v04）の処理クラス
 
-    def __init__(self):
+    engine:
+        "python"     `app.services.scoring` のPython移植をプロセス内で実行（既定）
+        "pool"       常駐Nodeワーカープール経由
+        "subprocess" 呼び出し毎に `node -e` を起動（従来方式）
+    """
+
+    def __init__(self, engine: Optional[str] = None):
         self.pivot_path = os.path.join(os.path.dirname(__file__), "../../pivot")
         self.entry_path = os.path.join(os.path.dirname(__file__), "../../entry-v04")
+        self.engine = engine or get_settings().rule_scoring_engine
 
     def analyze_pivot_v13(self, bar_data: Dict[str, Any]) -> Dict[str, Any]:
         """Pivot v1.3 分析を実行"""
         try:
+            if self.engine == "python":
+                return score_pivot(bar_data)
+            if self.engine == "pool":
+                return get_scoring_pool().call("pivot", bar_data)
+
             # Node.js経由でpivot分析実行
             cmd = [
                 "node",
@@ -42,9 +57,14 @@ class RuleBasedAnalyzer:
     ) -> Dict[str, Any]:
         """Entry v0.4 分析を実行"""
         try:
-            # Node.js経由でentry分析実行
             analysis_input = {"bar": bar_data, "indicators": indicators_data, "context": context}
 
+            if self.engine == "python":
+                return score_entry_v04(bar_data, indicators_data, context)
+            if self.engine == "pool":
+                return get_scoring_pool().call("entry", analysis_input)
+
+            # Node.js経由でentry分析実行
             cmd = [
                 "node",
                 "-e",
@@ -65,6 +85,22 @@ class RuleBasedAnalyzer:
             print(f"Error in entry analysis: {e}")
             return self._get_fallback_entry_result()
 
+    def score_series(
+        self,
+        columns: Mapping[str, Any],
+        recent_pivot_bars_ago: Any = None,
+        options: Optional[Mapping[str, Any]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """OHLCV系列全体をNumPyで一括スコアリング（スクリーニング用）
+
+        columns は `open/high/low/close/volume` と SMA 等の配列（欠損は NaN / None）。
+        戻り値は `{"pivot": {candle, location, slope, volume, final, isPivot},
+        "entry": {MA, Candle, Volume, final, label, gatePassed}}` の各配列で、
+        1本ずつ `analyze_pivot_v13` / `analyze_entry_v04` を回した結果と一致する。
+        エンジン設定に関わらずPython移植で計算する。
+        """
+        return score_series(columns, recent_pivot_bars_ago, options)
+
     def pivot_result_to_indicators(self, pivot_result: Dict[str, Any]) -> List[IndicatorItem]:
         """Pivot分析結果をIndicatorItem形式に変換"""
         indicators = []
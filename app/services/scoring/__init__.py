@@ -0,0 +1,7 @@
+"""In-process Python ports of the pivot v1.3 / entry v0.4 scorers."""
+
+from app.services.scoring.batch import score_entry_batch, score_pivot_batch, score_series
+from app.services.scoring.entry_v04 import score_entry_v04
+from app.services.scoring.pivot_v13 import score_pivot
+
+__all__ = ["score_entry_batch", "score_entry_v04", "score_pivot", "score_pivot_batch", "score_series"]
@@ -0,0 +1,337 @@
+"""NumPy batch scoring of pivot v1.3 / entry v0.4 over whole OHLCV series.
+
+The per-bar ports in `pivot_v13` / `entry_v04` are the reference; every
+expression here mirrors them element-wise (same operation order, same JS-style
+rounding) so a batch result equals looping the single-bar functions.
+
+Columns use the same names as the per-bar dicts. Missing values are NaN (the
+per-bar `None`). Columns that a daily series can derive by itself — `prevHigh`,
+`prevLow`, `prevClose`, `prev2High`, `prev2Low` and the `*_5ago` SMAs — are
+shifted from the series when they are not supplied.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+from app.services.scoring import entry_v04, pivot_v13
+
+BASE_COLUMNS = ("open", "high", "low", "close", "volume")
+OPTIONAL_COLUMNS = (
+    "volMA5",
+    "sma5",
+    "sma20",
+    "sma60",
+    "sma5_5ago",
+    "sma20_5ago",
+    "sma60_5ago",
+    "prevHigh",
+    "prevLow",
+    "prevClose",
+    "prev2High",
+    "prev2Low",
+)
+_SHIFTED = {
+    "prevHigh": ("high", 1),
+    "prevLow": ("low", 1),
+    "prevClose": ("close", 1),
+    "prev2High": ("high", 2),
+    "prev2Low": ("low", 2),
+    "sma5_5ago": ("sma5", 5),
+    "sma20_5ago": ("sma20", 5),
+    "sma60_5ago": ("sma60", 5),
+}
+
+ENTRY_LABELS = np.array(["見送り", "エントリー可", "強エントリー"], dtype=object)
+
+
+# --------------------------------------------------------------------------- #
+# JS-compatible element-wise helpers (see jsmath)
+# --------------------------------------------------------------------------- #
+def js_round(values: np.ndarray) -> np.ndarray:
+    floor = np.floor(values)
+    return np.where(values - floor >= 0.5, floor + 1, floor)
+
+
+def round_to(values: np.ndarray, digits: int = 1) -> np.ndarray:
+    factor = 10.0**digits
+    return js_round(values * factor) / factor
+
+
+def clamp(min_value: float, max_value: float, values: np.ndarray) -> np.ndarray:
+    return np.minimum(max_value, np.maximum(min_value, values))
+
+
+def nz(values: np.ndarray, default: float = 0) -> np.ndarray:
+    return np.where(np.isnan(values), default, values)
+
+
+def safe_div(numerator: np.ndarray, denominator: np.ndarray, fallback: float = 0) -> np.ndarray:
+    ok = np.abs(denominator) > 1e-9
+    return np.where(ok, numerator / np.where(ok, denominator, 1.0), fallback)
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:-periods]
+    return shifted
+
+
+def prepare_columns(columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """Coerce inputs to float64 arrays, fill absent columns with NaN or series shifts."""
+    missing = [name for name in BASE_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"missing OHLCV columns: {', '.join(missing)}")
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name in BASE_COLUMNS + OPTIONAL_COLUMNS:
+        if name in columns and columns[name] is not None:
+            arrays[name] = np.asarray(
+                [np.nan if value is None else value for value in columns[name]]
+                if not isinstance(columns[name], np.ndarray)
+                else columns[name],
+                dtype=np.float64,
+            )
+
+    length = len(arrays["close"])
+    for name, array in arrays.items():
+        if array.shape != (length,):
+            raise ValueError(f"column {name!r} has shape {array.shape}, expected ({length},)")
+
+    for name in OPTIONAL_COLUMNS:
+        if name in arrays:
+            continue
+        source, periods = _SHIFTED.get(name, (None, 0))
+        if source is not None and source in arrays:
+            arrays[name] = _shift(arrays[source], periods)
+        else:
+            arrays[name] = np.full(length, np.nan)
+    return arrays
+
+
+# --------------------------------------------------------------------------- #
+# pivot v1.3
+# --------------------------------------------------------------------------- #
+def _pivot_candle(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> np.ndarray:  # noqa: E741
+    rng = np.maximum(1e-9, h - l)
+    body = np.abs(c - o) / rng
+    upper = (h - np.maximum(o, c)) / rng
+    lower = (np.minimum(o, c) - l) / rng
+    pos = c > o
+
+    return np.select(
+        [
+            pos & (upper >= 0.30),
+            ~pos & (body >= 0.90),
+            pos & (lower >= 0.30),
+            ~pos & (lower >= 0.30),
+            pos & (body >= 0.70),
+            pos & (body > 0.30) & (body < 0.70),
+            pos & (body <= 0.30),
+        ],
+        [0, 0, 90, 65, 80, 70, 40],
+        default=20,
+    ).astype(np.float64)
+
+
+def _pivot_location(c: np.ndarray, sma20: np.ndarray, sma60: np.ndarray) -> np.ndarray:
+    near_pct = pivot_v13.THRESHOLDS["nearPct"]
+    denom = np.maximum(1, c)
+    near20 = ~np.isnan(sma20) & (np.abs(c - nz(sma20)) / denom <= near_pct)
+    near60 = ~np.isnan(sma60) & (np.abs(c - nz(sma60)) / denom <= near_pct)
+
+    bands = pivot_v13.PRICE_BANDS
+    band = np.where(c < bands["small"], 0, np.where(c < bands["mid"], 1, 2))
+    tables = [pivot_v13.LOCATION_TABLE[name] for name in ("small", "mid", "large")]
+
+    def lookup(key: str) -> np.ndarray:
+        return np.choose(band, [table[key] for table in tables])
+
+    return np.select(
+        [near20 & near60, near20, near60], [lookup("both"), lookup("20"), lookup("60")], default=lookup("none")
+    ).astype(np.float64)
+
+
+def _slope_points(pct: np.ndarray, table: Mapping[str, float], threshold: float) -> np.ndarray:
+    return np.select([pct >= threshold, pct <= -threshold], [table["up"], table["down"]], default=table["flat"])
+
+
+def _pivot_slope(sma20: np.ndarray, sma20_5ago: np.ndarray, sma60: np.ndarray, sma60_5ago: np.ndarray) -> np.ndarray:
+    def pct(current: np.ndarray, five_ago: np.ndarray) -> np.ndarray:
+        ok = ~np.isnan(current) & ~np.isnan(five_ago) & (five_ago > 0)
+        return np.where(ok, (nz(current) - nz(five_ago)) / np.where(ok, five_ago, 1.0) * 100, 0)
+
+    threshold = pivot_v13.THRESHOLDS["slopePct"]
+    score20 = _slope_points(pct(sma20, sma20_5ago), pivot_v13.SLOPE_SCORES["sma20"], threshold)
+    score60 = _slope_points(pct(sma60, sma60_5ago), pivot_v13.SLOPE_SCORES["sma60"], threshold)
+    weights = pivot_v13.SLOPE_SCORES["weights"]
+    return js_round(weights["sma20"] * score20 + weights["sma60"] * score60)
+
+
+def _pivot_volume(volume: np.ndarray, vol_ma5: np.ndarray) -> np.ndarray:
+    threshold = np.maximum(1, nz(vol_ma5)) * pivot_v13.VOLUME_FULL_SCORE_MULTIPLIER
+    return np.minimum(100, js_round((volume / threshold) * 100))
+
+
+def score_pivot_batch(columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """Vectorized `score_pivot`: subscores, final score and isPivot for every bar."""
+    cols = prepare_columns(columns)
+    scores = {
+        "candle": _pivot_candle(cols["open"], cols["high"], cols["low"], cols["close"]),
+        "location": _pivot_location(cols["close"], cols["sma20"], cols["sma60"]),
+        "slope": _pivot_slope(cols["sma20"], cols["sma20_5ago"], cols["sma60"], cols["sma60_5ago"]),
+        "volume": _pivot_volume(cols["volume"], cols["volMA5"]),
+    }
+    weighted = {key: round_to(value * pivot_v13.WEIGHTS[key]) for key, value in scores.items()}
+    final = round_to(weighted["candle"] + weighted["location"] + weighted["slope"] + weighted["volume"])
+    return {**scores, "final": final, "isPivot": final >= pivot_v13.THRESHOLDS["final"]}
+
+
+# --------------------------------------------------------------------------- #
+# entry v0.4
+# --------------------------------------------------------------------------- #
+def _entry_ma(cols: Mapping[str, np.ndarray], options: Mapping[str, Any]) -> np.ndarray:
+    table = entry_v04.SLOPE_SCORE_TABLE
+    threshold = options["slopePct"]
+
+    def points(period: str) -> np.ndarray:
+        current, previous = nz(cols[f"sma{period}"]), nz(cols[f"sma{period}_5ago"])
+        return _slope_points(safe_div((current - previous) * 100, previous, 0), table[period], threshold)
+
+    slope_score = round_to(0.1 * points("5") + 0.6 * points("20") + 0.3 * points("60"))
+    proper = ~np.isnan(cols["sma20"]) & ~np.isnan(cols["sma60"]) & (nz(cols["sma20"]) > nz(cols["sma60"]))
+    return js_round(clamp(0, 100, slope_score + np.where(proper, 10, 0)))
+
+
+def _is_near(price: np.ndarray, target: np.ndarray, threshold_pct: float) -> np.ndarray:
+    nonzero = target != 0
+    return nonzero & (np.abs(price - target) / np.where(nonzero, np.abs(target), 1.0) <= threshold_pct)
+
+
+def _entry_candle(cols: Mapping[str, np.ndarray], options: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    o, h, l, c = cols["open"], cols["high"], cols["low"], cols["close"]  # noqa: E741
+    rng = np.maximum(1e-9, h - l)
+    body = np.abs(c - o) / rng
+    upper = (h - np.maximum(o, c)) / rng
+    lower = (np.minimum(o, c) - l) / rng
+    bullish = c > o
+    clv = safe_div(c - l, h - l, 0.5)
+
+    prev_high, prev_low = nz(cols["prevHigh"]), nz(cols["prevLow"])
+    prev2_high, prev2_low = nz(cols["prev2High"]), nz(cols["prev2Low"])
+    prev_close = nz(cols["prevClose"])
+    has_sma20 = ~np.isnan(cols["sma20"])
+    near20 = has_sma20 & _is_near(c, nz(cols["sma20"]), options["nearPct20"])
+
+    breaks_prev_high = (prev_high != 0) & (c > prev_high)
+    pattern = np.select(
+        [
+            breaks_prev_high & (body >= 0.60) & (upper <= 0.20),
+            breaks_prev_high & (body >= 0.40) & (upper <= 0.30),
+            (prev_high != 0) & (prev2_high != 0) & (prev_high < prev2_high) & (prev_low > prev2_low) & (c > prev_high),
+            near20 & bullish & (lower >= 0.25),
+            has_sma20 & (prev_close != 0) & bullish & near20,
+            (prev_high != 0) & (h > prev_high) & (l > prev_low) & (body < 0.30),
+            bullish & (body >= 0.30) & (body < 0.70),
+        ],
+        list(range(7)),
+        default=7,
+    )
+    base = np.array([92, 85, 82, 78, 76, 62, 68, 30], dtype=np.float64)[pattern]
+
+    is_breakout = pattern <= 1
+    upper_penalty = np.where(upper > 0.35, np.where(is_breakout, -9999, -25), 0)
+    clv_adjustment = np.where(pattern == 3, 0, np.select([clv >= 0.70, clv <= 0.30], [5, -10], default=0))
+
+    range_ratio = safe_div(np.maximum(1e-9, h - l), np.maximum(1e-9, prev_high - prev_low), 1.0)
+    range_adjustment = np.select([range_ratio >= 1.3, range_ratio <= 0.7], [5, -5], default=0)
+
+    positive_close = prev_close > 0
+    gap_pct = np.where(positive_close, np.abs((o - prev_close) / np.where(positive_close, prev_close, 1.0) * 100), 0)
+    gap_adjustment = np.where((gap_pct >= 2.0) & (clv < 0.5), -20, 0)
+
+    total = upper_penalty + clv_adjustment + range_adjustment + gap_adjustment
+    return {"score": js_round(clamp(0, 100, base + total)), "pattern": pattern}
+
+
+def _entry_volume(volume: np.ndarray, vol_ma5: np.ndarray) -> np.ndarray:
+    ratio = safe_div(volume, nz(vol_ma5, 1), 0)
+    return js_round(np.minimum(100, 100 * ratio / 1.5))
+
+
+def _entry_gate(cols: Mapping[str, np.ndarray], bars_ago: np.ndarray, options: Mapping[str, Any]) -> np.ndarray:
+    pivot_ok = ~np.isnan(bars_ago) & ~(nz(bars_ago) > options["pivotLookbackBars"])
+    sma5, sma20 = cols["sma5"], cols["sma20"]
+    location_ok = (
+        ~np.isnan(sma5)
+        & ~np.isnan(sma20)
+        & ~(nz(sma5) < nz(sma20))
+        & ~(cols["close"] < nz(sma5) * (1 - options["allowEpsilonOnSMA5"]))
+    )
+    return pivot_ok & location_ok
+
+
+def bars_since(flags: np.ndarray) -> np.ndarray:
+    """Bars elapsed since the latest True at or before each index (NaN before the first)."""
+    index = np.arange(len(flags))
+    last = np.maximum.accumulate(np.where(flags, index, -1))
+    return np.where(last >= 0, index - last, np.nan).astype(np.float64)
+
+
+def score_entry_batch(
+    columns: Mapping[str, Any],
+    recent_pivot_bars_ago: Any,
+    options: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, np.ndarray]:
+    """Vectorized `score_entry_v04` with `recentPivotBarsAgo` given per bar."""
+    cols = prepare_columns(columns)
+    opts = entry_v04.merge_options(dict(options) if options else None)
+    bars_ago = np.asarray(
+        [np.nan if value is None else value for value in recent_pivot_bars_ago]
+        if not isinstance(recent_pivot_bars_ago, np.ndarray)
+        else recent_pivot_bars_ago,
+        dtype=np.float64,
+    )
+    if bars_ago.shape != cols["close"].shape:
+        raise ValueError("recent_pivot_bars_ago must have one value per bar")
+
+    gate_passed = _entry_gate(cols, bars_ago, opts)
+    ma = _entry_ma(cols, opts)
+    candle = _entry_candle(cols, opts)
+    volume = _entry_volume(cols["volume"], cols["volMA5"])
+
+    final = round_to(
+        round_to(ma * opts["wMA"]) + round_to(candle["score"] * opts["wCandle"]) + round_to(volume * opts["wVolume"])
+    )
+    level = np.select([final >= opts["strongCutoff"], final >= opts["entryCutoff"]], [2, 1], default=0)
+    label = ENTRY_LABELS[np.where(gate_passed, level, 0)]
+
+    return {
+        "MA": ma,
+        "Candle": candle["score"],
+        "Volume": volume,
+        "final": final,
+        "label": label,
+        "gatePassed": gate_passed,
+    }
+
+
+def score_series(
+    columns: Mapping[str, Any],
+    recent_pivot_bars_ago: Any = None,
+    options: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Pivot and entry scores for a whole series in one call.
+
+    When `recent_pivot_bars_ago` is omitted it is derived from the series' own
+    pivot flags (bars since the latest pivot bar, 0 on the pivot bar itself).
+    """
+    cols = prepare_columns(columns)
+    pivot = score_pivot_batch(cols)
+    if recent_pivot_bars_ago is None:
+        recent_pivot_bars_ago = bars_since(pivot["isPivot"])
+    entry = score_entry_batch(cols, recent_pivot_bars_ago, options)
+    return {"pivot": pivot, "entry": entry}
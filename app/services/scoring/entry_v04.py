@@ -0,0 +1,389 @@
+"""Entry足判定 v0.4（`entry-v04/src/*.ts` のPython移植）
+
+`scoreEntryV04(bar, indicators, context)` と同じ入出力。ゲート検証、MA/Candle/Volume
+サブスコア、ラベル決定までをそのまま移植している。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.scoring.jsmath import clamp, js_round, js_str, js_to_fixed, nz, round_to, safe_div
+
+VERSION = "v0.4"
+
+DEFAULT_OPTIONS: Dict[str, float] = {
+    # Gate
+    "pivotLookbackBars": 4,
+    "allowEpsilonOnSMA5": 0.0,
+    # Slope thresholds (% over 5 bars)
+    "slopePct": 0.5,
+    # Location proximity for 20MA (Candle scoring)
+    "nearPct20": 0.01,
+    # Weights (Entry)
+    "wMA": 0.50,
+    "wCandle": 0.35,
+    "wVolume": 0.15,
+    # Labels & cutoffs
+    "entryCutoff": 70,
+    "strongCutoff": 85,
+}
+
+SLOPE_SCORE_TABLE = {
+    "5": {"up": 80, "flat": 50, "down": 20},
+    "20": {"up": 100, "flat": 60, "down": 0},
+    "60": {"up": 80, "flat": 55, "down": 25},
+}
+
+
+def merge_options(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**DEFAULT_OPTIONS, **(overrides or {})}
+
+
+# --------------------------------------------------------------------------- #
+# utils.ts
+# --------------------------------------------------------------------------- #
+def change_percent(current: float, previous: float) -> float:
+    return safe_div((current - previous) * 100, previous, 0)
+
+
+def body_ratio(open_: float, close: float, high: float, low: float) -> float:
+    return abs(close - open_) / max(1e-9, high - low)
+
+
+def upper_shadow_ratio(open_: float, close: float, high: float, low: float) -> float:
+    return (high - max(open_, close)) / max(1e-9, high - low)
+
+
+def lower_shadow_ratio(open_: float, close: float, high: float, low: float) -> float:
+    return (min(open_, close) - low) / max(1e-9, high - low)
+
+
+def calculate_clv(close: float, high: float, low: float) -> float:
+    return safe_div(close - low, high - low, 0.5)
+
+
+def is_near(price: float, target: float, threshold_pct: float) -> bool:
+    if target == 0:
+        return False
+    return abs(price - target) / abs(target) <= threshold_pct
+
+
+# --------------------------------------------------------------------------- #
+# gateValidation.ts
+# --------------------------------------------------------------------------- #
+def _check_pivot_expiry(context: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    bars_ago = context.get("recentPivotBarsAgo")
+    if bars_ago is None:
+        return {"passed": False, "reason": "Pivot位置が不明"}
+    if bars_ago > options["pivotLookbackBars"]:
+        lookback = options["pivotLookbackBars"]
+        return {
+            "passed": False,
+            "reason": f"Pivot有効期限切れ（{js_str(bars_ago)}営業日前 > {js_str(lookback)}営業日）",
+        }
+    return {"passed": True}
+
+
+def _check_price_location(close: float, indicators: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    sma5 = indicators.get("sma5")
+    sma20 = indicators.get("sma20")
+
+    if sma5 is None:
+        return {"passed": False, "reason": "5MA が取得できません"}
+    if sma20 is None:
+        return {"passed": False, "reason": "20MA が取得できません"}
+    if sma5 < sma20:
+        return {
+            "passed": False,
+            "reason": f"5MA < 20MA （5MA: {js_to_fixed(sma5)}, 20MA: {js_to_fixed(sma20)}）",
+        }
+
+    threshold = sma5 * (1 - options["allowEpsilonOnSMA5"])
+    if close < threshold:
+        return {
+            "passed": False,
+            "reason": f"終値が5MA未満 （終値: {js_to_fixed(close)}, 5MA: {js_to_fixed(sma5)}）",
+        }
+    return {"passed": True}
+
+
+def validate_gate(
+    close: float, indicators: Dict[str, Any], context: Dict[str, Any], options: Dict[str, Any]
+) -> Dict[str, Any]:
+    pivot_expiry = _check_pivot_expiry(context, options)
+    price_location = _check_price_location(close, indicators, options)
+
+    failures = [check["reason"] for check in (pivot_expiry, price_location) if not check["passed"]]
+
+    return {
+        "passed": pivot_expiry["passed"] and price_location["passed"],
+        "checks": {"pivotExpiry": pivot_expiry, "priceLocation": price_location},
+        "failures": failures,
+    }
+
+
+# --------------------------------------------------------------------------- #
+# maScore.ts
+# --------------------------------------------------------------------------- #
+def _slope_direction(slope_pct: float, threshold_pct: float) -> str:
+    if slope_pct >= threshold_pct:
+        return "up"
+    if slope_pct <= -threshold_pct:
+        return "down"
+    return "flat"
+
+
+def calculate_ma_score(indicators: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    sma5_slope = change_percent(nz(indicators.get("sma5")), nz(indicators.get("sma5_5ago")))
+    sma20_slope = change_percent(nz(indicators.get("sma20")), nz(indicators.get("sma20_5ago")))
+    sma60_slope = change_percent(nz(indicators.get("sma60")), nz(indicators.get("sma60_5ago")))
+
+    sma5_score = SLOPE_SCORE_TABLE["5"][_slope_direction(sma5_slope, options["slopePct"])]
+    sma20_score = SLOPE_SCORE_TABLE["20"][_slope_direction(sma20_slope, options["slopePct"])]
+    sma60_score = SLOPE_SCORE_TABLE["60"][_slope_direction(sma60_slope, options["slopePct"])]
+
+    # 合成：0.1×S5 + 0.6×S20 + 0.3×S60
+    slope_score = 0.1 * sma5_score + 0.6 * sma20_score + 0.3 * sma60_score
+
+    sma20 = indicators.get("sma20")
+    sma60 = indicators.get("sma60")
+    is_proper_arrangement = sma20 is not None and sma60 is not None and sma20 > sma60
+
+    return {
+        "sma5Score": sma5_score,
+        "sma20Score": sma20_score,
+        "sma60Score": sma60_score,
+        "slopeScore": round_to(slope_score),
+        "arrangementBonus": 10 if is_proper_arrangement else 0,
+        "sma5SlopePct": round_to(sma5_slope, 2),
+        "sma20SlopePct": round_to(sma20_slope, 2),
+        "sma60SlopePct": round_to(sma60_slope, 2),
+        "isProperArrangement": is_proper_arrangement,
+    }
+
+
+def get_ma_final_score(details: Dict[str, Any]) -> float:
+    return js_round(clamp(0, 100, details["slopeScore"] + details["arrangementBonus"]))
+
+
+# --------------------------------------------------------------------------- #
+# candleScore.ts
+# --------------------------------------------------------------------------- #
+def _identify_pattern(bar: Dict[str, Any], indicators: Dict[str, Any], options: Dict[str, Any]) -> Tuple[str, int]:
+    open_, close, high, low = bar["open"], bar["close"], bar["high"], bar["low"]
+    body = body_ratio(open_, close, high, low)
+    upper = upper_shadow_ratio(open_, close, high, low)
+    lower = lower_shadow_ratio(open_, close, high, low)
+    bullish = close > open_
+
+    prev_high = nz(indicators.get("prevHigh"))
+    prev_low = nz(indicators.get("prevLow"))
+    prev2_high = nz(indicators.get("prev2High"))
+    prev2_low = nz(indicators.get("prev2Low"))
+    prev_close = nz(indicators.get("prevClose"))
+    sma20 = indicators.get("sma20")
+
+    # 1. ブレイク・マルボウズ / 標準ブレイク
+    if prev_high != 0 and close > prev_high:
+        if body >= 0.60 and upper <= 0.20:
+            return "breakout_marubozu", 92
+        if body >= 0.40 and upper <= 0.30:
+            return "standard_breakout", 85
+
+    # 2. インサイド上放れ（前日が前々日に内包）
+    if prev_high != 0 and prev2_high != 0:
+        prev_inside = prev_high < prev2_high and prev_low > prev2_low
+        if prev_inside and close > prev_high:
+            return "inside_breakout", 82
+
+    # 3. 20MAタッチ反転
+    if sma20 is not None:
+        if is_near(close, sma20, options["nearPct20"]) and bullish and lower >= 0.25:
+            return "ma20_touch_reversal", 78
+
+    # 4. エンガルフィング@20MA（近似判定）
+    if sma20 is not None and prev_close != 0:
+        if bullish and is_near(close, sma20, options["nearPct20"]):
+            return "engulfing_at_ma20", 76
+
+    # 5. 続伸・小実体(HHHL)
+    if prev_high != 0:
+        if high > prev_high and low > prev_low and body < 0.30:
+            return "continuation_small_body", 62
+
+    # 6. 汎用陽線
+    if bullish and 0.30 <= body < 0.70:
+        return "generic_bullish", 68
+
+    # 7. その他
+    return "other", 30
+
+
+def _calculate_adjustments(
+    pattern: str, upper_ratio: float, clv: float, range_ratio: float, gap_pct: float
+) -> Dict[str, int]:
+    upper_penalty = 0
+    clv_adjustment = 0
+    range_adjustment = 0
+    gap_adjustment = 0
+
+    # 上髭ペナルティ（ブレイク系は0点確定）
+    if upper_ratio > 0.35:
+        if pattern in ("breakout_marubozu", "standard_breakout"):
+            upper_penalty = -9999
+        else:
+            upper_penalty = -25
+
+    # CLV補正（20MAタッチ反転は除外）
+    if pattern != "ma20_touch_reversal":
+        if clv >= 0.70:
+            clv_adjustment = 5
+        elif clv <= 0.30:
+            clv_adjustment = -10
+
+    # レンジ拡大/縮小
+    if range_ratio >= 1.3:
+        range_adjustment = 5
+    elif range_ratio <= 0.7:
+        range_adjustment = -5
+
+    # ギャップ失速
+    if gap_pct >= 2.0 and clv < 0.5:
+        gap_adjustment = -20
+
+    return {
+        "upperPenalty": upper_penalty,
+        "clvAdjustment": clv_adjustment,
+        "rangeAdjustment": range_adjustment,
+        "gapAdjustment": gap_adjustment,
+    }
+
+
+def calculate_candle_score(bar: Dict[str, Any], indicators: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    open_, close, high, low = bar["open"], bar["close"], bar["high"], bar["low"]
+    body = body_ratio(open_, close, high, low)
+    upper = upper_shadow_ratio(open_, close, high, low)
+    lower = lower_shadow_ratio(open_, close, high, low)
+    clv = calculate_clv(close, high, low)
+
+    # レンジ比率（前日比）
+    prev_range = max(1e-9, nz(indicators.get("prevHigh")) - nz(indicators.get("prevLow")))
+    current_range = max(1e-9, high - low)
+    range_ratio = safe_div(current_range, prev_range, 1.0)
+
+    # ギャップ%
+    prev_close = nz(indicators.get("prevClose"))
+    gap_pct = abs((open_ - prev_close) / prev_close * 100) if prev_close > 0 else 0
+
+    pattern, base_score = _identify_pattern(bar, indicators, options)
+    adjustments = _calculate_adjustments(pattern, upper, clv, range_ratio, gap_pct)
+
+    total_adjustment = (
+        adjustments["upperPenalty"]
+        + adjustments["clvAdjustment"]
+        + adjustments["rangeAdjustment"]
+        + adjustments["gapAdjustment"]
+    )
+    adjusted_score = clamp(0, 100, base_score + total_adjustment)
+
+    return {
+        "pattern": pattern,
+        "baseScore": base_score,
+        "bodyRatio": round_to(body, 3),
+        "upperRatio": round_to(upper, 3),
+        "lowerRatio": round_to(lower, 3),
+        "clv": round_to(clv, 3),
+        "rangeRatio": round_to(range_ratio, 2),
+        "gapPct": round_to(gap_pct, 2),
+        "adjustments": adjustments,
+        "adjustedScore": js_round(adjusted_score),
+    }
+
+
+# --------------------------------------------------------------------------- #
+# volumeScore.ts
+# --------------------------------------------------------------------------- #
+def calculate_volume_score(bar: Dict[str, Any], indicators: Dict[str, Any]) -> Dict[str, Any]:
+    vol_ma5 = nz(indicators.get("volMA5"), 1)
+    volume_ratio = safe_div(bar["volume"], vol_ma5, 0)
+    score = min(100, 100 * volume_ratio / 1.5)
+    return {"volumeRatio": round_to(volume_ratio, 2), "score": js_round(score)}
+
+
+# --------------------------------------------------------------------------- #
+# entryScore.ts
+# --------------------------------------------------------------------------- #
+def determine_label(final_score: float, gate_passed: bool, strong_cutoff: float, entry_cutoff: float) -> str:
+    if not gate_passed:
+        return "見送り"
+    if final_score >= strong_cutoff:
+        return "強エントリー"
+    if final_score >= entry_cutoff:
+        return "エントリー可"
+    return "見送り"
+
+
+_MISSING_KEYS = ("sma5", "sma20", "sma60", "volMA5", "prevHigh", "prevLow", "prevClose")
+
+
+def score_entry_v04(
+    bar: Dict[str, Any], indicators: Dict[str, Any], context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Entry足判定 v0.4 メイン関数（`scoreEntryV04` 相当）"""
+    context = context or {}
+    options = merge_options(context.get("options"))
+
+    gate = validate_gate(bar["close"], indicators, context, options)
+
+    ma_details = calculate_ma_score(indicators, options)
+    ma_score = get_ma_final_score(ma_details)
+
+    candle_details = calculate_candle_score(bar, indicators, options)
+    candle_score = candle_details["adjustedScore"]
+
+    volume_details = calculate_volume_score(bar, indicators)
+    volume_score = volume_details["score"]
+
+    weighted_ma = round_to(ma_score * options["wMA"])
+    weighted_candle = round_to(candle_score * options["wCandle"])
+    weighted_volume = round_to(volume_score * options["wVolume"])
+
+    final_score = round_to(weighted_ma + weighted_candle + weighted_volume)
+    label = determine_label(final_score, gate["passed"], options["strongCutoff"], options["entryCutoff"])
+
+    missing: List[str] = [key for key in _MISSING_KEYS if indicators.get(key) is None]
+
+    details: Dict[str, Any] = {"ma": ma_details, "candle": candle_details, "volume": volume_details}
+    if missing:
+        details["missing"] = missing
+    if gate["failures"]:
+        details["gateFailures"] = gate["failures"]
+
+    return {
+        "version": VERSION,
+        "gatePassed": gate["passed"],
+        "scores": {"MA": ma_score, "Candle": candle_score, "Volume": volume_score},
+        "weighted": {"MA": weighted_ma, "Candle": weighted_candle, "Volume": weighted_volume},
+        "final": final_score,
+        "label": label,
+        "explain": _explain(label, final_score, gate["passed"], ma_details, candle_details, volume_details),
+        "details": details,
+    }
+
+
+def _explain(
+    label: str,
+    final_score: float,
+    gate_passed: bool,
+    ma_details: Dict[str, Any],
+    candle_details: Dict[str, Any],
+    volume_details: Dict[str, Any],
+) -> str:
+    if not gate_passed:
+        return f"ゲート条件未達により見送り（スコア: {js_str(final_score)}点）"
+
+    ma_desc = "MA順調" if ma_details["isProperArrangement"] else "MA混在"
+    candle_desc = candle_details["pattern"].replace("_", " ")
+    vol_desc = f"{js_str(volume_details['volumeRatio'])}×"
+    return f"{label}（{js_str(final_score)}点）: MA {ma_desc}, Candle {candle_desc}, Vol {vol_desc}"
@@ -0,0 +1,54 @@
+"""JavaScript-compatible numeric helpers.
+
+The TypeScript scorers round with `Math.round` (ties toward +Infinity) and
+format numbers with JS `String(n)` / `toFixed`. Python's `round` uses banker's
+rounding, so the ports go through these helpers to stay bit-for-bit identical.
+"""
+
+from __future__ import annotations
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+
+def js_round(value: float) -> float:
+    """`Math.round`: nearest integer, ties toward +Infinity."""
+    if not math.isfinite(value):
+        return value
+    floor = math.floor(value)
+    return floor + 1 if value - floor >= 0.5 else floor
+
+
+def round_to(value: float, digits: int = 1) -> float:
+    """`roundTo(value, digits)` from the TS utils."""
+    factor = math.pow(10, digits)
+    return js_round(value * factor) / factor
+
+
+def clamp(min_value: float, max_value: float, value: float) -> float:
+    return min(max_value, max(min_value, value))
+
+
+def nz(value: Optional[float], default: float = 0) -> float:
+    """`value ?? default`"""
+    return default if value is None else value
+
+
+def safe_div(numerator: float, denominator: float, fallback: float = 0) -> float:
+    return numerator / denominator if abs(denominator) > 1e-9 else fallback
+
+
+def js_str(value: float) -> str:
+    """Format a number the way a JS template literal does (`20`, `18.2`)."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def js_to_fixed(value: float, digits: int = 0) -> str:
+    """`Number.prototype.toFixed` (round half away from zero on the exact binary value)."""
+    quantum = Decimal(1).scaleb(-digits)
+    return str(Decimal(value).quantize(quantum, rounding=ROUND_HALF_UP))
@@ -0,0 +1,201 @@
+"""Pivot足判定 v1.3（`pivot/src/pivotScore.ts` / `config.ts` のPython移植）
+
+入出力の形は `scorePivot(input)` と同一。数値の丸めはJSと一致させる。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from app.services.scoring.jsmath import js_round, js_str, js_to_fixed, round_to
+
+VERSION = "v1.3"
+
+WEIGHTS = {"candle": 0.25, "location": 0.35, "slope": 0.20, "volume": 0.20}
+
+THRESHOLDS = {
+    "final": 65,  # 65点以上でPivot認定
+    "nearPct": 0.01,  # 1%以内でMA近接
+    "slopePct": 0.5,  # 0.5%で傾き上下判定
+}
+
+PRICE_BANDS = {"small": 3000, "mid": 10000}
+
+LOCATION_TABLE = {
+    "small": {"20": 100, "60": 70, "both": 85, "none": 0},
+    "mid": {"20": 90, "60": 60, "both": 75, "none": 0},
+    "large": {"20": 80, "60": 50, "both": 65, "none": 0},
+}
+
+SLOPE_SCORES: Dict[str, Dict[str, float]] = {
+    "sma20": {"up": 100, "flat": 60, "down": 0},
+    "sma60": {"up": 70, "flat": 50, "down": 30},
+    "weights": {"sma20": 0.7, "sma60": 0.3},
+}
+
+VOLUME_FULL_SCORE_MULTIPLIER = 1.5
+
+
+def candle_score(open_: float, high: float, low: float, close: float) -> int:
+    """Candleスコア（0-100）"""
+    rng = max(1e-9, high - low)
+
+    body = abs(close - open_) / rng
+    upper = (high - max(open_, close)) / rng
+    lower = (min(open_, close) - low) / rng
+
+    is_positive = close > open_
+
+    if is_positive and upper >= 0.30:
+        return 0  # 上髭陽線（トンカチ）
+    if not is_positive and body >= 0.90:
+        return 0  # 丸坊主陰線
+    if is_positive and lower >= 0.30:
+        return 90  # カラカサ陽線
+    if not is_positive and lower >= 0.30:
+        return 65  # 下影陰線
+    if is_positive and body >= 0.70:
+        return 80  # 大陽線
+    if is_positive and 0.30 < body < 0.70:
+        return 70  # 中陽線
+    if is_positive and body <= 0.30:
+        return 40  # 小陽線/コマ
+    return 20  # その他の陰線
+
+
+def get_price_band(close: float) -> str:
+    if close < PRICE_BANDS["small"]:
+        return "small"
+    if close < PRICE_BANDS["mid"]:
+        return "mid"
+    return "large"
+
+
+def location_score(close: float, sma20: Optional[float], sma60: Optional[float]) -> Dict[str, Any]:
+    """Locationスコア（0-100）と近接判定"""
+    band = get_price_band(close)
+    near_pct = THRESHOLDS["nearPct"]
+
+    near20 = sma20 is not None and abs(close - sma20) / max(1, close) <= near_pct
+    near60 = sma60 is not None and abs(close - sma60) / max(1, close) <= near_pct
+
+    table = LOCATION_TABLE[band]
+    if near20 and near60:
+        score = table["both"]
+    elif near20:
+        score = table["20"]
+    elif near60:
+        score = table["60"]
+    else:
+        score = table["none"]
+
+    return {"score": score, "near20": near20, "near60": near60, "band": band}
+
+
+def _slope_direction(slope_pct: float) -> str:
+    if slope_pct >= THRESHOLDS["slopePct"]:
+        return "up"
+    if slope_pct <= -THRESHOLDS["slopePct"]:
+        return "down"
+    return "flat"
+
+
+def _slope_pct(current: Optional[float], five_ago: Optional[float]) -> float:
+    if current is not None and five_ago is not None and five_ago > 0:
+        return ((current - five_ago) / five_ago) * 100
+    return 0
+
+
+def slope_score(
+    sma20: Optional[float],
+    sma20_5ago: Optional[float],
+    sma60: Optional[float],
+    sma60_5ago: Optional[float],
+) -> Dict[str, Any]:
+    """Slopeスコア（0-100）と傾き%"""
+    s20pct = _slope_pct(sma20, sma20_5ago)
+    s60pct = _slope_pct(sma60, sma60_5ago)
+
+    score20 = SLOPE_SCORES["sma20"][_slope_direction(s20pct)]
+    score60 = SLOPE_SCORES["sma60"][_slope_direction(s60pct)]
+
+    weights = SLOPE_SCORES["weights"]
+    score = weights["sma20"] * score20 + weights["sma60"] * score60
+
+    return {"score": js_round(score), "s20pct": round_to(s20pct, 2), "s60pct": round_to(s60pct, 2)}
+
+
+def volume_score(volume: float, vol_ma5: Optional[float]) -> float:
+    """Volumeスコア（0-100）: 5日平均の1.5倍で満点"""
+    threshold = max(1, vol_ma5 or 0) * VOLUME_FULL_SCORE_MULTIPLIER
+    score = (volume / threshold) * 100
+    return min(100, js_round(score))
+
+
+def score_pivot(bar: Dict[str, Any]) -> Dict[str, Any]:
+    """メインのPivot足判定（`scorePivot` 相当）"""
+    candle = candle_score(bar["open"], bar["high"], bar["low"], bar["close"])
+    location = location_score(bar["close"], bar.get("sma20"), bar.get("sma60"))
+    slope = slope_score(bar.get("sma20"), bar.get("sma20_5ago"), bar.get("sma60"), bar.get("sma60_5ago"))
+    volume = volume_score(bar["volume"], bar.get("volMA5"))
+
+    scores = {"candle": candle, "location": location["score"], "slope": slope["score"], "volume": volume}
+    weighted = {key: round_to(value * WEIGHTS[key]) for key, value in scores.items()}
+
+    final = round_to(weighted["candle"] + weighted["location"] + weighted["slope"] + weighted["volume"])
+    is_pivot = final >= THRESHOLDS["final"]
+
+    meta = {
+        "priceBand": location["band"],
+        "near20": location["near20"],
+        "near60": location["near60"],
+        "slope20pct": slope["s20pct"],
+        "slope60pct": slope["s60pct"],
+        "version": VERSION,
+    }
+
+    return {
+        "scores": scores,
+        "weighted": weighted,
+        "final": final,
+        "isPivot": is_pivot,
+        "explain": _explain(scores, weighted, final, is_pivot, meta),
+        "meta": meta,
+    }
+
+
+def _explain(
+    scores: Dict[str, Any], weighted: Dict[str, Any], final: float, is_pivot: bool, meta: Dict[str, Any]
+) -> str:
+    band_names = {"small": "小型株", "mid": "中型株", "large": "値嵩株"}
+    if meta["near20"] and meta["near60"]:
+        near_text = "20&60MA近接"
+    elif meta["near20"]:
+        near_text = "20MA近接"
+    elif meta["near60"]:
+        near_text = "60MA近接"
+    else:
+        near_text = "MA非近接"
+
+    def line(label: str, key: str) -> str:
+        weight = js_to_fixed(WEIGHTS[key] * 100, 0)
+        return f"{label}: {js_str(scores[key])}点 → 寄与 {js_str(weighted[key])}点 (重み{weight}%)"
+
+    def signed(value: float) -> str:
+        return f"{'+' if value >= 0 else ''}{js_str(value)}"
+
+    lines = [
+        f"=== Pivot足判定 {VERSION} ===",
+        line("Candle", "candle"),
+        line("Location", "location"),
+        line("Slope", "slope"),
+        line("Volume", "volume"),
+        "",
+        f"最終スコア: {js_str(final)}点",
+        f"判定: {'Pivot認定' if is_pivot else '非認定'} (閾値{THRESHOLDS['final']}点)",
+        "",
+        f"株価帯: {band_names[meta['priceBand']]} | {near_text}",
+        f"20MA傾き: {signed(meta['slope20pct'])}%",
+        f"60MA傾き: {signed(meta['slope60pct'])}%",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,268 @@
+"""Long-lived Node.js scoring workers for pivot v1.3 / entry v0.4.
+
+`RuleBasedAnalyzer` used to spawn `node -e` for every call, paying Node startup
+and module loading on each request. This module keeps a small pool of
+`scoring_worker.mjs` processes alive and talks to them with newline-delimited
+JSON over stdin/stdout.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "scoring_worker.mjs")
+PIVOT_MODULE = os.path.join(_REPO_ROOT, "pivot/dist/pivotScore.js")
+ENTRY_MODULE = os.path.join(_REPO_ROOT, "entry-v04/dist/entryScore.js")
+
+_EOF = object()
+
+
+class ScoringWorkerError(RuntimeError):
+    """Raised when a scoring worker fails, crashes or returns an error response."""
+
+
+class ScoringTimeout(ScoringWorkerError):
+    """Raised when a scoring worker does not answer within the call timeout."""
+
+
+class _NodeWorker:
+    """One `node scoring_worker.mjs` process plus a reader thread for its stdout."""
+
+    def __init__(self, argv: List[str]):
+        self.argv = argv
+        self._ids = itertools.count(1)
+        self._responses: "queue.Queue[Any]" = queue.Queue()
+        self.process = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._reader = threading.Thread(target=self._read_stdout, name="scoring-worker-reader", daemon=True)
+        self._reader.start()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def _read_stdout(self) -> None:
+        stdout = self.process.stdout
+        assert stdout is not None  # stdout=PIPE
+        try:
+            for line in stdout:
+                self._responses.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._responses.put(_EOF)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def call(self, op: str, payload: Any, timeout: float) -> Any:
+        request_id = next(self._ids)
+        line = json.dumps({"id": request_id, "op": op, "input": payload}, ensure_ascii=False)
+        stdin = self.process.stdin
+        assert stdin is not None  # stdin=PIPE
+        try:
+            stdin.write(line + "\n")
+            stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as exc:
+            raise ScoringWorkerError(f"scoring worker {self.pid} is not writable: {exc}") from exc
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ScoringTimeout(f"scoring worker {self.pid} timed out after {timeout:.2f}s ({op})")
+            try:
+                raw = self._responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if raw is _EOF:
+                raise ScoringWorkerError(f"scoring worker {self.pid} exited (code={self.process.poll()})")
+            try:
+                response = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning("Discarding non-JSON output from scoring worker %s: %r", self.pid, raw[:200])
+                continue
+            if response.get("id") != request_id:
+                # 以前にタイムアウトした呼び出しの遅延レスポンスは捨てる
+                continue
+            if not response.get("ok"):
+                raise ScoringWorkerError(response.get("error") or "scoring worker returned an error")
+            return response.get("result")
+
+    def close(self) -> None:
+        try:
+            if self.process.stdin:
+                self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait(timeout=1.0)
+
+
+class NodeScoringPool:
+    """Fixed-size pool of Node scoring workers with health checks and crash restarts."""
+
+    def __init__(
+        self,
+        size: int = 2,
+        call_timeout: float = 2.0,
+        health_interval: float = 30.0,
+        node_bin: str = "node",
+        worker_script: str = WORKER_SCRIPT,
+        pivot_module: str = PIVOT_MODULE,
+        entry_module: str = ENTRY_MODULE,
+    ):
+        if size < 1:
+            raise ValueError("scoring pool size must be >= 1")
+        self.size = size
+        self.call_timeout = call_timeout
+        self.health_interval = health_interval
+        self.argv = [node_bin, worker_script, pivot_module, entry_module]
+        self.restarts = 0
+        self._idle: "queue.Queue[_NodeWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise ScoringWorkerError("scoring pool is closed")
+            for _ in range(self.size):
+                self._idle.put(_NodeWorker(self.argv))
+            self._started = True
+            if self.health_interval and self.health_interval > 0:
+                self._health_thread = threading.Thread(
+                    target=self._health_loop, name="scoring-pool-health", daemon=True
+                )
+                self._health_thread.start()
+
+    def _replace(self, worker: Optional[_NodeWorker]) -> _NodeWorker:
+        if worker is not None:
+            worker.close()
+        self.restarts += 1
+        replacement = _NodeWorker(self.argv)
+        logger.warning("Restarted scoring worker %s -> %s", worker.pid if worker else None, replacement.pid)
+        return replacement
+
+    def _checkin(self, worker: _NodeWorker) -> None:
+        if self._closed:
+            worker.close()
+            return
+        self._idle.put(worker)
+
+    def call(self, op: str, payload: Any, timeout: Optional[float] = None) -> Any:
+        """Run one scoring op on an idle worker, restarting it on crash or timeout."""
+        self.start()
+        timeout = self.call_timeout if timeout is None else timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty as exc:
+            raise ScoringTimeout(f"no idle scoring worker within {timeout:.2f}s") from exc
+
+        try:
+            if not worker.alive():
+                worker = self._replace(worker)
+            return worker.call(op, payload, timeout)
+        except ScoringTimeout:
+            # 応答待ちのワーカーは状態が不明なので作り直す
+            worker = self._replace(worker)
+            raise
+        except ScoringWorkerError:
+            if not worker.alive():
+                worker = self._replace(worker)
+            raise
+        finally:
+            self._checkin(worker)
+
+    def health_check(self) -> Dict[str, Any]:
+        """Ping every currently idle worker and restart the ones that do not answer."""
+        self.start()
+        checked: List[_NodeWorker] = []
+        healthy = 0
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if worker.alive() and worker.call("ping", None, self.call_timeout) == "pong":
+                    healthy += 1
+                else:
+                    worker = self._replace(worker)
+            except ScoringWorkerError:
+                worker = self._replace(worker)
+            checked.append(worker)
+        for worker in checked:
+            self._checkin(worker)
+        return {"size": self.size, "checked": len(checked), "healthy": healthy, "restarts": self.restarts}
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.health_check()
+            except Exception as exc:  # noqa: BLE001 - keep the health loop alive
+                logger.warning("Scoring pool health check failed: %s", exc)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._stop.set()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[NodeScoringPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_scoring_pool() -> NodeScoringPool:
+    """Return the process-wide scoring pool, creating it from settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = NodeScoringPool(
+                size=settings.scoring_pool_size,
+                call_timeout=settings.scoring_call_timeout,
+                health_interval=settings.scoring_health_interval,
+            )
+        return _pool
+
+
+def shutdown_scoring_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
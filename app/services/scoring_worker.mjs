@@ -0,0 +1,45 @@
+/**
+ * 常駐スコアリングワーカー（pivot v1.3 / entry v0.4）
+ *
+ * stdin から1行1リクエストのJSONを受け取り、stdout に1行1レスポンスのJSONを返す。
+ *   request:  {"id": 1, "op": "pivot" | "entry" | "ping", "input": {...}}
+ *   response: {"id": 1, "ok": true, "result": {...}} / {"id": 1, "ok": false, "error": "..."}
+ *
+ * usage: node scoring_worker.mjs <pivotScore.js> <entryScore.js>
+ */
+
+import { createInterface } from 'node:readline';
+import { pathToFileURL } from 'node:url';
+
+const [pivotModulePath, entryModulePath] = process.argv.slice(2);
+
+const { scorePivot } = await import(pathToFileURL(pivotModulePath).href);
+const { scoreEntryV04 } = await import(pathToFileURL(entryModulePath).href);
+
+const handlers = {
+  ping: () => 'pong',
+  pivot: (input) => scorePivot(input),
+  entry: (input) => scoreEntryV04(input.bar, input.indicators, input.context),
+};
+
+function respond(payload) {
+  process.stdout.write(JSON.stringify(payload) + '\n');
+}
+
+const rl = createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+rl.on('line', (line) => {
+  if (!line.trim()) return;
+  let id = null;
+  try {
+    const request = JSON.parse(line);
+    id = request.id ?? null;
+    const handler = handlers[request.op];
+    if (!handler) throw new Error(`unknown op: ${request.op}`);
+    respond({ id, ok: true, result: handler(request.input) });
+  } catch (err) {
+    respond({ id, ok: false, error: String((err && err.message) || err) });
+  }
+});
+
+rl.on('close', () => process.exit(0));
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from app.services.bar_store import BarStore, BarStoreError, to_epoch_seconds
+from app.services.scoring import score_series
+
+
+def _daily(start, count, base=1000.0):
+    first = np.datetime64(start, "D")
+    dates = np.arange(first, first + np.timedelta64(count, "D")).astype(str)
+    close = base + np.arange(count, dtype=float)
+    return {
+        "date": dates,
+        "open": close - 1,
+        "high": close + 5,
+        "low": close - 5,
+        "close": close,
+        "volume": np.full(count, 10000.0),
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(tmp_path / "bars")
+
+
+def test_append_and_read_are_memory_mapped_views(store):
+    store.append("7203", _daily("2024-01-01", 30))
+    store.append("7203", _daily("2024-01-31", 10, base=2000.0))
+
+    window = store.read("7203", last=15)
+
+    assert len(window) == 15
+    assert isinstance(window.close, np.memmap)
+    assert not window.close.flags.owndata
+    assert window.close[-1] == 2009.0
+    assert str(window.dates[0].astype("datetime64[D]")) == "2024-01-26"
+    assert store.count("7203") == 40
+
+
+def test_read_date_range_is_inclusive(store):
+    store.append("6758", _daily("2024-03-01", 31))
+
+    window = store.read("6758", start="2024-03-10", end="2024-03-12")
+
+    assert [bar["date"] for bar in window.bars()] == ["2024-03-10", "2024-03-11", "2024-03-12"]
+
+
+def test_append_only_rejects_older_rows_unless_skipping(store):
+    store.append("9984", _daily("2024-01-01", 5))
+
+    with pytest.raises(BarStoreError):
+        store.append("9984", _daily("2024-01-03", 5))
+
+    written = store.append("9984", _daily("2024-01-03", 5), skip_existing=True)
+    assert written == 2
+    assert store.count("9984") == 7
+
+
+def test_intraday_bars_are_partitioned_by_session(store):
+    ts = np.array(["2024-05-01T09:00", "2024-05-01T09:05", "2024-05-02T09:00"], dtype="datetime64[s]")
+    bars = {"ts": ts, "open": [1, 2, 3], "high": [1, 2, 3], "low": [1, 2, 3], "close": [1, 2, 3], "volume": [1, 1, 1]}
+    store.append("7203", bars, timeframe="intraday")
+
+    assert store.sessions("7203") == ["2024-05-01", "2024-05-02"]
+    assert store.read("7203", timeframe="intraday", session="2024-05-01").close.tolist() == [1.0, 2.0]
+
+
+def test_torn_append_is_truncated_to_committed_rows(store):
+    store.append("8306", _daily("2024-01-01", 3))
+    path = store.partition_path("8306")
+    with open(path / "close.f8", "ab") as fh:
+        fh.write(np.array([999.0]).tobytes())  # ts を書く前に落ちた想定
+
+    store.append("8306", _daily("2024-01-04", 1, base=5000.0))
+
+    assert store.read("8306").close.tolist() == [1000.0, 1001.0, 1002.0, 5000.0]
+
+
+def test_torn_ts_write_is_truncated_before_the_next_append(store):
+    store.append("8306", _daily("2024-01-01", 2))
+    path = store.partition_path("8306")
+    for name in ("open", "high", "low", "close", "volume"):
+        with open(path / f"{name}.f8", "ab") as fh:
+            fh.write(np.array([999.0]).tobytes())
+    with open(path / "ts.i8", "ab") as fh:
+        fh.write(b"\x01\x02\x03")  # ts の 8 バイトを書き切る前に落ちた想定
+
+    store.append("8306", _daily("2024-01-03", 1, base=5000.0))
+
+    bars = store.read("8306")
+    assert bars.ts.tolist() == to_epoch_seconds(["2024-01-01", "2024-01-02", "2024-01-03"]).tolist()
+    assert bars.close.tolist() == [1000.0, 1001.0, 5000.0]
+
+
+def test_slice_feeds_batch_scorer(store):
+    store.append("7203", _daily("2024-01-01", 80))
+    result = score_series(store.read("7203").columns())
+
+    assert len(result["pivot"]["final"]) == 80
+
+
+@pytest.mark.parametrize("symbol", ["../etc", ".", "..", "-x", "7203\n"])
+def test_invalid_symbol_is_rejected(store, symbol):
+    with pytest.raises(BarStoreError):
+        store.read(symbol)
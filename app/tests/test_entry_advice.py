@@ -0,0 +1,89 @@
+import pytest
+
+from app.schemas.indicator_facts import IndicatorFacts
+from app.services import entry_advice
+from app.services.entry_advice import (
+    EntryAdviceCache,
+    generate_entry_advice,
+    render_entry_advice_html,
+    render_entry_advice_markdown,
+)
+
+TYPICAL_FACTS = [
+    IndicatorFacts(
+        trend_check="下降トレンド",
+        rsi_overheat="RSI高値圏",
+        price_action="陰線",
+        volume_trend="増加",
+        recent_high=1200,
+        recent_low=1000,
+        current_price=1100.5,
+    ),
+    IndicatorFacts(
+        trend_check="上昇トレンド",
+        rsi_overheat="RSI上昇中",
+        price_action="陽線",
+        volume_trend="増加",
+        recent_high=2450.0,
+        recent_low=2210.0,
+        current_price=2398.0,
+        sma_touch=True,
+    ),
+    IndicatorFacts(trend_check="レンジ", rsi_overheat="中立", price_action="コマ", current_price=812.0),
+    IndicatorFacts(),
+]
+
+
+class TestEntryAdviceRendering:
+    """エントリーアドバイス HTML の描画経路のテスト"""
+
+    @pytest.mark.parametrize("facts", TYPICAL_FACTS)
+    def test_direct_html_matches_markdown_round_trip(self, facts):
+        assert render_entry_advice_html(facts) == render_entry_advice_markdown(facts)
+
+    def test_direct_html_escapes_values(self):
+        html = render_entry_advice_html(IndicatorFacts(rsi_overheat="<b>70</b> | 過熱"))
+
+        assert "<td>&lt;b&gt;70&lt;/b&gt; | 過熱</td>" in html
+
+
+class TestEntryAdviceCache:
+    """facts をキーにした LRU のテスト"""
+
+    def test_equal_facts_hit_and_least_recently_used_is_evicted(self):
+        cache = EntryAdviceCache(max_entries=2)
+        calls = []
+
+        def render(facts):
+            calls.append(facts.current_price)
+            return render_entry_advice_html(facts)
+
+        first, second, third = TYPICAL_FACTS[:3]
+        html = cache.get_or_render(first, render)
+        # 同じ値の別インスタンスも同じキーになる
+        assert cache.get_or_render(first.model_copy(), render) == html
+        cache.get_or_render(second, render)
+        cache.get_or_render(first, render)
+        cache.get_or_render(third, render)  # second が追い出される
+        cache.get_or_render(second, render)
+
+        assert calls == [1100.5, 2398.0, 812.0, 2398.0]
+        assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 2, "misses": 4, "hit_rate": 0.3333}
+
+    def test_distinct_float_representations_are_not_conflated(self):
+        cache = EntryAdviceCache()
+
+        assert "<td>0.0</td>" in cache.get_or_render(IndicatorFacts(current_price=0.0), render_entry_advice_html)
+        assert "<td>-0.0</td>" in cache.get_or_render(IndicatorFacts(current_price=-0.0), render_entry_advice_html)
+
+    def test_generate_entry_advice_uses_shared_cache_unless_disabled(self, monkeypatch):
+        settings = entry_advice.get_settings()
+        monkeypatch.setattr(entry_advice, "_cache", None)
+        facts = TYPICAL_FACTS[0]
+
+        assert generate_entry_advice(facts) == generate_entry_advice(facts) == render_entry_advice_html(facts)
+        assert entry_advice.get_entry_advice_cache().stats()["hits"] == 1
+
+        monkeypatch.setattr(settings, "entry_advice_cache_size", 0)
+        assert entry_advice.get_entry_advice_cache() is None
+        assert generate_entry_advice(facts) == render_entry_advice_html(facts)
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from app.services.indicator_engine import IndicatorEngine
+from app.services.integrated_advice_service import IntegratedAdviceService
+from app.services.scoring import score_pivot
+
+
+def _bars(count, seed=1, start=2000.0):
+    rng = random.Random(seed)
+    price = start
+    bars = []
+    for i in range(count):
+        open_ = round(price * rng.uniform(0.99, 1.01), 1)
+        close = round(open_ * rng.uniform(0.97, 1.03), 1)
+        bars.append(
+            {
+                "date": f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}",
+                "open": open_,
+                "high": max(open_, close) + round(rng.uniform(0, 20), 1),
+                "low": min(open_, close) - round(rng.uniform(0, 20), 1),
+                "close": close,
+                "volume": float(rng.randint(10000, 300000)),
+            }
+        )
+        price = close
+    return bars
+
+
+def _mean(values):
+    return sum(values) / len(values)
+
+
+def _reference(bars):
+    """全履歴から毎回計算し直す素朴な実装"""
+    closes = [b["close"] for b in bars]
+    n = len(bars)
+
+    def sma(window, end):
+        return _mean(closes[end - window : end]) if end >= window else None
+
+    def at(offset, key):
+        return bars[n - 1 - offset][key] if n - 1 - offset >= 0 else None
+
+    return {
+        "sma5": sma(5, n),
+        "sma20": sma(20, n),
+        "sma60": sma(60, n),
+        "sma5_5ago": sma(5, n - 5) if n - 5 >= 5 else None,
+        "sma20_5ago": sma(20, n - 5) if n - 5 >= 20 else None,
+        "sma60_5ago": sma(60, n - 5) if n - 5 >= 60 else None,
+        "volMA5": _mean([b["volume"] for b in bars[-5:]]) if n >= 5 else None,
+        "prevHigh": at(1, "high"),
+        "prevLow": at(1, "low"),
+        "prevClose": at(1, "close"),
+        "prev2High": at(2, "high"),
+        "prev2Low": at(2, "low"),
+    }
+
+
+def _assert_matches(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, key
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-12), key
+
+
+def test_rolling_indicators_match_full_recompute():
+    bars = _bars(150)
+    engine = IndicatorEngine()
+    for i, bar in enumerate(bars):
+        snapshot = engine.update("7203", bar)
+        _assert_matches(snapshot.indicators, _reference(bars[: i + 1]))
+        assert snapshot.bar_count == i + 1
+        assert snapshot.pivot_input["sma20"] == snapshot.indicators["sma20"]
+        assert snapshot.pivot_input["sma60_5ago"] == snapshot.indicators["sma60_5ago"]
+
+
+def test_same_date_revises_latest_bar():
+    bars = _bars(70)
+    engine = IndicatorEngine()
+    engine.extend("6758", bars[:-1])
+
+    intraday = dict(bars[-1], close=bars[-1]["close"] * 1.02, volume=5000.0)
+    engine.update("6758", intraday)
+    final = engine.update("6758", bars[-1])
+
+    assert final.bar_count == 70
+    _assert_matches(final.indicators, _reference(bars))
+    assert final.pivot_input["close"] == bars[-1]["close"]
+
+
+def test_recent_pivot_bars_ago_tracks_scored_pivots():
+    bars = _bars(90, seed=4)
+    engine = IndicatorEngine()
+    last_pivot = None
+    for i, bar in enumerate(bars):
+        snapshot = engine.update("9984", bar)
+        if score_pivot(snapshot.pivot_input)["isPivot"]:
+            last_pivot = i
+        expected = None if last_pivot is None else i - last_pivot
+        assert snapshot.recent_pivot_bars_ago == expected
+        assert snapshot.context()["recentPivotBarsAgo"] == expected
+
+
+def test_symbols_are_independent():
+    engine = IndicatorEngine()
+    engine.extend("A", _bars(10, seed=1))
+    engine.extend("B", _bars(3, seed=2))
+
+    assert engine.snapshot("A").bar_count == 10
+    assert engine.snapshot("B").bar_count == 3
+    assert engine.snapshot("C") is None
+
+
+def test_integrated_service_uses_engine_snapshot():
+    engine = IndicatorEngine()
+    engine.extend("7203", _bars(80, seed=9))
+    service = IntegratedAdviceService("test_api_key", indicator_engine=engine)
+
+    snapshot = service._find_snapshot("7203 トヨタ自動車")
+    assert snapshot is engine.snapshot("7203")
+    assert service._find_snapshot("未登録銘柄") is None
+
+    context = service._create_analysis_context(1000.0, "long", snapshot)
+    assert context["recentPivotBarsAgo"] == snapshot.recent_pivot_bars_ago
+    assert context["entry_price"] == 1000.0
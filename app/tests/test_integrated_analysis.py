@@ -1,13 +1,19 @@
+import asyncio
 import json
+import time
 from unittest.mock import Mock, patch
 
 import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 
 # テスト対象のモジュール
+from app.routers import integrated_advice
 from app.schemas.indicators import IndicatorItem, TradingAnalysis
 from app.services.analysis_integrator import AnalysisIntegrator
 from app.services.gpt_analyzer import GPTAnalyzer
 from app.services.integrated_advice_service import IntegratedAdviceService
+from app.services.registry import get_integrated_advice_service
 from app.services.rule_based_analyzer import RuleBasedAnalyzer
 
 
@@ -65,7 +71,7 @@ class TestRuleBasedAnalyzer:
 
     @pytest.fixture
     def analyzer(self):
-        return RuleBasedAnalyzer()
+        return RuleBasedAnalyzer(engine="subprocess")
 
     @pytest.fixture
     def sample_bar_data(self):
@@ -241,6 +247,48 @@ class TestAnalysisIntegrator:
         assert any("出来高" in ind.name for ind in merged)
         assert any("RSI" in ind.name for ind in merged)
 
+    async def test_stages_run_concurrently(self, integrator):
+        """pivot / entry / GPT が並行に走り、所要時間が最も遅いステージ程度になる"""
+
+        def slow(result):
+            def run(*args):
+                time.sleep(0.2)
+                return result
+
+            return run
+
+        integrator.rule_analyzer.analyze_pivot_v13 = slow({"final": 80, "isPivot": True})
+        integrator.rule_analyzer.analyze_entry_v04 = slow({"final": 75, "label": "エントリー可"})
+        integrator.gpt_analyzer.analyze_chart_image = slow({})
+
+        analysis = await integrator.integrate_analysis({}, {}, {}, "", position_type="long")
+
+        assert (analysis.pivot_score, analysis.entry_score, analysis.fallback_stages) == (80, 75, [])
+        assert set(analysis.stage_timings) == {"pivot", "entry", "gpt", "total"}
+        assert min(analysis.stage_timings[name] for name in ("pivot", "entry", "gpt")) >= 200
+        assert analysis.stage_timings["total"] < 450
+
+    async def test_timed_out_and_failed_stages_fall_back(self):
+        """タイムアウト・例外のステージはフォールバック結果で統合を続ける"""
+        integrator = AnalysisIntegrator("test_api_key", rule_timeout=1.0, gpt_timeout=0.05)
+
+        async def hanging_gpt(*args):
+            await asyncio.sleep(1)
+
+        def broken_entry(*args):
+            raise RuntimeError("scorer crashed")
+
+        integrator.rule_analyzer.analyze_pivot_v13 = lambda bar: {"final": 90, "isPivot": True}
+        integrator.rule_analyzer.analyze_entry_v04 = broken_entry
+        integrator.gpt_analyzer.analyze_chart_image = hanging_gpt
+
+        analysis = await integrator.integrate_analysis({}, {}, {}, "")
+
+        assert analysis.fallback_stages == ["entry", "gpt"]
+        assert (analysis.pivot_score, analysis.entry_score, analysis.entry_label) == (90, 50, "見送り")
+        assert all(ind.source == "rule_based" for ind in analysis.indicators)
+        assert analysis.stage_timings["total"] < 500
+
 
 class TestIntegratedAdviceService:
     """統合アドバイスサービスのテスト"""
@@ -269,6 +317,57 @@ class TestIntegratedAdviceService:
         assert "recentPivotBarsAgo" in context
 
 
+class TestBatchIntegratedAnalysis:
+    """バッチ統合分析エンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        service = IntegratedAdviceService("test_api_key")
+        pivot_result = {**service.integrator.rule_analyzer._get_fallback_pivot_result(), "final": 80, "isPivot": True}
+
+        def slow_pivot(bar_data):
+            time.sleep(0.1)
+            return pivot_result
+
+        service.integrator.rule_analyzer.analyze_pivot_v13 = slow_pivot
+        monkeypatch.setattr(integrated_advice.settings, "openai_api_key", "sk-test")
+
+        app = FastAPI()
+        app.include_router(integrated_advice.router, prefix="/api/v1")
+        app.dependency_overrides[get_integrated_advice_service] = lambda: service
+        with TestClient(app) as test_client:
+            yield test_client
+
+    def test_symbols_are_analyzed_concurrently_and_streamed_as_ndjson(self, client):
+        symbols = [f"{code}" for code in range(1301, 1307)]
+
+        response = client.post(
+            "/api/v1/integrated-analysis/batch?concurrency=3",
+            data={"symbols": ",".join(symbols), "position_type": "long"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        results, done = lines[:-1], lines[-1]
+        assert sorted(line["index"] for line in results) == list(range(6))
+        assert all(line["symbol"] == symbols[line["index"]] for line in results)
+        assert all(line["analysis"]["pivot_score"] == 80 for line in results)
+        # 6件 × 100ms を 3 並行で処理する（直列なら 600ms 以上）
+        assert done["done"] and done["count"] == 6
+        assert 200 <= done["elapsed_ms"] < 550
+
+    def test_files_and_symbols_must_line_up(self, client):
+        files = [("files", (f"{n}.png", b"png", "image/png")) for n in range(2)]
+
+        response = client.post("/api/v1/integrated-analysis/batch", files=files, data={"symbols": "7203"})
+        assert response.status_code == 400
+
+        response = client.post("/api/v1/integrated-analysis/batch", files=files, data={"symbols": "7203,6758"})
+        assert [json.loads(line).get("filename") for line in response.text.splitlines()][-1] is None
+        assert {json.loads(line)["filename"] for line in response.text.splitlines()[:-1]} == {"0.png", "1.png"}
+
+
 # テスト実行用の設定
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
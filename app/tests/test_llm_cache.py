@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.services import llm_cache
+from app.services.llm_cache import LLMResponseCache, MemoryCacheBackend, SQLiteCacheBackend, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(text, tokens=100):
+    return {"choices": [{"message": {"content": text}}], "usage": {"total_tokens": tokens}}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryCacheBackend(max_entries=2)
+    else:
+        store = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+        yield store
+        store.close()
+
+
+def test_key_depends_on_image_template_model_and_context():
+    base = dict(model="gpt-4o-mini", template="prompt", image=b"png", symbol_context="7203", analysis_context="entry")
+    key = make_cache_key(**base)
+
+    assert key == make_cache_key(**dict(base))
+    assert key != make_cache_key(**{**base, "image": b"png2"})
+    assert key != make_cache_key(**{**base, "template": "prompt v2"})
+    assert key != make_cache_key(**{**base, "model": "gpt-4o"})
+    assert key != make_cache_key(**{**base, "symbol_context": "6758"})
+    assert key != make_cache_key(**{**base, "position_type": "short"})
+
+
+def test_ttl_expiry(backend):
+    clock = Clock()
+    cache = LLMResponseCache(backend, ttl=60, clock=clock)
+    cache.set("k", _response("a"))
+
+    clock.now += 59
+    assert cache.get("k") == _response("a")
+    clock.now += 2
+    assert cache.get("k") is None
+
+
+def test_lru_eviction_keeps_recently_used(backend):
+    clock = Clock()
+    cache = LLMResponseCache(backend, ttl=60, clock=clock)
+    cache.set("a", _response("a"))
+    clock.now += 1
+    cache.set("b", _response("b"))
+    clock.now += 1
+    assert cache.get("a") is not None  # a を最近使用に
+    clock.now += 1
+    cache.set("c", _response("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+async def test_get_or_call_counts_hits_and_savings(backend):
+    cache = LLMResponseCache(backend, ttl=60)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return _response("analysis", tokens=250)
+
+    first = await cache.get_or_call("k", call)
+    second = await cache.get_or_call("k", call)
+
+    assert first == second
+    assert calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["saved_tokens"] == 250
+    assert stats["saved_seconds"] >= 0.02
+    assert stats["hit_rate"] == 0.5
+
+
+async def test_errors_are_not_cached():
+    cache = LLMResponseCache(MemoryCacheBackend(), ttl=60)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_call("k", fail)
+    assert len(cache.backend) == 0
+
+
+def test_sqlite_backend_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    writer = LLMResponseCache(SQLiteCacheBackend(path), ttl=60)
+    writer.set("k", _response("shared"))
+
+    reader = LLMResponseCache(SQLiteCacheBackend(path), ttl=60)
+    assert reader.get("k") == _response("shared")
+
+
+async def test_cached_completion_disabled(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: None)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return _response("x")
+
+    for _ in range(2):
+        await llm_cache.cached_completion(call, model="m", template="t", image=b"i")
+    assert calls == 2
@@ -0,0 +1,148 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_async_db
+from app.routers import advice, integrated_advice
+from app.services import llm_streaming
+from app.services.llm_streaming import MockLLMStreamer, StockNameFilter
+from app.services.llm_transport import LLMTransport, LLMTransportError
+
+ANSWER = "STOCK_NAME_EXTRACTED: トヨタ自動車（7203）\n📊 トヨタ自動車 チャート分析\n⸻\n✅ 上昇トレンド継続\n"
+EXPECTED = "📊 トヨタ自動車 チャート分析\n⸻\n✅ 上昇トレンド継続\n"
+
+
+def _filter_chunks(chunks):
+    name_filter = StockNameFilter()
+    text = "".join(name_filter.feed(chunk) for chunk in chunks) + name_filter.flush()
+    return text, name_filter.stock_name
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 21, 200])
+def test_filter_strips_marker_for_any_chunking(size):
+    chunks = [ANSWER[i : i + size] for i in range(0, len(ANSWER), size)]
+    text, name = _filter_chunks(chunks)
+
+    assert text == EXPECTED
+    assert name == "トヨタ自動車（7203）"
+
+
+def test_filter_passes_through_lines_that_only_look_like_the_marker():
+    text, name = _filter_chunks(["STOCK", " price\n", "  STOCK_NAME", "_EXTRACTED: 6758", "\nend"])
+
+    assert text == "STOCK price\nend"
+    assert name == "6758"
+
+
+def test_filter_handles_marker_without_trailing_newline():
+    text, name = _filter_chunks(["本文\n", "STOCK_NAME_EXTRACTED: 9984"])
+
+    assert text == "本文\n"
+    assert name == "9984"
+
+
+def _sse_body(deltas):
+    lines = []
+    for delta in deltas:
+        lines.append("data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}, ensure_ascii=False))
+        lines.append("")
+    lines += ["data: [DONE]", ""]
+    return "\n".join(lines).encode("utf-8")
+
+
+async def test_transport_stream_chat_parses_deltas_and_retries_before_first_byte():
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        if len(calls) == 1:
+            return httpx.Response(503, text="busy")
+        return httpx.Response(200, content=_sse_body(["こん", "にちは"]), headers={"Content-Type": "text/event-stream"})
+
+    transport = LLMTransport("sk-test", backoff_base=0.0, transport=httpx.MockTransport(handler))
+    try:
+        deltas = [d async for d in transport.stream_chat({"model": "gpt-4o-mini", "messages": []})]
+    finally:
+        await transport.aclose()
+
+    assert deltas == ["こん", "にちは"]
+    assert len(calls) == 2
+    assert calls[1]["stream"] is True
+
+
+async def test_transport_stream_chat_does_not_retry_client_errors():
+    transport = LLMTransport("sk-test", transport=httpx.MockTransport(lambda request: httpx.Response(400, text="bad")))
+    try:
+        with pytest.raises(LLMTransportError) as excinfo:
+            [d async for d in transport.stream_chat({"model": "gpt-4o-mini", "messages": []})]
+    finally:
+        await transport.aclose()
+
+    assert excinfo.value.status_code == 400
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(advice, "get_llm_streamer", lambda: MockLLMStreamer(ANSWER, chunk_size=4))
+    monkeypatch.setattr(integrated_advice, "get_llm_streamer", lambda: MockLLMStreamer(ANSWER, chunk_size=4))
+    monkeypatch.setattr(llm_streaming, "get_llm_cache", lambda: None)
+
+    app = FastAPI()
+    app.include_router(advice.router)
+    app.include_router(integrated_advice.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = lambda: None
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_advice_text_stream_emits_tokens_then_done_and_saves_chat(client, monkeypatch):
+    saved = []
+
+    async def fake_save(chat_id, user_message, bot_response):
+        saved.append((chat_id, user_message, bot_response))
+
+    monkeypatch.setattr(advice, "_save_streamed_messages", fake_save)
+
+    response = client.post("/advice?stream=true", json={"message": "7203はどう？", "chat_id": "chat-1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1] == ("done", {"message": EXPECTED, "extracted_stock_name": "トヨタ自動車（7203）"})
+    assert "".join(tokens) == EXPECTED
+    assert saved == [("chat-1", "7203はどう？", EXPECTED.strip())]
+
+
+def test_quick_analysis_stream(client, monkeypatch):
+    monkeypatch.setattr(integrated_advice.settings, "openai_api_key", "sk-test")
+
+    response = client.post(
+        "/api/v1/quick-analysis?stream=true",
+        files={"file": ("chart.png", b"\x89PNG", "image/png")},
+        data={"symbol": "7203"},
+    )
+
+    events = _events(response.text)
+    assert events[-1] == ("done", {"message": EXPECTED, "extracted_stock_name": "7203"})
+
+
+def test_mock_streamer_default_answer_mentions_user_text():
+    payload = {"messages": [{"role": "user", "content": [{"type": "text", "text": "チャートを解析"}]}]}
+
+    text = MockLLMStreamer()._answer(payload)
+
+    assert text.startswith("STOCK_NAME_EXTRACTED:")
+    assert "チャートを解析" in text
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.schemas.exit_feedback import ExitFeedbackRequest
+from app.services import llm_gateway
+from app.services.exit_feedback_service import ExitFeedbackService
+from app.services.llm_transport import LLMTransport, LLMTransportError
+
+
+class StubOpenAI:
+    """ローカルで `/chat/completions` を模擬するスタブサーバー"""
+
+    def __init__(self):
+        self.script = []  # 先頭から順に (status, delay) を返す。尽きたら 200
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests.append({"path": self.path, "auth": self.headers.get("Authorization"), "body": body})
+                    status, delay = stub.script.pop(0) if stub.script else (200, stub.delay)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(delay)
+                    if status == 200:
+                        content = f"echo: {body['messages'][-1]['content']}"
+                        payload = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+                    else:
+                        payload = {"error": {"message": f"status {status}"}}
+                    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if status == 429:
+                        self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubOpenAI() as server:
+        yield server
+
+
+def _transport(stub, **kwargs):
+    options = {"max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.05, "timeout": 5.0}
+    options.update(kwargs)
+    return LLMTransport(api_key="sk-test", base_url=stub.base_url, **options)
+
+
+async def test_chat_text_round_trip(stub):
+    transport = _transport(stub)
+    try:
+        text = await transport.chat_text([{"role": "user", "content": "こんにちは"}], model="gpt-4o-mini")
+    finally:
+        await transport.aclose()
+
+    assert text == "echo: こんにちは"
+    assert stub.requests[0]["path"] == "/v1/chat/completions"
+    assert stub.requests[0]["auth"] == "Bearer sk-test"
+    assert stub.requests[0]["body"]["model"] == "gpt-4o-mini"
+
+
+async def test_retries_on_429_and_5xx(stub):
+    stub.script = [(429, 0), (503, 0)]
+    transport = _transport(stub)
+    try:
+        text = await transport.chat_text([{"role": "user", "content": "retry"}])
+    finally:
+        await transport.aclose()
+
+    assert text == "echo: retry"
+    assert len(stub.requests) == 3
+
+
+async def test_client_errors_are_not_retried(stub):
+    stub.script = [(400, 0)]
+    transport = _transport(stub)
+    try:
+        with pytest.raises(LLMTransportError) as excinfo:
+            await transport.chat_text([{"role": "user", "content": "bad"}])
+    finally:
+        await transport.aclose()
+
+    assert excinfo.value.status_code == 400
+    assert len(stub.requests) == 1
+
+
+async def test_per_request_timeout_retries_then_fails(stub):
+    stub.delay = 0.5
+    transport = _transport(stub, max_retries=1)
+    try:
+        with pytest.raises(LLMTransportError, match="ReadTimeout"):
+            await transport.chat_text([{"role": "user", "content": "slow"}], timeout=0.1)
+    finally:
+        await transport.aclose()
+
+    assert len(stub.requests) == 2
+
+
+async def test_concurrency_is_bounded_and_loop_stays_responsive(stub):
+    stub.delay = 0.2
+    transport = _transport(stub, max_concurrency=2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    tick_task = asyncio.create_task(ticker())
+    try:
+        results = await asyncio.gather(*(transport.chat_text([{"role": "user", "content": str(i)}]) for i in range(6)))
+    finally:
+        tick_task.cancel()
+        await transport.aclose()
+
+    assert sorted(results) == sorted(f"echo: {i}" for i in range(6))
+    assert stub.max_active == 2
+    # 3波 x 0.2秒の間もイベントループは回り続けている
+    assert ticks >= 20
+
+
+async def test_llm_gateway_uses_shared_transport(stub, monkeypatch):
+    transport = _transport(stub)
+    monkeypatch.setattr(llm_gateway, "get_llm_transport", lambda: transport)
+    monkeypatch.setattr(llm_gateway, "MOCK_AI", False)
+    try:
+        text = await llm_gateway.chat_completion([{"role": "user", "content": "gateway"}])
+    finally:
+        await transport.aclose()
+
+    assert text == "echo: gateway"
+    assert stub.requests[0]["body"]["temperature"] == 0.2
+
+
+async def test_exit_feedback_chart_analysis_goes_through_transport(stub, monkeypatch):
+    monkeypatch.setattr("app.services.exit_feedback_service.MOCK_AI", False)
+    transport = _transport(stub)
+    service = ExitFeedbackService("sk-test", transport=transport)
+    request = ExitFeedbackRequest(symbol="7203", entry_price=1000, exit_price=1100, position_type="long", quantity=100)
+    try:
+        analysis = await service._analyze_chart_with_gpt(request, b"\x89PNG")
+    finally:
+        await transport.aclose()
+
+    assert analysis.startswith("echo: ")
+    content = stub.requests[0]["body"]["messages"][0]["content"]
+    assert content[1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
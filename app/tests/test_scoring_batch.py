@@ -0,0 +1,128 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services.rule_based_analyzer import RuleBasedAnalyzer
+from app.services.scoring import score_entry_v04, score_pivot, score_series
+from app.services.scoring.batch import bars_since, prepare_columns
+
+PIVOT_KEYS = ("candle", "location", "slope", "volume")
+ENTRY_KEYS = ("MA", "Candle", "Volume")
+
+
+def _sma(values, window):
+    out = [None] * len(values)
+    for i in range(window - 1, len(values)):
+        out[i] = sum(values[i - window + 1 : i + 1]) / window
+    return out
+
+
+def _random_series(length=400, seed=7, base=2900.0):
+    rng = random.Random(seed)
+    opens, highs, lows, closes, volumes = [], [], [], [], []
+    price = base
+    for _ in range(length):
+        open_ = round(price * rng.uniform(0.98, 1.02), 1)
+        close = round(open_ * rng.uniform(0.96, 1.04), 1)
+        high = max(open_, close) + rng.choice([0, round(price * rng.uniform(0, 0.02), 1)])
+        low = min(open_, close) - rng.choice([0, round(price * rng.uniform(0, 0.02), 1)])
+        opens.append(open_)
+        highs.append(high)
+        lows.append(low)
+        closes.append(close)
+        volumes.append(rng.randint(0, 400000))
+        price = close
+    return {
+        "open": opens,
+        "high": highs,
+        "low": lows,
+        "close": closes,
+        "volume": volumes,
+        "volMA5": _sma(volumes, 5),
+        "sma5": _sma(closes, 5),
+        "sma20": _sma(closes, 20),
+        "sma60": _sma(closes, 60),
+    }
+
+
+def _bar_dicts(columns):
+    """バッチ側と同じ補完（前日値・5本前SMA）を行った1本ずつの入力"""
+    cols = prepare_columns(columns)
+    for i in range(len(cols["close"])):
+        values = {key: (None if math.isnan(cols[key][i]) else float(cols[key][i])) for key in cols}
+        bar = {key: values[key] for key in ("open", "high", "low", "close", "volume")}
+        bar.update({key: values[key] for key in ("volMA5", "sma20", "sma60", "sma20_5ago", "sma60_5ago")})
+        indicators = {
+            key: values[key]
+            for key in (
+                "sma5",
+                "sma20",
+                "sma60",
+                "sma5_5ago",
+                "sma20_5ago",
+                "sma60_5ago",
+                "volMA5",
+                "prevHigh",
+                "prevLow",
+                "prevClose",
+                "prev2High",
+                "prev2Low",
+            )
+        }
+        yield bar, indicators
+
+
+@pytest.mark.parametrize("seed,base", [(7, 2900.0), (11, 9800.0), (23, 480.0)])
+def test_batch_matches_per_bar_scoring(seed, base):
+    columns = _random_series(seed=seed, base=base)
+    result = score_series(columns)
+    pivot, entry = result["pivot"], result["entry"]
+    pivot_distance = bars_since(pivot["isPivot"])
+
+    for i, (bar, indicators) in enumerate(_bar_dicts(columns)):
+        expected_pivot = score_pivot(bar)
+        for key in PIVOT_KEYS:
+            assert pivot[key][i] == expected_pivot["scores"][key], (i, key)
+        assert pivot["final"][i] == expected_pivot["final"], i
+        assert bool(pivot["isPivot"][i]) == expected_pivot["isPivot"], i
+
+        bars_ago = None if math.isnan(pivot_distance[i]) else int(pivot_distance[i])
+        expected_entry = score_entry_v04(bar, indicators, {"recentPivotBarsAgo": bars_ago})
+        for key in ENTRY_KEYS:
+            assert entry[key][i] == expected_entry["scores"][key], (i, key)
+        assert entry["final"][i] == expected_entry["final"], i
+        assert entry["label"][i] == expected_entry["label"], i
+        assert bool(entry["gatePassed"][i]) == expected_entry["gatePassed"], (i, bars_ago)
+
+
+def test_batch_accepts_explicit_pivot_distance_and_options():
+    columns = _random_series(length=120, seed=3)
+    bars_ago = [2] * 120
+    options = {"pivotLookbackBars": 1, "entryCutoff": 50}
+    entry = score_series(columns, recent_pivot_bars_ago=bars_ago, options=options)["entry"]
+
+    assert not entry["gatePassed"].any()
+    assert set(entry["label"]) == {"見送り"}
+
+
+def test_bars_since_counts_from_latest_flag():
+    flags = np.array([False, True, False, False, True, False])
+    result = bars_since(flags)
+
+    assert math.isnan(result[0])
+    assert result[1:].tolist() == [0, 1, 2, 0, 1]
+
+
+def test_analyzer_exposes_batch_api():
+    columns = _random_series(length=80, seed=5)
+    result = RuleBasedAnalyzer(engine="python").score_series(columns)
+
+    assert len(result["pivot"]["final"]) == 80
+    assert len(result["entry"]["label"]) == 80
+
+
+def test_missing_ohlcv_column_is_rejected():
+    with pytest.raises(ValueError, match="volume"):
+        score_series({"open": [1], "high": [1], "low": [1], "close": [1]})
@@ -0,0 +1,170 @@
+"""pivot v1.3 / entry v0.4 のPython移植とNode版（dist）のパリティ検証
+
+tests/sample_indicators/*.json は価格ヒント（エントリー価格・損切り・目標値など）なので、
+そこから価格水準を取り出してOHLCVバーとSMA文脈を組み立て、乱数ケースと合わせて両実装に通す。
+score / label / isPivot を含む結果全体が一致しなければ失敗する。
+"""
+
+import json
+import random
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.services.scoring import score_entry_v04, score_pivot
+from app.services.scoring_pool import NodeScoringPool
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="Node.js runtime not available")
+
+SAMPLE_DIR = Path(__file__).resolve().parents[2] / "tests" / "sample_indicators"
+PRICE_KEYS = ("entry_price", "current_price", "recent_high", "recent_low", "stop_loss", "target1", "target2")
+RANDOM_CASES = 500
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = NodeScoringPool(size=1, call_timeout=10.0, health_interval=0)
+    yield pool
+    pool.close()
+
+
+def _collect_prices(node, out):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in PRICE_KEYS:
+                if isinstance(value, (int, float)):
+                    out.append(float(value))
+                elif isinstance(value, str):
+                    out.extend(float(m.replace(",", "")) for m in re.findall(r"\d[\d,]*(?:\.\d+)?", value))
+            else:
+                _collect_prices(value, out)
+    elif isinstance(node, list):
+        for value in node:
+            _collect_prices(value, out)
+    return out
+
+
+def _sample_cases():
+    """サンプルの価格水準からバー・指標・文脈の組み合わせを作る"""
+    cases = []
+    for path in sorted(SAMPLE_DIR.glob("*.json")):
+        prices = _collect_prices(json.loads(path.read_text(encoding="utf-8")), [])
+        assert prices, f"{path.name} に価格情報がありません"
+        high, low = max(prices), min(prices)
+        mid = prices[0]
+        for open_, close in ((low, high), (high, low), (mid, high), (mid, mid)):
+            for sma_offset in (-0.02, -0.005, 0.0, 0.008, 0.03):
+                sma20 = mid * (1 + sma_offset)
+                for slope in (-0.01, 0.0, 0.01):
+                    bar = {
+                        "open": open_,
+                        "high": high,
+                        "low": low,
+                        "close": close,
+                        "volume": 150000,
+                        "volMA5": 100000,
+                        "sma20": sma20,
+                        "sma60": sma20 * 0.99,
+                        "sma20_5ago": sma20 * (1 - slope),
+                        "sma60_5ago": sma20 * 0.99 * (1 - slope / 2),
+                    }
+                    indicators = {
+                        "sma5": mid,
+                        "sma20": sma20,
+                        "sma60": sma20 * 0.99,
+                        "sma5_5ago": mid * (1 - slope),
+                        "sma20_5ago": bar["sma20_5ago"],
+                        "sma60_5ago": bar["sma60_5ago"],
+                        "volMA5": 100000,
+                        "prevHigh": (high + mid) / 2,
+                        "prevLow": low,
+                        "prevClose": mid,
+                    }
+                    cases.append((path.name, bar, indicators, {"recentPivotBarsAgo": 2}))
+    return cases
+
+
+def _random_cases(seed=1234):
+    rng = random.Random(seed)
+
+    def maybe(value):
+        return None if rng.random() < 0.1 else value
+
+    cases = []
+    for i in range(RANDOM_CASES):
+        base = rng.choice([500, 2999, 3000, 5000, 9999.5, 10000, 25000])
+        open_ = round(base * rng.uniform(0.95, 1.05), rng.choice([0, 1, 2]))
+        close = round(base * rng.uniform(0.95, 1.05), rng.choice([0, 1, 2]))
+        # 上下髭なし・ゼロレンジのバーも混ぜる
+        high = max(open_, close) + rng.choice([0, base * rng.uniform(0, 0.03)])
+        low = min(open_, close) - rng.choice([0, base * rng.uniform(0, 0.03)])
+        bar = {
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": rng.randint(0, 300000),
+            "volMA5": maybe(rng.randint(0, 200000)),
+            "sma20": maybe(round(base * rng.uniform(0.97, 1.03), 1)),
+            "sma60": maybe(round(base * rng.uniform(0.95, 1.05), 1)),
+            "sma20_5ago": maybe(base * rng.uniform(0.97, 1.03)),
+            "sma60_5ago": maybe(base * rng.uniform(0.95, 1.05)),
+        }
+        indicators = {
+            "sma5": maybe(base * rng.uniform(0.97, 1.03)),
+            "sma20": bar["sma20"],
+            "sma60": bar["sma60"],
+            "sma5_5ago": maybe(base * rng.uniform(0.97, 1.03)),
+            "sma20_5ago": bar["sma20_5ago"],
+            "sma60_5ago": bar["sma60_5ago"],
+            "volMA5": bar["volMA5"],
+            "prevHigh": maybe(base * rng.uniform(1.0, 1.04)),
+            "prevLow": maybe(base * rng.uniform(0.94, 1.0)),
+            "prevClose": maybe(base * rng.uniform(0.96, 1.04)),
+            "prev2High": maybe(base * rng.uniform(1.0, 1.06)),
+            "prev2Low": maybe(base * rng.uniform(0.92, 1.0)),
+        }
+        context = {"recentPivotBarsAgo": maybe(rng.randint(0, 6))}
+        cases.append((f"random-{i}", bar, indicators, context))
+    return cases
+
+
+def _assert_pivot_parity(pool, case_id, bar):
+    expected = pool.call("pivot", bar)
+    actual = score_pivot(bar)
+    assert actual["final"] == expected["final"], case_id
+    assert actual["isPivot"] == expected["isPivot"], case_id
+    assert actual == expected, case_id
+
+
+def _assert_entry_parity(pool, case_id, bar, indicators, context):
+    expected = pool.call("entry", {"bar": bar, "indicators": indicators, "context": context})
+    actual = score_entry_v04(bar, indicators, context)
+    assert actual["final"] == expected["final"], case_id
+    assert actual["label"] == expected["label"], case_id
+    assert actual == expected, case_id
+
+
+def test_parity_on_sample_indicators(pool):
+    cases = _sample_cases()
+    assert cases
+    for case_id, bar, indicators, context in cases:
+        _assert_pivot_parity(pool, case_id, bar)
+        _assert_entry_parity(pool, case_id, bar, indicators, context)
+
+
+def test_parity_on_random_bars(pool):
+    for case_id, bar, indicators, context in _random_cases():
+        _assert_pivot_parity(pool, case_id, bar)
+        _assert_entry_parity(pool, case_id, bar, indicators, context)
+
+
+def test_parity_with_entry_option_overrides(pool):
+    _, bar, indicators, _ = _sample_cases()[0]
+    context = {
+        "recentPivotBarsAgo": 5,
+        "options": {"pivotLookbackBars": 6, "allowEpsilonOnSMA5": 0.02, "entryCutoff": 60, "strongCutoff": 75},
+    }
+    _assert_entry_parity(pool, "options", bar, indicators, context)
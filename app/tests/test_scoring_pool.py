@@ -0,0 +1,95 @@
+import shutil
+
+import pytest
+
+from app.services.rule_based_analyzer import RuleBasedAnalyzer
+from app.services.scoring_pool import ENTRY_MODULE, PIVOT_MODULE, NodeScoringPool, ScoringTimeout
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="Node.js runtime not available")
+
+SAMPLE_BAR = {
+    "date": "2024-01-15",
+    "open": 1000,
+    "high": 1120,
+    "low": 980,
+    "close": 1110,
+    "volume": 150000,
+    "volMA5": 100000,
+    "sma20": 1000,
+    "sma60": 950,
+    "sma20_5ago": 980,
+    "sma60_5ago": 940,
+}
+
+SAMPLE_INDICATORS = {
+    "sma5": 1050,
+    "sma20": 1000,
+    "sma60": 950,
+    "sma5_5ago": 1030,
+    "sma20_5ago": 980,
+    "sma60_5ago": 940,
+    "volMA5": 100000,
+    "prevHigh": 1070,
+    "prevLow": 970,
+    "prevClose": 1020,
+}
+
+
+@pytest.fixture
+def pool():
+    pool = NodeScoringPool(size=2, call_timeout=5.0, health_interval=0)
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_subprocess_engine(pool, monkeypatch):
+    """常駐ワーカーの結果が従来の `node -e` 方式と一致すること"""
+    monkeypatch.setattr("app.services.rule_based_analyzer.get_scoring_pool", lambda: pool)
+    context = {"recentPivotBarsAgo": 2, "priceBand": "mid"}
+
+    legacy = RuleBasedAnalyzer(engine="subprocess")
+    pooled = RuleBasedAnalyzer(engine="pool")
+
+    assert pooled.analyze_pivot_v13(SAMPLE_BAR) == legacy.analyze_pivot_v13(SAMPLE_BAR)
+    assert pooled.analyze_entry_v04(SAMPLE_BAR, SAMPLE_INDICATORS, context) == legacy.analyze_entry_v04(
+        SAMPLE_BAR, SAMPLE_INDICATORS, context
+    )
+
+
+def test_pool_restarts_crashed_worker(pool):
+    pool.start()
+    worker = pool._idle.get()
+    worker.process.kill()
+    worker.process.wait()
+    pool._idle.put(worker)
+
+    for _ in range(pool.size):
+        assert pool.call("ping", None) == "pong"
+    assert pool.restarts >= 1
+
+
+def test_health_check_reports_all_workers(pool):
+    status = pool.health_check()
+
+    assert status["checked"] == pool.size
+    assert status["healthy"] == pool.size
+
+
+def test_pool_times_out_and_replaces_hung_worker(tmp_path):
+    hung_script = tmp_path / "hung_worker.mjs"
+    hung_script.write_text("process.stdin.resume();\n")
+
+    pool = NodeScoringPool(
+        size=1,
+        call_timeout=0.3,
+        health_interval=0,
+        worker_script=str(hung_script),
+        pivot_module=PIVOT_MODULE,
+        entry_module=ENTRY_MODULE,
+    )
+    try:
+        with pytest.raises(ScoringTimeout):
+            pool.call("pivot", SAMPLE_BAR)
+        assert pool.restarts == 1
+    finally:
+        pool.close()
@@ -0,0 +1,53 @@
+import markdown2
+import pytest
+
+from app.services import registry as registry_module
+from app.services.registry import (
+    ServiceRegistry,
+    get_exit_feedback_service,
+    get_integrated_advice_service,
+    get_service_registry,
+    shutdown_service_registry,
+)
+
+MARKDOWN = "| 項目 | 状況 |\n| --- | --- |\n| RSI | 過熱 |\n"
+
+
+class TestServiceRegistry:
+    """アプリケーション共通のサービスレジストリのテスト"""
+
+    @pytest.fixture
+    def registry(self, tmp_path):
+        return ServiceRegistry("sk-test", str(tmp_path))
+
+    def test_templates_are_compiled_once_and_cached_as_bytecode(self, registry, tmp_path):
+        assert registry.warm() == 3
+        assert len(list(tmp_path.iterdir())) == 3
+
+        # 別のワーカーは同じバイトコードキャッシュから読む
+        other = ServiceRegistry("sk-test", str(tmp_path))
+        assert other.warm() == 3
+        assert other.templates.get_template("exit_feedback.j2") is other.exit_feedback.jinja_env.get_template(
+            "exit_feedback.j2"
+        )
+
+    def test_services_share_the_compiled_environment(self, registry):
+        assert registry.exit_feedback.jinja_env is registry.templates
+        assert registry.integrated_advice.template is registry.templates.get_template("integrated_analysis.j2")
+
+    def test_reused_markdown_converter_matches_one_off_conversion(self, registry):
+        expected = markdown2.markdown(MARKDOWN, extras=["tables"])
+        assert registry.table_markdown.convert(MARKDOWN) == expected
+        assert registry.table_markdown.convert(MARKDOWN) == expected
+        assert registry.markdown.convert("**強い**") == markdown2.markdown("**強い**")
+
+    def test_dependencies_return_process_wide_instances(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(registry_module.get_settings(), "template_cache_dir", str(tmp_path))
+        shutdown_service_registry()
+        try:
+            registry = get_service_registry()
+            assert get_service_registry() is registry
+            assert get_integrated_advice_service() is registry.integrated_advice
+            assert get_exit_feedback_service() is registry.exit_feedback
+        finally:
+            shutdown_service_registry()
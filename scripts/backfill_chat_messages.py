@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+chats.messages_json（旧形式のメッセージ配列）を chat_messages 行へ展開する一回限りのバックフィル
+
+使用方法:
+    python scripts/backfill_chat_messages.py                   # DATABASE_URL_SYNC / DATABASE_URL に対して実行
+    python scripts/backfill_chat_messages.py --dry-run         # 件数だけ確認
+    python scripts/backfill_chat_messages.py --clear-json      # 展開済みチャットの messages_json を NULL にする
+    python scripts/backfill_chat_messages.py --batch-size 200 --database-url postgresql+psycopg2://...
+
+チャットを id 順にバッチで読み、バッチごとに 1 回の複数行 INSERT とコミットを行う。
+行IDはチャットIDと配列内の位置から決まる UUIDv5 で、ON CONFLICT DO NOTHING で挿入するため
+途中で中断しても再実行で重複しない。created_at はチャット作成日時に配列順のマイクロ秒を足した値
+（旧形式の timestamp は "HH:MM" のみで日付を持たないため）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.engine import Engine
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.upsert import dialect_insert  # noqa: E402
+from app.models import Chat, ChatMessage  # noqa: E402
+from app.routers.advice import BOT_AUTHOR_ID, USER_AUTHOR_ID  # noqa: E402
+
+LEGACY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "gptset:chats.messages_json")
+
+
+def _naive_utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def legacy_rows(chat_id: str, raw: str, base_time: Optional[datetime]) -> Tuple[List[Dict[str, Any]], int]:
+    """messages_json を chat_messages の行に変換する。戻り値は (行, スキップ件数)。"""
+    messages = json.loads(raw)
+    if not isinstance(messages, list):
+        raise ValueError(f"messages_json is not a list (got {type(messages).__name__})")
+
+    base = _naive_utc(base_time)
+    rows: List[Dict[str, Any]] = []
+    skipped = 0
+    for index, item in enumerate(messages):
+        if not isinstance(item, dict):
+            skipped += 1
+            continue
+        content = item.get("content", item.get("text"))
+        if content is None or content == "":
+            skipped += 1
+            continue
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        legacy_id = item.get("id") or ""
+        rows.append(
+            {
+                "id": str(uuid.uuid5(LEGACY_NAMESPACE, f"{chat_id}:{index}:{legacy_id}")),
+                "chat_id": chat_id,
+                "type": "TEXT",
+                "author_id": BOT_AUTHOR_ID if item.get("type") == "bot" else USER_AUTHOR_ID,
+                "text": content,
+                "created_at": base + timedelta(microseconds=index),
+            }
+        )
+    return rows, skipped
+
+
+def _insert_ignore(engine: Engine):
+    return dialect_insert(engine.dialect.name, ChatMessage).on_conflict_do_nothing(index_elements=["id"])
+
+
+def backfill(engine: Engine, batch_size: int = 500, clear_json: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    stats = {"chats": 0, "messages": 0, "skipped": 0, "errors": 0}
+    insert_stmt = _insert_ignore(engine)
+    last_id = ""
+
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(
+                select(Chat.id, Chat.messages_json, Chat.created_at)
+                .where(Chat.id > last_id, Chat.messages_json.is_not(None), Chat.messages_json != "")
+                .order_by(Chat.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            rows: List[Dict[str, Any]] = []
+            converted: List[str] = []
+            for chat_id, raw, created_at in batch:
+                try:
+                    chat_rows, skipped = legacy_rows(chat_id, raw, created_at)
+                except ValueError as e:  # json.JSONDecodeError を含む
+                    print(f"  skip chat {chat_id}: {e}")
+                    stats["errors"] += 1
+                    continue
+                rows.extend(chat_rows)
+                converted.append(chat_id)
+                stats["skipped"] += skipped
+
+            stats["chats"] += len(converted)
+            stats["messages"] += len(rows)
+            if dry_run:
+                continue
+            if rows:
+                conn.execute(insert_stmt, rows)
+            if clear_json and converted:
+                conn.execute(update(Chat).where(Chat.id.in_(converted)).values(messages_json=None))
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.settings import get_settings
+
+    parser = argparse.ArgumentParser(description="chats.messages_json を chat_messages 行へ展開")
+    parser.add_argument("--database-url", default=None, help="同期接続URL（既定: 設定の sync_database_url）")
+    parser.add_argument("--batch-size", type=int, default=500, help="1トランザクションで処理するチャット数")
+    parser.add_argument("--clear-json", action="store_true", help="展開したチャットの messages_json を NULL にする")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに件数だけ表示")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url or get_settings().sync_database_url)
+    started = time.perf_counter()
+    try:
+        stats = backfill(engine, batch_size=args.batch_size, clear_json=args.clear_json, dry_run=args.dry_run)
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"{prefix}Backfilled {stats['messages']:,} messages from {stats['chats']:,} chats "
+        f"({elapsed:.1f}s, skipped={stats['skipped']}, errors={stats['errors']})"
+    )
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
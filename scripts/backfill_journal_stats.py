@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+trade_journal から /journal/stats のロールアップ（journal_rollups）を作り直す
+
+使用方法:
+    python scripts/backfill_journal_stats.py                      # 全ユーザー
+    python scripts/backfill_journal_stats.py --user-id <uuid>     # 指定ユーザーだけ
+    python scripts/backfill_journal_stats.py --database-url postgresql+asyncpg://...
+
+通常は close_trade が差分更新するので、導入時とロールアップの整合確認時だけ使う。
+1トランザクションで削除と再作成を行う。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.journal_stats import rebuild_rollups  # noqa: E402
+
+
+async def backfill(engine: AsyncEngine, user_ids: Optional[List[UUID]] = None) -> int:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        buckets = await rebuild_rollups(session, user_ids)
+        await session.commit()
+    return buckets
+
+
+async def _run(database_url: str, user_ids: Optional[List[UUID]]) -> int:
+    engine = create_async_engine(database_url)
+    try:
+        return await backfill(engine, user_ids)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.settings import get_settings
+
+    parser = argparse.ArgumentParser(description="trade_journal から journal_rollups を再構築")
+    parser.add_argument("--database-url", default=None, help="非同期接続URL（既定: 設定の async_database_url）")
+    parser.add_argument("--user-id", type=UUID, action="append", help="対象ユーザー（複数指定可、既定: 全ユーザー）")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    buckets = asyncio.run(_run(args.database_url or get_settings().async_database_url, args.user_id))
+    print(f"Rebuilt {buckets:,} rollup buckets ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
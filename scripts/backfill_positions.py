@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+既存の ENTRY/EXIT チャットメッセージから建玉台帳（positions / position_events）を構築する
+
+使用方法:
+    python scripts/backfill_positions.py                        # DATABASE_URL に対して実行
+    python scripts/backfill_positions.py --dry-run              # 件数だけ確認
+    python scripts/backfill_positions.py --batch-size 1000 --database-url postgresql+asyncpg://...
+
+メッセージを (created_at, id) 順にバッチで読み、position_events に ON CONFLICT DO NOTHING で
+挿入する（再実行しても重複しない）。最後に影響した tradeId の建玉をイベントから畳み直す。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.upsert import dialect_insert  # noqa: E402
+from app.models import ChatMessage, PositionEvent  # noqa: E402
+from app.services.positions_ledger import LEDGER_TYPES, event_from_message, rebuild_trades  # noqa: E402
+
+
+def _insert_ignore(engine: AsyncEngine):
+    return dialect_insert(engine.dialect.name, PositionEvent).on_conflict_do_nothing(index_elements=["message_id"])
+
+
+async def backfill(engine: AsyncEngine, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+    stats = {"messages": 0, "events": 0, "skipped": 0, "trades": 0}
+    insert_stmt = _insert_ignore(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    trade_ids: Set[str] = set()
+    last_key = None
+
+    while True:
+        async with session_factory() as session:
+            stmt = (
+                select(
+                    ChatMessage.id, ChatMessage.chat_id, ChatMessage.type, ChatMessage.payload, ChatMessage.created_at
+                )
+                .where(ChatMessage.type.in_(LEDGER_TYPES))
+                .order_by(ChatMessage.created_at, ChatMessage.id)
+                .limit(batch_size)
+            )
+            if last_key is not None:
+                stmt = stmt.where(tuple_(ChatMessage.created_at, ChatMessage.id) > last_key)
+            batch = (await session.execute(stmt)).all()
+            if not batch:
+                break
+            last_key = (batch[-1].created_at, batch[-1].id)
+
+            events = [event for event in (event_from_message(row._asdict()) for row in batch) if event is not None]
+            stats["messages"] += len(batch)
+            stats["events"] += len(events)
+            stats["skipped"] += len(batch) - len(events)
+            trade_ids.update(event["trade_id"] for event in events)
+            if not dry_run and events:
+                await session.execute(insert_stmt, events)
+                await session.commit()
+
+    stats["trades"] = len(trade_ids)
+    if dry_run:
+        return stats
+
+    ordered = sorted(trade_ids)
+    for start in range(0, len(ordered), batch_size):
+        async with session_factory() as session:
+            await rebuild_trades(session, ordered[start : start + batch_size])
+            await session.commit()
+    return stats
+
+
+async def _run(database_url: str, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    engine = create_async_engine(database_url)
+    try:
+        return await backfill(engine, batch_size=batch_size, dry_run=dry_run)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.settings import get_settings
+
+    parser = argparse.ArgumentParser(description="ENTRY/EXIT メッセージから建玉台帳を構築")
+    parser.add_argument("--database-url", default=None, help="非同期接続URL（既定: 設定の async_database_url）")
+    parser.add_argument("--batch-size", type=int, default=500, help="1トランザクションで処理するメッセージ数")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに件数だけ表示")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = asyncio.run(_run(args.database_url or get_settings().async_database_url, args.batch_size, args.dry_run))
+    elapsed = time.perf_counter() - started
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"{prefix}Recorded {stats['events']:,} events for {stats['trades']:,} trades "
+        f"from {stats['messages']:,} messages ({elapsed:.1f}s, skipped={stats['skipped']})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""Benchmark NumPy batch scoring against looping the per-bar pivot/entry scorers."""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.scoring import score_entry_v04, score_pivot, score_series  # noqa: E402
+from app.services.scoring.batch import prepare_columns  # noqa: E402
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumsum = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1 :] = (cumsum[window:] - cumsum[:-window]) / window
+    return out
+
+
+def synthetic_series(bars: int, seed: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    close = np.round(3000 * np.exp(np.cumsum(rng.normal(0, 0.015, bars))), 1)
+    open_ = np.round(close * (1 + rng.normal(0, 0.008, bars)), 1)
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, bars)))
+    volume = rng.integers(10_000, 500_000, bars).astype(np.float64)
+    return {
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+        "volMA5": rolling_mean(volume, 5),
+        "sma5": rolling_mean(close, 5),
+        "sma20": rolling_mean(close, 20),
+        "sma60": rolling_mean(close, 60),
+    }
+
+
+def loop_series(columns: dict[str, np.ndarray]) -> None:
+    cols = prepare_columns(columns)
+    pivot_keys = ("open", "high", "low", "close", "volume", "volMA5", "sma20", "sma60", "sma20_5ago", "sma60_5ago")
+    last_pivot = None
+    for i in range(len(cols["close"])):
+        row = {key: (None if math.isnan(values[i]) else float(values[i])) for key, values in cols.items()}
+        pivot = score_pivot({key: row[key] for key in pivot_keys})
+        if pivot["isPivot"]:
+            last_pivot = i
+        bars_ago = None if last_pivot is None else i - last_pivot
+        score_entry_v04(row, row, {"recentPivotBarsAgo": bars_ago})
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=20, help="number of synthetic symbols")
+    parser.add_argument("--bars", type=int, default=1250, help="daily bars per symbol (~5 years)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    universe = [synthetic_series(args.bars, args.seed + n) for n in range(args.symbols)]
+    total = args.symbols * args.bars
+
+    started = time.perf_counter()
+    for columns in universe:
+        score_series(columns)
+    batch_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for columns in universe:
+        loop_series(columns)
+    loop_elapsed = time.perf_counter() - started
+
+    print(f"bars scored:    {total:,} ({args.symbols} symbols x {args.bars} bars)")
+    print(f"per-bar loop:   {loop_elapsed:8.3f}s  ({total / loop_elapsed:,.0f} bars/s)")
+    print(f"numpy batch:    {batch_elapsed:8.3f}s  ({total / batch_elapsed:,.0f} bars/s)")
+    print(f"speedup:        {loop_elapsed / batch_elapsed:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+"""Benchmark chat message writes: select-then-write flow vs the single-round-trip statements.
+
+Counts the statements each flow sends per operation and times them. Defaults to
+a temporary SQLite file; pass --database-url postgresql+asyncpg://... to measure
+the data-modifying-CTE path (the chats / chat_messages tables must exist there
+or be creatable).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.models import Chat, ChatMessage  # noqa: E402
+from app.services.chat_writes import append_messages, edit_message, live_chat_condition, remove_message  # noqa: E402
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _row(message_id: str) -> dict:
+    return {
+        "id": message_id,
+        "type": "TEXT",
+        "author_id": "bench",
+        "text": "hello",
+        "payload": None,
+        "created_at": _now().replace(tzinfo=None),
+    }
+
+
+async def legacy_flow(db, chat_id: str, message_id: str) -> None:
+    """変更前のルーター実装と同じ順序の読み書き"""
+    # create
+    chat = (await db.execute(select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None)))).scalar_one()
+    now = _now()
+    await db.execute(insert(ChatMessage).values(chat_id=chat.id, **_row(message_id)))
+    await db.execute(update(Chat).where(Chat.id == chat_id).values(updated_at=now))
+    await db.commit()
+    # update
+    message = (await db.execute(select(ChatMessage).where(ChatMessage.id == message_id))).scalar_one()
+    now = _now()
+    await db.execute(
+        update(ChatMessage)
+        .where(ChatMessage.id == message_id)
+        .values(text="edited", updated_at=now.replace(tzinfo=None))
+    )
+    await db.execute(update(Chat).where(Chat.id == message.chat_id).values(updated_at=now))
+    await db.commit()
+    (await db.execute(select(ChatMessage).where(ChatMessage.id == message_id))).scalar_one()
+    # delete
+    (await db.execute(select(Chat).where(Chat.id == chat_id, Chat.deleted_at.is_(None)))).scalar_one()
+    (
+        await db.execute(select(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.chat_id == chat_id))
+    ).scalar_one()
+    await db.execute(delete(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.chat_id == chat_id))
+    await db.execute(update(Chat).where(Chat.id == chat_id).values(updated_at=_now()))
+    await db.commit()
+
+
+async def single_round_trip_flow(db, chat_id: str, message_id: str) -> None:
+    now = _now()
+    assert await append_messages(db, chat_id, [_row(message_id)], touched_at=now)
+    await db.commit()
+    now = _now()
+    assert await edit_message(db, message_id, {"text": "edited", "updated_at": now.replace(tzinfo=None)}, now)
+    await db.commit()
+    assert await remove_message(db, message_id, _now(), live_chat_condition(chat_id))
+    await db.commit()
+
+
+async def run(database_url: str, iterations: int) -> None:
+    engine = create_async_engine(database_url)
+    tables = [Chat.metadata.tables[Chat.__tablename__], ChatMessage.metadata.tables[ChatMessage.__tablename__]]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Chat.metadata.create_all(sync_conn, tables=tables, checkfirst=True))
+
+    chat_id = f"bench-{uuid.uuid4()}"
+    async with engine.begin() as conn:
+        await conn.execute(insert(Chat).values(id=chat_id, name="bench", created_at=_now(), updated_at=_now()))
+
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"database:   {engine.dialect.name} ({iterations} x create/update/delete)")
+    try:
+        for label, flow in (("legacy", legacy_flow), ("single", single_round_trip_flow)):
+            statements = 0
+            started = time.perf_counter()
+            async with session_factory() as db:
+                for _ in range(iterations):
+                    await flow(db, chat_id, str(uuid.uuid4()))
+            elapsed = time.perf_counter() - started
+            print(
+                f"{label:<10}  {statements / iterations:5.1f} statements/cycle  "
+                f"{elapsed:8.3f}s  ({elapsed / iterations * 1000:.2f} ms/cycle)"
+            )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        async with engine.begin() as conn:
+            await conn.execute(delete(ChatMessage).where(ChatMessage.chat_id == chat_id))
+            await conn.execute(delete(Chat).where(Chat.id == chat_id))
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="async SQLAlchemy URL (default: temporary sqlite+aiosqlite file)")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.iterations))
+        return 0
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.sqlite3'}", args.iterations))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
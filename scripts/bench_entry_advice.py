@@ -0,0 +1,107 @@
+"""Benchmark entry-advice HTML rendering: Markdown round trip vs direct HTML vs the LRU memo.
+
+markdown: estimate_strategy -> Markdown template -> markdown2 (tables), the previous path
+direct:   estimate_strategy -> entry_advice.html.j2, no Markdown step
+cached:   generate_entry_advice with the LRU; requests draw from --distinct fact sets, so
+          after warm-up most calls are hits (the first call for each set renders directly)
+
+Fact sets cover the three strategy branches (short setup, long setup, no pattern) with
+varying prices. Every set is checked to render the same HTML on both uncached paths.
+
+    python scripts/bench_entry_advice.py --distinct 50 --iterations 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.schemas.indicator_facts import IndicatorFacts  # noqa: E402
+from app.services.entry_advice import (  # noqa: E402
+    EntryAdviceCache,
+    render_entry_advice_html,
+    render_entry_advice_markdown,
+)
+
+# (trend_check, rsi_overheat, price_action, volume_trend)
+SETUPS = [
+    ("下降トレンド", "RSI高値圏", "陰線", "増加"),
+    ("上昇トレンド", "RSI上昇中", "陽線", "増加"),
+    ("レンジ", "中立", "コマ", "横ばい"),
+]
+
+
+def fact_sets(count: int, seed: int) -> List[IndicatorFacts]:
+    rng = random.Random(seed)
+    facts = []
+    for n in range(count):
+        price = round(rng.uniform(500, 5000), 1)
+        trend, rsi, action, volume = SETUPS[n % len(SETUPS)]
+        facts.append(
+            IndicatorFacts(
+                symbol=f"{1300 + n}",
+                trend_check=trend,
+                rsi_overheat=rsi,
+                price_action=action,
+                volume_trend=volume,
+                current_price=price,
+                recent_high=round(price * 1.05, 1),
+                recent_low=round(price * 0.95, 1),
+                rsi_value=round(rng.uniform(20, 80), 1),
+                sma_touch=rng.random() < 0.5,
+            )
+        )
+    return facts
+
+
+def _timeit(fn: Callable[[IndicatorFacts], str], requests: List[IndicatorFacts]) -> List[float]:
+    samples = []
+    for facts in requests:
+        started = time.perf_counter()
+        fn(facts)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct fact sets in the request mix")
+    parser.add_argument("--iterations", type=int, default=2000, help="requests per path")
+    parser.add_argument("--cache-size", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    facts = fact_sets(args.distinct, args.seed)
+    for item in facts:
+        assert render_entry_advice_html(item) == render_entry_advice_markdown(item), item
+    rng = random.Random(args.seed)
+    requests = [rng.choice(facts) for _ in range(args.iterations)]
+
+    cache = EntryAdviceCache(args.cache_size)
+    results = {
+        "markdown (template + markdown2)": _timeit(render_entry_advice_markdown, requests),
+        "direct (HTML template)": _timeit(render_entry_advice_html, requests),
+        "cached (LRU + direct)": _timeit(lambda item: cache.get_or_render(item, render_entry_advice_html), requests),
+    }
+
+    print(f"{args.iterations} requests over {args.distinct} fact sets (µs per call)")
+    for name, samples in results.items():
+        p95 = sorted(samples)[int(len(samples) * 0.95)]
+        print(f"  {name:32s} median {statistics.median(samples):9.1f}  p95 {p95:9.1f}")
+    markdown, direct, cached = (statistics.median(samples) for samples in results.values())
+    print(f"  direct vs markdown: {markdown / direct:.1f}x, cached vs markdown: {markdown / cached:.1f}x")
+    print(f"  cache: {cache.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+"""Benchmark /journal/ page serialization: per-row ORM + models vs row tuples straight to JSON.
+
+legacy: ORM entities -> json.loads of the TEXT JSON columns -> one JournalEntryResponse
+        per row -> FastAPI's response_model pass (validate, dump to jsonable, json.dumps)
+rows:   column tuples -> one TypeAdapter(List[JournalEntryResponse]) validation -> dump_json
+
+Both paths serialize the same page fetched from an in-memory SQLite database, so the
+numbers isolate serialization cost. Use --fetch to include the query in the timing.
+
+    python scripts/bench_journal_list.py --rows 100 --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.models import TradeJournal  # noqa: E402
+from app.schemas.journal import JournalEntryResponse  # noqa: E402
+from app.services.journal_query import ENTRY_COLUMNS  # noqa: E402
+
+ENTRIES = TypeAdapter(List[JournalEntryResponse])
+BASE = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _journal_rows(count: int) -> list:
+    return [
+        {
+            "journal_id": n + 1,
+            "trade_uuid": uuid4(),
+            "chat_id": f"chat-{n % 7}",
+            "symbol": "7203",
+            "side": "LONG",
+            "avg_entry": 1000.0,
+            "avg_exit": 1000.0 + n,
+            "qty": 100,
+            "pnl_abs": float(n * 100),
+            "pnl_pct": n / 10,
+            "hold_minutes": 30 + n,
+            "closed_at": BASE + timedelta(minutes=n),
+            "feedback_text": "利確が早すぎました。トレーリングストップを検討しましょう。",
+            "feedback_tone": "advice",
+            "feedback_next_actions": ["トレーリングストップを設定", "出来高を確認", "分割利確"],
+            "feedback_message_id": f"m-{n}",
+            "analysis_score": 70,
+            "analysis_labels": ["breakout", "volume"],
+            "created_at": BASE,
+            "updated_at": BASE,
+        }
+        for n in range(count)
+    ]
+
+
+def legacy_page(entities, raw_json) -> bytes:
+    """変更前の get_journal_entries と FastAPI の response_model 処理"""
+    response_entries = []
+    for entry in entities:
+        raw = raw_json[entry.journal_id]
+        response_entries.append(
+            JournalEntryResponse(
+                trade_id=entry.trade_uuid,
+                chat_id=entry.chat_id,
+                symbol=entry.symbol,
+                side=entry.side,
+                avg_entry=entry.avg_entry,
+                avg_exit=entry.avg_exit,
+                qty=entry.qty,
+                pnl_abs=entry.pnl_abs,
+                pnl_pct=entry.pnl_pct,
+                hold_minutes=entry.hold_minutes,
+                closed_at=entry.closed_at,
+                feedback_text=entry.feedback_text,
+                feedback_tone=entry.feedback_tone,
+                feedback_next_actions=json.loads(raw[0]) if raw[0] else None,
+                feedback_message_id=entry.feedback_message_id,
+                analysis_score=entry.analysis_score,
+                analysis_labels=json.loads(raw[1]) if raw[1] else None,
+                created_at=entry.created_at,
+                updated_at=entry.updated_at,
+            )
+        )
+    content = ENTRIES.dump_python(ENTRIES.validate_python(response_entries), mode="json", by_alias=True)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def rows_page(rows) -> bytes:
+    return ENTRIES.dump_json(ENTRIES.validate_python(rows, from_attributes=True), by_alias=True)
+
+
+def _timeit(fn, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        table = TradeJournal.metadata.tables[TradeJournal.__tablename__]
+        await conn.run_sync(lambda sync_conn: TradeJournal.metadata.create_all(sync_conn, tables=[table]))
+        await conn.execute(insert(TradeJournal), _journal_rows(args.rows))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    page_query = select(TradeJournal).order_by(TradeJournal.closed_at.desc()).limit(args.rows)
+    rows_query = (
+        select(TradeJournal.journal_id, *ENTRY_COLUMNS).order_by(TradeJournal.closed_at.desc()).limit(args.rows)
+    )
+    async with session_factory() as session:
+        entities = (await session.execute(page_query)).scalars().all()
+        rows = (await session.execute(rows_query)).all()
+    # 変更前は TEXT 列に json.dumps した文字列を保存していた
+    raw_json = {
+        entry.journal_id: (json.dumps(entry.feedback_next_actions), json.dumps(entry.analysis_labels))
+        for entry in entities
+    }
+    assert json.loads(legacy_page(entities, raw_json)) == json.loads(rows_page(rows))
+
+    results = {
+        "legacy (ORM + per-row models)": _timeit(lambda: legacy_page(entities, raw_json), args.iterations),
+        "rows (tuples -> dump_json)": _timeit(lambda: rows_page(rows), args.iterations),
+    }
+
+    if args.fetch:
+        loop_samples: Dict[str, List[float]] = {"legacy + fetch": [], "rows + fetch": []}
+        async with session_factory() as session:
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                fetched = (await session.execute(page_query)).scalars().all()
+                legacy_page(fetched, raw_json)
+                loop_samples["legacy + fetch"].append((time.perf_counter() - started) * 1e6)
+                session.expunge_all()
+
+                started = time.perf_counter()
+                rows_page((await session.execute(rows_query)).all())
+                loop_samples["rows + fetch"].append((time.perf_counter() - started) * 1e6)
+        results.update(loop_samples)
+    await engine.dispose()
+
+    print(f"{args.rows}-row page, {args.iterations} iterations (µs per page)")
+    for name, samples in results.items():
+        p95 = sorted(samples)[int(len(samples) * 0.95)]
+        print(f"  {name:32s} median {statistics.median(samples):9.1f}  p95 {p95:9.1f}")
+    legacy, current = (statistics.median(samples) for samples in list(results.values())[:2])
+    print(f"  serialization speedup: {legacy / current:.1f}x")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--fetch", action="store_true", help="also time query + serialization")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+"""Benchmark per-request service construction vs the application-scoped service registry.
+
+legacy:   what each request used to pay before doing any real work -
+          IntegratedAdviceService (reads + parses integrated_analysis.j2, builds the analyzers),
+          ExitFeedbackService (new Jinja Environment, so exit_feedback.j2 is compiled again on
+          first render) and a fresh markdown2 converter for the entry-advice HTML
+registry: the FastAPI dependencies returning the shared instances + the same renders
+
+The renders are included on both sides so the numbers show the per-request overhead that
+remains; --no-render times construction/lookup alone.
+
+    python scripts/bench_service_registry.py --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import markdown2
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.exit_feedback_service import ExitFeedbackService  # noqa: E402
+from app.services.integrated_advice_service import IntegratedAdviceService  # noqa: E402
+from app.services.registry import ServiceRegistry  # noqa: E402
+
+MARKDOWN = "\n".join(
+    [
+        "## ✅ 現在の状況（10:00時点）",
+        "",
+        "| 項目 | 状況 |",
+        "| --- | --- |",
+        *(f"| 指標{n} | 良好 |" for n in range(8)),
+        "",
+        "- 押し目を待つ",
+        "- 出来高を確認",
+    ]
+)
+FEEDBACK = {
+    "trade_summary": "7203 ロング 1000円 → 1050円 (100株)",
+    "profit_loss": 5000.0,
+    "profit_loss_rate": 5.0,
+    "reflection_items": [],
+    "memo_comment": "利確が早すぎました。",
+}
+
+
+def legacy_request(render: bool) -> None:
+    advice = IntegratedAdviceService("sk-bench")
+    feedback = ExitFeedbackService("sk-bench")
+    if render:
+        advice.template.render(analysis=None)
+        feedback._render_feedback_template(**FEEDBACK)
+        markdown2.markdown(MARKDOWN, extras=["tables"])
+
+
+def registry_request(registry: ServiceRegistry, render: bool) -> None:
+    advice = registry.integrated_advice
+    feedback = registry.exit_feedback
+    if render:
+        advice.template.render(analysis=None)
+        feedback._render_feedback_template(**FEEDBACK)
+        registry.table_markdown.convert(MARKDOWN)
+
+
+def _timeit(fn: Callable[[], None], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--no-render", action="store_true", help="time construction / lookup only")
+    args = parser.parse_args(argv)
+    render = not args.no_render
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        started = time.perf_counter()
+        registry = ServiceRegistry("sk-bench", cache_dir)
+        compiled = registry.warm()
+        cold_ms = (time.perf_counter() - started) * 1000
+        # 2つ目のワーカー: バイトコードキャッシュからテンプレートを読む
+        started = time.perf_counter()
+        ServiceRegistry("sk-bench", cache_dir).warm()
+        warm_ms = (time.perf_counter() - started) * 1000
+
+        assert registry.table_markdown.convert(MARKDOWN) == markdown2.markdown(MARKDOWN, extras=["tables"])
+        results = {
+            "legacy (build per request)": _timeit(lambda: legacy_request(render), args.iterations),
+            "registry (shared instances)": _timeit(lambda: registry_request(registry, render), args.iterations),
+        }
+
+    print(f"registry startup: {cold_ms:.1f} ms ({compiled} templates), {warm_ms:.1f} ms with bytecode cache")
+    print(f"{args.iterations} requests, {'with' if render else 'without'} renders (µs per request)")
+    for name, samples in results.items():
+        p95 = sorted(samples)[int(len(samples) * 0.95)]
+        print(f"  {name:30s} median {statistics.median(samples):9.1f}  p95 {p95:9.1f}")
+    legacy, current = (statistics.median(samples) for samples in results.values())
+    print(f"  speedup: {legacy / current:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
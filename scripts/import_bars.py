@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+CSVダンプから OHLCV バーストア（app/services/bar_store.py）へ一括取り込みするスクリプト
+
+使用方法:
+    python scripts/import_bars.py data/csv/              # ディレクトリ内の *.csv を全て取り込み
+    python scripts/import_bars.py 7203.csv 6758.csv      # 銘柄ごとのCSV（ファイル名=証券コード）
+    python scripts/import_bars.py all_daily.csv          # コード列を含む全銘柄CSV
+    python scripts/import_bars.py --timeframe intraday --root data/bars 5min/*.csv
+
+CSVはヘッダー付きで、日付・始値・高値・安値・終値・出来高の列を持つこと
+（英語 / 日本語の列名どちらも可、UTF-8 または Shift_JIS）。コード列が無い場合は
+ファイル名（"7203.csv" / "7203.T.csv"）を銘柄コードとして扱う。
+既に格納済みの日時以前の行はスキップするので、同じダンプを再実行しても重複しない。
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.bar_store import BarStore, BarStoreError  # noqa: E402
+
+COLUMN_ALIASES = {
+    "code": ("code", "symbol", "ticker", "コード", "銘柄コード", "証券コード"),
+    "date": ("date", "datetime", "timestamp", "日付", "年月日", "日時"),
+    "time": ("time", "時刻", "時間"),
+    "open": ("open", "始値"),
+    "high": ("high", "高値"),
+    "low": ("low", "安値"),
+    "close": ("close", "終値", "adj close"),
+    "volume": ("volume", "出来高"),
+}
+REQUIRED = ("date", "open", "high", "low", "close", "volume")
+ENCODINGS = ("utf-8-sig", "cp932")
+
+Row = Tuple[str, float, float, float, float, float]
+
+
+def map_columns(header: List[str]) -> Dict[str, int]:
+    """ヘッダーの列名を標準名 -> 列番号に対応付ける"""
+    normalized = [h.strip().lower() for h in header]
+    mapping: Dict[str, int] = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                mapping[key] = normalized.index(alias)
+                break
+    return mapping
+
+
+def normalize_code(value: str) -> str:
+    code = value.strip()
+    if code.upper().endswith(".T"):
+        code = code[:-2]
+    return code
+
+
+def read_csv(path: Path) -> List[List[str]]:
+    for encoding in ENCODINGS:
+        try:
+            with open(path, newline="", encoding=encoding) as fh:
+                rows = list(csv.reader(fh))
+            return rows
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Unsupported encoding: {path}")
+
+
+def parse_file(path: Path) -> Dict[str, List[Row]]:
+    """CSVを読み、銘柄コードごとの行リストを返す"""
+    rows = read_csv(path)
+    if not rows:
+        return {}
+    header, body = rows[0], rows[1:]
+    mapping = map_columns(header)
+    missing = [key for key in REQUIRED if key not in mapping]
+    if missing:
+        raise ValueError(f"{path.name}: required columns not found: {missing} (header={header})")
+
+    default_code = normalize_code(path.stem)
+    grouped: Dict[str, List[Row]] = defaultdict(list)
+    for line_no, row in enumerate(body, start=2):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        try:
+            code = normalize_code(row[mapping["code"]]) if "code" in mapping else default_code
+            stamp = row[mapping["date"]].strip().replace("/", "-")
+            if "time" in mapping and row[mapping["time"]].strip():
+                stamp = f"{stamp}T{row[mapping['time']].strip()}"
+            open_, high, low, close, volume = (
+                float(row[mapping[key]].replace(",", "")) for key in ("open", "high", "low", "close", "volume")
+            )
+        except (IndexError, ValueError) as e:
+            print(f"  skip {path.name}:{line_no}: {e}")
+            continue
+        grouped[code].append((stamp.replace(" ", "T"), open_, high, low, close, volume))
+    return grouped
+
+
+def to_columns(rows: List[Row]) -> Dict[str, np.ndarray]:
+    """日時で並べ替え、同一日時は後勝ちで1行にまとめた列データ"""
+    ts = np.array([r[0] for r in rows], dtype="datetime64[s]").astype(np.int64)
+    values = np.array([r[1:] for r in rows], dtype=np.float64)
+    order = np.argsort(ts, kind="stable")
+    ts, values = ts[order], values[order]
+    # 同一タイムスタンプは最後の行を採用
+    keep = np.append(ts[1:] != ts[:-1], True)
+    ts, values = ts[keep], values[keep]
+    return {
+        "ts": ts,
+        "open": values[:, 0],
+        "high": values[:, 1],
+        "low": values[:, 2],
+        "close": values[:, 3],
+        "volume": values[:, 4],
+    }
+
+
+def collect_paths(inputs: List[str]) -> List[Path]:
+    paths: List[Path] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(sorted(path.rglob("*.csv")))
+        elif path.exists():
+            paths.append(path)
+        else:
+            print(f"Not found: {path}")
+    return paths
+
+
+def import_bars(inputs: List[str], root: str, timeframe: str = "daily", strict: bool = False) -> Dict[str, int]:
+    store = BarStore(root)
+    paths = collect_paths(inputs)
+    stats = {"files": 0, "symbols": 0, "rows": 0, "errors": 0}
+    symbols = set()
+
+    for path in paths:
+        try:
+            grouped = parse_file(path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            stats["errors"] += 1
+            continue
+        stats["files"] += 1
+        for code, rows in grouped.items():
+            try:
+                written = store.append(code, to_columns(rows), timeframe=timeframe, skip_existing=not strict)
+            except BarStoreError as e:
+                print(f"Error: {path.name} [{code}]: {e}")
+                stats["errors"] += 1
+                continue
+            symbols.add(code)
+            stats["rows"] += written
+
+    stats["symbols"] = len(symbols)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.settings import get_settings
+
+    parser = argparse.ArgumentParser(description="CSVダンプをOHLCVバーストアに一括取り込み")
+    parser.add_argument("inputs", nargs="+", help="CSVファイルまたはディレクトリ")
+    parser.add_argument("--root", default=None, help="バーストアのルート（既定: BAR_STORE_PATH）")
+    parser.add_argument("--timeframe", choices=("daily", "intraday"), default="daily")
+    parser.add_argument("--strict", action="store_true", help="格納済み以前の行があればスキップせずエラーにする")
+    args = parser.parse_args(argv)
+
+    root = args.root or get_settings().bar_store_path
+    started = time.perf_counter()
+    stats = import_bars(args.inputs, root, timeframe=args.timeframe, strict=args.strict)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Imported {stats['rows']:,} rows for {stats['symbols']:,} symbols "
+        f"from {stats['files']:,} files into {root} ({elapsed:.1f}s, errors={stats['errors']})"
+    )
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""Load test for the positions live feed: thousands of simulated subscribers on one hub.
+
+Each subscriber runs the real PositionsHub.serve loop with an in-memory send that
+sleeps to emulate network latency; a fraction of them are "slow" so their bounded
+queues overflow and drop to resnapshot. A publisher pushes upserts for random
+positions through the broker at a fixed rate. Reports delivery latency, the
+coalescing ratio and the feed metrics (event_queue_max, snapshot_http_ms, ...).
+
+    python scripts/load_positions_feed.py --subscribers 5000 --rate 2000 --duration 10
+    python scripts/load_positions_feed.py --broker postgres --database-url postgresql://...
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.positions_feed import (  # noqa: E402
+    InProcessBroker,
+    PositionsBroker,
+    PositionsHub,
+    PostgresNotifyBroker,
+    make_event,
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args: argparse.Namespace) -> None:
+    hub = PositionsHub(coalesce_window=args.coalesce_ms / 1000, max_pending=args.max_pending)
+    if args.broker == "postgres":
+        broker: PositionsBroker = PostgresNotifyBroker.from_database_url(args.database_url)
+    else:
+        broker = InProcessBroker()
+    await broker.start(hub)
+
+    rng = random.Random(args.seed)
+    chats = [f"chat-{n}" for n in range(args.chats)]
+    latencies: list[float] = []
+    received = 0
+
+    def make_send(delay: float):
+        async def send(event):
+            nonlocal received
+            received += 1
+            sent_at = event["payload"].get("sentAt")
+            if sent_at is not None:
+                latencies.append((time.perf_counter() - sent_at) * 1000)
+            if delay:
+                await asyncio.sleep(delay)
+
+        return send
+
+    async def load_snapshot():
+        await asyncio.sleep(args.snapshot_ms / 1000)
+        return []
+
+    tasks = []
+    slow_count = int(args.subscribers * args.slow_fraction)
+    for n in range(args.subscribers):
+        subscriber = hub.subscribe(chat_id=rng.choice(chats) if args.per_chat else None)
+        delay = args.slow_send_ms / 1000 if n < slow_count else args.send_ms / 1000
+        tasks.append(asyncio.create_task(hub.serve(subscriber, make_send(delay), load_snapshot)))
+
+    interval = 1 / args.rate
+    published = 0
+    started = time.perf_counter()
+    deadline = started + args.duration
+    while time.perf_counter() < deadline:
+        chat_id = rng.choice(chats)
+        position_id = f"{chat_id}:t-{rng.randrange(args.positions_per_chat)}"
+        event = make_event(
+            "positions.upsert",
+            {
+                "positionId": position_id,
+                "chatId": chat_id,
+                "qtyTotal": rng.randint(1, 1000),
+                "sentAt": time.perf_counter(),
+            },
+        )
+        await broker.publish(event, chat_id, None)
+        published += 1
+        next_at = started + published * interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+    await asyncio.sleep(args.coalesce_ms / 1000 * 4 + args.slow_send_ms / 1000)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await broker.stop()
+
+    metrics = hub.metrics.as_dict()
+    elapsed = time.perf_counter() - started
+    offered = metrics["delivered"] + metrics["coalesced"]
+    print(f"broker:            {type(broker).__name__}")
+    print(f"subscribers:       {args.subscribers:,} ({slow_count:,} slow, {'per-chat' if args.per_chat else 'all'})")
+    print(f"published:         {published:,} events in {elapsed:.1f}s ({published / elapsed:,.0f}/s)")
+    print(f"delivered:         {metrics['delivered']:,} (+{metrics['snapshots']:,} snapshots), {received:,} sends")
+    print(
+        f"coalesced:         {metrics['coalesced']:,} ({metrics['coalesced'] / offered:.1%} of queued)"
+        if offered
+        else ""
+    )
+    print(f"resnapshots:       {metrics['resnapshots']:,}")
+    print(f"event_queue_max:   {metrics['event_queue_max']}")
+    print(f"snapshot_http_ms:  avg {metrics['snapshot_http_ms_avg']} / max {metrics['snapshot_http_ms_max']}")
+    if latencies:
+        print(
+            f"delivery latency:  p50 {statistics.median(latencies):.1f}ms  "
+            f"p99 {_percentile(latencies, 99):.1f}ms  max {max(latencies):.1f}ms"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200, help="number of chats events are spread over")
+    parser.add_argument("--positions-per-chat", type=int, default=5)
+    parser.add_argument("--per-chat", action="store_true", help="subscribers filter by one chat (default: all)")
+    parser.add_argument("--rate", type=float, default=500, help="published events per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--coalesce-ms", type=float, default=50.0)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--send-ms", type=float, default=0.0, help="per-send latency of normal subscribers")
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--slow-send-ms", type=float, default=200.0, help="per-send latency of slow subscribers")
+    parser.add_argument("--snapshot-ms", type=float, default=5.0, help="simulated snapshot query time")
+    parser.add_argument("--broker", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--database-url", help="PostgreSQL URL for --broker postgres")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.broker == "postgres" and not args.database_url:
+        parser.error("--broker postgres requires --database-url")
+
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
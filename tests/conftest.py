@@ -1,17 +1,22 @@
 import os
 import pathlib
 import sys
+from dataclasses import dataclass
+from typing import List, Sequence
 from uuid import UUID
 
 import pytest
 import pytest_asyncio
-from sqlalchemy import text
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Table, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.database import async_engine, sync_engine  # noqa: E402
+from app.database import async_engine, get_async_db, sync_engine  # noqa: E402
 
 os.environ.setdefault("ENV", "test")
 
@@ -55,8 +60,8 @@ def prepare_test_state(request: pytest.FixtureRequest):
             conn.execute(
                 text(
                     """
-                    TRUNCATE TABLE chat_messages, chats, trade_journal, alerts,
-                    pattern_results, images, trades, users CASCADE
+                    TRUNCATE TABLE chat_messages, chats, trade_journal, journal_rollups, alerts,
+                    pattern_results, images, trades, users, analysis_jobs, positions, position_events CASCADE
                     """
                 )
             )
@@ -78,3 +83,45 @@ def prepare_test_state(request: pytest.FixtureRequest):
         pytest.skip(f"PostgreSQL database setup not available: {exc}")
     else:
         yield
+
+
+@dataclass
+class SQLiteApp:
+    app: FastAPI
+    client: AsyncClient
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+
+
+@pytest_asyncio.fixture
+async def sqlite_app(tmp_path):
+    """`await sqlite_app(tables, routers)` で、指定テーブルだけを作った SQLite に向けた FastAPI と AsyncClient を返す
+
+    既定はインメモリ DB。file=True なら tmp_path のファイル DB にする（複数接続から同時に触るジョブワーカーや、
+    別スレッドのループで動く TestClient から使う場合）。エンジンとクライアントはテスト終了時に閉じる。
+    """
+    opened: List[SQLiteApp] = []
+
+    async def factory(tables: Sequence[Table], routers: Sequence[APIRouter], *, file: bool = False) -> SQLiteApp:
+        url = f"sqlite+aiosqlite:///{tmp_path / f'app{len(opened)}.sqlite3'}" if file else "sqlite+aiosqlite://"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: tables[0].metadata.create_all(sync_conn, tables=list(tables)))
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def override_db():
+            async with session_factory() as session:
+                yield session
+
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router)
+        app.dependency_overrides[get_async_db] = override_db
+        client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+        opened.append(SQLiteApp(app, client, engine, session_factory))
+        return opened[-1]
+
+    yield factory
+    for env in reversed(opened):
+        await env.client.aclose()
+        await env.engine.dispose()
@@ -0,0 +1,124 @@
+import json
+from datetime import datetime
+
+import pytest
+from scripts.backfill_chat_messages import backfill, legacy_rows
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Chat, ChatMessage
+from app.routers.advice import BOT_AUTHOR_ID, USER_AUTHOR_ID, update_chat_messages
+
+pytestmark = pytest.mark.no_db
+
+TABLES = [Chat.__table__, ChatMessage.__table__]
+
+
+def _legacy(*pairs):
+    return json.dumps(
+        [{"id": str(i), "type": kind, "content": text, "timestamp": "09:00"} for i, (kind, text) in enumerate(pairs)],
+        ensure_ascii=False,
+    )
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Chat.metadata.create_all(engine, tables=TABLES)
+    yield engine
+    engine.dispose()
+
+
+def _add_chat(conn, chat_id, messages_json):
+    created = datetime(2025, 1, 1, 9, 0)
+    conn.execute(
+        insert(Chat).values(
+            id=chat_id, name=chat_id, messages_json=messages_json, created_at=created, updated_at=created
+        )
+    )
+
+
+def _messages(conn, chat_id):
+    stmt = select(ChatMessage).where(ChatMessage.chat_id == chat_id).order_by(ChatMessage.created_at)
+    return conn.execute(stmt).all()
+
+
+def test_legacy_rows_keeps_order_and_skips_empty_items():
+    raw = json.dumps([{"type": "user", "content": "質問"}, {"type": "bot", "content": ""}, "garbage", {"type": "bot"}])
+
+    rows, skipped = legacy_rows("c1", raw, datetime(2025, 1, 1))
+
+    assert [(r["author_id"], r["text"]) for r in rows] == [(USER_AUTHOR_ID, "質問")]
+    assert skipped == 3
+
+
+def test_backfill_explodes_blobs_in_batches_and_is_idempotent(engine):
+    with engine.begin() as conn:
+        for n in range(5):
+            _add_chat(conn, f"chat-{n}", _legacy(("user", f"q{n}"), ("bot", f"a{n}")))
+        _add_chat(conn, "broken", "{not json")
+        _add_chat(conn, "empty", None)
+
+    stats = backfill(engine, batch_size=2)
+    again = backfill(engine, batch_size=2)
+
+    assert stats == {"chats": 5, "messages": 10, "skipped": 0, "errors": 1}
+    assert again["messages"] == 10  # 再実行しても ON CONFLICT で増えない
+    with engine.connect() as conn:
+        assert conn.scalar(select(ChatMessage.id).where(ChatMessage.chat_id == "empty")) is None
+        rows = conn.execute(
+            select(ChatMessage.author_id, ChatMessage.text)
+            .where(ChatMessage.chat_id == "chat-3")
+            .order_by(ChatMessage.created_at)
+        ).all()
+        total = len(conn.execute(select(ChatMessage.id)).all())
+    assert [tuple(r) for r in rows] == [(USER_AUTHOR_ID, "q3"), (BOT_AUTHOR_ID, "a3")]
+    assert total == 10
+
+
+def test_backfill_clear_json_and_dry_run(engine):
+    with engine.begin() as conn:
+        _add_chat(conn, "chat-a", _legacy(("user", "q"), ("bot", "a")))
+
+    dry = backfill(engine, dry_run=True)
+    with engine.connect() as conn:
+        assert _messages(conn, "chat-a") == []
+
+    backfill(engine, clear_json=True)
+    with engine.connect() as conn:
+        assert len(_messages(conn, "chat-a")) == 2
+        assert conn.scalar(select(Chat.messages_json).where(Chat.id == "chat-a")) is None
+    assert dry["messages"] == 2
+
+
+async def test_update_chat_messages_appends_rows_without_touching_blob():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Chat.metadata.create_all(sync_conn, tables=TABLES))
+        await conn.run_sync(lambda sync_conn: _add_chat(sync_conn, "chat-x", _legacy(("user", "old"))))
+
+    try:
+        async with AsyncSession(engine) as session:
+            await update_chat_messages(session, "chat-x", "7203は？", "押し目買い候補です")
+            await update_chat_messages(session, "chat-x", "損切りは？", "直近安値割れ")
+            await update_chat_messages(session, "missing", "q", "a")
+
+        async with engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    select(ChatMessage.author_id, ChatMessage.text)
+                    .where(ChatMessage.chat_id == "chat-x")
+                    .order_by(ChatMessage.created_at)
+                )
+            ).all()
+            blob = await conn.scalar(select(Chat.messages_json).where(Chat.id == "chat-x"))
+    finally:
+        await engine.dispose()
+
+    assert [tuple(r) for r in rows] == [
+        (USER_AUTHOR_ID, "7203は？"),
+        (BOT_AUTHOR_ID, "押し目買い候補です"),
+        (USER_AUTHOR_ID, "損切りは？"),
+        (BOT_AUTHOR_ID, "直近安値割れ"),
+    ]
+    assert blob == _legacy(("user", "old"))
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, select
+
+from app.models import Chat, ChatMessage, Position, PositionEvent
+from app.routers import chats
+
+pytestmark = pytest.mark.no_db
+
+BASE = datetime(2025, 3, 1, 9, 0)
+
+
+@pytest_asyncio.fixture
+async def env(sqlite_app):
+    tables = [Chat.__table__, ChatMessage.__table__, Position.__table__, PositionEvent.__table__]
+    app_env = await sqlite_app(tables, [chats.router])
+    async with app_env.engine.begin() as conn:
+        await conn.execute(
+            insert(Chat),
+            [
+                {"id": "chat-1", "name": "t", "created_at": BASE, "updated_at": BASE, "deleted_at": None},
+                {"id": "gone", "name": "t", "created_at": BASE, "updated_at": BASE, "deleted_at": BASE},
+            ],
+        )
+
+    statements = []
+    event.listen(
+        app_env.engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2].split()[0].upper()),
+    )
+    return app_env.client, app_env.session_factory, statements
+
+
+async def _chat_updated_at(session_factory, chat_id="chat-1"):
+    async with session_factory() as session:
+        return (await session.execute(select(Chat.updated_at).where(Chat.id == chat_id))).scalar_one()
+
+
+async def _create(client, chat_id="chat-1", text="hello"):
+    return await client.post(f"/chats/{chat_id}/messages", json={"type": "TEXT", "author_id": "u", "text": text})
+
+
+async def test_create_update_delete_touch_chat_without_rereads(env):
+    client, session_factory, statements = env
+
+    created = await _create(client)
+    assert created.status_code == 200
+    message_id = created.json()["id"]
+    assert statements == ["UPDATE", "INSERT"]
+    touched = await _chat_updated_at(session_factory)
+    assert touched.replace(tzinfo=None) > BASE
+
+    statements.clear()
+    updated = await client.patch(f"/chats/messages/{message_id}", json={"type": "TEXT", "text": "edited"})
+    assert updated.status_code == 200
+    assert updated.json()["text"] == "edited"
+    assert updated.json()["updated_at"] is not None
+    assert statements == ["UPDATE", "UPDATE"]
+
+    statements.clear()
+    deleted = await client.delete(f"/chats/chat-1/messages/{message_id}")
+    assert deleted.status_code == 200
+    assert statements == ["DELETE", "UPDATE"]
+
+
+async def test_missing_targets_are_404(env):
+    client, _, _ = env
+
+    assert (await _create(client, chat_id="nope")).status_code == 404
+    assert (await _create(client, chat_id="gone")).status_code == 404
+    assert (await client.patch("/chats/messages/nope", json={"type": "TEXT", "text": "x"})).status_code == 404
+
+    message_id = (await _create(client)).json()["id"]
+    missing_chat = await client.delete(f"/chats/gone/messages/{message_id}")
+    assert missing_chat.status_code == 404
+    assert "Chat" in missing_chat.json()["detail"]
+    missing_message = await client.delete("/chats/chat-1/messages/nope")
+    assert missing_message.status_code == 404
+    assert "Message" in missing_message.json()["detail"]
+
+
+async def test_undo_only_recent_exit_messages(env):
+    client, session_factory, _ = env
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    async with session_factory() as session:
+        await session.execute(
+            insert(ChatMessage),
+            [
+                {"id": "exit-new", "chat_id": "chat-1", "type": "EXIT", "author_id": "u", "created_at": now},
+                {
+                    "id": "exit-old",
+                    "chat_id": "chat-1",
+                    "type": "EXIT",
+                    "author_id": "u",
+                    "created_at": now - timedelta(hours=1),
+                },
+                {"id": "text", "chat_id": "chat-1", "type": "TEXT", "author_id": "u", "created_at": now},
+            ],
+        )
+        await session.commit()
+
+    assert (await client.post("/chats/messages/exit-new/undo")).status_code == 200
+    assert (await client.post("/chats/messages/exit-new/undo")).status_code == 404
+    assert (await client.post("/chats/messages/exit-old/undo")).json()["detail"].startswith("Message is too old")
+    assert (await client.post("/chats/messages/text/undo")).json()["detail"] == "Only EXIT messages can be undone"
+
+
+async def test_bulk_create_reports_per_item_errors_and_touches_chats_once(env):
+    client, session_factory, statements = env
+    entry = {
+        "symbolCode": "7203",
+        "symbolName": "トヨタ",
+        "side": "LONG",
+        "price": 3000,
+        "qty": 100,
+        "tradeId": "t-1",
+    }
+    items = [{"chat_id": "chat-1", "message": {"type": "TEXT", "author_id": "u", "text": f"m{n}"}} for n in range(5)]
+    items += [
+        {"chat_id": "chat-1", "message": {"type": "ENTRY", "author_id": "u", "payload": entry}},
+        {"chat_id": "chat-1", "message": {"type": "TEXT", "author_id": "u"}},
+        {"chat_id": "gone", "message": {"type": "TEXT", "author_id": "u", "text": "x"}},
+        {"message": {"type": "TEXT", "author_id": "u", "text": "x"}},
+    ]
+
+    response = await client.post("/chats/messages/bulk", json={"items": items})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (6, 3)
+    assert [result["index"] for result in body["results"]] == list(range(9))
+    assert [result["status"] for result in body["results"]][5:] == ["created", "error", "error", "error"]
+    assert "not found" in body["results"][7]["error"]
+    # chats の更新1回 + chat_messages の executemany 1回（残りは ENTRY の台帳記録）
+    assert statements[:2] == ["UPDATE", "INSERT"]
+    assert statements.count("UPDATE") == 1
+
+    listed = (await client.get("/chats/chat-1/messages")).json()
+    assert [m["text"] for m in listed] == ["m0", "m1", "m2", "m3", "m4", None]
+    assert listed[-1]["payload"]["tradeId"] == "t-1"
+    assert (await _chat_updated_at(session_factory)).replace(tzinfo=None) > BASE
+    assert (await _chat_updated_at(session_factory, "gone")).replace(tzinfo=None) == BASE
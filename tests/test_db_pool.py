@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db.pool import TimedAsyncQueuePool, TimedQueuePool, pool_kwargs, pool_metrics
+
+pytestmark = pytest.mark.no_db
+
+
+def test_pool_kwargs_only_tune_server_databases():
+    kwargs = pool_kwargs(
+        "postgresql+asyncpg://u:p@db/app",
+        "async",
+        asynchronous=True,
+        pool_size=5,
+        max_overflow=2,
+        use_lifo=True,
+        timeout=3.0,
+    )
+
+    assert kwargs == {
+        "poolclass": TimedAsyncQueuePool,
+        "pool_logging_name": "async",
+        "pool_size": 5,
+        "max_overflow": 2,
+        "pool_use_lifo": True,
+        "pool_timeout": 3.0,
+    }
+    assert (
+        pool_kwargs(
+            "sqlite+aiosqlite://", "x", asynchronous=True, pool_size=5, max_overflow=2, use_lifo=True, timeout=None
+        )
+        == {}
+    )
+
+
+def test_checkout_wait_timeouts_and_saturation_are_recorded(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite3'}",
+        poolclass=TimedQueuePool,
+        pool_logging_name="test-pool",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = pool_metrics("test-pool")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert metrics.as_dict(engine.pool)["saturation"] == 1.0
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    # dispose でプールが作り直されてもメトリクスは引き継がれる
+    engine.dispose()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    stats = metrics.as_dict(engine.pool)
+    assert (stats["checkouts"], stats["timeouts"], stats["checked_out_max"]) == (2, 1, 1)
+    assert (stats["pool_size"], stats["checked_out"], stats["saturation"]) == (1, 0, 0.0)
+    assert stats["checkout_wait_ms_max"] >= stats["checkout_wait_ms_avg"] > 0
+    engine.dispose()
@@ -0,0 +1,42 @@
+import pytest
+from scripts import import_bars
+
+from app.services.bar_store import BarStore
+
+pytestmark = pytest.mark.no_db
+
+
+def test_imports_per_symbol_and_universe_csv(tmp_path):
+    dumps = tmp_path / "csv"
+    dumps.mkdir()
+    (dumps / "7203.T.csv").write_text(
+        "Date,Open,High,Low,Close,Volume\n2024-01-05,100,110,95,105,1000\n2024-01-04,90,100,85,95,900\n",
+        encoding="utf-8",
+    )
+    (dumps / "universe.csv").write_bytes(
+        'コード,日付,始値,高値,安値,終値,出来高\n6758,2024/01/04,10,11,9,10,"1,500"\n6758,2024/01/05,10,12,9,11,2000\n'.encode(
+            "cp932"
+        )
+    )
+
+    stats = import_bars.import_bars([str(dumps)], str(tmp_path / "bars"))
+    assert stats == {"files": 2, "symbols": 2, "rows": 4, "errors": 0}
+
+    store = BarStore(tmp_path / "bars")
+    assert store.read("7203").close.tolist() == [95.0, 105.0]
+    assert store.read("6758").volume.tolist() == [1500.0, 2000.0]
+
+    # 再実行しても重複しない
+    again = import_bars.import_bars([str(dumps)], str(tmp_path / "bars"))
+    assert again["rows"] == 0
+    assert store.count("6758") == 2
+
+
+def test_missing_columns_are_reported(tmp_path):
+    bad = tmp_path / "1301.csv"
+    bad.write_text("Date,Close\n2024-01-04,100\n", encoding="utf-8")
+
+    stats = import_bars.import_bars([str(bad)], str(tmp_path / "bars"))
+
+    assert stats["errors"] == 1
+    assert stats["rows"] == 0
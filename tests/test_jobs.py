@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+
+from app.models import AnalysisJob
+from app.routers import analyze
+from app.routers import jobs as jobs_router
+from app.services import jobs
+from app.services.jobs import JobWorkerPool, TransientJobError, claim_job, job_handler, submit_job, wait_for_job
+
+pytestmark = pytest.mark.no_db
+
+ALICE = UUID("00000000-0000-0000-0000-00000000000a")
+BOB = UUID("00000000-0000-0000-0000-00000000000b")
+
+calls = {"flaky": 0}
+
+
+@job_handler("test.echo")
+async def _echo(payload, input_data):
+    return {"echo": payload["value"], "bytes": len(input_data or b"")}
+
+
+@job_handler("test.flaky")
+async def _flaky(payload, input_data):
+    calls["flaky"] += 1
+    if calls["flaky"] == 1:
+        raise TransientJobError("upstream 503")
+    return {"ok": True}
+
+
+@job_handler("test.broken")
+async def _broken(payload, input_data):
+    raise ValueError("bad chart")
+
+
+@pytest_asyncio.fixture
+async def env(sqlite_app, monkeypatch):
+    # ワーカーが並行にセッションを開くのでファイル DB を使う
+    app_env = await sqlite_app([AnalysisJob.__table__], [jobs_router.router, analyze.router], file=True)
+    session_factory = app_env.session_factory
+    pool = JobWorkerPool(session_factory, workers=2, interactive_workers=1, retry_backoff=0, poll_interval=0.05)
+    monkeypatch.setattr(jobs, "get_job_pool", lambda: pool)
+    monkeypatch.setattr(jobs_router, "get_job_pool", lambda: pool)
+    monkeypatch.setattr(jobs_router, "async_session_factory", session_factory)
+    calls["flaky"] = 0
+
+    yield app_env.client, session_factory, pool
+    await pool.stop()
+
+
+async def test_claims_prefer_interactive_lane_and_respect_per_user_limit(env):
+    _, session_factory, _ = env
+    async with session_factory() as db:
+        batch = await submit_job(db, "test.echo", {"value": 1}, lane="batch", user_id=ALICE)
+        first = await submit_job(db, "test.echo", {"value": 2}, user_id=ALICE)
+        await submit_job(db, "test.echo", {"value": 3}, user_id=ALICE)
+        bob = await submit_job(db, "test.echo", {"value": 4}, user_id=BOB)
+
+    async with session_factory() as db:
+        assert (await claim_job(db, "w-1", ("interactive",), per_user_limit=1)).job_id == first.job_id
+        # ALICE は上限に達しているので BOB のジョブが先に出る
+        assert (await claim_job(db, "w-1", ("interactive", "batch"), per_user_limit=1)).job_id == bob.job_id
+        assert await claim_job(db, "w-1", ("interactive", "batch"), per_user_limit=1) is None
+        claimed = await claim_job(db, "w-2", ("batch",), per_user_limit=3)
+        assert (claimed.job_id, claimed.attempts) == (batch.job_id, 1)
+
+
+async def test_workers_retry_transient_failures_and_long_poll_returns_results(env):
+    client, session_factory, pool = env
+    async with session_factory() as db:
+        echo = await submit_job(db, "test.echo", {"value": "hi"}, b"png", lane="batch")
+        flaky = await submit_job(db, "test.flaky", {})
+        broken = await submit_job(db, "test.broken", {})
+    await pool.start()
+
+    response = await client.get(f"/jobs/{echo.job_id}", params={"wait": 5})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["result"], body["lane"]) == ("succeeded", {"echo": "hi", "bytes": 3}, "batch")
+
+    body = (await client.get(f"/jobs/{flaky.job_id}", params={"wait": 5})).json()
+    assert (body["status"], body["attempts"], body["result"]) == ("succeeded", 2, {"ok": True})
+
+    body = (await client.get(f"/jobs/{broken.job_id}", params={"wait": 5})).json()
+    assert (body["status"], body["attempts"], body["error"]) == ("failed", 1, "ValueError: bad chart")
+
+    async with session_factory() as db:
+        assert (await db.get(AnalysisJob, echo.job_id)).input_data is None
+    assert (await client.get("/jobs/00000000-0000-0000-0000-000000000000")).status_code == 404
+    stats = (await client.get("/jobs/stats")).json()
+    assert (stats["completed"], stats["failed"], stats["retried"]) == (2, 1, 1)
+
+
+def _job(status, attempts=0, started=None, finished=None, **values):
+    now = datetime.now(timezone.utc)
+    return AnalysisJob(
+        kind="test.echo",
+        lane="interactive",
+        status=status,
+        payload={"value": status},
+        attempts=attempts,
+        max_attempts=3,
+        run_after=now,
+        created_at=now,
+        started_at=now - started if started else None,
+        finished_at=now - finished if finished else None,
+        **values,
+    )
+
+
+async def test_running_pool_recovers_stale_jobs_and_purges_old_ones(env):
+    _, session_factory, _ = env
+    pool = JobWorkerPool(
+        session_factory, workers=1, per_user_limit=1, job_timeout=1, retention=3600, maintenance_interval=0.05
+    )
+    await pool.start()
+    try:
+        # 落ちたプロセスが running のまま残したジョブ（ALICE の枠を埋めている）と終了済みのジョブ
+        stale = _job("running", attempts=1, started=timedelta(seconds=10), worker_id="dead-0", user_id=ALICE)
+        exhausted = _job("running", attempts=3, started=timedelta(seconds=10), worker_id="dead-1")
+        queued = _job("queued", user_id=ALICE)
+        old = _job("succeeded", finished=timedelta(hours=2))
+        recent = _job("failed", finished=timedelta(minutes=5))
+        async with session_factory() as db:
+            db.add_all([stale, exhausted, queued, old, recent])
+            await db.commit()
+
+        for job in (stale, queued):
+            done = await wait_for_job(session_factory, job.job_id, 5, pool=pool, poll_interval=0.05)
+            assert (done.status, done.result) == ("succeeded", {"echo": job.payload["value"], "bytes": 0})
+        async with session_factory() as db:
+            lost = await db.get(AnalysisJob, exhausted.job_id)
+            assert (lost.status, lost.error) == ("failed", "Worker stopped while running the job")
+            assert await db.get(AnalysisJob, old.job_id) is None
+            assert await db.get(AnalysisJob, recent.job_id) is not None
+    finally:
+        await pool.stop()
+
+
+async def test_background_submission_returns_job_id(env, monkeypatch):
+    client, session_factory, _ = env
+    monkeypatch.setattr(analyze.settings, "openai_api_key", "sk-test")
+
+    response = await client.post(
+        "/analyze/chart",
+        params={"background": "true", "lane": "batch", "user_id": str(ALICE)},
+        files={"file": ("chart.png", b"png-bytes", "image/png")},
+    )
+
+    assert response.status_code == 202
+    body = response.json()
+    assert (body["kind"], body["lane"], body["status"]) == ("chart_analysis", "batch", "queued")
+    assert body["statusUrl"] == f"/jobs/{body['jobId']}"
+    async with session_factory() as db:
+        job = await db.get(AnalysisJob, UUID(body["jobId"]))
+    assert (job.payload, job.input_data, job.user_id) == ({"content_type": "image/png"}, b"png-bytes", ALICE)
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+
+from app.models import JournalRollup, TradeJournal
+from app.routers import journal
+
+pytestmark = pytest.mark.no_db
+
+BASE = datetime(2025, 3, 3, 1, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def env(sqlite_app):
+    app_env = await sqlite_app([TradeJournal.__table__, JournalRollup.__table__], [journal.router])
+    statements = []
+    event.listen(app_env.engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return app_env.client, app_env.session_factory, statements
+
+
+def _close(trade_id, pnl, closed_at=BASE, **extra):
+    return {
+        "tradeId": str(trade_id),
+        "chatId": "chat-1",
+        "symbol": "7203",
+        "side": "LONG",
+        "avgEntry": 1000,
+        "avgExit": 1000 + pnl,
+        "qty": 1,
+        "pnlAbs": pnl,
+        "pnlPct": pnl / 10,
+        "holdMinutes": 30,
+        "closedAt": closed_at.isoformat(),
+        **extra,
+    }
+
+
+async def _row(session_factory, trade_id):
+    async with session_factory() as session:
+        return (await session.execute(select(TradeJournal).where(TradeJournal.trade_uuid == trade_id))).scalar_one()
+
+
+async def test_reclose_overwrites_metrics_and_keeps_feedback(env):
+    client, session_factory, statements = env
+    trade_id = uuid4()
+    feedback = {"text": "良いエントリー", "tone": "praise", "next_actions": ["継続"], "message_id": "m1"}
+    analysis = {"score": 80, "labels": ["breakout"]}
+    response = await client.post("/journal/close", json=_close(trade_id, 100, feedback=feedback, analysis=analysis))
+    assert response.json() == {"status": "success", "tradeId": str(trade_id)}
+
+    statements.clear()
+    relabel = {"score": 60, "labels": ["late"]}
+    later = BASE + timedelta(hours=1)
+    update = _close(trade_id, -40, closed_at=later, symbol="9999", analysis=relabel)
+    assert (await client.post("/journal/close", json=update)).status_code == 200
+    # 既存行の読み取り（FOR UPDATE）と UPSERT の2文 + ロールアップ
+    assert sum(s.lstrip().upper().startswith("INSERT INTO TRADE_JOURNAL") for s in statements) == 1
+
+    row = await _row(session_factory, trade_id)
+    assert (row.pnl_abs, row.closed_at.replace(tzinfo=timezone.utc), row.symbol) == (-40, later, "7203")
+    assert (row.feedback_text, row.feedback_message_id) == ("良いエントリー", "m1")
+    assert (row.analysis_score, row.analysis_labels) == (60, ["late"])
+
+    stats = (await client.get("/journal/stats")).json()["buckets"]
+    assert (stats[0]["trades"], stats[0]["pnlAbsSum"]) == (1, -40)
+
+    [entry] = (await client.get("/journal/")).json()
+    assert (entry["tradeId"], entry["feedbackNextActions"], entry["analysisLabels"]) == (
+        str(trade_id),
+        ["継続"],
+        ["late"],
+    )
+
+
+async def test_bulk_close_creates_and_updates_in_one_request(env):
+    client, session_factory, _ = env
+    trade_ids = [uuid4() for _ in range(3)]
+    items = [_close(trade_id, 10 * n, closed_at=BASE + timedelta(days=n)) for n, trade_id in enumerate(trade_ids)]
+    response = await client.post("/journal/close/bulk", json={"items": items})
+    assert response.json() == {"status": "success", "created": 3, "updated": 0}
+
+    items = [_close(trade_ids[0], -25), _close(uuid4(), 5, closed_at=BASE + timedelta(days=5))]
+    response = await client.post("/journal/close/bulk", json={"items": items})
+    assert response.json() == {"status": "success", "created": 1, "updated": 1}
+    assert (await _row(session_factory, trade_ids[0])).pnl_abs == -25
+
+    [total] = (await client.get("/journal/stats")).json()["buckets"]
+    assert (total["trades"], total["pnlAbsSum"]) == (4, -25 + 10 + 20 + 5)
+
+    duplicated = {"items": [_close(trade_ids[1], 1), _close(trade_ids[1], 2)]}
+    assert (await client.post("/journal/close/bulk", json=duplicated)).status_code == 422
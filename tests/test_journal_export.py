@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+
+from app.models import TradeJournal
+from app.routers import journal
+from app.services import journal_export
+
+pytestmark = [
+    pytest.mark.no_db,
+    pytest.mark.filterwarnings("ignore:datetime.datetime.utcnow:DeprecationWarning"),
+]
+
+ALICE = UUID("00000000-0000-0000-0000-00000000000a")
+BASE = datetime(2025, 3, 3, 1, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def client(sqlite_app, monkeypatch):
+    env = await sqlite_app([TradeJournal.__table__], [journal.router])
+    async with env.engine.begin() as conn:
+        await conn.execute(
+            insert(TradeJournal),
+            [
+                {
+                    "trade_uuid": uuid4(),
+                    "user_id": ALICE if n % 2 else None,
+                    "chat_id": "chat-1",
+                    "symbol": "7203" if n % 3 else "6758",
+                    "side": "LONG",
+                    "avg_entry": 1000,
+                    "avg_exit": 1000 + n,
+                    "qty": 100,
+                    "pnl_abs": n * 100,
+                    "pnl_pct": n / 10,
+                    "hold_minutes": 30,
+                    "closed_at": BASE + timedelta(minutes=n),
+                    "feedback_text": "利確が早すぎました, 次は分割で" if n == 1 else None,
+                    "feedback_next_actions": ["トレーリングストップを設定"] if n == 1 else None,
+                    "analysis_labels": ["breakout", "volume"] if n == 1 else None,
+                }
+                for n in range(7)
+            ],
+        )
+    # バッチ境界をまたぐように小さくする
+    monkeypatch.setattr(journal_export, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(journal, "async_session_factory", env.session_factory)
+    return env.client
+
+
+async def test_csv_export_streams_filtered_rows(client):
+    response = await client.get("/journal/export", params={"symbol": "7203", "user_id": str(ALICE)})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"].startswith('attachment; filename="journal-')
+    assert response.content.startswith(b"\xef\xbb\xbf")
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    # n = 1, 5（奇数かつ 3 の倍数以外）を closed_at の昇順で
+    assert [row["avg_exit"] for row in rows] == ["1001.0", "1005.0"]
+    assert list(rows[0]) == journal_export.EXPORT_FIELDS
+    assert rows[0]["feedback_text"] == "利確が早すぎました, 次は分割で"
+    assert json.loads(rows[0]["analysis_labels"]) == ["breakout", "volume"]
+    assert rows[1]["analysis_labels"] == ""
+    assert rows[0]["closed_at"].startswith("2025-03-03T01:01:00")
+
+    assert (await client.get("/journal/export", params={"from_date": "not-a-date"})).status_code == 400
+
+
+async def test_parquet_export_writes_one_row_group_per_batch(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = await client.get("/journal/export", params={"format": "parquet", "pnl": "win"})
+
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == journal_export.EXPORT_FIELDS
+    assert table.column("pnl_abs").to_pylist() == [100.0, 200.0, 300.0, 400.0, 500.0, 600.0]
+    assert table.column("analysis_labels").to_pylist()[0] == ["breakout", "volume"]
+    assert table.column("closed_at").to_pylist()[0] == BASE + timedelta(minutes=1)
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.database import sync_engine
+from app.models import TradeJournal
+from app.services.journal_query import journal_filters
+
+ALICE = UUID("00000000-0000-0000-0000-00000000000a")
+SINCE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def journal_conn():
+    engine = create_engine("sqlite://")
+    TradeJournal.metadata.create_all(engine, tables=[TradeJournal.__table__])
+    rows = [
+        {"symbol": symbol, "user_id": ALICE if n % 2 else None}
+        for n, symbol in enumerate(["7203", "7203.T", "17203", "トヨタ自動車", "50%OFF", "130A"])
+    ]
+    with engine.begin() as conn:
+        conn.execute(
+            insert(TradeJournal),
+            [
+                {
+                    **row,
+                    "trade_uuid": uuid4(),
+                    "chat_id": "chat-1",
+                    "side": "LONG",
+                    "avg_entry": 1,
+                    "avg_exit": 1,
+                    "qty": 1,
+                    "pnl_abs": 0,
+                    "pnl_pct": 0,
+                    "hold_minutes": 1,
+                    "closed_at": SINCE,
+                    "created_at": SINCE,
+                    "updated_at": SINCE,
+                }
+                for row in rows
+            ],
+        )
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def _symbols(conn, **filters):
+    stmt = select(TradeJournal.symbol).where(*journal_filters(**filters)).order_by(TradeJournal.symbol)
+    return conn.execute(stmt).scalars().all()
+
+
+@pytest.mark.no_db
+def test_code_matches_prefix_and_other_terms_match_substring(journal_conn):
+    assert _symbols(journal_conn, symbol="7203") == ["7203", "7203.T"]
+    assert _symbols(journal_conn, symbol="130a") == ["130A"]
+    assert _symbols(journal_conn, symbol="ヨタ") == ["トヨタ自動車"]
+    assert _symbols(journal_conn, symbol="0%") == ["50%OFF"]  # LIKE の特殊文字はエスケープする
+    assert _symbols(journal_conn, symbol="203", user_id=ALICE) == ["7203.T"]
+
+
+def _plan(conn, stmt) -> str:
+    """本番（asyncpg）と同じ $n パラメータのプリペアド文の汎用プラン
+
+    literal_execute の値は実行時と同じく SQL に展開し、それ以外はバインドしたまま PREPARE する。
+    """
+    compiled = stmt.compile(dialect=asyncpg.dialect(), compile_kwargs={"render_postcompile": True})
+    params = {
+        f"p{n}": str(value) if isinstance(value, UUID) else value
+        for n, value in enumerate(compiled.params[name] for name in compiled.positiontup or [])
+    }
+    conn.exec_driver_sql(f"PREPARE journal_plan AS {compiled}")
+    try:
+        arguments = f"({', '.join(f':{name}' for name in params)})" if params else ""
+        return "\n".join(conn.execute(text(f"EXPLAIN EXECUTE journal_plan{arguments}"), params).scalars())
+    finally:
+        conn.exec_driver_sql("DEALLOCATE journal_plan")
+
+
+def test_filters_use_journal_indexes_on_postgres():
+    cases = [
+        ({"user_id": ALICE, "from_date": SINCE}, "ix_trade_journal_user_id_closed_at"),
+        ({"symbol": "7203", "from_date": SINCE}, "ix_trade_journal_symbol_closed_at"),
+        ({"from_date": SINCE}, "ix_trade_journal_closed_at_journal_id"),
+    ]
+    with sync_engine.begin() as conn:
+        if conn.scalar(text("SELECT to_regclass('public.ix_trade_journal_symbol_trgm')")) is not None:
+            cases.append(({"symbol": "toyota"}, "ix_trade_journal_symbol_trgm"))
+        # 空のテーブルでも統計に左右されずインデックスの可否だけを見る。
+        # キャッシュ済みのプリペアド文と同じ汎用プラン（パラメータの値を見ない）で確かめる
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        conn.execute(text("SET LOCAL plan_cache_mode = force_generic_plan"))
+        for filters, index in cases:
+            plan = _plan(conn, select(TradeJournal.journal_id).where(*journal_filters(**filters)))
+            assert index in plan, (filters, plan)
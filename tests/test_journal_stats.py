@@ -0,0 +1,114 @@
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+
+from app.models import JournalRollup, TradeJournal
+from app.routers import journal
+from app.services.journal_stats import DIMENSIONS, rebuild_rollups
+
+pytestmark = [
+    pytest.mark.no_db,
+    # TradeJournal の created_at / updated_at の既定値（datetime.utcnow）由来
+    pytest.mark.filterwarnings("ignore:datetime.datetime.utcnow:DeprecationWarning"),
+]
+
+BASE = datetime(2025, 3, 3, 1, 0, tzinfo=timezone.utc)  # 月曜
+ALICE = UUID("00000000-0000-0000-0000-00000000000a")
+BOB = UUID("00000000-0000-0000-0000-00000000000b")
+
+
+@pytest_asyncio.fixture
+async def env(sqlite_app):
+    app_env = await sqlite_app([TradeJournal.__table__, JournalRollup.__table__], [journal.router])
+    return app_env.client, app_env.session_factory
+
+
+async def _close(client, pnl, closed_at, trade_id=None, symbol="7203", side="LONG", user=ALICE, hold=30):
+    trade_id = trade_id or uuid4()
+    payload = {
+        "tradeId": str(trade_id),
+        "userId": str(user) if user else None,
+        "chatId": "chat-1",
+        "symbol": symbol,
+        "side": side,
+        "avgEntry": 1000,
+        "avgExit": 1000 + pnl,
+        "qty": 1,
+        "pnlAbs": pnl,
+        "pnlPct": pnl / 10,
+        "holdMinutes": hold,
+        "closedAt": closed_at.isoformat(),
+    }
+    response = await client.post("/journal/close", json=payload)
+    assert response.status_code == 200
+    return trade_id
+
+
+def _approx(buckets):
+    return [{k: pytest.approx(v) if isinstance(v, float) else v for k, v in b.items()} for b in buckets]
+
+
+async def _stats(client, group_by="total", **params):
+    response = await client.get("/journal/stats", params={"group_by": group_by, **params})
+    assert response.status_code == 200
+    return response.json()["buckets"]
+
+
+async def test_stats_accumulate_in_order(env):
+    client, _ = env
+    for day, pnl in enumerate([100, -50, -80, 200, -30]):
+        await _close(client, pnl, BASE + timedelta(days=day), symbol="7203" if pnl > 0 else "6758")
+
+    [total] = await _stats(client, user_id=str(ALICE))
+    assert (total["trades"], total["wins"], total["winRate"]) == (5, 2, 0.4)
+    assert (total["pnlAbsSum"], total["pnlAbsAvg"], total["holdMinutesAvg"]) == (140, 28, 30)
+    # 累積 100, 50, -30, 170, 140 → ピーク 100 から -30 まで
+    assert total["maxDrawdown"] == 130
+
+    by_symbol = {b["key"]: b for b in await _stats(client, "symbol", user_id=str(ALICE))}
+    assert {k: (b["trades"], b["maxDrawdown"]) for k, b in by_symbol.items()} == {"6758": (3, 160), "7203": (2, 0)}
+
+    days = await _stats(client, "day", user_id=str(ALICE), from_date="2025-03-04", to_date="2025-03-06")
+    assert [b["key"] for b in days] == ["2025-03-04", "2025-03-05", "2025-03-06"]
+    [week] = await _stats(client, "week", user_id=str(ALICE))
+    assert (week["key"], week["trades"]) == ("2025-03-03", 5)
+
+
+async def test_backdated_closes_and_updates_match_rebuild(env):
+    client, session_factory = env
+    rng = random.Random(7)
+    trade_ids = []
+    for n in range(30):
+        closed_at = BASE + timedelta(days=rng.randrange(40), minutes=n)
+        trade_ids.append(
+            await _close(
+                client,
+                rng.randint(-300, 300),
+                closed_at,
+                symbol=rng.choice(["7203", "6758", "9984"]),
+                side=rng.choice(["LONG", "SHORT"]),
+                user=rng.choice([ALICE, BOB, None]),
+            )
+        )
+    # 既存トレードの再クローズ（損益と日付が変わる）と同一内容の再送
+    await _close(client, -500, BASE + timedelta(days=2), trade_id=trade_ids[3], user=None)
+    await _close(client, -500, BASE + timedelta(days=2), trade_id=trade_ids[3], user=None)
+
+    incremental = {
+        (user, dim): await _stats(client, dim, **({"user_id": str(user)} if user else {}))
+        for user in (ALICE, BOB, None)
+        for dim in DIMENSIONS
+    }
+    async with session_factory() as session:
+        await rebuild_rollups(session)
+        await session.commit()
+    for (user, dim), buckets in incremental.items():
+        rebuilt = await _stats(client, dim, **({"user_id": str(user)} if user else {}))
+        assert rebuilt == _approx(buckets), (user, dim)
+
+    totals = await _stats(client)
+    assert totals[0]["trades"] == 30
+    assert totals[0]["maxDrawdown"] is None  # 全ユーザー合算ではドローダウンを出さない
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+
+from app.db.pagination import NEXT_CURSOR_HEADER, InvalidCursorError, decode_cursor, encode_cursor
+from app.models import Chat, ChatMessage, TradeJournal
+from app.routers import chats, journal
+
+pytestmark = pytest.mark.no_db
+
+BASE = datetime(2025, 3, 1, 9, 0)
+
+
+@pytest_asyncio.fixture
+async def client(sqlite_app):
+    env = await sqlite_app(
+        [Chat.__table__, ChatMessage.__table__, TradeJournal.__table__], [chats.router, journal.router]
+    )
+    async with env.engine.begin() as conn:
+        await conn.execute(insert(Chat).values(id="chat-1", name="t", created_at=BASE, updated_at=BASE))
+        # 同一 created_at を含めて並び順のタイブレークを確認する
+        await conn.execute(
+            insert(ChatMessage),
+            [
+                {
+                    "id": f"m{n:02d}",
+                    "chat_id": "chat-1",
+                    "type": "TEXT",
+                    "author_id": "u",
+                    "text": str(n),
+                    "created_at": BASE + timedelta(minutes=n // 2),
+                }
+                for n in range(25)
+            ],
+        )
+        await conn.execute(
+            insert(TradeJournal),
+            [
+                {
+                    "journal_id": n + 1,
+                    "trade_uuid": uuid4(),
+                    "chat_id": "chat-1",
+                    "symbol": "7203",
+                    "side": "LONG",
+                    "avg_entry": 100,
+                    "avg_exit": 100 + n,
+                    "qty": 1,
+                    "pnl_abs": n,
+                    "pnl_pct": 0,
+                    "hold_minutes": 1,
+                    "closed_at": BASE + timedelta(hours=n // 3),
+                    "created_at": BASE,
+                    "updated_at": BASE,
+                }
+                for n in range(12)
+            ],
+        )
+    return env.client
+
+
+async def _walk(client, url, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        items.extend(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    stamp = datetime(2025, 1, 2, 3, 4, 5, 678)
+    assert decode_cursor(encode_cursor(stamp, "m01")) == (stamp, "m01")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+async def test_message_cursor_pages_match_offset_pages(client):
+    by_cursor = [m["id"] for m in await _walk(client, "/chats/chat-1/messages", limit=7)]
+    by_offset = []
+    for offset in range(0, 25, 7):
+        response = await client.get("/chats/chat-1/messages", params={"limit": 7, "offset": offset})
+        by_offset.extend(m["id"] for m in response.json())
+
+    assert by_cursor == [f"m{n:02d}" for n in range(25)]
+    assert by_offset == by_cursor
+
+
+async def test_journal_cursor_pages_newest_first(client):
+    entries = await _walk(client, "/journal/", limit=5)
+
+    assert [e["pnlAbs"] for e in entries] == list(range(11, -1, -1))
+
+
+async def test_invalid_cursor_is_400(client):
+    assert (await client.get("/chats/chat-1/messages", params={"cursor": "%%%"})).status_code == 400
+    assert (await client.get("/journal/", params={"cursor": "%%%"})).status_code == 400
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.models import Chat, ChatMessage, Position, PositionEvent
+from app.routers import chats, positions
+from app.services import positions_feed
+from app.services.positions_feed import InProcessBroker, PositionsFeed, PositionsHub, make_event
+
+pytestmark = pytest.mark.no_db
+
+BASE = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _upsert(position_id, qty):
+    return make_event("positions.upsert", {"positionId": position_id, "qtyTotal": qty})
+
+
+def test_pending_events_coalesce_per_position():
+    hub = PositionsHub(coalesce_window=0)
+    subscriber = hub.subscribe()
+    for qty in (100, 200, 300):
+        hub.dispatch(_upsert("t-1", qty), "chat-1", None)
+    hub.dispatch(_upsert("t-2", 50), "chat-1", None)
+
+    resnapshot, events = subscriber.drain()
+
+    assert not resnapshot
+    assert [(e["payload"]["positionId"], e["payload"]["qtyTotal"]) for e in events] == [("t-1", 300), ("t-2", 50)]
+    assert hub.metrics.coalesced == 2
+    assert hub.metrics.event_queue_max == 2
+
+
+def test_overflow_drops_to_resnapshot():
+    hub = PositionsHub(coalesce_window=0, max_pending=2)
+    slow = hub.subscribe()
+    for n in range(5):
+        hub.dispatch(_upsert(f"t-{n}", n), None, None)
+
+    resnapshot, events = slow.drain()
+
+    assert resnapshot and events == []
+    assert hub.metrics.resnapshots == 1
+
+
+def test_dispatch_respects_chat_and_user_filters():
+    hub = PositionsHub(coalesce_window=0)
+    everyone = hub.subscribe()
+    chat_one = hub.subscribe(chat_id="chat-1")
+    chat_two = hub.subscribe(chat_id="chat-2")
+    alice = hub.subscribe(user_id="alice")
+    bob_in_chat_one = hub.subscribe(chat_id="chat-1", user_id="bob")
+
+    hub.dispatch(_upsert("t-1", 1), "chat-1", "alice")
+
+    assert [len(s.pending) for s in (everyone, chat_one, chat_two, alice, bob_in_chat_one)] == [1, 1, 0, 1, 0]
+    hub.unsubscribe(chat_two)
+    assert len(hub) == 4
+
+
+async def test_serve_sends_snapshot_then_diffs():
+    hub = PositionsHub(coalesce_window=0.01)
+    subscriber = hub.subscribe()
+    sent = []
+
+    async def send(event):
+        sent.append(event)
+
+    async def load_snapshot():
+        return [{"positionId": "t-1", "qtyTotal": 1}]
+
+    task = asyncio.create_task(hub.serve(subscriber, send, load_snapshot))
+    await asyncio.sleep(0)
+    hub.dispatch(_upsert("t-1", 2), None, None)
+    hub.dispatch(_upsert("t-1", 3), None, None)
+    await asyncio.sleep(0.05)
+    subscriber.request_snapshot()
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    assert [e["type"] for e in sent] == ["positions.snapshot", "positions.upsert", "positions.snapshot"]
+    assert sent[1]["payload"]["qtyTotal"] == 3
+    assert hub.metrics.snapshots == 2
+
+
+@pytest_asyncio.fixture
+async def client(sqlite_app, monkeypatch):
+    tables = [Chat.__table__, ChatMessage.__table__, Position.__table__, PositionEvent.__table__]
+    env = await sqlite_app(tables, [chats.router, positions.router, positions.live_router], file=True)
+    async with env.engine.begin() as conn:
+        await conn.execute(insert(Chat).values(id="chat-1", name="t", created_at=BASE, updated_at=BASE))
+    # TestClient は別スレッドのイベントループで動くので、このループで開いた接続は残さない
+    await env.engine.dispose()
+
+    feed = PositionsFeed(PositionsHub(coalesce_window=0.01), InProcessBroker())
+    await feed.start()
+    monkeypatch.setattr(positions_feed, "_feed", feed)
+
+    with TestClient(env.app) as test_client:
+        yield test_client
+        test_client.portal.call(env.engine.dispose)
+
+
+def test_websocket_streams_snapshot_and_ledger_updates(client):
+    entry = {"symbolCode": "7203", "symbolName": "トヨタ", "side": "LONG", "price": 1000, "qty": 100, "tradeId": "t-1"}
+
+    with client.websocket_connect("/ws/positions?chat_id=chat-1") as ws:
+        snapshot = ws.receive_json()
+        assert (snapshot["type"], snapshot["payload"]["positions"]) == ("positions.snapshot", [])
+
+        response = client.post("/chats/chat-1/messages", json={"type": "ENTRY", "author_id": "u", "payload": entry})
+        assert response.status_code == 200
+        upsert = ws.receive_json()
+        assert upsert["type"] == "positions.upsert"
+        assert (upsert["payload"]["positionId"], upsert["payload"]["qtyTotal"]) == ("t-1", 100)
+
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+        ws.send_json({"type": "positions.snapshot.request"})
+        resnapshot = ws.receive_json()
+        assert [p["positionId"] for p in resnapshot["payload"]["positions"]] == ["t-1"]
+
+    stats = client.get("/positions/live/stats").json()
+    assert stats["backend"] == "InProcessBroker"
+    assert stats["connections"] == 0
+    assert stats["snapshots"] == 2
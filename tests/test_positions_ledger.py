@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from scripts.backfill_positions import backfill
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import Chat, ChatMessage, Position, PositionEvent
+from app.routers import chats, positions
+from app.services.positions_ledger import rebuild_trades, record_messages
+
+pytestmark = pytest.mark.no_db
+
+BASE = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def env(sqlite_app):
+    tables = [Chat.__table__, ChatMessage.__table__, Position.__table__, PositionEvent.__table__]
+    app_env = await sqlite_app(tables, [chats.router, positions.router])
+    async with app_env.engine.begin() as conn:
+        await conn.execute(insert(Chat).values(id="chat-1", name="t", created_at=BASE, updated_at=BASE))
+    return app_env.client, app_env.engine
+
+
+async def _entry(client, price, qty, trade_id="t-1", side="LONG"):
+    payload = {
+        "symbolCode": "7203",
+        "symbolName": "トヨタ",
+        "side": side,
+        "price": price,
+        "qty": qty,
+        "tradeId": trade_id,
+    }
+    response = await client.post("/chats/chat-1/messages", json={"type": "ENTRY", "author_id": "u", "payload": payload})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def _exit(client, price, qty, trade_id="t-1"):
+    payload = {"tradeId": trade_id, "exitPrice": price, "exitQty": qty}
+    response = await client.post("/chats/chat-1/messages", json={"type": "EXIT", "author_id": "u", "payload": payload})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def _position(client, trade_id="t-1"):
+    response = await client.get(f"/positions/{trade_id}")
+    return response.json() if response.status_code == 200 else None
+
+
+async def test_entries_and_exits_fold_into_position(env):
+    client, _ = env
+    await _entry(client, 1000, 100)
+    await _entry(client, 1300, 200)
+    await _exit(client, 1400, 100)
+
+    position = await _position(client)
+    assert (position["qtyTotal"], position["avgPrice"], position["realizedPnl"]) == (200, 1200, 20000)
+    assert position["status"] == "OPEN"
+    assert position["chatId"] == "chat-1"
+
+    await _exit(client, 1100, 500)  # 保有数量までに丸める
+    position = await _position(client)
+    assert (position["qtyTotal"], position["realizedPnl"], position["status"]) == (0, 0, "CLOSED")
+    assert position["closedAt"] is not None
+
+    snapshot = (await client.get("/positions/snapshot", params={"chat_id": "chat-1"})).json()
+    assert snapshot["positions"] == []
+    closed = (await client.get("/positions/snapshot", params={"status": "closed"})).json()
+    assert [p["positionId"] for p in closed["positions"]] == ["t-1"]
+
+
+async def test_short_position_pnl(env):
+    client, _ = env
+    await _entry(client, 2000, 10, trade_id="s-1", side="SHORT")
+    await _exit(client, 1900, 10, trade_id="s-1")
+
+    position = await _position(client, "s-1")
+    assert (position["side"], position["realizedPnl"], position["status"]) == ("SHORT", 1000, "CLOSED")
+
+
+async def test_settled_entry_cannot_be_edited_but_open_one_refolds(env):
+    client, _ = env
+    entry_id = await _entry(client, 1000, 100)
+    edit = {
+        "type": "ENTRY",
+        "payload": {
+            "symbolCode": "7203",
+            "symbolName": "トヨタ",
+            "side": "LONG",
+            "price": 900,
+            "qty": 100,
+            "tradeId": "t-1",
+        },
+    }
+
+    assert (await client.patch(f"/chats/messages/{entry_id}", json=edit)).status_code == 200
+    assert (await _position(client))["avgPrice"] == 900
+
+    await _exit(client, 1000, 100)
+    assert (await client.patch(f"/chats/messages/{entry_id}", json=edit)).status_code == 409
+    assert (await client.patch("/chats/messages/nope", json=edit)).status_code == 404
+
+
+async def test_undo_and_delete_unwind_the_ledger(env):
+    client, _ = env
+    entry_id = await _entry(client, 1000, 100)
+    exit_id = await _exit(client, 1100, 100)
+    assert (await _position(client))["status"] == "CLOSED"
+    version = (await _position(client))["version"]
+
+    assert (await client.post(f"/chats/messages/{exit_id}/undo")).status_code == 200
+    position = await _position(client)
+    assert (position["status"], position["qtyTotal"], position["realizedPnl"]) == ("OPEN", 100, 0)
+    assert position["version"] > version
+
+    assert (await client.delete(f"/chats/chat-1/messages/{entry_id}")).status_code == 200
+    assert await _position(client) is None
+
+
+async def test_backfill_rebuilds_the_same_ledger(env):
+    client, engine = env
+    await _entry(client, 1000, 100)
+    await _entry(client, 1300, 200)
+    await _exit(client, 1400, 100)
+    expected = await _position(client)
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(PositionEvent))
+        await conn.execute(delete(Position))
+
+    stats = await backfill(engine, batch_size=2)
+    assert (stats["events"], stats["trades"]) == (3, 1)
+    rebuilt = await _position(client)
+    assert {k: rebuilt[k] for k in ("qtyTotal", "avgPrice", "realizedPnl", "status")} == {
+        k: expected[k] for k in ("qtyTotal", "avgPrice", "realizedPnl", "status")
+    }
+
+    # 再実行しても重複しない
+    await backfill(engine, batch_size=2)
+    assert (await _position(client))["qtyTotal"] == expected["qtyTotal"]
+
+
+def _message(message_id, kind, minutes, **payload):
+    return {
+        "id": message_id,
+        "chat_id": "chat-1",
+        "type": kind,
+        "payload": {"tradeId": "t-9", **payload},
+        "created_at": BASE + timedelta(minutes=minutes),
+    }
+
+
+async def test_out_of_order_events_match_a_rebuild(env):
+    client, engine = env
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    entry = {"symbolCode": "7203", "side": "LONG", "qty": 100}
+
+    async with session_factory() as db:
+        # ENTRY より先に届いた EXIT は建玉がないので保留になる
+        changes = await record_messages(db, [_message("m-exit", "EXIT", 2, exitPrice=1100, exitQty=40)])
+        assert not changes
+        changes = await record_messages(db, [_message("m-entry", "ENTRY", 1, price=1000, **entry)])
+        assert changes.upserted == {"t-9"}
+        # 畳み込み済みより古い ENTRY（1100円 → 加重平均で 1050円）
+        await record_messages(db, [_message("m-early", "ENTRY", 0, price=1100, **entry)])
+        await db.commit()
+
+    position = await _position(client, "t-9")
+    assert (position["qtyTotal"], position["avgPrice"], position["realizedPnl"]) == (160, 1050, 2000)
+
+    async with session_factory() as db:
+        await rebuild_trades(db, {"t-9"})
+        await db.commit()
+    rebuilt = await _position(client, "t-9")
+    assert {k: rebuilt[k] for k in ("qtyTotal", "avgPrice", "realizedPnl", "status")} == {
+        k: position[k] for k in ("qtyTotal", "avgPrice", "realizedPnl", "status")
+    }